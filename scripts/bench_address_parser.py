@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Benchmark przepustowości AddressParser na korpusie golden.
+
+Test golden (test_address_parser_golden.py) pilnuje POPRAWNOŚCI, ale nikt nie
+mierzy, ile kosztuje każdy kolejny FIX dokładający przebiegi regexów. Ten
+skrypt przepuszcza korpus przez extract_address / extract_street_only /
+extract_from_whitelist / extract_district i raportuje:
+  - cold: każdy ekstraktor osobno, z pustym LRU parsera (czyli z
+    _normalize_text i tokenizacją) — koszt pojedynczego wywołania
+  - pipeline: wszystkie cztery na wspólnym ParsedText (jak w _prepare_offer)
+  - teksty/s, p50/p99/średnia latencji [ms]
+  - alokacje (tracemalloc, na próbce): szczyt na wywołanie [KiB]
+
+Korpusy:
+  - golden: teksty z test_address_golden.json
+  - amplified: syntetyczny korpus (domyślnie 100k) budowany deterministycznie
+    z golden — sklejanie tytułów i opisów różnych ofert, tasowanie zdań,
+    podmiana numerów domów, zmiana wielkości liter
+
+Wynik: JSON (domyślnie bench_results/address_parser-<commit>.json), do
+porównania między commitami: --compare <stary.json>.
+
+Uruchom:
+    python scripts/bench_address_parser.py                    # golden + 100k
+    python scripts/bench_address_parser.py --amplified 0      # tylko golden
+    python scripts/bench_address_parser.py --compare bench_results/address_parser-abc1234.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+# Determinizm: patrz test_address_parser_golden.py (kolejność iteracji whitelist)
+if os.environ.get('PYTHONHASHSEED') != '0':
+    os.environ['PYTHONHASHSEED'] = '0'
+    os.execv(sys.executable, [sys.executable] + sys.argv)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'src'))
+
+from address_parser import AddressParser, ParsedText, PARSE_EXTRACTORS
+
+CACHE = os.path.join(REPO_ROOT, 'test_fixtures', 'geocoding_cache_golden.json')
+GOLDEN = os.path.join(REPO_ROOT, 'test_address_golden.json')
+RESULTS_DIR = os.path.join(REPO_ROOT, 'bench_results')
+
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+')
+_HOUSE_NUMBER = re.compile(r'\b(\d{1,3})(?=[a-zA-Z]?\b)')
+
+
+def load_golden() -> list:
+    with open(GOLDEN, 'r', encoding='utf-8') as f:
+        return list(json.load(f))
+
+
+def amplify(texts: list, size: int, seed: int = 2026) -> list:
+    """Syntetyczny korpus `size` tekstów z golden (deterministyczny dla seed)."""
+    rng = random.Random(seed)
+    out = []
+    while len(out) < size:
+        base = rng.choice(texts)
+        kind = rng.randrange(4)
+        if kind == 0:
+            # tytuł jednej oferty + opis innej
+            other = rng.choice(texts)
+            text = base[:80] + ' ' + other[80:]
+        elif kind == 1:
+            # tasowanie zdań
+            sentences = _SENTENCE_SPLIT.split(base)
+            rng.shuffle(sentences)
+            text = ' '.join(sentences)
+        elif kind == 2:
+            # inne numery domów
+            text = _HOUSE_NUMBER.sub(lambda m: str(rng.randint(1, 150)), base)
+        else:
+            # wielkość liter (CAPS w tytule / wszystko małymi)
+            text = base.upper() if rng.random() < 0.3 else base.lower()
+        out.append(text)
+    return out
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[idx]
+
+
+def summarize(latencies: list) -> dict:
+    latencies = sorted(latencies)
+    total = sum(latencies)
+    return {
+        'count': len(latencies),
+        'total_s': round(total, 3),
+        'texts_per_s': round(len(latencies) / total, 1) if total else None,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 4),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 4),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 4) if latencies else 0.0,
+    }
+
+
+def bench_cold(parser: AddressParser, texts: list) -> dict:
+    """Każdy ekstraktor osobno, z pustym LRU — pełny koszt pojedynczego wywołania."""
+    results = {}
+    for name, method in PARSE_EXTRACTORS.items():
+        fn = getattr(parser, method)
+        latencies = []
+        for text in texts:
+            parser._parse_cache.clear()
+            t0 = time.perf_counter()
+            fn(text)
+            latencies.append(time.perf_counter() - t0)
+        results[name] = summarize(latencies)
+
+    # Sama analiza tekstu (_normalize_text + tokenizacja) — wspólny koszt wszystkich
+    latencies = []
+    for text in texts:
+        t0 = time.perf_counter()
+        ParsedText(text, parser._normalize_text(text))
+        latencies.append(time.perf_counter() - t0)
+    results['parse_text'] = summarize(latencies)
+    return results
+
+
+def bench_pipeline(parser: AddressParser, texts: list) -> dict:
+    """Wszystkie ekstraktory na wspólnym ParsedText (jak w _prepare_offer)."""
+    latencies = []
+    for text in texts:
+        parser._parse_cache.clear()
+        t0 = time.perf_counter()
+        parsed = parser.parse_text(text)
+        for method in PARSE_EXTRACTORS.values():
+            getattr(parser, method)(parsed)
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies)
+
+
+def bench_allocations(parser: AddressParser, texts: list) -> dict:
+    """Szczyt alokacji na wywołanie (tracemalloc spowalnia — tylko próbka)."""
+    results = {}
+    tracemalloc.start()
+    try:
+        for name, method in PARSE_EXTRACTORS.items():
+            fn = getattr(parser, method)
+            peaks = []
+            for text in texts:
+                parser._parse_cache.clear()
+                base, _ = tracemalloc.get_traced_memory()
+                tracemalloc.reset_peak()
+                fn(text)
+                _, peak = tracemalloc.get_traced_memory()
+                peaks.append(max(0, peak - base))
+            peaks.sort()
+            results[name] = {
+                'sample': len(peaks),
+                'peak_kib_p50': round(percentile(peaks, 0.50) / 1024, 2),
+                'peak_kib_p99': round(percentile(peaks, 0.99) / 1024, 2),
+                'peak_kib_max': round(peaks[-1] / 1024, 2) if peaks else 0.0,
+            }
+    finally:
+        tracemalloc.stop()
+    return results
+
+
+def run_corpus(parser: AddressParser, texts: list, alloc_sample: int) -> dict:
+    with contextlib.redirect_stdout(io.StringIO()):  # wydruki ekstraktorów
+        started = time.perf_counter()
+        cold = bench_cold(parser, texts)
+        pipeline = bench_pipeline(parser, texts)
+        allocations = bench_allocations(parser, texts[:alloc_sample])
+        wall = time.perf_counter() - started
+    return {
+        'texts': len(texts),
+        'wall_s': round(wall, 2),
+        'cold': cold,
+        'pipeline': pipeline,
+        'allocations': allocations,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def print_report(report: dict):
+    for corpus, data in report['corpora'].items():
+        print(f"\n📊 {corpus}: {data['texts']} tekstów ({data['wall_s']}s)")
+        print(f"   {'ekstraktor':<14}{'teksty/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'KiB p50':>10}{'KiB p99':>10}")
+        for name, row in data['cold'].items():
+            alloc = data['allocations'].get(name, {})
+            print(f"   {name:<14}{row['texts_per_s'] or 0:>12}{row['p50_ms']:>10}{row['p99_ms']:>10}"
+                  f"{alloc.get('peak_kib_p50', ''):>10}{alloc.get('peak_kib_p99', ''):>10}")
+        row = data['pipeline']
+        print(f"   {'pipeline':<14}{row['texts_per_s'] or 0:>12}{row['p50_ms']:>10}{row['p99_ms']:>10}")
+
+
+def print_comparison(report: dict, baseline: dict):
+    print(f"\n🔁 Porównanie z {baseline['meta'].get('commit')} "
+          f"({baseline['meta'].get('date', '')[:10]}) — zmiana p50 / p99 [%]")
+    for corpus, data in report['corpora'].items():
+        old = baseline.get('corpora', {}).get(corpus)
+        if not old:
+            continue
+        rows = dict(data['cold'], pipeline=data['pipeline'])
+        old_rows = dict(old['cold'], pipeline=old['pipeline'])
+        print(f"   {corpus}:")
+        for name, row in rows.items():
+            prev = old_rows.get(name)
+            if not prev or not prev['p50_ms'] or not prev['p99_ms']:
+                continue
+            d50 = (row['p50_ms'] / prev['p50_ms'] - 1) * 100
+            d99 = (row['p99_ms'] / prev['p99_ms'] - 1) * 100
+            flag = ' ⚠️' if d50 > 10 else ''
+            print(f"      {name:<14}{d50:>+8.1f}%{d99:>+9.1f}%{flag}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Benchmark przepustowości AddressParser')
+    ap.add_argument('--amplified', type=int, default=100_000,
+                    help='rozmiar syntetycznego korpusu (0 = tylko golden)')
+    ap.add_argument('--seed', type=int, default=2026)
+    ap.add_argument('--alloc-sample', type=int, default=2000,
+                    help='ile tekstów na korpus mierzyć pod tracemalloc')
+    ap.add_argument('--out', help='plik wynikowy JSON (domyślnie bench_results/address_parser-<commit>.json)')
+    ap.add_argument('--compare', help='poprzedni wynik JSON do porównania')
+    args = ap.parse_args()
+
+    parser = AddressParser(geocoding_cache_path=CACHE)
+    golden = load_golden()
+    corpora = {'golden': golden}
+    if args.amplified > 0:
+        corpora['amplified'] = amplify(golden, args.amplified, args.seed)
+
+    commit = git_commit()
+    report = {
+        'meta': {
+            'commit': commit,
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'known_streets': len(parser._known_streets),
+            'seed': args.seed,
+        },
+        'corpora': {},
+    }
+    for name, texts in corpora.items():
+        print(f"⏱️  {name}: {len(texts)} tekstów...")
+        report['corpora'][name] = run_corpus(parser, texts, args.alloc_sample)
+
+    print_report(report)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            print_comparison(report, json.load(f))
+
+    out = args.out or os.path.join(RESULTS_DIR, f'address_parser-{commit}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+    print(f"\n✅ Wynik zapisany: {out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -88,6 +88,9 @@ def run_parser(parser, text):
 def main():
     parser = AddressParser(geocoding_cache_path=CACHE)
     texts = collect_texts()
+    # Ekstraktory w puli procesów (parse_many); run_parser niżej trafia w memo
+    # parsera — wyniki i błędy identyczne jak przy wywołaniach pojedynczo
+    parser.parse_many(texts)
     golden = {t: run_parser(parser, t) for t in texts}
 
     out = os.path.join(REPO_ROOT, 'test_address_golden.json')
@@ -8,10 +8,18 @@ Akceptuje formaty:
 - "Aleja Kraśnicka 73a" - zachowuje prefiks Aleja!
 """
 
+import contextlib
+import hashlib
+import io
 import re
-from typing import Optional, Dict
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Union
 
 import address_parser_data as _apd
+import parser_artifact
+from shared_utils import default_workers, map_chunks_in_processes
+from street_matcher import StreetAutomaton, SymSpellIndex
 
 try:
     from Levenshtein import distance as _lev_distance
@@ -22,6 +30,99 @@ except ImportError:  # pragma: no cover — bez python-Levenshtein korekta liter
 # potrafi je wciągnąć do nazwy ("ul. Skierki, w 3-pokojowym" → "Skierki w 3").
 _ONE_LETTER_WORDS = {'w', 'z', 'i', 'o', 'u', 'a', 'k', 'e'}
 
+# Rozmiar LRU przeanalizowanych tekstów (per AddressParser). Oferta to ~3 teksty
+# (tytuł, tytuł+opis, opis), więc mieści pełny skan kilkuset ofert z zapasem.
+PARSE_CACHE_SIZE = 2048
+
+# Ekstraktory uruchamiane przez parse_many: nazwa (klucz wyniku i memo
+# w ParsedText) → metoda AddressParser
+PARSE_EXTRACTORS = {
+    'address': 'extract_address',
+    'street_only': 'extract_street_only',
+    'whitelist': 'extract_from_whitelist',
+    'district': 'extract_district',
+}
+
+_PUNCT_TO_SPACE = re.compile(r'[^\w\sśćłąęóżźńŚĆŁĄĘÓŻŹŃ]')
+
+
+class ParsedText:
+    """
+    Wspólna analiza tekstu dla wszystkich ekstraktorów AddressParser.
+
+    _process_offer wołał extract_address na tytule/pełnym tekście/opisie, a
+    _geocode_candidates zaraz potem extract_street_only / extract_from_whitelist /
+    extract_district na TYCH SAMYCH tekstach — każde wywołanie od nowa puszczało
+    łańcuch regexów _normalize_text i tokenizację. ParsedText liczy to raz:
+      - text: wynik _normalize_text
+      - lower: text.lower() (dzielnice)
+      - words_cap / normalized_raw / words_set_raw / cap_words_raw: tokeny po
+        zamianie interpunkcji na spacje (whitelist)
+      - nominative(): forma mianownikowa tokenów (leniwie, tylko gdy potrzebna)
+      - finditer(pattern): zapamiętane dopasowania regexu (spany) na text
+    oraz wyniki samych ekstraktorów (memo), więc ponowne zapytanie o ten sam
+    tekst nie parsuje niczego.
+    """
+
+    __slots__ = ('raw', 'text', 'lower', 'words_cap', 'normalized_raw', 'words_set_raw',
+                 'cap_words_raw', '_nominative', '_matches', '_results')
+
+    def __init__(self, raw: str, normalized: str):
+        self.raw = raw
+        self.text = normalized
+        self.lower = normalized.lower()
+        # Interpunkcja na spacje (zachowaj wielkość liter w wersji _cap, potrzebną
+        # do filtra rzeczownika własnego w extract_from_whitelist).
+        normalized_cap = _PUNCT_TO_SPACE.sub(' ', normalized)
+        self.words_cap = normalized_cap.split()
+        self.normalized_raw = normalized_cap.lower()
+        self.words_set_raw = set(self.normalized_raw.split())
+        self.cap_words_raw = {w.lower() for w in self.words_cap if w[:1].isupper()}
+        self._nominative = None
+        self._matches = {}
+        self._results = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.raw)
+
+    def nominative(self):
+        """(normalized_nom, words_set_nom, cap_words_nom) — tokeny w mianowniku."""
+        if self._nominative is None:
+            try:
+                from geocoder import to_nominative
+            except ImportError:
+                to_nominative = lambda x: x
+
+            # Transformacja per-word (tylko dla słów ≥4 znaków); jednocześnie budujemy
+            # zbiór dozwolonych słów-mianowników pochodzących ze słów z wielkiej litery.
+            nominative_words = []
+            cap_words_nom = set()
+            for w in self.words_cap:
+                wl = w.lower()
+                if len(w) >= 4 and w[0].isalpha():
+                    nom = to_nominative(wl).lower()
+                else:
+                    nom = wl
+                nominative_words.append(nom)
+                if w[:1].isupper():
+                    cap_words_nom.add(nom)
+            self._nominative = (' '.join(nominative_words), set(nominative_words), cap_words_nom)
+        return self._nominative
+
+    def finditer(self, pattern) -> list:
+        """Lista dopasowań skompilowanego regexu na text (liczona raz)."""
+        matches = self._matches.get(pattern)
+        if matches is None:
+            matches = self._matches[pattern] = list(pattern.finditer(self.text))
+        return matches
+
+    def memo(self, name: str, compute):
+        """Wynik ekstraktora dla tego tekstu; kopia dicta, bo wołający go modyfikują."""
+        if name not in self._results:
+            self._results[name] = compute(self)
+        result = self._results[name]
+        return dict(result) if result else result
+
 
 class AddressParser:
     # Prefiksy ulic - teraz jako GRUPY do wyciągnięcia
@@ -290,17 +391,186 @@ class AddressParser:
         # Wczytuje 148+ znanych nazw ulic które już raz geokodowaliśmy.
         # Używane jako TRZECI fallback po extract_address i extract_street_only.
         # Fix #4.1: filtrujemy słowa z EXCLUDED_WORDS (np. "umcs", "pokoje", "kawalerka")
-        self._known_streets = self._load_known_streets(geocoding_cache_path, self.EXCLUDED_WORDS)
+        #
+        # Artefakt (parser_artifact.py): ulice z cache, automat ulic i indeks literówek
+        # policzone raz i zapisane obok cache — ważne, dopóki nie zmieni się cache ani
+        # źródła parsera. Lista ulic trzyma kolejność wstawiania, więc zbiór niżej
+        # iteruje identycznie jak zbudowany od zera.
+        artifact, fingerprint = None, None
+        if parser_artifact.artifact_enabled():
+            try:
+                fingerprint = parser_artifact.source_fingerprint(geocoding_cache_path)
+                artifact = parser_artifact.load_artifact(geocoding_cache_path, fingerprint)
+            except OSError as e:
+                print(f"⚠️ Artefakt parsera niedostępny: {e}")
+        self.artifact_loaded = artifact is not None
+        if artifact is not None:
+            cache_streets = artifact['cache_streets']
+        else:
+            cache_streets = self._load_known_street_list(geocoding_cache_path, self.EXCLUDED_WORDS)
+        self._known_streets = set(cache_streets)
         # FIX 2026-05-26: hardcoded whitelist znanych ulic Lublina, których brak w geocoding_cache.
         # Trafiają tu nazwy zweryfikowane z OSM/UM Lublin, niemożliwe do wyciągnięcia przez parser
         # z typowych opisów OLX (np. mało wystąpień, brak numeru w opisie).
         self._known_streets |= self.HARDCODED_LUBLIN_STREETS
+
+        self._street_index = None
+        self._typo_symspell = None
+        if artifact is not None:
+            automaton = artifact['automaton']
+            automaton.rerank(self._known_streets)
+            self._street_index = (self._known_streets, len(self._known_streets),
+                                  automaton, artifact['typo_index'])
+        elif fingerprint is not None:
+            _, _, automaton, typo_index = self._street_indexes()
+            parser_artifact.save_artifact(geocoding_cache_path, {
+                'version': parser_artifact.ARTIFACT_VERSION,
+                'fingerprint': fingerprint,
+                'cache_streets': cache_streets,
+                'automaton': automaton,
+                'typo_index': typo_index,
+            })
+        self.geocoding_cache_path = geocoding_cache_path
+        self._parse_cache: 'OrderedDict[bytes, ParsedText]' = OrderedDict()
+        self._parse_cache_size = PARSE_CACHE_SIZE
+        self.parse_stats = {'hits': 0, 'misses': 0, 'batch_items': 0, 'batch_seconds': 0.0}
+
+    def parse_text(self, text: Union[str, ParsedText]) -> ParsedText:
+        """
+        Wspólna analiza tekstu (ParsedText) z LRU kluczowanym hashem tekstu.
+        Przeskanowana ponownie, niezmieniona oferta nie jest parsowana wcale.
+        """
+        if isinstance(text, ParsedText):
+            return text
+        key = self._text_key(text)
+        parsed = self._parse_cache.get(key)
+        if parsed is not None:
+            self._parse_cache.move_to_end(key)
+            self.parse_stats['hits'] += 1
+            return parsed
+        self.parse_stats['misses'] += 1
+        parsed = ParsedText(text, self._normalize_text(text))
+        self._remember(key, parsed)
+        return parsed
+
+    def __getstate__(self):
+        # Kopia dla procesu roboczego (spawn) — bez LRU przeanalizowanych tekstów
+        state = self.__dict__.copy()
+        state['_parse_cache'] = OrderedDict()
+        state['_typo_symspell'] = None
+        return state
+
+    @staticmethod
+    def _text_key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+    def _remember(self, key: bytes, parsed: ParsedText):
+        self._parse_cache[key] = parsed
+        self._parse_cache.move_to_end(key)
+        while len(self._parse_cache) > self._parse_cache_size:
+            self._parse_cache.popitem(last=False)
+
+    def _parse_one(self, text: str, extractors) -> tuple:
+        """Wszystkie ekstraktory na jednym tekście: (ParsedText, wynik z czasem i logiem)."""
+        started = time.perf_counter()
+        parsed = self.parse_text(text)
+        log = io.StringIO()
+        result = {}
+        with contextlib.redirect_stdout(log):
+            for name in extractors:
+                try:
+                    result[name] = getattr(self, PARSE_EXTRACTORS[name])(parsed)
+                except Exception as e:
+                    result[name] = {'__error__': f'{type(e).__name__}: {e}'}
+        result['seconds'] = time.perf_counter() - started
+        result['log'] = log.getvalue()
+        return parsed, result
+
+    def parse_many(self, texts, workers: Optional[int] = None, extractors=None,
+                   chunksize: int = 64) -> list:
+        """
+        Wsadowe parsowanie: wszystkie ekstraktory (domyślnie PARSE_EXTRACTORS) na
+        każdym tekście, rozłożone na pulę procesów.
+
+        Parser po __init__ trzyma tylko niezmienny stan (whitelist, automat,
+        indeks literówek), więc procesy robocze dostają jego kopię (fork: bez
+        kosztu kopiowania) i liczą dokładnie to, co ten parser. Przeanalizowane
+        teksty (ParsedText z wynikami ekstraktorów) wracają do LRU tego parsera —
+        późniejsze extract_* na tych tekstach to trafienia w memo.
+
+        Args:
+            texts: Teksty (duplikaty parsowane raz)
+            workers: Liczba procesów; None = default_workers(), ≤1 = bez puli
+            extractors: Nazwy z PARSE_EXTRACTORS
+            chunksize: Teksty na paczkę wysyłaną do procesu
+
+        Returns:
+            Lista w kolejności wejścia: {<ekstraktor>: wynik | None |
+            {'__error__': ...}, 'seconds': czas parsowania tekstu, 'log': wydruki
+            ekstraktorów}
+        """
+        extractors = tuple(extractors or PARSE_EXTRACTORS)
+        texts = list(texts)
+        unique = list(dict.fromkeys(texts))
+        if workers is None:
+            workers = default_workers()
+        started = time.perf_counter()
+
+        # LRU musi pomieścić całą paczkę, inaczej początek wypadnie przed użyciem
+        self._parse_cache_size = max(self._parse_cache_size, len(unique) + PARSE_CACHE_SIZE)
+        if workers > 1 and len(unique) > chunksize:
+            pairs = map_chunks_in_processes(
+                _parse_chunk, unique, workers, chunksize,
+                initializer=_init_parse_worker,
+                initargs=(self, extractors))
+            for parsed, _ in pairs:
+                self._remember(self._text_key(parsed.raw), parsed)
+        else:
+            pairs = [self._parse_one(text, extractors) for text in unique]
+
+        self.parse_stats['batch_items'] += len(unique)
+        self.parse_stats['batch_seconds'] += time.perf_counter() - started
+        by_text = {text: result for text, (_, result) in zip(unique, pairs)}
+        return [dict(by_text[text]) for text in texts]
     
+    @staticmethod
+    def _load_geocoded_addresses(cache_path: str) -> list:
+        """Adresy z poprawnymi współrzędnymi z cache geokodera.
+
+        Backend SQLite (geocache_sqlite.py): zapytanie po indeksie wpisów
+        pozytywnych, bez wczytywania całego cache. Inaczej płaski JSON.
+        """
+        import json as _json
+        from pathlib import Path as _Path
+        from geocache_sqlite import sqlite_backend_enabled, sqlite_path_for
+
+        if sqlite_backend_enabled(cache_path) and sqlite_path_for(cache_path).exists():
+            from geocache_sqlite import SQLiteGeocodingCache
+            store = SQLiteGeocodingCache(sqlite_path_for(cache_path))
+            try:
+                return store.positive_keys()
+            finally:
+                store.close()
+
+        p = _Path(cache_path)
+        if not p.exists():
+            return []
+        with open(p, 'r', encoding='utf-8') as f:
+            cache = _json.load(f)
+        # Bierzemy tylko wpisy z poprawnymi współrzędnymi
+        return [addr for addr, coords in cache.items() if coords is not None]
+
     @staticmethod
     def _load_known_streets(cache_path: str, excluded_words: set = None) -> set:
+        """Unikalne nazwy ulic z geocoding_cache.json (lowercase) jako set."""
+        return set(AddressParser._load_known_street_list(cache_path, excluded_words))
+
+    @staticmethod
+    def _load_known_street_list(cache_path: str, excluded_words: set = None) -> list:
         """
         Ekstraktuje unikalne nazwy ulic z geocoding_cache.json.
-        Zwraca set z nazwami w lowercase dla szybkiego matching case-insensitive.
+        Zwraca listę nazw w lowercase w kolejności pierwszego wystąpienia
+        (set z niej budowany iteruje jak zbierany przez add()).
         
         Args:
             cache_path: ścieżka do geocoding_cache.json
@@ -309,22 +579,14 @@ class AddressParser:
         """
         excluded_words = excluded_words or set()
         try:
-            import json as _json
-            from pathlib import Path as _Path
-            p = _Path(cache_path)
-            if not p.exists():
-                return set()
-            with open(p, 'r', encoding='utf-8') as f:
-                cache = _json.load(f)
-            streets = set()
+            addresses = AddressParser._load_geocoded_addresses(cache_path)
+            streets = []
+            seen = set()
             # Wzorzec: "Nazwa Ulicy 5" lub "Nazwa Ulicy" - wyciągamy część PRZED numerem
             addr_pattern = re.compile(r'^([\w\sśćłąęóżźńŚĆŁĄĘÓŻŹŃ\.]+?)(?:\s+\d+[a-zA-Z]?(?:/\d+)?)?$')
             prefix_pattern = re.compile(r'^(Aleja|Aleje|Plac|Osiedle)\s+', re.UNICODE)
             
-            for addr, coords in cache.items():
-                # Bierzemy tylko wpisy z poprawnymi współrzędnymi
-                if coords is None:
-                    continue
+            for addr in addresses:
                 m = addr_pattern.match(addr.strip())
                 if not m:
                     continue
@@ -355,11 +617,13 @@ class AddressParser:
                     if any(w in excluded_words for w in street_words_lower):
                         continue
 
-                streets.add(street_name.lower())
+                if street_lower_full not in seen:
+                    seen.add(street_lower_full)
+                    streets.append(street_lower_full)
             return streets
         except Exception as e:
             print(f"⚠️ Nie udało się załadować whitelist z {cache_path}: {e}")
-            return set()
+            return []
     
     def _canonicalize_street(self, street: str) -> str:
         """Mapuje wariant zapisu ulicy na formę kanoniczną (geokodowalną).
@@ -398,13 +662,13 @@ class AddressParser:
         if ' ' in low or len(low) < 9 or low in self._known_streets:
             return street
 
+        # Kubełek (długość, pierwsze 3, ostatnie 2 litery) z indeksu literówek —
+        # pozostaje tylko odległość Levenshteina. SymSpell (street_typo_candidates)
+        # jest tu ~20× wolniejszy: generuje usunięcia, których kubełek i tak nie przepuści.
+        typo_index = self._street_indexes()[3]
         matches = [
-            known for known in self._known_streets
-            if ' ' not in known
-            and len(known) == len(low)
-            and known[:3] == low[:3]
-            and known[-2:] == low[-2:]
-            and _lev_distance(known, low) <= 2
+            known for known in typo_index.get((len(low), low[:3], low[-2:]), ())
+            if _lev_distance(known, low) <= 2
         ]
         if len(matches) != 1:
             return street
@@ -412,7 +676,7 @@ class AddressParser:
         print(f"      🔤 Literówka w nazwie ulicy: '{street}' → '{fixed}'")
         return fixed
 
-    def extract_from_whitelist(self, text: str) -> Optional[Dict[str, Optional[str]]]:
+    def extract_from_whitelist(self, text: Union[str, ParsedText]) -> Optional[Dict[str, Optional[str]]]:
         """
         Fix #4 (2026-05-11): trzeci fallback parsera.
         Wyszukuje w tekście jakiekolwiek znane nazwy ulic Lublina (z geocoding_cache).
@@ -431,24 +695,19 @@ class AddressParser:
         """
         if not self._known_streets or not text:
             return None
-        
-        # FIX 2026-05-14: preprocessing — rozdziel sklejone tokeny i znormalizuj spacje.
-        text = self._normalize_text(text)
-
-        # Normalizacja tekstu: znaki interpunkcyjne na spacje (zachowaj wielkość liter
-        # w wersji _cap, potrzebną do filtra rzeczownika własnego niżej).
-        normalized_cap = re.sub(r'[^\w\sśćłąęóżźńŚĆŁĄĘÓŻŹŃ]', ' ', text)
-        words_cap = normalized_cap.split()
-        normalized_raw = normalized_cap.lower()
-        words_raw = normalized_raw.split()
-        words_set_raw = set(words_raw)
+        # FIX 2026-05-14: preprocessing (_normalize_text) i tokenizacja — raz na tekst, w ParsedText.
+        return self.parse_text(text).memo('whitelist', self._extract_from_whitelist)
 
+    def _extract_from_whitelist(self, parsed: ParsedText) -> Optional[Dict[str, Optional[str]]]:
+        # Tokeny po zamianie interpunkcji na spacje (patrz ParsedText).
         # FIX 2026-07-13: nazwa ulicy to rzeczownik własny → w oryginale pisana z
-        # wielkiej litery. Zbieramy (lowercase) słowa, które wystąpiły z wielkiej litery,
-        # i tylko one mogą być jednowyrazowym dopasowaniem ulicy. Chroni przed
+        # wielkiej litery. cap_words_raw to (lowercase) słowa, które wystąpiły z wielkiej
+        # litery, i tylko one mogą być jednowyrazowym dopasowaniem ulicy. Chroni przed
         # przymiotnikami-które-są-ulicami użytymi opisowo: "w spokojnej okolicy"
         # (spokojnej z małej) NIE jest ul. Spokojna, ale "na Spokojnej" (z wielkiej) tak.
-        cap_words_raw = {w.lower() for w in words_cap if w[:1].isupper()}
+        normalized_raw = parsed.normalized_raw
+        words_set_raw = parsed.words_set_raw
+        cap_words_raw = parsed.cap_words_raw
 
         # === KROK 1: EXACT MATCH (bez transformacji) ===
         # Najczęstszy przypadek: cache i tekst mają tę samą formę nazwy.
@@ -457,28 +716,7 @@ class AddressParser:
         # === KROK 2: NOMINATIVE MATCH (z transformacją do mianownika) ===
         # Jeśli exact nic nie znalazł, próbujemy z mianownikiem ('Lipowej' → 'Lipowa').
         if not candidates:
-            try:
-                from geocoder import to_nominative
-            except ImportError:
-                to_nominative = lambda x: x
-
-            # Transformacja per-word (tylko dla słów ≥4 znaków); jednocześnie budujemy
-            # zbiór dozwolonych słów-mianowników pochodzących ze słów z wielkiej litery.
-            nominative_words = []
-            cap_words_nom = set()
-            for w in words_cap:
-                wl = w.lower()
-                if len(w) >= 4 and w[0].isalpha():
-                    nom = to_nominative(wl).lower()
-                else:
-                    nom = wl
-                nominative_words.append(nom)
-                if w[:1].isupper():
-                    cap_words_nom.add(nom)
-
-            normalized_nom = ' '.join(nominative_words)
-            words_set_nom = set(nominative_words)
-
+            normalized_nom, words_set_nom, cap_words_nom = parsed.nominative()
             candidates = self._find_in_text(words_set_nom, normalized_nom, cap_words_nom)
         
         if not candidates:
@@ -495,35 +733,84 @@ class AddressParser:
             'full': best_street
         }
     
+    def street_typo_candidates(self, street: str, max_distance: int = 2) -> list:
+        """
+        Znane jednowyrazowe ulice w odległości Levenshteina ≤ max_distance od street:
+        [(ulica_lowercase, odległość)], od najbliższej, bez kryteriów kubełka
+        _fix_street_typo. Do diagnostyki korekt literówek — indeks SymSpell
+        budowany leniwie przy pierwszym użyciu.
+        """
+        if not street:
+            return []
+        index = self._street_indexes()
+        if self._typo_symspell is None or self._typo_symspell[0] is not index:
+            self._typo_symspell = (index, SymSpellIndex(k for k in self._known_streets if ' ' not in k))
+        return self._typo_symspell[1].candidates(street.lower(), max_distance)
+
+    def _street_indexes(self) -> tuple:
+        """
+        Indeksy nad whitelist ulic: (zbiór, rozmiar, automat, indeks literówek).
+        Budowane leniwie (albo z artefaktu) i przebudowywane, gdy _known_streets
+        zmieni się (podmiana zbioru / dopisanie ulic).
+
+        Automat Aho-Corasick: ranga wzorca = kolejność iteracji po zbiorze —
+        _find_in_text zwraca kandydatów w tej samej kolejności co dawna pętla po
+        _known_streets (remisy długości w extract_from_whitelist rozstrzygają się
+        tak samo). Indeks literówek: jednowyrazowe ulice w kubełkach
+        (długość, pierwsze 3, ostatnie 2 litery) — kryteria _fix_street_typo.
+        """
+        index = self._street_index
+        if index is None or index[0] is not self._known_streets \
+                or index[1] != len(self._known_streets):
+            typo_index = {}
+            for known in self._known_streets:
+                if ' ' not in known:
+                    typo_index.setdefault((len(known), known[:3], known[-2:]), []).append(known)
+            index = (self._known_streets, len(self._known_streets),
+                     StreetAutomaton(self._known_streets), typo_index)
+            self._street_index = index
+        return index
+
+    def _street_matcher(self) -> StreetAutomaton:
+        """Automat Aho-Corasick nad whitelist ulic (patrz _street_indexes)."""
+        return self._street_indexes()[2]
+
     def _find_in_text(self, words_set: set, text: str, cap_words: set = None) -> list:
         """
         Pomocnicza: szuka znanych ulic w danym tekście.
         Zwraca listę kandydatów (street_lower, score=length).
 
+        Wszystkie wystąpienia wszystkich ulic whitelisty znajduje jeden przebieg
+        automatu (_street_matcher) z semantyką granic słów \\b; filtry poniżej
+        działają na jego spanach.
+
         cap_words: (opcjonalny) zbiór słów (lowercase), które w oryginale wystąpiły
             z wielkiej litery. Jednowyrazowe dopasowanie ulicy jest przyjmowane tylko
             gdy słowo należy do tego zbioru (rzeczownik własny), co odsiewa
             przymiotniki-ulice użyte opisowo ("spokojnej", "zielonej" z małej litery).
         """
+        matcher = self._street_matcher()
+        found = matcher.find_all(text)
         candidates = []
-        for street_lower in self._known_streets:
+        for street_lower in sorted(found, key=matcher.rank.__getitem__):
+            spans = found[street_lower]
             street_words = street_lower.split()
             if len(street_words) == 1:
                 if street_lower in words_set:
-                    occ = list(re.finditer(r'\b' + re.escape(street_lower) + r'\b', text))
+                    occ = spans  # (start, end) każdego wystąpienia
                     # FIX 2026-07-13: pomiń, gdy KAŻDE wystąpienie słowa jest
                     # przymiotnikiem opisującym ofertę ("Przytulna 2-pokojowa" =
                     # przytulne mieszkanie, nie ul. Przytulna). Sygnał: bezpośrednio
                     # następujące złożenie "N-pokojowa/N-osobowy".
-                    if occ and all(self._ADJ_ROOMCOUNT.match(text[m.end():m.end() + 20]) for m in occ):
+                    if all(self._ADJ_ROOMCOUNT.match(text[end:end + 20]) for _, end in occ):
                         continue
                     # FIX 2026-07-14: pomiń, gdy KAŻDE wystąpienie to "<nazwa> okolica"
                     # ("Spokojna okolica" = spokojna dzielnica, nie ul. Spokojna) i NIE
                     # jest wprowadzone prefiksem ulicy (ul./al. — wtedy to jednak adres).
-                    if occ and all(
-                        self._OKOLICA_AFTER.match(text[m.end():m.end() + 15])
-                        and not self._WL_PREFIX_BEFORE.search(text[:m.start()])
-                        for m in occ
+                    if all(
+                        self._OKOLICA_AFTER.match(text[end:end + 15])
+                        and not self._WL_PREFIX_BEFORE.search(text[:start])
+                        for start, end in occ
                     ):
                         continue
                     # FIX 2026-07-13: nazwa ulicy to rzeczownik własny — przyjmij tylko
@@ -533,33 +820,33 @@ class AddressParser:
                     # elektryczna") lądowały jako adres.
                     if cap_words is not None:
                         is_proper = street_lower in cap_words or any(
-                            self._WL_PREFIX_BEFORE.search(text[:m.start()]) for m in occ
+                            self._WL_PREFIX_BEFORE.search(text[:start]) for start, _ in occ
                         )
                         if not is_proper:
                             continue
                     candidates.append((street_lower, len(street_lower)))
             else:
-                pattern = r'\b' + re.escape(street_lower) + r'\b'
-                if re.search(pattern, text):
-                    candidates.append((street_lower, len(street_lower)))
+                candidates.append((street_lower, len(street_lower)))
         return candidates
     
-    def extract_address(self, text: str) -> Optional[Dict[str, str]]:
+    def extract_address(self, text: Union[str, ParsedText]) -> Optional[Dict[str, str]]:
         """
         Wyciąga adres z tekstu.
         
         Args:
-            text: Tekst do przeszukania (tytuł + opis)
+            text: Tekst do przeszukania (tytuł + opis) albo gotowy ParsedText
             
         Returns:
             Dict z kluczami: street, number, full lub None jeśli nie znaleziono
         """
         if not text:
             return None
-        
+        return self.parse_text(text).memo('address', self._extract_address)
+
+    def _extract_address(self, parsed: ParsedText) -> Optional[Dict[str, str]]:
         # FIX 2026-05-14: preprocessing — rozdziel sklejone tokeny (CamelCase, cyfra+wielka)
         # i znormalizuj spacje. Bez tego parser łapie śmieci typu "of PLN 100D" z "PLN 100Deposit".
-        text = self._normalize_text(text)
+        text = parsed.text
         
         # FILTR 1: Sprawdź czy tekst zawiera "X metrów od" - to NIE jest adres
         if re.search(r'\d+\s*metr[oó]w\s+(od|do)', text, re.IGNORECASE):
@@ -669,7 +956,7 @@ class AddressParser:
         excluded_words_lower = self.EXCLUDED_WORDS
         
         # Szukamy WSZYSTKICH dopasowań (prefiks + ulica + numer)
-        matches = self.ADDRESS_PATTERN.finditer(text)
+        matches = parsed.finditer(self.ADDRESS_PATTERN)
         
         # Zbierz wszystkie kandydaty
         candidates = []
@@ -991,7 +1278,7 @@ class AddressParser:
         # Adresy bez numeru (np. "ul. Niecała") są zbyt nieprecyzyjne dla mapy
         return None
 
-    def extract_district(self, text: str) -> Optional[Dict[str, Optional[str]]]:
+    def extract_district(self, text: Union[str, ParsedText]) -> Optional[Dict[str, Optional[str]]]:
         """
         FIX 2026-05-26 (A): czwarty fallback — rozpoznaje dzielnicę Lublina w tekście
         i zwraca jej kanoniczną nazwę. Geocoder zwróci centroid dzielnicy.
@@ -1009,9 +1296,10 @@ class AddressParser:
         """
         if not text:
             return None
+        return self.parse_text(text).memo('district', self._extract_district)
 
-        text = self._normalize_text(text)
-        text_lower = text.lower()
+    def _extract_district(self, parsed: ParsedText) -> Optional[Dict[str, Optional[str]]]:
+        text_lower = parsed.lower
 
         # Dla każdej dzielnicy: sprawdź czy któraś z form występuje w tekście
         # w kontekście lokalizacyjnym (przed nią słowo lokalizacyjne, lub po niej separator).
@@ -1048,7 +1336,7 @@ class AddressParser:
             'full': canonical,
         }
 
-    def extract_street_only(self, text: str) -> Optional[Dict[str, str]]:
+    def extract_street_only(self, text: Union[str, ParsedText]) -> Optional[Dict[str, str]]:
         """
         Ekstrakcja samej nazwy ulicy (BEZ numeru domu) z opisu.
         Używana TYLKO gdy extract_address() zwróciło None — daje przybliżoną lokalizację.
@@ -1064,13 +1352,14 @@ class AddressParser:
         """
         if not text:
             return None
+        return self.parse_text(text).memo('street_only', self._extract_street_only)
 
-        # FIX 2026-05-14: preprocessing — rozdziel sklejone tokeny i znormalizuj spacje.
-        text = self._normalize_text(text)
-
+    def _extract_street_only(self, parsed: ParsedText) -> Optional[Dict[str, str]]:
+        # FIX 2026-05-14: preprocessing — rozdziel sklejone tokeny i znormalizuj spacje
+        # (ParsedText.text to wynik _normalize_text).
         candidates = []
 
-        for match in self.STREET_ONLY_PATTERN.finditer(text):
+        for match in parsed.finditer(self.STREET_ONLY_PATTERN):
             # FIX 2026-05-14 (P2a): pattern ma teraz 3 grupy
             # - grupa 1: prefiks z kropką (ul./al./pl./os.) lub None
             # - grupa 2: prefiks bez kropki (ul/aleja/...) lub None
@@ -1274,6 +1563,31 @@ class AddressParser:
         return True
 
 
+# ----------------------------------------------------------------------
+# Procesy robocze parse_many
+# ----------------------------------------------------------------------
+
+_worker_parser = None
+_worker_extractors = ()
+
+
+def _init_parse_worker(parser: AddressParser, extractors: tuple):
+    global _worker_parser, _worker_extractors
+    _worker_parser = parser
+    _worker_extractors = extractors
+
+
+def _parse_chunk(texts: list) -> list:
+    pairs = []
+    for text in texts:
+        parsed, result = _worker_parser._parse_one(text, _worker_extractors)
+        # Dopasowania regexów (re.Match) nie przechodzą przez pickle — wyniki
+        # ekstraktorów są już w memo, więc nie będą potrzebne
+        parsed._matches = {}
+        pairs.append((parsed, result))
+    return pairs
+
+
 # Testy jednostkowe
 if __name__ == "__main__":
     parser = AddressParser()
@@ -1603,6 +1917,33 @@ if __name__ == "__main__":
             print(f"   Oczekiwano: {expected}")
     print(f"\n📊 Fix 2 EXCLUDED_WORDS: {fix2b_pass} OK / {fix2b_fail} FAIL")
 
+    # ===== Wspólna analiza tekstu (ParsedText + LRU) =====
+    print("\n🧪 ParsedText — jedna analiza tekstu dla wszystkich ekstraktorów:\n")
+    sample = "Pokój na Spokojnej, blisko ul. Narutowicza 38 — dzielnica Czuby"
+    hits_before = parser.parse_stats['hits']
+    first = parser.extract_address(sample)
+    parsed = parser.parse_text(sample)
+    assert parser.extract_address(parsed) == first
+    first['full'] = 'zmienione'  # wołający dostaje kopię — memo zostaje nietknięte
+    assert parser.extract_address(sample)['full'] != 'zmienione'
+    parser.extract_street_only(sample)
+    parser.extract_from_whitelist(sample)
+    parser.extract_district(sample)
+    assert parser.parse_stats['hits'] - hits_before == 5
+    print(f"✅ ParsedText OK ({parser.parse_stats})")
+
+    # parse_many w puli procesów = te same wyniki co pojedyncze wywołania
+    batch = ["ul. Lipowa 5, pokój", "Pokój na Czubach, ul. Zana", "Narutowicza 38", sample]
+    fresh = AddressParser()
+    pooled = fresh.parse_many(batch, workers=2, chunksize=1)
+    for text, result in zip(batch, pooled):
+        assert result['address'] == parser.extract_address(text), text
+        assert result['whitelist'] == parser.extract_from_whitelist(text), text
+    hits_before = fresh.parse_stats['hits']
+    fresh.extract_district(batch[1])
+    assert fresh.parse_stats['hits'] == hits_before + 1  # ParsedText wrócił z procesu do LRU
+    print(f"✅ parse_many OK ({sum(r['seconds'] for r in pooled) * 1000:.1f} ms parsowania)")
+
     # Total summary
     total_pass = pass_count + fix1_pass + fix2_pass + fix4_pass + norm_pass + int_pass + fix2b_pass
     total_fail = fail_count + fix1_fail + fix2_fail + fix4_fail + norm_fail + int_fail + fix2b_fail
@@ -24,6 +24,8 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from address_parser import AddressParser
 from geocoder import Geocoder
 from shared_utils import OFFERS_FILE, GEOCODING_CACHE_FILE
+from offers_sqlite import open_storage, json_path_for
+from offers_journal import JournalOfferStorage, open_journal
 
 
 def is_bogus_address(address_full: str, excluded_words: set) -> bool:
@@ -61,9 +63,14 @@ def main():
     offers_path = Path(args.offers_file)
     cache_path = Path(args.cache_file)
     
-    print(f"📚 Wczytuję {offers_path}")
-    with open(offers_path, 'r', encoding='utf-8') as f:
-        db = json.load(f)
+    # Backend SQLite / journal (SONAR_OFFERS_BACKEND): zapis tylko zmienionych rekordów
+    storage = open_storage(offers_path) or open_journal(offers_path)
+    print(f"📚 Wczytuję {storage.db_path if storage else offers_path}")
+    if storage is not None:
+        db = storage.load()
+    else:
+        with open(offers_path, 'r', encoding='utf-8') as f:
+            db = json.load(f)
     
     ap = AddressParser(geocoding_cache_path=str(cache_path))
     geo = Geocoder(cache_file=str(cache_path))
@@ -86,6 +93,12 @@ def main():
     skipped = 0
     
     now_iso = datetime.now().isoformat()
+
+    # Re-parse całej paczki z góry w puli procesów (AddressParser.parse_many) —
+    # pętla niżej trafia w memo parsera
+    ap.parse_many(
+        [(o.get('title', '') + ' ' + (o.get('description', '') or '')).strip() for o in bogus_offers],
+        extractors=('address', 'street_only', 'whitelist'))
     
     for i, offer in enumerate(bogus_offers, 1):
         addr_full = offer.get('address', {}).get('full', '')
@@ -175,7 +188,15 @@ def main():
     if args.dry_run:
         print(f"\n  💧 DRY RUN - nic nie zapisano. Uruchom bez --dry-run żeby zapisać.")
     else:
-        if fixed + deactivated > 0:
+        if fixed + deactivated > 0 and isinstance(storage, JournalOfferStorage):
+            stats = storage.save(db)
+            print(f"\n  💾 Zapisano {storage.journal_path} ({stats['update'] + stats['deactivate']} zmienionych rekordów)")
+        elif fixed + deactivated > 0 and storage is not None:
+            stats = storage.save(db)
+            storage.export_json(json_path_for(offers_path), db)
+            print(f"\n  💾 Zapisano {storage.db_path} ({stats['written']} zmienionych rekordów) "
+                  f"+ eksport {json_path_for(offers_path).name}")
+        elif fixed + deactivated > 0:
             with open(offers_path, 'w', encoding='utf-8') as f:
                 json.dump(db, f, ensure_ascii=False, indent=2)
             print(f"\n  💾 Zapisano {offers_path}")
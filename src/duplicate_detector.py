@@ -1,10 +1,134 @@
 """
 Duplicate Detector - wykrywanie duplikatów ogłoszeń
 Algorytm: Adres identyczny + opis podobny >95% = duplikat
+
+SimilarityScorer - silnik podobieństwa opisów: znormalizowane teksty w LRU
+(opis liczony raz, nie przy każdej parze), odrzucenie po długościach i
+odległość z progiem (Levenshtein przerywa po przekroczeniu dozwolonej
+liczby edycji). Opisy mają po kilka KB, a większość par to oczywiste
+nie-duplikaty — pełna odległość jest potrzebna tylko do diagnostyki.
+
+DuplicateIndex - przyrostowy indeks dla run_scan: kandydaci tylko z tego
+samego adresu i pasma cen ±5%, podobieństwo jednym wywołaniem
+"jeden do wielu". Wynik identyczny z liniowym find_duplicate, koszt
+~liniowy zamiast O(n²).
 """
 
 import Levenshtein
-from typing import List, Dict
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import List, Dict, Optional
+
+# Ile znormalizowanych opisów trzymać w pamięci (klucz = surowy opis)
+NORMALIZE_CACHE_SIZE = 4096
+
+
+class SimilarityScorer:
+    """
+    Podobieństwo = 1 - Levenshtein / max(len) na tekstach po normalizacji
+    (małe litery, pojedyncze spacje). Pusty tekst (przed normalizacją) nie
+    jest podobny do niczego.
+    """
+    
+    def __init__(self, threshold: float = 0.95, cache_size: int = NORMALIZE_CACHE_SIZE):
+        self.threshold = threshold
+        self.cache_size = cache_size
+        self._normalized: OrderedDict = OrderedDict()
+        self.stats = {'pairs': 0, 'length_pruned': 0, 'distance_computed': 0,
+                      'cache_hits': 0, 'cache_misses': 0}
+    
+    def normalize(self, text: str) -> Optional[str]:
+        """Znormalizowany tekst (LRU) albo None dla pustego."""
+        if not text:
+            return None
+        cached = self._normalized.get(text)
+        if cached is not None:
+            self._normalized.move_to_end(text)
+            self.stats['cache_hits'] += 1
+            return cached
+        self.stats['cache_misses'] += 1
+        normalized = ' '.join(text.lower().split())
+        self._normalized[text] = normalized
+        if len(self._normalized) > self.cache_size:
+            self._normalized.popitem(last=False)
+        return normalized
+    
+    def similarity(self, text1: str, text2: str) -> float:
+        """Dokładne podobieństwo (pełna odległość) — do diagnostyki i raportów."""
+        norm1, norm2 = self.normalize(text1), self.normalize(text2)
+        if norm1 is None or norm2 is None:
+            return 0.0
+        max_len = max(len(norm1), len(norm2))
+        if max_len == 0:
+            return 1.0
+        # Podobieństwo = 1 - (distance / max_length)
+        return 1 - (Levenshtein.distance(norm1, norm2) / max_len)
+    
+    def allowed_edits(self, max_len: int) -> int:
+        """Największa odległość d, przy której 1 - d/max_len >= threshold (-1 = żadna)."""
+        edits = min(max_len, int((1 - self.threshold) * max_len))
+        while edits < max_len and 1 - ((edits + 1) / max_len) >= self.threshold:
+            edits += 1
+        while edits >= 0 and 1 - (edits / max_len) < self.threshold:
+            edits -= 1
+        return edits
+    
+    def is_similar_normalized(self, norm1: Optional[str], norm2: Optional[str]) -> bool:
+        """similarity(...) >= threshold dla tekstów już znormalizowanych."""
+        self.stats['pairs'] += 1
+        if norm1 is None or norm2 is None:
+            return 0.0 >= self.threshold
+        max_len = max(len(norm1), len(norm2))
+        if max_len == 0:
+            return 1.0 >= self.threshold
+        
+        # distance >= |len1 - len2| → różnica długości ponad limit edycji = na pewno poniżej progu
+        edits = self.allowed_edits(max_len)
+        if abs(len(norm1) - len(norm2)) > edits:
+            self.stats['length_pruned'] += 1
+            return False
+        
+        # Levenshtein z progiem: po przekroczeniu `edits` przerywa i zwraca edits + 1
+        self.stats['distance_computed'] += 1
+        return Levenshtein.distance(norm1, norm2, score_cutoff=edits) <= edits
+    
+    def similar_many_normalized(self, query: Optional[str], choices: List[Optional[str]],
+                                limit: Optional[int] = None) -> List[int]:
+        """
+        Indeksy choices podobnych do query (teksty znormalizowane, None = brak opisu),
+        rosnąco; limit = zatrzymaj się po tylu trafieniach.
+        """
+        hits = []
+        for i, choice in enumerate(choices):
+            if self.is_similar_normalized(query, choice):
+                hits.append(i)
+                if limit is not None and len(hits) >= limit:
+                    break
+        return hits
+    
+    def similar_many(self, query: str, choices: List[str]) -> List[int]:
+        """
+        Jeden do wielu: indeksy tekstów z choices o podobieństwie do query >= progu.
+        Query normalizowane raz, choices przez LRU (powtarzające się opisy — za darmo).
+        """
+        return self.similar_many_normalized(self.normalize(query),
+                                            [self.normalize(choice) for choice in choices])
+
+
+class _DedupEntry:
+    """Pola oferty potrzebne do porównania, policzone raz (opis znormalizowany)."""
+    __slots__ = ('offer', 'seq', 'url', 'address', 'price', 'description')
+
+    def __init__(self, offer: Dict, scorer: SimilarityScorer, seq: int = -1):
+        self.offer = offer
+        self.seq = seq
+        self.url = offer.get('url', '').split('?')[0]
+        self.address = offer.get('address', {}).get('full', '').lower().strip()
+        # Uwaga: offer['price'] może być dict {'current': X} lub liczbą
+        raw = offer.get('price', 0)
+        self.price = raw.get('current', 0) if isinstance(raw, dict) else (raw or 0)
+        self.description = scorer.normalize(offer.get('description', ''))
+
 
 class DuplicateDetector:
     def __init__(self, similarity_threshold: float = 0.95):
@@ -13,6 +137,7 @@ class DuplicateDetector:
             similarity_threshold: Próg podobieństwa (0-1), domyślnie 0.95 (95%)
         """
         self.threshold = similarity_threshold
+        self.scorer = SimilarityScorer(similarity_threshold)
     
     def calculate_similarity(self, text1: str, text2: str) -> float:
         """
@@ -21,65 +146,46 @@ class DuplicateDetector:
         Returns:
             Float od 0 (całkowicie różne) do 1 (identyczne)
         """
-        if not text1 or not text2:
-            return 0.0
-        
-        # Normalizacja: małe litery, usunięcie nadmiarowych spacji
-        text1 = ' '.join(text1.lower().split())
-        text2 = ' '.join(text2.lower().split())
-        
-        # Obliczamy odległość Levenshteina
-        distance = Levenshtein.distance(text1, text2)
-        max_len = max(len(text1), len(text2))
-        
-        if max_len == 0:
-            return 1.0
+        return self.scorer.similarity(text1, text2)
+    
+    def _entry(self, offer: Dict, seq: int = -1) -> _DedupEntry:
+        return _DedupEntry(offer, self.scorer, seq)
+    
+    def _prefilter(self, entry1: _DedupEntry, entry2: _DedupEntry, check_address: bool = True) -> bool:
+        """Warunki is_duplicate poza opisem (entry1 = offer1, od jego ceny liczymy ±5%)."""
+        # 0. Ten sam URL → nigdy duplikat (to ta sama oferta)
+        if entry1.url and entry2.url and entry1.url == entry2.url:
+            return False
         
-        # Podobieństwo = 1 - (distance / max_length)
-        similarity = 1 - (distance / max_len)
+        # 1. Adres musi być identyczny
+        if check_address and entry1.address != entry2.address:
+            return False
         
-        return similarity
+        # 2. Cena musi być identyczna lub bardzo podobna (±5%)
+        # Różne ceny = różne pokoje/mieszkania w tym samym budynku
+        price1, price2 = entry1.price, entry2.price
+        if price1 and price2 and abs(price1 - price2) > price1 * 0.05:
+            return False
+        return True
     
-    def is_duplicate(self, offer1: Dict, offer2: Dict) -> bool:
+    def is_duplicate(self, offer1: Dict, offer2: Dict, ignore_address: bool = False) -> bool:
         """
         Sprawdza czy dwa ogłoszenia to duplikaty.
         
         Args:
             offer1, offer2: Dicts z kluczami: address, description, url
+            ignore_address: Pomiń warunek identycznego adresu (kandydaci z
+                RelistIndex — ten sam tekst, inaczej sparsowany adres)
             
         Returns:
             True jeśli duplikat, False jeśli nie
         """
-        # 0. Ten sam URL → nigdy duplikat (to ta sama oferta)
-        url1 = offer1.get('url', '').split('?')[0]
-        url2 = offer2.get('url', '').split('?')[0]
-        if url1 and url2 and url1 == url2:
-            return False
-        
-        # 1. Adres musi być identyczny
-        addr1 = offer1.get('address', {}).get('full', '').lower().strip()
-        addr2 = offer2.get('address', {}).get('full', '').lower().strip()
-        
-        if addr1 != addr2:
-            return False
-        
-        # 2. Cena musi być identyczna lub bardzo podobna (±5%)
-        # Różne ceny = różne pokoje/mieszkania w tym samym budynku
-        # Uwaga: offer['price'] może być dict {'current': X} lub liczbą
-        p1_raw = offer1.get('price', 0)
-        p2_raw = offer2.get('price', 0)
-        price1 = p1_raw.get('current', 0) if isinstance(p1_raw, dict) else (p1_raw or 0)
-        price2 = p2_raw.get('current', 0) if isinstance(p2_raw, dict) else (p2_raw or 0)
-        if price1 and price2 and abs(price1 - price2) > price1 * 0.05:
+        entry1, entry2 = self._entry(offer1), self._entry(offer2)
+        if not self._prefilter(entry1, entry2, check_address=not ignore_address):
             return False
         
         # 3. Sprawdzamy podobieństwo opisów
-        desc1 = offer1.get('description', '')
-        desc2 = offer2.get('description', '')
-        
-        similarity = self.calculate_similarity(desc1, desc2)
-        
-        return similarity >= self.threshold
+        return self.scorer.is_similar_normalized(entry1.description, entry2.description)
     
     def find_duplicates_in_batch(self, offers: List[Dict]) -> List[tuple]:
         """
@@ -91,13 +197,18 @@ class DuplicateDetector:
         Returns:
             Lista tupli (index1, index2) wskazujących na duplikaty
         """
+        # Indeks zamiast wszystkich par: offers[j] porównujemy tylko z wcześniejszymi
+        # ofertami z tego samego bloku (adres + pasmo cen). is_duplicate(offers[i], offers[j])
+        # liczy ±5% od ceny offers[i] — stąd reference_first=True.
+        index = DuplicateIndex(self)
         duplicates = []
         
-        for i in range(len(offers)):
-            for j in range(i + 1, len(offers)):
-                if self.is_duplicate(offers[i], offers[j]):
-                    duplicates.append((i, j))
+        for j, offer in enumerate(offers):
+            for existing in index.find_all(offer, reference_first=True):
+                duplicates.append((existing.seq, j))
+            index.add(offer)
         
+        duplicates.sort()
         return duplicates
     
     def filter_duplicates(self, new_offer: Dict, existing_offers: List[Dict]) -> bool:
@@ -136,6 +247,102 @@ class DuplicateDetector:
         return None
 
 
+class DuplicateIndex:
+    """
+    Przyrostowy indeks ofert zaakceptowanych w skanie.
+    
+    index.find(new_offer) == detector.find_duplicate(new_offer, <dodane oferty>),
+    ale kandydatami są tylko oferty z tym samym znormalizowanym adresem
+    (warunek 1 is_duplicate) i ceną w paśmie ±5% (warunek 2) — plus oferty
+    bez ceny, bo te przechodzą warunek ceny zawsze.
+    
+    Użycie (run_scan):
+        index = DuplicateIndex(detector)
+        if index.find(processed) is None:
+            index.add(processed)
+    """
+    
+    # Pasmo cen z zapasem: pokrywa |p - q| <= 0.05·p w obu kierunkach
+    # (q ∈ [0.95·p, p/0.95]); ostateczna decyzja i tak w _prefilter
+    PRICE_BAND_LOW = 0.95 * (1 - 1e-9)
+    PRICE_BAND_HIGH = (1 / 0.95) * (1 + 1e-9)
+    
+    def __init__(self, detector: DuplicateDetector):
+        self.detector = detector
+        # adres → {'all': [wpisy w kolejności dodania],
+        #          'prices': [ceny rosnąco], 'priced': [wpisy wg ceny],
+        #          'unpriced': [wpisy bez ceny liczbowej]}
+        self._blocks: Dict[str, Dict] = {}
+        self._size = 0
+        self.stats = {'queries': 0, 'candidates': 0}
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    @staticmethod
+    def _banded(price) -> bool:
+        return isinstance(price, (int, float)) and not isinstance(price, bool) and price > 0
+    
+    def add(self, offer: Dict):
+        """Dodaje zaakceptowaną ofertę do indeksu."""
+        entry = self.detector._entry(offer, self._size)
+        self._size += 1
+        block = self._blocks.setdefault(entry.address, {'all': [], 'prices': [], 'priced': [], 'unpriced': []})
+        block['all'].append(entry)
+        if self._banded(entry.price):
+            pos = bisect_right(block['prices'], entry.price)
+            block['prices'].insert(pos, entry.price)
+            block['priced'].insert(pos, entry)
+        else:
+            block['unpriced'].append(entry)
+    
+    def _candidates(self, entry: _DedupEntry) -> List[_DedupEntry]:
+        block = self._blocks.get(entry.address)
+        if not block:
+            return []
+        if not self._banded(entry.price):
+            return block['all']
+        prices = block['prices']
+        lo = bisect_left(prices, entry.price * self.PRICE_BAND_LOW)
+        hi = bisect_right(prices, entry.price * self.PRICE_BAND_HIGH)
+        if not block['unpriced'] and hi - lo == len(block['all']):
+            return block['all']
+        # Kolejność dodania — find() musi zwrócić pierwszy pasujący jak find_duplicate
+        return sorted(block['priced'][lo:hi] + block['unpriced'], key=lambda e: e.seq)
+    
+    def find_all(self, offer: Dict, reference_first: bool = False) -> List[_DedupEntry]:
+        """
+        Wszystkie dodane wpisy, z którymi oferta jest duplikatem (kolejność dodania).
+        
+        Args:
+            reference_first: False → is_duplicate(offer, istniejąca) (jak find_duplicate),
+                             True → is_duplicate(istniejąca, offer) (jak find_duplicates_in_batch)
+        """
+        return self._matches(self.detector._entry(offer), reference_first)
+    
+    def find(self, offer: Dict) -> Optional[Dict]:
+        """Pierwsza dodana oferta, której offer jest duplikatem, albo None."""
+        matches = self._matches(self.detector._entry(offer), False, limit=1)
+        return matches[0].offer if matches else None
+    
+    def _matches(self, entry: _DedupEntry, reference_first: bool,
+                 limit: Optional[int] = None) -> List[_DedupEntry]:
+        self.stats['queries'] += 1
+        prefilter = self.detector._prefilter
+        candidates = []
+        for existing in self._candidates(entry):
+            pair = (existing, entry) if reference_first else (entry, existing)
+            if prefilter(*pair):
+                candidates.append(existing)
+        if not candidates:
+            return []
+        self.stats['candidates'] += len(candidates)
+        # Podobieństwo jest symetryczne — jedno wywołanie "jeden do wielu"
+        hits = self.detector.scorer.similar_many_normalized(
+            entry.description, [existing.description for existing in candidates], limit)
+        return [candidates[i] for i in hits]
+
+
 # Testy jednostkowe
 if __name__ == "__main__":
     detector = DuplicateDetector(similarity_threshold=0.95)
@@ -186,3 +393,69 @@ if __name__ == "__main__":
     
     print(f"Offer1 vs Offer2 (ten sam adres, 93.62% podobny opis): {is_dup_12} (oczekiwano: False, bo <95%)")
     print(f"Offer1 vs Offer3 (inny adres): {is_dup_13} (oczekiwano: False)")
+    
+    # Test 3: DuplicateIndex == liniowe find_duplicate / pary O(n²)
+    print("\n🧪 Test 3 - DuplicateIndex vs pełne porównanie:\n")
+    import random
+    import time
+    
+    rng = random.Random(18)
+    words = ['pokój', 'jednoosobowy', 'blisko', 'umcs', 'kul', 'wifi', 'balkon', 'cisza', 'media', 'w cenie']
+    templates = [' '.join(rng.choice(words) for _ in range(rng.randint(0, 40))) for _ in range(40)]
+    offers = []
+    for n in range(1500):
+        desc = rng.choice(templates)
+        if desc and rng.random() < 0.5:  # drobne zmiany → część powyżej, część poniżej 95%
+            pos = rng.randrange(len(desc))
+            desc = desc[:pos] + rng.choice(['!', 'x', '', '  ', 'ABC']) + desc[pos + 1:]
+        price = rng.choice([None, 0, rng.choice([600, 630, 650, 700, 735, 800]),
+                            {'current': rng.choice([600, 629, 631, 700])}])
+        offers.append({
+            'url': f"https://olx.pl/d/oferta/{rng.randrange(1200)}.html?ref={n}",
+            'address': {'full': rng.choice(['Narutowicza 5', 'narutowicza 5 ', 'Zana 10', 'Lipowa 1'])},
+            'price': price,
+            'description': desc,
+        })
+    
+    t0 = time.perf_counter()
+    brute_pairs = [(i, j) for i in range(len(offers)) for j in range(i + 1, len(offers))
+                   if detector.is_duplicate(offers[i], offers[j])]
+    t_brute = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    assert detector.find_duplicates_in_batch(offers) == brute_pairs
+    t_index = time.perf_counter() - t0
+    
+    index = DuplicateIndex(detector)
+    accepted = []
+    for offer in offers:
+        expected = detector.find_duplicate(offer, accepted)
+        assert index.find(offer) is expected
+        if expected is None:
+            accepted.append(offer)
+            index.add(offer)
+    print(f"✅ {len(brute_pairs)} par duplikatów identycznych "
+          f"(pełne {t_brute:.2f}s, indeks {t_index:.2f}s), zaakceptowane: {len(index)}/{len(offers)}")
+    print(f"   Statystyki indeksu: {index.stats}, scorer: {detector.scorer.stats}")
+    
+    # Test 4: SimilarityScorer — próg zamiast pełnej odległości, opisy po kilka KB
+    print("\n🧪 Test 4 - SimilarityScorer (jeden do wielu):\n")
+    scorer = SimilarityScorer(0.95)
+    for length in range(1, 300):
+        edits = scorer.allowed_edits(length)
+        assert all((1 - d / length >= 0.95) == (d <= edits) for d in range(length + 1))
+    base = ' '.join(rng.choice(words) for _ in range(600))
+    choices = []
+    for _ in range(300):
+        chars = list(base)
+        for _ in range(rng.choice([0, 5, 40, 150, 600])):
+            chars[rng.randrange(len(chars))] = rng.choice('xyz ')
+        choices.append(''.join(chars)[:rng.choice([len(chars), len(chars) - 400])])
+    t0 = time.perf_counter()
+    expected = [i for i, c in enumerate(choices) if detector.calculate_similarity(base, c) >= 0.95]
+    t_full = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    assert scorer.similar_many(base, choices) == expected
+    t_fast = time.perf_counter() - t0
+    print(f"✅ {len(expected)}/{len(choices)} podobnych do opisu {len(base)} zn. "
+          f"(pełna odległość {t_full * 1000:.0f} ms, z progiem {t_fast * 1000:.0f} ms)")
+    print(f"   {scorer.stats}")
@@ -13,6 +13,7 @@ Z surowych snapshotów wyprowadza per oferta:
 import json
 from datetime import datetime
 
+from offers_journal import read_offers
 from profiles_config import TRACKED_PROFILES
 from shared_utils import (DATA_DIR, DOCS_DIR, OFFERS_FILE, TZ,
                           format_datetime, write_json_atomic)
@@ -41,7 +42,7 @@ def _load_json(path, default):
 
 def _offers_by_short_id() -> dict:
     """Indeks ofert z bazy po krótkim ID ('...-ID1be1cg' → '1be1cg')."""
-    data = _load_json(OFFERS_FILE, {})
+    data = read_offers(OFFERS_FILE) if OFFERS_FILE.exists() else {}
     index = {}
     for offer in data.get('offers', []):
         oid = offer.get('id', '')
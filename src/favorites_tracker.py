@@ -21,6 +21,7 @@ import sys
 from datetime import datetime
 
 from scraper import OLXScraper, NETWORK_EXCEPTIONS
+from http_cache import SCAN_CACHE
 from shared_utils import DATA_DIR, TZ, write_json_atomic
 
 # Sesja z impersonacją TLS Safari — zwykły requests dostaje 403 od WAF
@@ -325,6 +326,8 @@ def track_favorites() -> bool:
 
     write_json_atomic(TRACKING_FILE, tracking)
     print(f"💾 Zapisano {TRACKING_FILE}")
+    cache = SCAN_CACHE.summary()
+    print(f"🗄️ Cache HTTP: {cache['hits']} trafień / {cache['misses']} chybień")
     return True
 
 
@@ -0,0 +1,407 @@
+"""
+Gazetteer - offline geokoder Lublina (ulice, numery domów, POI) bez Nominatim.
+
+Każde chybienie cache w Geocoder to request do Nominatim przy 1 req/s,
+a wynik i tak jest potem filtrowany po LUBLIN_BBOX i typie (numer domu /
+ulica) w _nominatim_lookup. Przegeokodowanie całej bazy po poprawce
+parsera to więc godziny.
+
+Gazetteer trzyma lokalny wyciąg OSM Lublina w pamięci:
+  - indeks nazw: znormalizowana nazwa ulicy (mianownik, małe litery, bez
+    prefiksu ul./al.) → punkty ulicy + słownik numerów domów
+  - indeks prefiksów (posortowane nazwy + bisect) — podpowiedzi / zapytania
+    po początku nazwy
+  - KD-tree po wszystkich punktach — reverse(lat, lon): najbliższy adres / ulica
+
+Geocoder pyta gazetteer PRZED Nominatim (Geocoder._nominatim_lookup) i
+dostaje ten sam kontrakt (coords, info) co z Nominatim — house /
+street_level / road / weak — więc fallbacki (mianownik, l. mnoga, ucięty
+numer mieszkania, sama ulica) i return_meta działają bez zmian. Do
+Nominatim idą tylko adresy, których gazetteer nie zna (albo zna tylko
+słabiej, niż trzeba).
+
+Źródła (python gazetteer.py build):
+  - wyciąg OSM: JSON z Overpass API ([out:json] ... out center;) albo
+    GeoJSON — węzły/drogi z addr:street + addr:housenumber, drogi
+    highway=* z nazwą, nazwane POI/osiedla
+  - opcjonalnie pozytywne wpisy geocoding_cache.json (--cache) — niższe
+    zaufanie: wpis z numerem to tylko "Nominatim tak odpowiedział"
+
+Plik data/lublin_gazetteer.json jest ładowany automatycznie, gdy istnieje
+(ścieżkę można nadpisać env SONAR_GAZETTEER, "0" wyłącza).
+"""
+
+import bisect
+import json
+import math
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+GAZETTEER_VERSION = 1
+
+# Prefiksy zapisu ulic pomijane w nazwie indeksu ("ul. Lipowa" = "Lipowa")
+_STREET_PREFIX = re.compile(r'^\s*(?:ul\.?|ulica|al\.?|pl\.?)\s+', re.IGNORECASE)
+_HOUSE_NUMBER_TAIL = re.compile(r'\s+(\d+\s*[a-zA-Z]?(?:\s*/\s*\d+[a-zA-Z]?)?)\s*$')
+_CITY_SUFFIX = re.compile(r',\s*lublin\s*$', re.IGNORECASE)
+
+
+def _normalize_name(name: str) -> str:
+    """'ul. Lipowej' → 'lipowa' (ten sam klucz co geocache_sqlite.normalize_cache_key)."""
+    from geocache_sqlite import normalize_cache_key
+    name = _STREET_PREFIX.sub('', _CITY_SUFFIX.sub('', name or ''))
+    return normalize_cache_key(name)
+
+
+def _normalize_number(number: str) -> str:
+    """'12 A' / '12a/3' → '12a' (numer mieszkania nie rozróżnia budynku)."""
+    return (number or '').split('/')[0].strip().lower().replace(' ', '')
+
+
+def split_address(address: str) -> Tuple[str, Optional[str]]:
+    """'Lipowej 14/2, Lublin' → ('lipowa', '14')."""
+    address = _CITY_SUFFIX.sub('', (address or '').strip())
+    m = _HOUSE_NUMBER_TAIL.search(address)
+    if m:
+        return _normalize_name(address[:m.start()]), _normalize_number(m.group(1))
+    return _normalize_name(address), None
+
+
+class KDTree:
+    """Statyczne drzewo 2D (lat, lon w metrach lokalnego rzutu) do najbliższego sąsiada."""
+
+    def __init__(self, points: List[Tuple[float, float]], ref_lat: float = 51.25):
+        self._kx = 111320.0 * math.cos(math.radians(ref_lat))  # m / stopień długości
+        self._ky = 110540.0                                     # m / stopień szerokości
+        projected = [(lon * self._kx, lat * self._ky, i) for i, (lat, lon) in enumerate(points)]
+        self._root = self._build(projected, 0)
+
+    def _build(self, pts, depth):
+        if not pts:
+            return None
+        axis = depth % 2
+        pts.sort(key=lambda p: p[axis])
+        mid = len(pts) // 2
+        return (pts[mid], axis, self._build(pts[:mid], depth + 1), self._build(pts[mid + 1:], depth + 1))
+
+    def nearest(self, lat: float, lon: float) -> Optional[Tuple[int, float]]:
+        """(indeks punktu, odległość w metrach) albo None dla pustego drzewa."""
+        target = (lon * self._kx, lat * self._ky)
+        best = [None, float('inf')]
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            point, axis, left, right = node
+            d2 = (point[0] - target[0]) ** 2 + (point[1] - target[1]) ** 2
+            if d2 < best[1]:
+                best = [point[2], d2]
+            diff = target[axis] - point[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            # Dalsza gałąź tylko, gdy płaszczyzna podziału jest bliżej niż najlepszy wynik
+            if diff * diff < best[1]:
+                stack.append(far)
+            stack.append(near)
+        if best[0] is None:
+            return None
+        return best[0], math.sqrt(best[1])
+
+
+class Gazetteer:
+    def __init__(self, entries: List[Dict]):
+        """
+        Args:
+            entries: Lista {'name', 'number' | None, 'kind' ('house'|'road'|'place'),
+                     'lat', 'lon'}; name w oryginalnym zapisie (normalizacja tutaj)
+        """
+        self.entries = entries
+        self._streets: Dict[str, Dict] = {}
+        for i, e in enumerate(entries):
+            key = _normalize_name(e['name'])
+            if not key:
+                continue
+            street = self._streets.setdefault(key, {'houses': {}, 'road': [], 'place': []})
+            if e['kind'] == 'house' and e.get('number'):
+                street['houses'].setdefault(_normalize_number(e['number']), i)
+            elif e['kind'] == 'road':
+                street['road'].append(i)
+            else:
+                street['place'].append(i)
+        self._names = sorted(self._streets)
+        self._kdtree = KDTree([(e['lat'], e['lon']) for e in entries])
+        self.stats = {'lookups': 0, 'hits': 0}
+
+    # ------------------------------------------------------------------
+    # ŁADOWANIE
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def load(cls, path) -> 'Gazetteer':
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != GAZETTEER_VERSION:
+            raise ValueError(f"nieobsługiwana wersja gazetteera: {data.get('version')}")
+        keys = ('name', 'number', 'kind', 'lat', 'lon')
+        return cls([dict(zip(keys, row)) for row in data['entries']])
+
+    @classmethod
+    def load_default(cls, cache_file) -> Optional['Gazetteer']:
+        """Gazetteer obok cache geokodera (data/lublin_gazetteer.json) albo z env
+        SONAR_GAZETTEER. None gdy pliku nie ma lub wyłączony ("0")."""
+        env = os.environ.get('SONAR_GAZETTEER')
+        if env == '0':
+            return None
+        path = Path(env) if env else Path(cache_file).parent / 'lublin_gazetteer.json'
+        if not path.exists():
+            return None
+        try:
+            gazetteer = cls.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Gazetteer: nie udało się wczytać {path}: {e}")
+            return None
+        print(f"🗺️  Gazetteer offline: {len(gazetteer.entries)} punktów, "
+              f"{len(gazetteer._names)} nazw ({path.name})")
+        return gazetteer
+
+    def save(self, path):
+        from shared_utils import write_json_atomic
+        rows = [[e['name'], e.get('number'), e['kind'], round(e['lat'], 7), round(e['lon'], 7)]
+                for e in self.entries]
+        write_json_atomic(path, {'version': GAZETTEER_VERSION, 'entries': rows}, indent=None)
+
+    # ------------------------------------------------------------------
+    # ZAPYTANIA
+    # ------------------------------------------------------------------
+
+    def _coords(self, idx: int) -> Dict[str, float]:
+        e = self.entries[idx]
+        return {'lat': e['lat'], 'lon': e['lon']}
+
+    def _street_point(self, street: Dict) -> Optional[Dict[str, float]]:
+        """Punkt ulicy: segment drogi najbliżej środka wszystkich segmentów
+        (środek arytmetyczny krzywej ulicy potrafi leżeć poza nią)."""
+        idxs = street['road']
+        if not idxs:
+            return None
+        if len(idxs) == 1:
+            return self._coords(idxs[0])
+        lat = sum(self.entries[i]['lat'] for i in idxs) / len(idxs)
+        lon = sum(self.entries[i]['lon'] for i in idxs) / len(idxs)
+        best = min(idxs, key=lambda i: (self.entries[i]['lat'] - lat) ** 2 + (self.entries[i]['lon'] - lon) ** 2)
+        return self._coords(best)
+
+    def lookup(self, address: str, require_house: bool = False, prefer_road: bool = False):
+        """
+        Odpowiednik Geocoder._nominatim_lookup na danych lokalnych.
+
+        Returns:
+            (coords | None, info) z kluczami house / street_level / road / weak
+        """
+        info = {'house': False, 'street_level': False, 'road': False, 'weak': False}
+        self.stats['lookups'] += 1
+        name, number = split_address(address)
+        street = self._streets.get(name)
+        if street is None:
+            return None, info
+
+        if number is not None and number in street['houses']:
+            self.stats['hits'] += 1
+            return self._coords(street['houses'][number]), {**info, 'house': True}
+
+        road = self._street_point(street)
+        if road is not None:
+            self.stats['hits'] += 1
+            return road, {**info, 'road': True,
+                          'street_level': bool(require_house and number is not None)}
+
+        if street['place']:
+            self.stats['hits'] += 1
+            return self._coords(street['place'][0]), {**info, 'weak': bool(prefer_road)}
+
+        if street['houses']:
+            # Znamy tylko inne numery tej ulicy — punkt "gdzieś na ulicy"
+            self.stats['hits'] += 1
+            any_house = next(iter(street['houses'].values()))
+            return self._coords(any_house), {**info, 'street_level': bool(require_house), 'road': True}
+        return None, info
+
+    def names_with_prefix(self, prefix: str, limit: int = 20) -> List[str]:
+        """Znormalizowane nazwy zaczynające się od prefiksu ('kraśn' → ['kraśnicka', ...])."""
+        prefix = (prefix or '').strip().casefold()
+        out = []
+        i = bisect.bisect_left(self._names, prefix)
+        while i < len(self._names) and self._names[i].startswith(prefix) and len(out) < limit:
+            out.append(self._names[i])
+            i += 1
+        return out
+
+    def reverse(self, lat: float, lon: float, max_distance_m: float = 150.0) -> Optional[Dict]:
+        """Najbliższy punkt gazetteera (KD-tree) — {'name', 'number', 'kind', 'distance_m'}."""
+        found = self._kdtree.nearest(lat, lon)
+        if found is None or found[1] > max_distance_m:
+            return None
+        idx, distance = found
+        e = self.entries[idx]
+        return {'name': e['name'], 'number': e.get('number'), 'kind': e['kind'],
+                'distance_m': round(distance, 1)}
+
+
+# ----------------------------------------------------------------------
+# BUDOWANIE Z WYCIĄGU OSM
+# ----------------------------------------------------------------------
+
+def _element_point(element: Dict) -> Optional[Tuple[float, float]]:
+    """Punkt elementu Overpass (node: lat/lon, way/relation: center)."""
+    if 'lat' in element and 'lon' in element:
+        return element['lat'], element['lon']
+    center = element.get('center')
+    if center:
+        return center['lat'], center['lon']
+    return None
+
+
+def _feature_point(feature: Dict) -> Optional[Tuple[float, float]]:
+    """Punkt cechy GeoJSON (Point albo środek współrzędnych linii/poligonu)."""
+    geom = feature.get('geometry') or {}
+    coords = geom.get('coordinates')
+    if not coords:
+        return None
+    if geom.get('type') == 'Point':
+        return coords[1], coords[0]
+    flat = []
+
+    def _walk(c):
+        if c and isinstance(c[0], (int, float)):
+            flat.append(c)
+        else:
+            for sub in c:
+                _walk(sub)
+    _walk(coords)
+    if not flat:
+        return None
+    return (sum(c[1] for c in flat) / len(flat), sum(c[0] for c in flat) / len(flat))
+
+
+def entries_from_osm(data: Dict, bbox: Dict) -> List[Dict]:
+    """Wpisy gazetteera z JSON Overpass (elements) albo GeoJSON (features)."""
+    if 'elements' in data:
+        items = [(el.get('tags') or {}, _element_point(el)) for el in data['elements']]
+    else:
+        items = [(f.get('properties') or {}, _feature_point(f)) for f in data.get('features', [])]
+
+    entries = []
+    for tags, point in items:
+        if point is None:
+            continue
+        lat, lon = point
+        if not (bbox['min_lat'] <= lat <= bbox['max_lat'] and bbox['min_lon'] <= lon <= bbox['max_lon']):
+            continue
+        if tags.get('addr:street') and tags.get('addr:housenumber'):
+            # addr:housenumber bywa listą "12;14"
+            for number in str(tags['addr:housenumber']).split(';'):
+                entries.append({'name': tags['addr:street'], 'number': number.strip(),
+                                'kind': 'house', 'lat': lat, 'lon': lon})
+        if tags.get('name'):
+            kind = 'road' if tags.get('highway') else 'place'
+            entries.append({'name': tags['name'], 'number': None, 'kind': kind, 'lat': lat, 'lon': lon})
+    return entries
+
+
+def entries_from_cache(cache: Dict, bbox: Dict) -> List[Dict]:
+    """Wpisy z pozytywnych wyników geocoding_cache.json (niższe zaufanie)."""
+    entries = []
+    for key, coords in cache.items():
+        if not coords:
+            continue
+        lat, lon = coords['lat'], coords['lon']
+        if not (bbox['min_lat'] <= lat <= bbox['max_lat'] and bbox['min_lon'] <= lon <= bbox['max_lon']):
+            continue
+        m = _HOUSE_NUMBER_TAIL.search(_CITY_SUFFIX.sub('', key.strip()))
+        if m:
+            entries.append({'name': _CITY_SUFFIX.sub('', key.strip())[:m.start()], 'number': m.group(1),
+                            'kind': 'house', 'lat': lat, 'lon': lon})
+        else:
+            entries.append({'name': key, 'number': None, 'kind': 'road', 'lat': lat, 'lon': lon})
+    return entries
+
+
+def main():
+    import argparse
+    from geocoder import LUBLIN_BBOX
+
+    parser = argparse.ArgumentParser(description='Offline gazetteer Lublina')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p_build = sub.add_parser('build', help='Zbuduj data/lublin_gazetteer.json')
+    p_build.add_argument('--osm', help='Wyciąg OSM: JSON z Overpass albo GeoJSON')
+    p_build.add_argument('--cache', help='geocoding_cache.json (pozytywne wpisy, niższe zaufanie)')
+    p_build.add_argument('--out', default=str(Path(__file__).resolve().parent.parent / 'data' / 'lublin_gazetteer.json'))
+    p_query = sub.add_parser('query', help='Geokoduj adres z gazetteera')
+    p_query.add_argument('address')
+    p_query.add_argument('--file', default=str(Path(__file__).resolve().parent.parent / 'data' / 'lublin_gazetteer.json'))
+    args = parser.parse_args()
+
+    if args.cmd == 'build':
+        entries = []
+        if args.osm:
+            with open(args.osm, 'r', encoding='utf-8') as f:
+                entries += entries_from_osm(json.load(f), LUBLIN_BBOX)
+        if args.cache:
+            with open(args.cache, 'r', encoding='utf-8') as f:
+                entries += entries_from_cache(json.load(f), LUBLIN_BBOX)
+        if not entries:
+            parser.error('podaj --osm i/lub --cache')
+        gazetteer = Gazetteer(entries)
+        gazetteer.save(args.out)
+        print(f"✅ Zapisano {len(entries)} punktów ({len(gazetteer._names)} nazw) do {args.out}")
+    else:
+        gazetteer = Gazetteer.load(args.file)
+        house = bool(_HOUSE_NUMBER_TAIL.search(args.address))
+        print(gazetteer.lookup(args.address, require_house=house, prefer_road=not house))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main()
+    else:
+        import random
+        import time
+
+        print("🧪 Test gazetteer offline\n")
+        bbox = {'min_lat': 51.18, 'max_lat': 51.30, 'min_lon': 22.42, 'max_lon': 22.68}
+        overpass = {'elements': [
+            {'type': 'node', 'lat': 51.2342, 'lon': 22.5601,
+             'tags': {'addr:street': 'Lipowa', 'addr:housenumber': '14'}},
+            {'type': 'way', 'center': {'lat': 51.2350, 'lon': 22.5590},
+             'tags': {'highway': 'residential', 'name': 'Lipowa'}},
+            {'type': 'way', 'center': {'lat': 51.2610, 'lon': 22.5200},
+             'tags': {'landuse': 'residential', 'name': 'Osiedle Chopina'}},
+            {'type': 'node', 'lat': 50.0, 'lon': 20.0,
+             'tags': {'addr:street': 'Lipowa', 'addr:housenumber': '99'}},  # poza Lublinem
+        ]}
+        gz = Gazetteer(entries_from_osm(overpass, bbox))
+        coords, info = gz.lookup('Lipowej 14/2', require_house=True)
+        assert coords == {'lat': 51.2342, 'lon': 22.5601} and info['house']
+        coords, info = gz.lookup('Lipowa 99', require_house=True)
+        assert coords is not None and info['street_level']
+        coords, info = gz.lookup('ul. Lipowej', prefer_road=True)
+        assert info['road'] and not info['weak']
+        assert gz.lookup('Osiedle Chopina', prefer_road=True)[1]['weak']
+        assert gz.lookup('Nieznana 5')[0] is None
+        assert gz.names_with_prefix('lip') == ['lipowa']
+        assert gz.reverse(51.23421, 22.56012)['number'] == '14'
+
+        # KD-tree vs brute force
+        rnd = random.Random(1)
+        pts = [(51.18 + rnd.random() * 0.12, 22.42 + rnd.random() * 0.26) for _ in range(20000)]
+        tree = KDTree(pts)
+        t0 = time.time()
+        for _ in range(200):
+            q = (51.18 + rnd.random() * 0.12, 22.42 + rnd.random() * 0.26)
+            idx, _ = tree.nearest(*q)
+            brute = min(range(len(pts)), key=lambda i: ((pts[i][0] - q[0]) * 110540) ** 2
+                        + ((pts[i][1] - q[1]) * tree._kx) ** 2)
+            assert idx == brute
+        print(f"✅ Gazetteer OK (KD-tree 20k punktów: {(time.time() - t0) / 200 * 1000:.2f} ms/zapytanie z brute-force)")
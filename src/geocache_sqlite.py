@@ -0,0 +1,336 @@
+"""
+Geocache SQLite - opcjonalny backend cache geokodowania (zamiast płaskiego JSON).
+
+geocoding_cache.json to jeden słownik {adres: coords | None} wczytywany w
+całości przez Geocoder._load_cache, AddressParser._load_known_streets
+i retry_none_cache. Odmiany tej samej ulicy ("Lipowej 14", "Lipowa 14",
+"Lipowa 14/2") to osobne klucze, a wpisy None (Nominatim nie znalazł)
+nie wygasają nigdy — literówka sprzed roku blokuje adres na zawsze.
+
+Backend SQLite (tabela geocache):
+  - key       — dokładny klucz jak w JSON (kontrakt self.cache[adres] bez zmian)
+  - norm_key  — klucz znormalizowany: mianownik, bez numeru mieszkania,
+                małe litery ("Lipowej 14/2" → "lipowa 14"), z indeksem —
+                odmiana już geokodowanego adresu nie idzie do Nominatim
+  - lat/lon   — NULL = wpis negatywny
+  - result_type / number_fallback — typ wyniku Nominatim (house / road / place)
+  - updated_at — wpisy negatywne starsze niż negative_ttl są traktowane jak
+                 brak wpisu, więc geocoder sam ponawia je w kolejnym scanie
+  - indeks częściowy po wpisach pozytywnych — whitelist ulic parsera czyta
+    tylko je, bez parsowania całego cache
+
+Włączenie: env SONAR_GEOCACHE_BACKEND=sqlite (obok geocoding_cache.json
+powstaje geocoding_cache.sqlite, przy pierwszym otwarciu zasilony z JSON)
+albo ścieżka cache z rozszerzeniem .sqlite / .db. Przy zapisie snapshotu
+Geocoder eksportuje też JSON — fixture'y golden i skrypty naprawcze dalej
+czytają płaski plik.
+
+CLI:
+    python geocache_sqlite.py import data/geocoding_cache.json data/geocoding_cache.sqlite
+    python geocache_sqlite.py export data/geocoding_cache.sqlite test_fixtures/geocoding_cache_golden.json
+    python geocache_sqlite.py stats data/geocoding_cache.sqlite
+"""
+
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections.abc import MutableMapping
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from shared_utils import write_json_atomic
+
+SQLITE_SUFFIXES = ('.sqlite', '.db')
+DEFAULT_NEGATIVE_TTL = 30 * 24 * 3600  # miesiąc — OSM w tym czasie dostaje nowe numery/ulice
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocache (
+    key             TEXT PRIMARY KEY,
+    norm_key        TEXT NOT NULL,
+    lat             REAL,
+    lon             REAL,
+    result_type     TEXT,
+    number_fallback INTEGER NOT NULL DEFAULT 0,
+    updated_at      REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_geocache_norm ON geocache(norm_key);
+CREATE INDEX IF NOT EXISTS idx_geocache_positive ON geocache(key) WHERE lat IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_geocache_negative ON geocache(updated_at) WHERE lat IS NULL;
+"""
+
+_APARTMENT_RE = re.compile(r'(\d+[a-zA-Z]?)\s*/\s*\d+[a-zA-Z]?\b')
+_SPACES_RE = re.compile(r'\s+')
+
+
+def normalize_cache_key(address: str) -> str:
+    """Klucz wspólny dla odmian adresu: 'Lipowej 14/2' → 'lipowa 14'."""
+    from geocoder import to_nominative  # import leniwy: geocoder importuje ten moduł
+
+    if not address:
+        return ''
+    address = _APARTMENT_RE.sub(r'\1', address.strip())
+    address = to_nominative(_SPACES_RE.sub(' ', address))
+    return address.casefold()
+
+
+def sqlite_backend_enabled(cache_path) -> bool:
+    """Czy cache pod tą ścieżką obsługuje backend SQLite."""
+    if Path(str(cache_path)).suffix in SQLITE_SUFFIXES:
+        return True
+    return os.environ.get('SONAR_GEOCACHE_BACKEND', 'json').lower() == 'sqlite'
+
+
+def sqlite_path_for(cache_path) -> Path:
+    """geocoding_cache.json → geocoding_cache.sqlite (ścieżka .sqlite/.db bez zmian)."""
+    path = Path(str(cache_path))
+    return path if path.suffix in SQLITE_SUFFIXES else path.with_suffix('.sqlite')
+
+
+class SQLiteGeocodingCache(MutableMapping):
+    """Mapping {adres: coords | None} na SQLite — drop-in za słownik Geocoder.cache."""
+
+    def __init__(self, db_path, negative_ttl: float = DEFAULT_NEGATIVE_TTL,
+                 import_json: Optional[Path] = None):
+        """
+        Args:
+            db_path: Plik bazy (tworzony przy pierwszym otwarciu)
+            negative_ttl: Po ilu sekundach wpis None przestaje obowiązywać
+            import_json: Płaski geocoding_cache.json do zaimportowania, gdy baza jest pusta
+        """
+        self.db_path = Path(db_path)
+        self.negative_ttl = negative_ttl
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+        if import_json is not None and len(self) == 0 and Path(import_json).exists():
+            imported = self.import_json(import_json)
+            print(f"📥 Geocache SQLite: zaimportowano {imported} wpisów z {Path(import_json).name}")
+
+    # ------------------------------------------------------------------
+    # MAPPING
+    # ------------------------------------------------------------------
+
+    def _negative_cutoff(self) -> float:
+        return time.time() - self.negative_ttl
+
+    @staticmethod
+    def _coords(row) -> Optional[Dict[str, float]]:
+        lat, lon = row
+        return None if lat is None else {'lat': lat, 'lon': lon}
+
+    def __getitem__(self, key: str):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT lat, lon, updated_at FROM geocache WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        lat, lon, updated_at = row
+        if lat is None and updated_at < self._negative_cutoff():
+            # Wygasły wpis negatywny = brak wpisu → geocoder spróbuje ponownie
+            raise KeyError(key)
+        return self._coords((lat, lon))
+
+    def __setitem__(self, key: str, coords: Optional[Dict[str, float]]):
+        lat = coords['lat'] if coords else None
+        lon = coords['lon'] if coords else None
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO geocache (key, norm_key, lat, lon, updated_at) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET norm_key = excluded.norm_key, lat = excluded.lat, '
+                'lon = excluded.lon, updated_at = excluded.updated_at',
+                (key, normalize_cache_key(key), lat, lon, time.time()))
+
+    def __delitem__(self, key: str):
+        with self._lock:
+            cur = self._conn.execute('DELETE FROM geocache WHERE key = ?', (key,))
+        if cur.rowcount == 0:
+            raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT key FROM geocache WHERE lat IS NOT NULL OR updated_at >= ?',
+                (self._negative_cutoff(),)).fetchall()
+        return iter([r[0] for r in rows])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM geocache WHERE lat IS NOT NULL OR updated_at >= ?',
+                (self._negative_cutoff(),)).fetchone()[0]
+
+    def items(self):
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT key, lat, lon FROM geocache WHERE lat IS NOT NULL OR updated_at >= ?',
+                (self._negative_cutoff(),)).fetchall()
+        return [(key, self._coords((lat, lon))) for key, lat, lon in rows]
+
+    # ------------------------------------------------------------------
+    # ZAPYTANIA
+    # ------------------------------------------------------------------
+
+    def lookup_normalized(self, address: str) -> Optional[Dict[str, float]]:
+        """Koordynaty odmiany tego samego adresu (ten sam norm_key), jeśli jest
+        pozytywna. Preferuje wyniki z numerem domu, potem najświeższe."""
+        norm = normalize_cache_key(address)
+        if not norm:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT lat, lon FROM geocache WHERE norm_key = ? AND lat IS NOT NULL "
+                "ORDER BY (result_type = 'house') DESC, number_fallback ASC, updated_at DESC LIMIT 1",
+                (norm,)).fetchone()
+        return self._coords(row) if row else None
+
+    def set_meta(self, key: str, result_type: Optional[str] = None, number_fallback: bool = False):
+        """Metadane wyniku Nominatim dla istniejącego wpisu."""
+        with self._lock:
+            self._conn.execute(
+                'UPDATE geocache SET result_type = ?, number_fallback = ? WHERE key = ?',
+                (result_type, int(bool(number_fallback)), key))
+
+    def positive_keys(self) -> List[str]:
+        """Klucze z koordynatami (indeks częściowy) — źródło whitelist ulic parsera."""
+        with self._lock:
+            return [r[0] for r in self._conn.execute(
+                'SELECT key FROM geocache WHERE lat IS NOT NULL')]
+
+    def negative_keys(self, expired_only: bool = False) -> List[str]:
+        """Wpisy None — wszystkie albo tylko te po TTL (kolejka do ponowienia)."""
+        sql = 'SELECT key FROM geocache WHERE lat IS NULL'
+        params = ()
+        if expired_only:
+            sql += ' AND updated_at < ?'
+            params = (self._negative_cutoff(),)
+        with self._lock:
+            return [r[0] for r in self._conn.execute(sql, params)]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total, positive, norm_keys = self._conn.execute(
+                'SELECT COUNT(*), COUNT(lat), COUNT(DISTINCT norm_key) FROM geocache').fetchone()
+        expired = len(self.negative_keys(expired_only=True))
+        return {
+            'entries': total,
+            'positive': positive,
+            'negative': total - positive,
+            'negative_expired': expired,
+            'normalized_keys': norm_keys,
+        }
+
+    # ------------------------------------------------------------------
+    # TRWAŁOŚĆ / EKSPORT
+    # ------------------------------------------------------------------
+
+    def commit(self):
+        with self._lock:
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+    def import_json(self, json_path) -> int:
+        """Zasila bazę płaskim geocoding_cache.json (wpisy nadpisują istniejące)."""
+        with open(json_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        now = time.time()
+        rows = [
+            (key, normalize_cache_key(key),
+             coords['lat'] if coords else None, coords['lon'] if coords else None, now)
+            for key, coords in data.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                'INSERT INTO geocache (key, norm_key, lat, lon, updated_at) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET norm_key = excluded.norm_key, lat = excluded.lat, '
+                'lon = excluded.lon, updated_at = excluded.updated_at', rows)
+            self._conn.commit()
+        return len(rows)
+
+    def to_dict(self) -> Dict:
+        """Pełny płaski słownik (z wygasłymi wpisami None — jak w JSON)."""
+        with self._lock:
+            rows = self._conn.execute('SELECT key, lat, lon FROM geocache ORDER BY key').fetchall()
+        return {key: self._coords((lat, lon)) for key, lat, lon in rows}
+
+    def export_json(self, json_path):
+        """Eksport do formatu geocoding_cache.json (fixture'y golden, skrypty naprawcze)."""
+        write_json_atomic(json_path, self.to_dict())
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Backend SQLite cache geokodowania')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p_imp = sub.add_parser('import', help='JSON → SQLite')
+    p_imp.add_argument('json_path')
+    p_imp.add_argument('db_path')
+    p_exp = sub.add_parser('export', help='SQLite → JSON')
+    p_exp.add_argument('db_path')
+    p_exp.add_argument('json_path')
+    p_st = sub.add_parser('stats', help='Statystyki bazy')
+    p_st.add_argument('db_path')
+    args = parser.parse_args()
+
+    if args.cmd == 'import':
+        store = SQLiteGeocodingCache(args.db_path)
+        print(f"📥 Zaimportowano {store.import_json(args.json_path)} wpisów do {args.db_path}")
+    elif args.cmd == 'export':
+        store = SQLiteGeocodingCache(args.db_path)
+        store.export_json(args.json_path)
+        print(f"📤 Wyeksportowano {store.stats()['entries']} wpisów do {args.json_path}")
+    else:
+        store = SQLiteGeocodingCache(args.db_path)
+        print(json.dumps(store.stats(), indent=2))
+    store.close()
+
+
+def _self_test():
+    import tempfile
+
+    print("🧪 Test geocache SQLite\n")
+    assert normalize_cache_key('Lipowej 14/2') == 'lipowa 14'
+    assert normalize_cache_key('  Lipowa   14 ') == 'lipowa 14'
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src_json = Path(tmp) / 'geocoding_cache.json'
+        with open(src_json, 'w', encoding='utf-8') as f:
+            json.dump({'Lipowa 14': {'lat': 51.2342, 'lon': 22.5601}, 'Telefonu 60': None}, f)
+
+        store = SQLiteGeocodingCache(Path(tmp) / 'geocoding_cache.sqlite', import_json=src_json)
+        assert store['Lipowa 14'] == {'lat': 51.2342, 'lon': 22.5601}
+        assert 'Telefonu 60' in store and store['Telefonu 60'] is None
+        assert store.lookup_normalized('Lipowej 14/3') == {'lat': 51.2342, 'lon': 22.5601}
+        assert store.positive_keys() == ['Lipowa 14']
+
+        # Wpis negatywny po TTL znika z mappingu i trafia do kolejki ponowień
+        store.negative_ttl = -1
+        assert 'Telefonu 60' not in store
+        assert store.negative_keys(expired_only=True) == ['Telefonu 60']
+
+        out_json = Path(tmp) / 'export.json'
+        store.export_json(out_json)
+        with open(out_json, 'r', encoding='utf-8') as f:
+            assert json.load(f) == {'Lipowa 14': {'lat': 51.2342, 'lon': 22.5601}, 'Telefonu 60': None}
+        print(f"✅ {store.stats()}")
+        store.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main()
+    else:
+        _self_test()
@@ -0,0 +1,224 @@
+"""
+Geocode Scheduler - geokodowanie w tle, równolegle z przetwarzaniem ofert.
+
+Krok 2 run_scan wołał Geocoder.geocode_address synchronicznie w
+_process_offer: każde chybienie cache to ~1 s Nominatim (a przy timeoucie
+backoff 1/2/4 s), przez które stała cała pętla. Oferty z tymczasowym
+błędem Nominatim lądowały w transient_retry_queue i były ponawiane po
+pętli z blokującym sleepem 5/10/20 s.
+
+Scheduler:
+  - JEDEN wątek roboczy — jedyny użytkownik Geocodera w trakcie kroku 2
+    (cache geokodera i journal nie są thread-safe), tempo Nominatim
+    pilnowane w Geocoder._pace_nominatim (polityka 1 req/s)
+  - zadanie = łańcuch kandydatów adresu jednej oferty (główny adres, potem
+    street_only / whitelist / district — jak _geocode_with_fallbacks);
+    kolejny kandydat idzie do Nominatim tylko, gdy poprzedni zawiódł
+  - priorytet wg precyzji głównego kandydata: exact > street_only > district
+  - deduplikacja: ten sam łańcuch kandydatów (np. oferta z listingu i z
+    profilu) dostaje wspólny Future
+  - tymczasowy błąd Nominatim → zadanie wraca do kolejki z opóźnieniem
+    (retry_delays), nie blokując pozostałych; po ostatniej próbie Future
+    dostaje wynik z transient=True (oferta trafia do no_coords)
+
+Wątek główny w tym czasie parsuje kolejne oferty i odbiera wyniki przez
+Future.result().
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+PRECISION_PRIORITY = {'exact': 0, 'street_only': 1, 'district': 2}
+DEFAULT_RETRY_DELAYS = (5, 10, 20)
+
+
+def geocode_candidates(geocoder, candidates: List[Tuple[Dict, str]]):
+    """
+    Łańcuch fallbacków: geokoduje kandydatów KOLEJNO, pierwszy trafiony wygrywa.
+
+    Args:
+        geocoder: Obiekt z geocode_address(address, return_meta=True)
+        candidates: Lista (address_data, precision), od najbardziej precyzyjnego
+
+    Returns:
+        (coords, chosen_address_data, chosen_precision, transient)
+        coords=None gdy żaden kandydat się nie zgeokodował — wtedy zwracany jest
+        pierwszy kandydat, a transient mówi, czy któryś padł na TYMCZASOWY błąd.
+    """
+    tried_full = set()
+    transient = False
+    for cand, precision in candidates:
+        full = cand['full']
+        if full in tried_full:
+            continue
+        tried_full.add(full)
+
+        # FIX 2026-05-14: return_meta=True → wiemy czy geocoder zrobił fallback
+        # "sama ulica bez numeru" (wtedy obniżamy precision do street_only).
+        coords, geo_meta = geocoder.geocode_address(full, return_meta=True)
+        if geo_meta.get('transient_error'):
+            transient = True
+        if not coords:
+            continue
+
+        if len(tried_full) > 1:
+            print(f"      🔁 Fallback ekstraktora: główny adres nie geokodował się, "
+                  f"użyto '{full}' (precision={precision})")
+
+        if geo_meta.get('number_fallback') and precision != 'district':
+            # Geocoder nie znalazł konkretnego numeru, użył samej ulicy → przybliżony.
+            # FIX 2026-05-26 (A): nie nadpisujemy precision='district'.
+            print(f"      📌 Fallback geocoder: '{full}' "
+                  f"→ koordynaty samej ulicy (precision=street_only)")
+            precision = 'street_only'
+
+        return coords, cand, precision, transient
+
+    first_cand, first_precision = candidates[0]
+    return None, first_cand, first_precision, transient
+
+
+class GeocodeScheduler:
+    def __init__(self, geocoder, retry_delays=DEFAULT_RETRY_DELAYS):
+        """
+        Args:
+            geocoder: Geocoder (używany WYŁĄCZNIE z wątku roboczego)
+            retry_delays: Opóźnienia (s) kolejnych ponowień po błędzie tymczasowym
+        """
+        self.geocoder = geocoder
+        self.retry_delays = tuple(retry_delays)
+        self._cond = threading.Condition()
+        self._ready = []    # heap: (priorytet, seq, zadanie)
+        self._delayed = []  # heap: (not_before, seq, zadanie)
+        self._jobs: Dict[tuple, dict] = {}
+        self._seq = itertools.count()
+        self._closed = False
+        self.stats = {'submitted': 0, 'deduplicated': 0, 'resolved': 0,
+                      'retries': 0, 'transient_failed': 0, 'busy_seconds': 0.0}
+        self._worker = threading.Thread(target=self._run, name='geocode-scheduler', daemon=True)
+        self._worker.start()
+
+    # ------------------------------------------------------------------
+
+    def submit(self, candidates: List[Tuple[Dict, str]]) -> Future:
+        """Zleca geokodowanie łańcucha kandydatów. Wynik Future: jak geocode_candidates."""
+        key = tuple(c['full'] for c, _ in candidates)
+        with self._cond:
+            self.stats['submitted'] += 1
+            job = self._jobs.get(key)
+            if job is not None:
+                self.stats['deduplicated'] += 1
+                return job['future']
+            job = {
+                'key': key,
+                'candidates': candidates,
+                'priority': PRECISION_PRIORITY.get(candidates[0][1], len(PRECISION_PRIORITY)),
+                'attempt': 0,
+                'future': Future(),
+            }
+            self._jobs[key] = job
+            heapq.heappush(self._ready, (job['priority'], next(self._seq), job))
+            self._cond.notify()
+        return job['future']
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._ready) + len(self._delayed)
+
+    def close(self):
+        """Czeka na obsłużenie wszystkich zleceń i zatrzymuje wątek roboczy."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._worker.join()
+
+    def summary(self) -> Dict:
+        with self._cond:
+            return {**self.stats, 'busy_seconds': round(self.stats['busy_seconds'], 1)}
+
+    # ------------------------------------------------------------------
+
+    def _next_job(self) -> Optional[dict]:
+        """Najpilniejsze gotowe zadanie; czeka na nowe zlecenia / koniec opóźnień."""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                while self._delayed and self._delayed[0][0] <= now:
+                    _, seq, job = heapq.heappop(self._delayed)
+                    heapq.heappush(self._ready, (job['priority'], seq, job))
+                if self._ready:
+                    return heapq.heappop(self._ready)[2]
+                if self._closed and not self._delayed:
+                    return None
+                timeout = self._delayed[0][0] - now if self._delayed else None
+                self._cond.wait(timeout)
+
+    def _run(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            started = time.monotonic()
+            try:
+                result = geocode_candidates(self.geocoder, job['candidates'])
+            except Exception as e:
+                print(f"      ⚠️ Scheduler geokodowania: błąd dla {job['key'][0]!r}: {e}")
+                result = (None, job['candidates'][0][0], job['candidates'][0][1], False)
+
+            with self._cond:
+                self.stats['busy_seconds'] += time.monotonic() - started
+                coords, _, _, transient = result
+                if coords is None and transient and job['attempt'] < len(self.retry_delays):
+                    # Tymczasowy błąd Nominatim (timeout/429/5xx) — ponów później,
+                    # w tym czasie obsługuj inne zadania
+                    delay = self.retry_delays[job['attempt']]
+                    job['attempt'] += 1
+                    self.stats['retries'] += 1
+                    print(f"      ⏳ Transient fail geokodera '{job['key'][0]}' — "
+                          f"retry {job['attempt']}/{len(self.retry_delays)} za {delay}s")
+                    heapq.heappush(self._delayed, (time.monotonic() + delay, next(self._seq), job))
+                    continue
+                if coords is None and transient:
+                    self.stats['transient_failed'] += 1
+                self.stats['resolved'] += 1
+                self._jobs.pop(job['key'], None)
+            job['future'].set_result(result)
+
+
+if __name__ == "__main__":
+    print("🧪 Test GeocodeScheduler\n")
+
+    class _Geo:
+        def __init__(self):
+            self.calls = []
+            self.flaky = {'Chodźki': 1}
+
+        def geocode_address(self, address, return_meta=False):
+            self.calls.append(address)
+            meta = {'number_fallback': False, 'cache_hit': False, 'transient_error': False}
+            if self.flaky.get(address):
+                self.flaky[address] -= 1
+                meta['transient_error'] = True
+                return None, meta
+            if address.startswith('Zła'):
+                return None, meta
+            return {'lat': 51.25, 'lon': 22.57}, meta
+
+    geo = _Geo()
+    sched = GeocodeScheduler(geo, retry_delays=(0.05,))
+    f_district = sched.submit([({'full': 'Czuby'}, 'district')])
+    f_exact = sched.submit([({'full': 'Zła 5'}, 'exact'), ({'full': 'Lipowa'}, 'street_only')])
+    f_dup = sched.submit([({'full': 'Zła 5'}, 'exact'), ({'full': 'Lipowa'}, 'street_only')])
+    f_flaky = sched.submit([({'full': 'Chodźki'}, 'street_only')])
+    sched.close()
+
+    assert f_dup is f_exact
+    coords, chosen, precision, transient = f_exact.result()
+    assert coords and chosen['full'] == 'Lipowa' and precision == 'street_only'
+    assert f_flaky.result()[0] is not None and sched.stats['retries'] == 1
+    assert f_district.result()[0] is not None
+    print(f"✅ {sched.summary()} | kolejność: {geo.calls}")
@@ -3,11 +3,16 @@ Geocoder - zamiana adresów na współrzędne GPS
 Używa Nominatim API (OpenStreetMap) + cache w JSON
 + walidacja czy adres jest w Lublinie (bounding box)
 + Fix #3 (2026-05-11): retry z transformacją do mianownika
++ 2026-10-17: zapis cache write-behind (journal + zbiorczy snapshot)
++ 2026-10-17: opcjonalny backend SQLite (geocache_sqlite.py)
++ 2026-10-17: offline gazetteer Lublina przed Nominatim (gazetteer.py)
 """
 
+import atexit
 import json
 import re
 import time
+import weakref
 from pathlib import Path
 from typing import Optional, Dict
 from geopy.geocoders import Nominatim
@@ -19,6 +24,8 @@ except ImportError:
     GeocoderRateLimited = None  # type: ignore
 
 from shared_utils import write_json_atomic
+from geocache_sqlite import SQLiteGeocodingCache, sqlite_backend_enabled, sqlite_path_for
+from gazetteer import Gazetteer
 
 # Nazwy dzielnic Lublina — dla nich NIE forsujemy dopasowania do ulicy o tej samej
 # nazwie (marker dzielnicowy ma stać na centroidzie dzielnicy). FIX 2026-08-18.
@@ -163,29 +170,163 @@ def to_nominative_singular_feminine(address: str) -> str:
     return ' '.join(result)
 
 
+# Polityka Nominatim: max 1 request/s (https://operations.osmfoundation.org/policies/nominatim/)
+NOMINATIM_MIN_INTERVAL = 1.0
+
+# Write-behind cache: zmiany trafiają od razu do journala (dopisanie linii),
+# a pełny snapshot geocoding_cache.json jest przepisywany dopiero po tylu
+# zmianach / sekundach, na końcu fazy przetwarzania i przy wyjściu procesu.
+CACHE_FLUSH_EVERY = 50
+CACHE_FLUSH_INTERVAL = 60.0
+
+# Geocodery z niezapisanymi zmianami — zrzucane w atexit (słabe referencje,
+# żeby rejestr nie trzymał przy życiu instancji z testów)
+_LIVE_GEOCODERS = weakref.WeakSet()
+
+
+def _flush_live_geocoders():
+    for geocoder in list(_LIVE_GEOCODERS):
+        try:
+            geocoder.flush()
+        except Exception as e:
+            print(f"⚠️ Geocoder: nie udało się zapisać cache przy wyjściu: {e}")
+
+
+atexit.register(_flush_live_geocoders)
+
+
 class Geocoder:
-    def __init__(self, cache_file: str = "data/geocoding_cache.json"):
+    def __init__(self, cache_file: str = "data/geocoding_cache.json",
+                 flush_every: int = CACHE_FLUSH_EVERY,
+                 flush_interval: float = CACHE_FLUSH_INTERVAL):
         self.cache_file = Path(cache_file)
-        self.cache = self._load_cache()
+        # Backend SQLite (opcjonalny): źródłem prawdy jest geocoding_cache.sqlite,
+        # a geocoding_cache.json to eksport robiony przy snapshocie
+        self.sqlite_backend = sqlite_backend_enabled(cache_file)
+        if self.sqlite_backend:
+            self.cache_file = self.cache_file.with_suffix('.json')
+        # Journal obok snapshotu: geocoding_cache.json.journal (NDJSON {"k", "v"})
+        self.journal_file = self.cache_file.with_name(self.cache_file.name + '.journal')
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._dirty_keys = set()
+        self._last_flush = time.monotonic()
+        self._stats_snapshots = 0
+        self._last_lookup_info = None
+        self._last_nominatim_request = 0.0
+        self.cache = self._open_sqlite_cache() if self.sqlite_backend else self._load_cache()
         self.geolocator = Nominatim(user_agent="sonar-pokojowy-lublin/1.0")
+        # Offline gazetteer (data/lublin_gazetteer.json) — pytany przed Nominatim
+        self.gazetteer = Gazetteer.load_default(self.cache_file)
+        self._stats_gazetteer_hits = 0
         # Stats dla Fix #3
         self._stats_nominative_hits = 0
         # Stats dla Fix 2026-05-14: ile razy fallback "sama ulica bez numeru" zadziałał
         self._stats_number_fallback_hits = 0
+        _LIVE_GEOCODERS.add(self)
         
     def _load_cache(self) -> Dict:
-        """Ładuje cache z pliku JSON."""
+        """Ładuje cache z pliku JSON + odtwarza journal zmian niezapisanych
+        w snapshocie (crash w połowie scanu nie gubi wyników Nominatim)."""
+        cache = {}
         if self.cache_file.exists():
             try:
                 with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                    cache = json.load(f)
             except json.JSONDecodeError:
-                return {}
-        return {}
-    
+                cache = {}
+
+        replayed = self._replay_journal(cache)
+        if replayed:
+            print(f"♻️  Geocoder: odtworzono {len(replayed)} wpisów z journala cache")
+            # Wpisy z journala są już w pamięci — przy najbliższym flush trafią
+            # do snapshotu, a journal zostanie wyczyszczony
+            self._dirty_keys |= replayed
+        return cache
+
+    def _open_sqlite_cache(self) -> SQLiteGeocodingCache:
+        """Otwiera backend SQLite; pusta baza jest zasilana z geocoding_cache.json."""
+        return SQLiteGeocodingCache(sqlite_path_for(self.cache_file), import_json=self.cache_file)
+
+    def _replay_journal(self, cache: Dict) -> set:
+        """Nakłada journal na snapshot, zwraca zbiór odtworzonych kluczy."""
+        replayed = set()
+        if not self.journal_file.exists():
+            return replayed
+        try:
+            with open(self.journal_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Ucięta ostatnia linia (crash w trakcie dopisywania)
+                        continue
+                    cache[entry['k']] = entry['v']
+                    replayed.add(entry['k'])
+        except OSError as e:
+            print(f"⚠️ Geocoder: nie udało się odczytać journala cache: {e}")
+        return replayed
+
+    def _mark_dirty(self, *keys: str):
+        """Rejestruje zmienione wpisy cache: dopisuje je do journala i zrzuca
+        snapshot, gdy uzbiera się flush_every zmian albo minie flush_interval.
+        W trybie SQLite journalem jest sama baza (commit), a snapshot to eksport JSON."""
+        if self.sqlite_backend:
+            self._store_result_meta(keys)
+            self.cache.commit()
+        else:
+            self._append_journal(keys)
+        self._dirty_keys.update(keys)
+        if (len(self._dirty_keys) >= self.flush_every
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def _append_journal(self, keys):
+        try:
+            with open(self.journal_file, 'a', encoding='utf-8') as f:
+                for key in keys:
+                    f.write(json.dumps({'k': key, 'v': self.cache.get(key)}, ensure_ascii=False) + '\n')
+        except OSError as e:
+            print(f"⚠️ Geocoder: nie udało się dopisać do journala cache: {e}")
+
+    def _store_result_meta(self, keys):
+        """SQLite: typ wyniku ostatniego zapytania Nominatim przy zapisanych kluczach."""
+        info = self._last_lookup_info
+        if not info:
+            return
+        result_type = 'house' if info.get('house') else 'road' if info.get('road') else 'place'
+        for key in keys:
+            if self.cache.get(key) is not None:
+                self.cache.set_meta(key, result_type=result_type,
+                                    number_fallback=info.get('street_level', False))
+
+    def flush(self):
+        """Zapisuje snapshot cache, jeśli są niezapisane zmiany."""
+        if self._dirty_keys:
+            self._save_cache()
+
     def _save_cache(self):
-        """Zapisuje cache do pliku JSON (atomowo)."""
-        write_json_atomic(self.cache_file, self.cache)
+        """Zapisuje cały cache do pliku JSON (atomowo) i czyści journal.
+        Wywoływane bezpośrednio po masowych zmianach poza geocode_address
+        (np. retry_none_cache usuwa wpisy z self.cache)."""
+        if self.sqlite_backend:
+            self.cache.commit()
+            self.cache.export_json(self.cache_file)
+        else:
+            write_json_atomic(self.cache_file, self.cache)
+        try:
+            self.journal_file.unlink()
+        except FileNotFoundError:
+            pass
+        self._dirty_keys.clear()
+        self._last_flush = time.monotonic()
+        self._stats_snapshots += 1
+
+    def negative_keys(self, expired_only: bool = False) -> list:
+        """Adresy z wpisem None w cache. expired_only (tylko SQLite): wpisy po TTL."""
+        if self.sqlite_backend:
+            return self.cache.negative_keys(expired_only=expired_only)
+        return [k for k, v in self.cache.items() if v is None]
     
     def is_in_lublin(self, coords: Dict[str, float]) -> bool:
         """
@@ -242,6 +383,7 @@ class Geocoder:
         
         if not address:
             return None, meta
+        self._last_lookup_info = None
         
         # Sprawdzamy cache - oryginalny klucz
         if address in self.cache:
@@ -261,7 +403,7 @@ class Geocoder:
                         print(f"      ♻️  Bypass zatrutego cache '{address}' → mianownik '{nominative_check}' jest w cache")
                         # Zaktualizuj cache oryginału żeby następnym razem hit był natychmiastowy
                         self.cache[address] = coords
-                        self._save_cache()
+                        self._mark_dirty(address)
                         self._stats_nominative_hits += 1
                         meta['cache_hit'] = True
                         return coords, meta
@@ -276,6 +418,15 @@ class Geocoder:
                 # Cache ma koordynaty - zwróć je
                 meta['cache_hit'] = True
                 return cached_value, meta
+        elif self.sqlite_backend:
+            # Odmiana już geokodowanego adresu ("Lipowej 14/2" ~ "Lipowa 14") —
+            # wspólny klucz znormalizowany, bez zapytania do Nominatim
+            coords = self.cache.lookup_normalized(address)
+            if coords is not None:
+                self.cache[address] = coords
+                self._mark_dirty(address)
+                meta['cache_hit'] = True
+                return coords, meta
         
         # === FIX 2026-08-18 (audyt markerów): tryb zapytania ===
         # Adres z numerem → akceptujemy TYLKO wynik z numerem domu (inaczej dostajemy
@@ -297,8 +448,10 @@ class Geocoder:
 
         def _lookup(query, max_retries=max_retries):
             """Zwraca (coords, info) albo podnosi wyjątek sieciowy."""
-            return self._nominatim_lookup(query, max_retries=max_retries,
-                                          require_house=wants_house, prefer_road=prefer_road)
+            coords, info = self._nominatim_lookup(query, max_retries=max_retries,
+                                                  require_house=wants_house, prefer_road=prefer_road)
+            self._last_lookup_info = info
+            return coords, info
 
         def _accept(coords, info):
             """Wynik "mocny" → zwraca coords. Słaby → chowa go i zwraca None,
@@ -342,7 +495,7 @@ class Geocoder:
 
             if coords is not None:
                 self.cache[address] = coords
-                self._save_cache()
+                self._mark_dirty(address)
                 return coords, meta
         
         # === KROK 2 (Fix #3): Retry z transformacją do mianownika ===
@@ -356,7 +509,7 @@ class Geocoder:
                 coords = self.cache[nominative]
                 print(f"      ✅ Trafiony cache mianownika: {nominative}")
                 self.cache[address] = coords  # Zapisz pod oryginalnym też
-                self._save_cache()
+                self._mark_dirty(address)
                 self._stats_nominative_hits += 1
                 return coords, meta
             
@@ -375,7 +528,7 @@ class Geocoder:
                 # Cache pod OBA klucze
                 self.cache[address] = coords
                 self.cache[nominative] = coords
-                self._save_cache()
+                self._mark_dirty(address, nominative)
                 self._stats_nominative_hits += 1
                 return coords, meta
         
@@ -400,7 +553,7 @@ class Geocoder:
                 coords = self.cache[variant]
                 print(f"      ✅ Trafiony cache wariantu: {variant}")
                 self.cache[address] = coords
-                self._save_cache()
+                self._mark_dirty(address)
                 return coords, meta
             
             try:
@@ -416,7 +569,7 @@ class Geocoder:
                 print(f"      ✅ Wariant znaleziony: {variant}")
                 self.cache[address] = coords
                 self.cache[variant] = coords
-                self._save_cache()
+                self._mark_dirty(address, variant)
                 return coords, meta
         
         # === KROK 3.5 (Fix 2026-05-14, P2b): wariant liczba pojedyncza żeńska ===
@@ -441,7 +594,7 @@ class Geocoder:
                 coords = self.cache[variant]
                 print(f"      ✅ Trafiony cache wariantu: {variant}")
                 self.cache[address] = coords
-                self._save_cache()
+                self._mark_dirty(address)
                 return coords, meta
             
             if variant in self.cache and self.cache[variant] is None:
@@ -460,12 +613,12 @@ class Geocoder:
                 print(f"      ✅ Wariant l. poj. ż. znaleziony: {variant}")
                 self.cache[address] = coords
                 self.cache[variant] = coords
-                self._save_cache()
+                self._mark_dirty(address, variant)
                 return coords, meta
             else:
                 # Cache None dla negatywnego wyniku — ale tylko pod kluczem wariantu
                 self.cache[variant] = None
-                self._save_cache()
+                self._mark_dirty(variant)
 
         # === KROK 3.7 (FIX 2026-08-18, audyt markerów klasa C): numer mieszkania ===
         # "Głęboka 29/4", "Niecała 15/80", "Skrzetuskiego 2/22" — Nominatim nie zna
@@ -484,7 +637,7 @@ class Geocoder:
                     coords = self.cache[variant]
                     print(f"      🏠 Numer bez mieszkania z cache: '{address}' → '{variant}'")
                     self.cache[address] = coords
-                    self._save_cache()
+                    self._mark_dirty(address)
                     return coords, meta
                 if variant in self.cache and self.cache[variant] is None:
                     continue
@@ -502,7 +655,7 @@ class Geocoder:
                     print(f"      ✅ Trafiony numer domu: {variant}")
                     self.cache[variant] = coords
                     self.cache[address] = coords
-                    self._save_cache()
+                    self._mark_dirty(variant, address)
                     return coords, meta
                 if coords is not None and street_level_coords is None:
                     street_level_coords = coords
@@ -559,14 +712,14 @@ class Geocoder:
                 # Cache POD KLUCZEM samej ulicy (żeby inne oferty z tej ulicy też trafiały).
                 # NIE zapisujemy pod cache[address] - patrz komentarz wyżej.
                 self.cache[street_only] = coords
-                self._save_cache()
+                self._mark_dirty(street_only)
                 self._stats_number_fallback_hits += 1
                 meta['number_fallback'] = True
                 return coords, meta
             else:
                 # Cache None dla wariantu samej ulicy (np. literówka w nazwie)
                 self.cache[street_only] = None
-                self._save_cache()
+                self._mark_dirty(street_only)
         
         # FIX 2026-08-18: mamy punkt ULICY z któregoś wariantu, ale nie trafiliśmy
         # w numer domu — oddajemy go z number_fallback=True, żeby caller obniżył
@@ -582,12 +735,12 @@ class Geocoder:
         # (osiedle/park o tej nazwie). Zachowanie jak przed 2026-08-18.
         if weak_coords is not None:
             self.cache[address] = weak_coords
-            self._save_cache()
+            self._mark_dirty(address)
             return weak_coords, meta
 
         # Wszystkie podejścia zawiodły (faktyczne None od Nominatim) - cache jako None
         self.cache[address] = None
-        self._save_cache()
+        self._mark_dirty(address)
         return None, meta
     
     @staticmethod
@@ -689,9 +842,23 @@ class Geocoder:
               - 'road': bool — wynik to ulica (class=highway)
         """
         info = {'house': False, 'street_level': False, 'road': False, 'weak': False}
+
+        # Gazetteer offline: mocny wynik (numer domu / ulica) zamyka sprawę bez
+        # Nominatim. Słabszy (sama ulica dla adresu z numerem, osiedle zamiast
+        # ulicy) zostaje w odwodzie — Nominatim może znać więcej.
+        offline = None
+        if self.gazetteer is not None:
+            coords, offline_info = self.gazetteer.lookup(address, require_house=require_house,
+                                                         prefer_road=prefer_road)
+            if coords is not None:
+                if not offline_info['street_level'] and not offline_info['weak']:
+                    self._stats_gazetteer_hits += 1
+                    return coords, offline_info
+                offline = (coords, offline_info)
+
         results = self._nominatim_search(address, max_retries)
         if not results:
-            return None, info
+            return offline or (None, info)
 
         wanted_number = self._requested_number(address) if require_house else None
         fallback = None  # pierwszy sensowny wynik, gdyby nie było lepszego
@@ -711,7 +878,7 @@ class Geocoder:
                 fallback = (coords, is_house, is_road)
 
         if fallback is None:
-            return None, info
+            return offline or (None, info)
         coords, is_house, is_road = fallback
         return coords, {
             'house': is_house,
@@ -723,6 +890,13 @@ class Geocoder:
             'road': is_road,
         }
 
+    def _pace_nominatim(self):
+        """Pilnuje odstępu NOMINATIM_MIN_INTERVAL między requestami (także retry)."""
+        wait = self._last_nominatim_request + NOMINATIM_MIN_INTERVAL - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        self._last_nominatim_request = time.monotonic()
+
     def _nominatim_search(self, address: str, max_retries: int = 3):
         """Surowe wyniki z Nominatim (do 5), przefiltrowane po bbox Lublina.
         Zwraca listę (raw_dict, coords). Wyjątki jak w _try_nominatim."""
@@ -730,6 +904,7 @@ class Geocoder:
 
         for attempt in range(max_retries):
             try:
+                self._pace_nominatim()
                 locations = self.geolocator.geocode(
                     full_address,
                     timeout=10,
@@ -905,6 +1080,27 @@ if __name__ == "__main__":
     else:
         print(f"❌ Bez return_meta zwraca: {coords_legacy}")
         fb_fail += 1
+
+    # Write-behind: zmiana jest w journalu przed snapshotem, a nowa instancja
+    # (np. po crashu scanu) odtwarza ją przy starcie
+    print("\n🧪 Test: write-behind cache + replay journala:")
+    test_geo.flush()
+    wb_geo = Geocoder(cache_file=cache_path, flush_every=1000, flush_interval=3600)
+    wb_geo.cache['Testowa 1'] = {'lat': 51.25, 'lon': 22.57}
+    wb_geo._mark_dirty('Testowa 1')
+    with open(cache_path, 'r', encoding='utf-8') as f:
+        in_snapshot = 'Testowa 1' in _json.load(f)
+    replay_geo = Geocoder(cache_file=cache_path)
+    replay_geo.flush()
+    if (not in_snapshot and replay_geo.cache.get('Testowa 1') == {'lat': 51.25, 'lon': 22.57}
+            and not replay_geo.journal_file.exists()):
+        print("✅ Wpis odtworzony z journala, po flush journal wyczyszczony")
+        fb_pass += 1
+    else:
+        print(f"❌ in_snapshot={in_snapshot}, replay={replay_geo.cache.get('Testowa 1')}, "
+              f"journal={replay_geo.journal_file.exists()}")
+        fb_fail += 1
+    wb_geo._dirty_keys.clear()
     
     _os.unlink(cache_path)
 
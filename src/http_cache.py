@@ -0,0 +1,299 @@
+"""
+HTTP Cache - wspólny cache odpowiedzi OLX na czas JEDNEGO scanu.
+
+Ten sam URL oferty bywa pobierany w jednym runie GitHub Actions kilka razy:
+szczegóły w scraperze (fetch_offer_details), weryfikacja nieaktywnych
+(main._verify_inactive_offers, własna sesja) i favorites_tracker (osobny
+proces kilka minut później). Sesje z OLXScraper.make_olx_session /
+make_olx_async_session zaglądają tu przed requestem — drugi komponent
+proszący o ten sam URL dostaje body z cache zamiast kolejnego hitu w WAF.
+
+Zasady:
+  - klucz = znormalizowany URL (host małymi literami, bez fragmentu
+    i parametrów śledzących OLX, posortowane query)
+  - cache'ujemy TYLKO GET z HTTP 200 (blokady, 404 i błędy zawsze idą do sieci)
+    i TYLKO strony ofert (/d/oferta/) z treścią oferty (opis / JSON-LD) —
+    listing się zmienia między próbami, a "miękka" blokada z kodem 200
+    (challenge, pusta strona) nie może przeżyć do retry scanu
+  - pamięć ograniczona (LRU po rozmiarze body), wypchnięte wpisy lądują na
+    dysku (spill) i dalej są trafieniami
+  - w GitHub Actions katalog spill jest wspólny dla procesów jednego runu
+    (GITHUB_RUN_ID + GITHUB_RUN_ATTEMPT), a na wyjściu procesu pamięć jest
+    zrzucana na dysk — favorites_tracker widzi odpowiedzi z main.py.
+    Każde wywołanie main.py zaczyna od begin_scan(), które czyści spill —
+    auto-retry scanu (SCRAPE_PARTIAL/BLOCKED w scanner.yml) idzie do sieci,
+    a nie do odpowiedzi z zablokowanej próby
+  - wpisy starsze niż max_age są ignorowane (cache jest per scan, nie trwały)
+
+Wyłączenie: env SONAR_HTTP_CACHE=0.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from requests.structures import CaseInsensitiveDict
+
+# Parametry, które OLX dokleja do linków ofert (skąd przyszło kliknięcie) —
+# nie zmieniają treści strony, a bez ich ścięcia ten sam URL miałby N kluczy
+TRACKING_PARAMS = {'reason', 'search_reason', 'bs', 'ad_reason'}
+
+DEFAULT_MAX_MEMORY_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_AGE = 2 * 3600  # tracker leci kilka minut po scanie
+
+# Treść, po której poznajemy prawdziwą stronę oferty (por. scraper._parse_offer_details)
+OFFER_PAGE_MARKERS = ('data-cy="ad_description"', 'application/ld+json')
+
+
+def normalize_url(url: str) -> str:
+    """Klucz cache: 'HTTPS://www.OLX.pl/d/oferta/x.html?reason=a#top' →
+    'https://www.olx.pl/d/oferta/x.html'."""
+    parts = urlsplit(url or '')
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k not in TRACKING_PARAMS and not k.startswith('utm_')
+    )
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path,
+                       urlencode(query), ''))
+
+
+def is_cacheable_page(url: str, text: str) -> bool:
+    """Tylko strona oferty z jej treścią — listing i strony bez opisu/JSON-LD
+    (challenge WAF z kodem 200, pusta odpowiedź) zawsze idą do sieci."""
+    if '/d/oferta/' not in urlsplit(url or '').path:
+        return False
+    return any(marker in text for marker in OFFER_PAGE_MARKERS)
+
+
+class CachedResponse:
+    """Minimalny odpowiednik odpowiedzi curl_cffi dla trafień z cache
+    (status_code, text, content, headers, url, json(), raise_for_status())."""
+
+    from_cache = True
+
+    def __init__(self, url: str, status_code: int, text: str, headers: Dict[str, str]):
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+        self.headers = CaseInsensitiveDict(headers)
+
+    @property
+    def content(self) -> bytes:
+        return self.text.encode('utf-8')
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        # W cache są wyłącznie odpowiedzi 200
+        return None
+
+
+class ScanResponseCache:
+    def __init__(self, max_memory_bytes: int = DEFAULT_MAX_MEMORY_BYTES,
+                 spill_dir: Optional[Path] = None, max_age: float = DEFAULT_MAX_AGE,
+                 enabled: bool = True):
+        self.max_memory_bytes = max_memory_bytes
+        self.max_age = max_age
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._memory: 'OrderedDict[str, dict]' = OrderedDict()
+        self._memory_bytes = 0
+
+        # Katalog spill: wspólny dla runu GitHub Actions (zostaje po procesie),
+        # lokalnie prywatny dla procesu (sprzątany na wyjściu)
+        run_id = os.environ.get('GITHUB_RUN_ID')
+        if spill_dir is not None:
+            self.spill_dir, self._shared = Path(spill_dir), True
+        elif run_id:
+            attempt = os.environ.get('GITHUB_RUN_ATTEMPT', '1')
+            self.spill_dir = Path(tempfile.gettempdir()) / f'sonar_http_cache_{run_id}_{attempt}'
+            self._shared = True
+        else:
+            self.spill_dir, self._shared = None, False
+
+        self.stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0, 'spilled': 0}
+
+    # ------------------------------------------------------------------
+
+    def _spill_path(self, key: str) -> Optional[Path]:
+        if self.spill_dir is None:
+            if self._shared:
+                return None
+            self.spill_dir = Path(tempfile.mkdtemp(prefix='sonar_http_cache_'))
+        return self.spill_dir / (hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+    def _write_spill(self, key: str, entry: dict):
+        path = self._spill_path(key)
+        if path is None:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp, path)
+            self.stats['spilled'] += 1
+        except OSError as e:
+            print(f"⚠️ HTTP cache: nie udało się zrzucić wpisu na dysk: {e}")
+
+    def _read_spill(self, key: str) -> Optional[dict]:
+        if self.spill_dir is None:
+            return None
+        path = self._spill_path(key)
+        if path is None or not path.exists():
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _remember(self, key: str, entry: dict):
+        """Wstawia wpis do LRU w pamięci; nadmiar spycha na dysk. Pod lockiem."""
+        size = len(entry['text'])
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old['text'])
+        self._memory[key] = entry
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            old_key, old_entry = self._memory.popitem(last=False)
+            self._memory_bytes -= len(old_entry['text'])
+            self._write_spill(old_key, old_entry)
+
+    # ------------------------------------------------------------------
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        if not self.enabled:
+            return None
+        key = normalize_url(url)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                source = 'hits'
+            else:
+                entry = self._read_spill(key)
+                source = 'disk_hits'
+            if entry is None or time.time() - entry.get('fetched_at', 0) > self.max_age:
+                self.stats['misses'] += 1
+                return None
+            self.stats['hits'] += 1
+            if source == 'disk_hits':
+                self.stats['disk_hits'] += 1
+                self._remember(key, entry)
+        return CachedResponse(entry['url'], entry['status_code'], entry['text'], entry['headers'])
+
+    def put(self, url: str, response) -> None:
+        """Zapamiętuje odpowiedź (tylko HTTP 200 strony oferty, patrz is_cacheable_page)."""
+        if not self.enabled or getattr(response, 'from_cache', False):
+            return
+        if getattr(response, 'status_code', None) != 200:
+            return
+        text = getattr(response, 'text', None)
+        if not text or not is_cacheable_page(url, text):
+            return
+        entry = {
+            'url': url,
+            'status_code': 200,
+            'text': text,
+            'headers': {k: v for k, v in dict(response.headers).items()
+                        if k.lower() in ('content-type', 'server', 'last-modified')},
+            'fetched_at': time.time(),
+        }
+        with self._lock:
+            self._remember(normalize_url(url), entry)
+            self.stats['stores'] += 1
+
+    def begin_scan(self):
+        """Start wywołania main.py: odrzuca odpowiedzi poprzednich prób tego
+        runu (pamięć i wspólny spill). Tracker ulubionych tego nie woła —
+        dalej czyta spill ostatniego scanu."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            if self._shared and self.spill_dir is not None:
+                shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+    def flush(self):
+        """Zrzuca pamięć na wspólny dysk (dla kolejnych procesów tego runu)."""
+        if not self.enabled or not self._shared:
+            return
+        with self._lock:
+            for key, entry in self._memory.items():
+                self._write_spill(key, entry)
+
+    def close(self):
+        """Wyjście procesu: współdzielony cache zrzuć, prywatny posprzątaj."""
+        if self._shared:
+            self.flush()
+        elif self.spill_dir is not None:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+    def summary(self) -> Dict:
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'hit_rate': round(self.stats['hits'] / lookups * 100, 1) if lookups else 0.0,
+                'memory_entries': len(self._memory),
+                'memory_mb': round(self._memory_bytes / 1024 / 1024, 2),
+                'shared': self._shared,
+            }
+
+
+# Jeden cache na proces — wszystkie sesje OLX go współdzielą
+SCAN_CACHE = ScanResponseCache(enabled=os.environ.get('SONAR_HTTP_CACHE', '1') != '0')
+atexit.register(SCAN_CACHE.close)
+
+
+if __name__ == "__main__":
+    print("🧪 Test HTTP cache\n")
+    cache = ScanResponseCache(max_memory_bytes=10)
+
+    class _Resp:
+        status_code = 200
+        headers = {'Content-Type': 'text/html'}
+
+        def __init__(self, text):
+            self.text = text
+
+    page = '<div data-cy="ad_description">Pokój</div>'
+    u = 'https://www.olx.pl/d/oferta/pokoj-CID3-IDabc.html?reason=observed_ad'
+    assert normalize_url(u) == 'https://www.olx.pl/d/oferta/pokoj-CID3-IDabc.html'
+    assert cache.get(u) is None
+    cache.put(u, _Resp(page))
+    cache.put('https://www.olx.pl/d/oferta/pokoj-CID3-IDdef.html', _Resp(page + '2'))
+    hit = cache.get('https://www.olx.pl/d/oferta/pokoj-CID3-IDabc.html')
+    assert hit is not None and hit.text == page
+
+    # Listing i "miękka" blokada z kodem 200 nie trafiają do cache
+    listing = 'https://www.olx.pl/nieruchomosci/stancje-pokoje/lublin/?page=2'
+    cache.put(listing, _Resp(page))
+    challenge = 'https://www.olx.pl/d/oferta/pokoj-CID3-IDxyz.html'
+    cache.put(challenge, _Resp('<html>Just a moment...</html>'))
+    assert cache.get(listing) is None and cache.get(challenge) is None
+
+    # Nowe wywołanie main.py (retry scanu) zaczyna z pustym cache
+    shared = ScanResponseCache(max_memory_bytes=10, spill_dir=Path(tempfile.mkdtemp()))
+    shared.put(u, _Resp(page))
+    shared.flush()
+    assert ScanResponseCache(spill_dir=shared.spill_dir).get(u) is not None
+    shared.begin_scan()
+    assert shared.get(u) is None and ScanResponseCache(spill_dir=shared.spill_dir).get(u) is None
+    print(f"✅ {cache.summary()}")
+    cache.close()
@@ -4,31 +4,95 @@ Koordynuje: scraping → parsowanie → geokodowanie → wykrywanie duplikatów
 WERSJA 2.0: Równoległy scraping + monitoring
 """
 
+import functools
+import hashlib
+import inspect
 import json
+import os
 from pathlib import Path
 from datetime import datetime, timedelta
 import pytz
 from typing import List, Dict, Optional
 import time
-import random
 import statistics
 
 # Import lokalnych modułów
 from scraper import OLXScraper
+from http_cache import SCAN_CACHE
+from rate_controller import OLX_RATE
 from profiles_config import TRACKED_PROFILES
 from address_parser import AddressParser
 from price_parser import PriceParser
 from geocoder import Geocoder
-from duplicate_detector import DuplicateDetector
+from geocode_scheduler import GeocodeScheduler, geocode_candidates
+from duplicate_detector import DuplicateDetector, DuplicateIndex
 from scan_logger import ScanLogger
-from shared_utils import write_json_atomic, DATA_DIR
+from shared_utils import write_json_atomic, DATA_DIR, default_workers
+from offer_store import OfferStore
+from offers_sqlite import open_storage, json_path_for
+from offers_journal import JournalOfferStorage, open_journal
+from offer_shards import HOT_WINDOW_DAYS, open_archive, split_hot
+from relist_detector import RelistIndex, SignatureCache, signature_cache_path_for
+from scan_pipeline import DetailStream, run_ordered
+
+_SRC_DIR = Path(__file__).resolve().parent
+
+# Źródła, od których zależy wynik _prepare_offer / _geocode_candidates. Wchodzą
+# do source_hash oferty — po zmianie kodu parsera lub geokodera każda oferta
+# jest raz przeliczona od zera (poprawki parsera muszą docierać do starych ofert,
+# patrz FIX 2026-07-26 w _prepare_offer). Cały main.py celowo NIE jest na liście —
+# każda zmiana logowania czy zapisu bazy unieważniałaby fast path dla całej bazy.
+_PIPELINE_SOURCES = ('address_parser.py', 'address_parser_data.py', 'street_matcher.py',
+                     'price_parser.py', 'geocoder.py', 'gazetteer.py', 'geocode_scheduler.py')
+
+# Logika parsowania w samym main.py — do odcisku wchodzi źródło tych metod
+# (filtr wykluczeń, łańcuch ekstraktorów, bogus adresy, kandydaci geokodera),
+# więc ich zmiana unieważnia fast path bez ręcznego podbijania wersji.
+_PIPELINE_METHODS = ('_prepare_offer', '_finish_pending', '_is_bogus_address',
+                     '_geocode_candidates', '_geocode_with_fallbacks')
+
+# Podbij tylko przy zmianie parsowania POZA powyższymi metodami i plikami
+# (np. _PRECISION_RANK).
+PIPELINE_VERSION = 1
+
+
+@functools.lru_cache(maxsize=None)
+def _pipeline_fingerprint() -> bytes:
+    h = hashlib.blake2b(f'pipeline-v{PIPELINE_VERSION}'.encode(), digest_size=16)
+    for name in _PIPELINE_SOURCES:
+        h.update(b'|' + name.encode() + b'|')
+        h.update((_SRC_DIR / name).read_bytes())
+    for name in _PIPELINE_METHODS:
+        h.update(b'|' + name.encode() + b'|')
+        h.update(inspect.getsource(getattr(SonarPokojowy, name)).encode('utf-8'))
+    return h.digest()
+
 
 class SonarPokojowy:
     # Hierarchia precyzji adresu — im wyżej, tym lepszy marker. Używane przy
     # rozstrzyganiu "świeży parsing vs adres z cache" w _process_offer.
     _PRECISION_RANK = {'exact': 2, 'street_only': 1, 'district': 0}
 
-    def __init__(self, data_file: str = "../data/offers.json"):
+    # Pre-parsing w puli procesów opłaca się dopiero przy większej paczce
+    # (start procesów + przesyłanie ParsedText)
+    PREPARSE_MIN_OFFERS = 200
+
+    # Fast path po source_hash: co N-ta oferta (rotacyjnie wg dnia) i tak
+    # przechodzi pełny pipeline i jest porównana z wynikiem z bazy
+    FAST_PATH_AUDIT_EVERY = 20
+
+    # Domyślne dla instancji bez __init__ (object.__new__ w testach procesora
+    # ofert): bez bazy fast path się nie włącza
+    force_reparse = False
+    offer_store: Optional[OfferStore] = None
+    _price_outlier_threshold: Optional[float] = None
+
+    # Kroki 1→2 run_scan: 'stream' = szczegóły ofert płyną z puli pobierania
+    # prosto do parsowania/geokodowania/dedupu (scan_pipeline), 'staged' =
+    # dawne etapy po kolei (SONAR_PIPELINE=staged — np. do porównań)
+    PIPELINE_MODES = ('stream', 'staged')
+
+    def __init__(self, data_file: str = "../data/offers.json", force_reparse: Optional[bool] = None):
         self.data_file = Path(data_file)
         self.address_parser = AddressParser(geocoding_cache_path="../data/geocoding_cache.json")
         self.price_parser = PriceParser()
@@ -43,9 +107,34 @@ class SonarPokojowy:
         # Raportowany w scan_history.json — nagły skok = zmiana w parserze przepisała
         # pół bazy i warto na to spojrzeć, zamiast odkryć to przypadkiem na mapie.
         self._addr_corrections_count = 0
+
+        # Pełny re-parsing wszystkich ofert (ignoruje source_hash):
+        # SonarPokojowy(force_reparse=True) albo SONAR_FORCE_REPARSE=1
+        if force_reparse is None:
+            force_reparse = os.environ.get('SONAR_FORCE_REPARSE', '0') == '1'
+        self.force_reparse = force_reparse
+        self.fast_path_stats = {'hits': 0, 'misses': 0, 'audited': 0, 'audit_mismatch': 0}
+
+        self.pipeline_mode = os.environ.get('SONAR_PIPELINE', 'stream')
+        if self.pipeline_mode not in self.PIPELINE_MODES:
+            print(f"⚠️ Nieznany SONAR_PIPELINE={self.pipeline_mode!r} — używam 'stream'")
+            self.pipeline_mode = 'stream'
         
-        # Wczytaj istniejącą bazę
+        # Wczytaj istniejącą bazę. Backend SQLite (SONAR_OFFERS_BACKEND=sqlite
+        # albo data_file *.sqlite) zapisuje tylko zmienione rekordy, offers.json
+        # jest wtedy eksportem dla strony i generatorów. Backend journala
+        # (SONAR_OFFERS_BACKEND=journal) dopisuje zmiany scanu do
+        # offers.json.journal, a offers.json przepisuje tylko przy kompakcji.
+        self.storage = open_storage(self.data_file) or open_journal(self.data_file)
         self.database = self._load_database()
+        # Archiwum (SONAR_OFFER_SHARDS=1): database['offers'] to tylko gorący zbiór
+        # (aktywne + nieaktywne z okna reaktywacji), starsze rekordy leżą w
+        # miesięcznych plikach data/offers_archive/ i wracają przy reaktywacji
+        self.cold_archive = open_archive(json_path_for(self.data_file))
+        if self.cold_archive is not None:
+            self._split_cold_offers()
+        # Indeksy id / short ID / URL / aktywne nad database['offers']
+        self.offer_store = OfferStore(self.database, archive=self.cold_archive)
 
         # Inicjalizuj scraper Z istniejącymi ofertami (inteligentne pomijanie)
         existing_offers = self._build_existing_offers_index()
@@ -59,14 +148,14 @@ class SonarPokojowy:
     def _build_existing_offers_index(self) -> Dict:
         """
         Buduje indeks istniejących ofert dla inteligentnego pomijania.
-        Zawiera WSZYSTKIE oferty (aktywne + nieaktywne z ostatnich 30 dni)
+        Zawiera WSZYSTKIE oferty (aktywne + nieaktywne z ostatnich HOT_WINDOW_DAYS dni)
         aby umożliwić reaktywację ofert które tymczasowo zniknęły.
         Returns: {offer_id: {'price': X, 'description': '...', 'was_active': bool}}
         """
         index = {}
         active_count = 0
         inactive_count = 0
-        cutoff_date = datetime.now(self.tz) - timedelta(days=30)
+        cutoff_date = datetime.now(self.tz) - timedelta(days=HOT_WINDOW_DAYS)
         
         for offer in self.database.get('offers', []):
             is_active = offer.get('active', False)
@@ -138,7 +227,9 @@ class SonarPokojowy:
         return threshold
 
     def _load_database(self) -> Dict:
-        """Wczytuje bazę danych z JSON."""
+        """Wczytuje bazę danych z JSON (albo z backendu SQLite / snapshot + journal)."""
+        if self.storage is not None:
+            return self.storage.load()
         if self.data_file.exists():
             try:
                 with open(self.data_file, 'r', encoding='utf-8') as f:
@@ -157,8 +248,52 @@ class SonarPokojowy:
             "offers": []
         }
     
+    def _split_cold_offers(self):
+        """Przenosi do archiwum nieaktywne oferty spoza okna reaktywacji."""
+        # Kopia w bazie i w archiwum (crash w trakcie zapisu) — wygrywa baza;
+        # przed podziałem, żeby rekord, który zdążył znów wygasnąć, nie trafił
+        # do archiwum drugi raz
+        self.cold_archive.discard(self.database.get('offers', []))
+        hot, cold = split_hot(self.database.get('offers', []), datetime.now(self.tz))
+        if cold:
+            self.database['offers'] = hot
+            self.cold_archive.archive(cold)
+        print(f"🧊 Archiwum ofert: {len(hot)} w gorącym zbiorze, {len(self.cold_archive)} w archiwum "
+              f"({len(cold)} przeniesionych w tym scanie)")
+
     def _save_database(self):
-        """Zapisuje bazę danych do JSON (atomowo — crash nie utnie offers.json)."""
+        """Zapisuje bazę danych do JSON (atomowo — crash nie utnie offers.json).
+        Z archiwum: miesiące z przeniesionymi rekordami przed bazą, usunięcie
+        rekordów wyciągniętych z powrotem do gorącego zbioru — po niej."""
+        if self.cold_archive is None:
+            self._write_database()
+            return
+        self.cold_archive.flush(keep_taken=True)
+        self._write_database()
+        self.cold_archive.flush()
+
+    def _write_database(self):
+        """Zapis gorącego zbioru wg backendu: JSON atomowo, SQLite (transakcja
+        z rekordami oznaczonymi w OfferStore jako brudne; offers.json eksportują
+        generatory / CLI, nie każdy zapis) albo journal (dopisanie zmian scanu,
+        pełny offers.json przy kompakcji)."""
+        if isinstance(self.storage, JournalOfferStorage):
+            stats = self.storage.save(self.database)
+            changed = sum(stats[op] for op in ('insert', 'update', 'deactivate', 'reactivate', 'delete'))
+            if stats['compacted']:
+                print(f"💾 Baza zapisana: {self.data_file} (kompakcja: {stats['compacted']})")
+            else:
+                print(f"💾 Baza zapisana: {self.storage.journal_path.name} +{stats['appended_bytes'] // 1024} KB "
+                      f"({changed} zmian, {stats['deactivate']} dezaktywacji, "
+                      f"scan {stats['journal_scans']}/{self.storage.compact_every} do kompakcji)")
+            return
+        if self.storage is not None:
+            stats = self.storage.save(self.database, dirty=self.offer_store.dirty_records())
+            self.offer_store.clear_dirty()
+            print(f"💾 Baza zapisana: {self.storage.db_path} ({stats['written']} zmienionych, "
+                  f"{stats['deleted']} usuniętych, {stats['unchanged']} bez zmian, "
+                  f"{stats['compared']} porównanych)")
+            return
         write_json_atomic(self.data_file, self.database)
         print(f"💾 Baza zapisana: {self.data_file}")
     
@@ -216,79 +351,67 @@ class SonarPokojowy:
         
         return False
 
-    def _geocode_with_fallbacks(self, address_data: Dict, address_precision: str,
-                                full_text: str, raw_offer: Dict):
+    @staticmethod
+    def _geocode_candidates(address_parser, address_data: Dict, address_precision: str,
+                            full_text: str, raw_offer: Dict) -> list:
         """
-        FIX 2026-06-09: geokoduje adres z łańcuchem fallbacków na poziomie ekstraktorów.
-
-        Próbuje geokodować KOLEJNO kandydatów adresu, od najbardziej precyzyjnego:
+        Kandydaci adresu do geokodowania, od najbardziej precyzyjnego:
           1. address_data (główny — zwykle z extract_address, precision='exact')
           2. extract_street_only  (precision='street_only')
           3. extract_from_whitelist (precision='street_only')
           4. extract_district     (precision='district')
 
-        Pierwszy kandydat który się zgeokoduje wygrywa. Bez tego błędnie sparsowany
-        adres z numerem (np. "Gabriela Narutowicza 50" → centroid poza Lublinem,
-        "Adres Paganiniego 4", "Głęboka Samochód 9m") zabija ofertę, mimo że poprawna
-        ulica jest dostępna z innego ekstraktora.
-
-        Returns:
-            (coords, chosen_address_data, chosen_precision)
-            coords=None jeśli ŻADEN kandydat się nie zgeokodował (wtedy zwracamy
-            oryginalny address_data/precision dla logu).
-
-        Efekt uboczny: ustawia self._geocode_transient=True jeśli któryś kandydat
-        padł na TYMCZASOWY błąd Nominatim (timeout/429/5xx) — run_scan użyje tego
-        do ponowienia oferty w kolejce retry (zamiast liczyć ją jako no_coords).
+        Staticmethod z jawnym parserem — lista jest budowana w wątku głównym,
+        a geokodowana w GeocodeScheduler (albo synchronicznie w _geocode_with_fallbacks).
         """
         description = raw_offer.get('description', '')
 
-        # Zbuduj listę kandydatów w kolejności precyzji, deduplikując po 'full'.
+        # Zbuduj listę kandydatów w kolejności precyzji (deduplikacja po 'full'
+        # w geocode_candidates).
         candidates = [(address_data, address_precision)]
 
         def _add(extractor_result, precision):
             if extractor_result and extractor_result.get('full'):
                 candidates.append((extractor_result, precision))
 
-        # street_only / whitelist / district — liczone leniwie tylko jako fallback
-        _add(self.address_parser.extract_street_only(full_text)
-             or (self.address_parser.extract_street_only(description) if description else None),
+        _add(address_parser.extract_street_only(full_text)
+             or (address_parser.extract_street_only(description) if description else None),
              'street_only')
-        _add(self.address_parser.extract_from_whitelist(full_text)
-             or (self.address_parser.extract_from_whitelist(description) if description else None),
+        _add(address_parser.extract_from_whitelist(full_text)
+             or (address_parser.extract_from_whitelist(description) if description else None),
              'street_only')
-        _add(self.address_parser.extract_district(full_text)
-             or (self.address_parser.extract_district(description) if description else None),
+        _add(address_parser.extract_district(full_text)
+             or (address_parser.extract_district(description) if description else None),
              'district')
+        return candidates
 
-        tried_full = set()
-        transient = False
-        for cand, precision in candidates:
-            full = cand['full']
-            if full in tried_full:
-                continue
-            tried_full.add(full)
+    def _geocode_with_fallbacks(self, address_data: Dict, address_precision: str,
+                                full_text: str, raw_offer: Dict):
+        """
+        FIX 2026-06-09: geokoduje adres z łańcuchem fallbacków na poziomie ekstraktorów.
 
-            # FIX 2026-05-14: return_meta=True → wiemy czy geocoder zrobił fallback
-            # "sama ulica bez numeru" (wtedy obniżamy precision do street_only).
-            coords, geo_meta = self.geocoder.geocode_address(full, return_meta=True)
-            if geo_meta.get('transient_error'):
-                transient = True
-            if not coords:
-                continue
+        Próbuje geokodować KOLEJNO kandydatów adresu (_geocode_candidates).
+        Pierwszy kandydat który się zgeokoduje wygrywa. Bez tego błędnie sparsowany
+        adres z numerem (np. "Gabriela Narutowicza 50" → centroid poza Lublinem,
+        "Adres Paganiniego 4", "Głęboka Samochód 9m") zabija ofertę, mimo że poprawna
+        ulica jest dostępna z innego ekstraktora.
 
-            if len(tried_full) > 1:
-                print(f"      🔁 Fallback ekstraktora: główny adres nie geokodował się, "
-                      f"użyto '{full}' (precision={precision})")
+        Wersja synchroniczna (quick_scan, testy). run_scan zleca ten sam łańcuch
+        do GeocodeScheduler i geokoduje w tle.
 
-            if geo_meta.get('number_fallback') and precision != 'district':
-                # Geocoder nie znalazł konkretnego numeru, użył samej ulicy → przybliżony.
-                # FIX 2026-05-26 (A): nie nadpisujemy precision='district'.
-                print(f"      📌 Fallback geocoder: '{full}' "
-                      f"→ koordynaty samej ulicy (precision=street_only)")
-                precision = 'street_only'
+        Returns:
+            (coords, chosen_address_data, chosen_precision)
+            coords=None jeśli ŻADEN kandydat się nie zgeokodował (wtedy zwracamy
+            oryginalny address_data/precision dla logu).
 
-            return coords, cand, precision
+        Efekt uboczny: ustawia self._geocode_transient=True jeśli któryś kandydat
+        padł na TYMCZASOWY błąd Nominatim (timeout/429/5xx).
+        """
+        candidates = SonarPokojowy._geocode_candidates(
+            self.address_parser, address_data, address_precision, full_text, raw_offer)
+        coords, chosen, precision, transient = geocode_candidates(self.geocoder, candidates)
+        if coords:
+            return coords, chosen, precision
 
         # Żaden kandydat się nie zgeokodował — zapamiętaj czy to był transient fail.
         if transient:
@@ -298,13 +421,153 @@ class SonarPokojowy:
     def _process_offer(self, raw_offer: Dict) -> Dict:
         """
         Przetwarza surowe ogłoszenie: parsuje adres, cenę, geokoduje.
+        Synchronicznie — run_scan robi to samo etapami (_prepare_offer →
+        GeocodeScheduler → _build_offer).
         
         Returns:
             Dict z przetworzonymi danymi lub None jeśli oferta nieprawidłowa
         """
-        # Reset flagi transient-fail geokodera (ustawiana w _geocode_with_fallbacks,
-        # odczytywana przez run_scan do kolejki retry).
+        # Reset flagi transient-fail geokodera (ustawiana w _geocode_with_fallbacks).
         self._geocode_transient = False
+        pending = self._prepare_offer(raw_offer)
+        if pending is None:
+            return None
+
+        if pending['coords'] is None:
+            # FIX 2026-06-09: geokodowanie z łańcuchem fallbacków na poziomie EKSTRAKTORÓW.
+            # Jeśli główny (zwykle exact) adres nie geokoduje się, próbujemy alternatyw
+            # z pozostałych ekstraktorów (street_only / whitelist / district) ZANIM
+            # porzucimy ofertę. Bez tego błędnie sparsowany adres z numerem
+            # (np. "Gabriela Narutowicza 50" → poza Lublinem, "Adres Paganiniego 4",
+            # "Głęboka Samochód 9m") zabijał ofertę, mimo że poprawna ulica
+            # ("Narutowicza", "Paganiniego", "Bursztynowa") była dostępna z innego ekstraktora.
+            coords, address_data, address_precision = self._geocode_with_fallbacks(
+                pending['address_data'], pending['address_precision'],
+                pending['full_text'], raw_offer
+            )
+            if not coords:
+                print(f"⚠️ Nie można geokodować: {address_data['full']}")
+                self._skip_reason = 'no_coords'
+                return None  # Nie znaleziono współrzędnych → ignoruj
+            pending.update(coords=coords, address_data=address_data,
+                           address_precision=address_precision)
+
+        return self._build_offer(pending)
+
+    def _preparse_offers(self, raw_offers: List[Dict], workers: int) -> Dict:
+        """
+        Parsuje adresy i ceny CAŁEJ paczki z góry, w puli procesów
+        (AddressParser.parse_many / PriceParser.extract_many). Wyniki lądują w memo
+        parserów, więc _prepare_offer i _geocode_candidates dostają je bez
+        parsowania — pętla kroku 2 zajmuje się już tylko decyzjami i geokodowaniem.
+
+        Teksty jak w _prepare_offer: tytuł, tytuł + opis, sam opis.
+
+        Returns:
+            Statystyki do scan_history (teksty, czas ścienny, suma czasów parsowania)
+        """
+        started = time.time()
+        texts = []
+        full_texts = []
+        for raw_offer in raw_offers:
+            description = raw_offer.get('description', '')
+            full_text = raw_offer['title'] + " " + description
+            full_texts.append(full_text)
+            # Fast path (niezmieniony tekst) nie parsuje adresu — tylko cenę
+            if self._stored_parse(raw_offer, self._source_hash(raw_offer)) is not None:
+                continue
+            texts.append(raw_offer['title'])
+            texts.append(full_text)
+            if description:
+                texts.append(description)
+
+        address_results = self.address_parser.parse_many(texts, workers=workers)
+        price_results = self.price_parser.extract_many(full_texts, workers=workers)
+        # Wydruki ekstraktorów (poprawki literówek, odrzucone kandydaty) są
+        # łapane w procesach roboczych — tu trafiają do logu scanu, raz na tekst
+        logged = set()
+        for text, result in zip(texts, address_results):
+            if result.get('log') and text not in logged:
+                logged.add(text)
+                print(result['log'], end='')
+        stats = {
+            'workers': workers,
+            'texts': len(set(texts)),
+            'wall_seconds': round(time.time() - started, 2),
+            'parse_seconds': round(sum(r['seconds'] for r in address_results)
+                                   + sum(r['seconds'] for r in price_results), 2),
+        }
+        print(f"   ⚡ Pre-parsing: {stats['texts']} tekstów w {stats['wall_seconds']}s "
+              f"({workers} procesów, suma parsowania {stats['parse_seconds']}s)")
+        return stats
+
+    def _source_hash(self, raw_offer: Dict) -> str:
+        """Odcisk wejścia _prepare_offer: tytuł + opis + profil + kod pipeline'u."""
+        h = hashlib.blake2b(_pipeline_fingerprint(), digest_size=16)
+        for part in (raw_offer.get('title', ''), raw_offer.get('description', ''),
+                     raw_offer.get('profile_name') or ''):
+            h.update(part.encode('utf-8'))
+            h.update(b'\x00')
+        return h.hexdigest()
+
+    def _stored_parse(self, raw_offer: Dict, source_hash: str):
+        """
+        Adres i koordynaty z rekordu w bazie, jeśli oferta ma ten sam source_hash
+        (identyczny tekst i kod parsera), kompletny, niepodejrzany adres, a cache
+        geokodera ma pod tym adresem te same koordynaty.
+
+        Returns:
+            (address_data, address_precision, coords) albo None (pełny pipeline)
+        """
+        if self.force_reparse or self.offer_store is None:
+            return None
+        offer_id = raw_offer['url'].split('/')[-1].split('.')[0]
+        # Odczyt bez promocji z archiwum — rekord archiwalny i tak przejdzie pełny
+        # pipeline, a do gorącego zbioru wróci w kroku 3
+        existing, _ = self.offer_store.lookup(offer_id)
+        if not existing or existing.get('source_hash') != source_hash:
+            return None
+        address = existing.get('address') or {}
+        coords = address.get('coords')
+        if (not address.get('full') or self._is_bogus_address(address['full'])
+                or address.get('precision', 'exact') not in self._PRECISION_RANK
+                or not isinstance(coords, dict) or coords.get('lat') is None or coords.get('lon') is None):
+            return None
+        # Koordynaty z rekordu tylko, gdy cache geokodera dalej mówi to samo —
+        # poprawiony zatruty klucz (retry_none_cache, ręczna korekta cache) ma
+        # dotrzeć do oferty przy najbliższym przetworzeniu, jak przed fast path
+        if not self._same_coords(self.geocoder.cache.get(address['full']), coords):
+            print(f"      ♻️  Koordynaty '{address['full']}' w cache geokodera inne niż w bazie — pełny pipeline")
+            return None
+        address_data = {'full': address['full'], 'street': address.get('street'), 'number': address.get('number')}
+        return address_data, address.get('precision', 'exact'), coords
+
+    @staticmethod
+    def _same_coords(a: Optional[Dict], b: Optional[Dict]) -> bool:
+        """Te same koordynaty (z tolerancją zaokrągleń zapisu JSON/SQLite)."""
+        if not a or not b or a.get('lat') is None or b.get('lat') is None:
+            return False
+        return abs(a['lat'] - b['lat']) < 1e-7 and abs(a['lon'] - b['lon']) < 1e-7
+
+    def _audit_fast_path(self, source_hash: str) -> bool:
+        """Czy tę ofertę sprawdzić dziś pełnym pipeline'em (każda raz na N dni)."""
+        n = self.FAST_PATH_AUDIT_EVERY
+        return n > 0 and int(source_hash[:8], 16) % n == datetime.now(self.tz).toordinal() % n
+
+    def _prepare_offer(self, raw_offer: Dict, use_fast_path: bool = True) -> Optional[Dict]:
+        """
+        Część _process_offer bez geokodowania: filtr wykluczeń, adres (z cache
+        adresu i łańcuchem ekstraktorów), cena, filtr outlierów.
+
+        Fast path: gdy tytuł + opis + kod parsera są identyczne jak przy
+        poprzednim przetworzeniu (source_hash w rekordzie), adres i koordynaty
+        bierzemy z bazy, a liczymy tylko cenę (JSON-LD / cache / parser).
+
+        Returns:
+            Dict pending (raw_offer, full_text, address_data, address_precision,
+            price, media_info, price_source, coords — koordynaty z cache albo None,
+            gdy trzeba geokodować, source_hash) lub None z ustawionym self._skip_reason.
+        """
         # FIX 2026-06-09: jawny powód odrzucenia oferty (zamiast zgadywania przez
         # re-derywację w run_scan). Ustawiany przed każdym `return None`.
         # Wartości: 'excluded' | 'no_address' | 'no_price' | 'no_coords' | 'price_outlier' | None.
@@ -313,6 +576,35 @@ class SonarPokojowy:
 
         # 1. Użyj pełnego opisu (scraper już go pobrał)
         full_text = raw_offer['title'] + " " + raw_offer.get('description', '')
+        source_hash = self._source_hash(raw_offer)
+
+        stored = self._stored_parse(raw_offer, source_hash) if use_fast_path else None
+        if stored is not None:
+            address_data, address_precision, coords = stored
+            print(f"      ⚡ Tekst bez zmian — adres z bazy: {address_data['full']}")
+            pending = self._finish_pending(raw_offer, full_text, address_data, address_precision,
+                                           coords, source_hash)
+            if pending is None or not self._audit_fast_path(source_hash):
+                self.fast_path_stats['hits'] += 1
+                return pending
+            # Audyt: pełny pipeline musi dać ten sam adres i koordynaty co baza
+            # (bez koordynatów w pending — te, które da geokoder z cache)
+            self.fast_path_stats['audited'] += 1
+            full = self._prepare_offer(raw_offer, use_fast_path=False)
+            full_coords = None
+            if full is not None:
+                full_coords = full['coords'] or self.geocoder.cache.get(full['address_data'].get('full'))
+            if full is not None and full['address_data'].get('full') == address_data['full'] \
+                    and full['address_precision'] == address_precision \
+                    and self._same_coords(full_coords, coords):
+                self.fast_path_stats['hits'] += 1
+                return pending
+            self.fast_path_stats['audit_mismatch'] += 1
+            print(f"      ⚠️ Audyt fast path: baza '{address_data['full']}' {coords} ≠ pełny pipeline "
+                  f"'{full['address_data'].get('full') if full else None}' {full_coords} — używam pełnego")
+            return full
+        if use_fast_path and self.offer_store is not None:
+            self.fast_path_stats['misses'] += 1
         
         # FILTR: Wykluczamy ogłoszenia które nie są pokojami w mieszkaniach
         # FIX 2026-05-17: usunięto 'bliźniak', 'dom jednorodzinny', 'w domu jednorodzinnym'
@@ -494,7 +786,21 @@ class SonarPokojowy:
         if not address_data:
             self._skip_reason = 'no_address'
             return None  # Brak adresu → ignoruj
-        
+
+        # 4. Koordynaty z cache (reaktywacja / ten sam adres co w bazie) —
+        # pozostałe oferty geokoduje caller (_process_offer albo GeocodeScheduler)
+        coords = None
+        if use_cached_coords and cached_coords:
+            coords = cached_coords
+            print(f"      📍 Użyto współrzędnych z cache: {coords['lat']:.4f}, {coords['lon']:.4f}")
+
+        return self._finish_pending(raw_offer, full_text, address_data, address_precision,
+                                    coords, source_hash)
+
+    def _finish_pending(self, raw_offer: Dict, full_text: str, address_data: Dict,
+                        address_precision: str, coords: Optional[Dict], source_hash: str) -> Optional[Dict]:
+        """Cena (priorytety JSON-LD / cache / parser / HTML) i filtr outlierów —
+        wspólne dla pełnego pipeline'u i fast path _prepare_offer."""
         # 3. Parsuj cenę - NOWA LOGIKA TRÓJPOZIOMOWA (2C)
         # PRIORYTET 1: JSON-LD z OLX (najbardziej niezawodne, oficjalne dane)
         # PRIORYTET 2: Cache (dane z poprzedniego skanu - równie niezawodne jak JSON-LD)
@@ -556,26 +862,29 @@ class SonarPokojowy:
             self._skip_reason = 'price_outlier'
             return None
 
-        # 4. Geokoduj adres (lub użyj cache dla reaktywacji)
-        if use_cached_coords and cached_coords:
-            coords = cached_coords
-            print(f"      📍 Użyto współrzędnych z cache: {coords['lat']:.4f}, {coords['lon']:.4f}")
-        else:
-            # FIX 2026-06-09: geokodowanie z łańcuchem fallbacków na poziomie EKSTRAKTORÓW.
-            # Jeśli główny (zwykle exact) adres nie geokoduje się, próbujemy alternatyw
-            # z pozostałych ekstraktorów (street_only / whitelist / district) ZANIM
-            # porzucimy ofertę. Bez tego błędnie sparsowany adres z numerem
-            # (np. "Gabriela Narutowicza 50" → poza Lublinem, "Adres Paganiniego 4",
-            # "Głęboka Samochód 9m") zabijał ofertę, mimo że poprawna ulica
-            # ("Narutowicza", "Paganiniego", "Bursztynowa") była dostępna z innego ekstraktora.
-            coords, address_data, address_precision = self._geocode_with_fallbacks(
-                address_data, address_precision, full_text, raw_offer
-            )
-            if not coords:
-                print(f"⚠️ Nie można geokodować: {address_data['full']}")
-                self._skip_reason = 'no_coords'
-                return None  # Nie znaleziono współrzędnych → ignoruj
-        
+        return {
+            'raw_offer': raw_offer,
+            'full_text': full_text,
+            'address_data': address_data,
+            'address_precision': address_precision,
+            'price': price,
+            'media_info': media_info,
+            'price_source': price_source,
+            'coords': coords,
+            'source_hash': source_hash,
+        }
+
+    def _build_offer(self, pending: Dict) -> Dict:
+        """Rekord oferty z przygotowanych danych (_prepare_offer) i koordynatów."""
+        raw_offer = pending['raw_offer']
+        full_text = pending['full_text']
+        address_data = pending['address_data']
+        address_precision = pending['address_precision']
+        coords = pending['coords']
+        price = pending['price']
+        media_info = pending['media_info']
+        price_source = pending['price_source']
+
         # 5. Stwórz ID z URL (unikalne)
         offer_id = raw_offer['url'].split('/')[-1].split('.')[0]
 
@@ -621,28 +930,20 @@ class SonarPokojowy:
             'last_refresh_date': raw_offer.get('api_last_refresh', ''),
             'reactivation_count': 0,     # ile razy reaktywowano po zniknięciu
             'reactivation_dates': [],    # daty reaktywacji ['YYYY-MM-DDT...', ...]
+            # Odcisk tekstu + kodu parsera — fast path _prepare_offer w kolejnych skanach
+            'source_hash': pending.get('source_hash'),
         }
     
     def _find_existing_offer(self, offer_id: str) -> Dict:
-        """Znajduje istniejące ogłoszenie po ID."""
-        for offer in self.database['offers']:
-            if offer['id'] == offer_id:
-                return offer
-        return None
+        """Znajduje istniejące ogłoszenie po ID (indeks OfferStore, O(1))."""
+        return self.offer_store.get(offer_id)
 
     def _find_existing_offer_by_short_id(self, short_id: str) -> Dict:
         """Znajduje istniejące ogłoszenie po krótkiej końcówce ID (IDxxxxx).
         OLX zmienia slug URL gdy edytowany tytuł/adres — końcówka (ID OLX) pozostaje ta sama.
         Gdy w bazie jest kilka rekordów z tą samą końcówką (historyczne duplikaty),
         zwraca najlepszego kandydata: aktywny > najświeższy last_seen."""
-        if not short_id or len(short_id) < 3:
-            return None
-        suffix = f'-ID{short_id}'
-        candidates = [o for o in self.database['offers'] if o.get('id', '').endswith(suffix)]
-        if not candidates:
-            return None
-        candidates.sort(key=lambda o: (o.get('active', False), o.get('last_seen', '')), reverse=True)
-        return candidates[0]
+        return self.offer_store.get_by_short_id(short_id)
 
     def _title_changed(self, old_title: str, new_title: str) -> bool:
         """Czy tytuł realnie się zmienił? Ignoruje szum: wielkość liter,
@@ -987,6 +1288,19 @@ class SonarPokojowy:
                 print(f"      🔧 Korekta parsera: '{_old.get('full')}' ({_old.get('precision')}) → "
                       f"'{_new_addr_full}' ({_new_addr.get('precision')}) — bez wpisu do historii adresu")
 
+        # === KOREKTA KOORDYNATÓW ===
+        # Ten sam adres, inne koordynaty = poprawiony wpis cache geokodera (zatruty
+        # klucz, retry_none_cache). Podmiana in-place, bez historii adresu — inaczej
+        # poprawka cache nie dociera do ofert, które już go użyły.
+        elif (_new_addr.get('coords') and _existing_addr_full
+              and _new_addr_full.strip().lower() == _existing_addr_full.strip().lower()
+              and not self._same_coords(existing.get('address', {}).get('coords'), _new_addr['coords'])):
+            _old_coords = existing['address'].get('coords') or {}
+            existing['address']['coords'] = _new_addr['coords']
+            print(f"      📍 Korekta koordynatów '{_existing_addr_full}': "
+                  f"{_old_coords.get('lat')}, {_old_coords.get('lon')} → "
+                  f"{_new_addr['coords']['lat']}, {_new_addr['coords']['lon']}")
+
         # Upewnij się że jest aktywne (REAKTYWACJA nieaktywnych ofert)
         was_inactive = not existing.get('active', True)
         existing['active'] = True
@@ -1007,6 +1321,10 @@ class SonarPokojowy:
         # klucz — nie 'api_last_refresh', którego przetworzona oferta nie ma.
         self._track_refresh(existing, new_data.get('last_refresh_date', ''))
 
+        # Odcisk tekstu, z którego pochodzi adres rekordu (fast path _prepare_offer)
+        if new_data.get('source_hash'):
+            existing['source_hash'] = new_data['source_hash']
+
         # Śledź reaktywacje — inkrementuj licznik i dopisz datę przy każdej reaktywacji
         if was_inactive:
             existing['reactivation_count'] = existing.get('reactivation_count', 0) + 1
@@ -1053,8 +1371,10 @@ class SonarPokojowy:
         """
         Aktualizuje pole days_active dla WSZYSTKICH ofert (aktywnych i nieaktywnych).
         Oblicza różnicę w dniach między first_seen a last_seen.
+        Z archiwum tylko gorący zbiór — archiwalnym last_seen się już nie zmienia.
         """
         for offer in self.database['offers']:
+            before = offer.get('days_active')
             try:
                 first_seen = datetime.fromisoformat(offer['first_seen'])
                 last_seen = datetime.fromisoformat(offer['last_seen'])
@@ -1062,6 +1382,8 @@ class SonarPokojowy:
             except (ValueError, KeyError) as e:
                 print(f"⚠️ Błąd obliczania days_active dla oferty {offer.get('id')}: {e}")
                 offer['days_active'] = 0
+            if offer['days_active'] != before:
+                self.offer_store.mark_dirty(offer)
     
     def _reference_scrape_size(self, lookback: int = 8) -> Optional[int]:
         """
@@ -1130,14 +1452,23 @@ class SonarPokojowy:
         deactivated_bogus_count = 0
         reactivated_from_skipped = 0
         
-        for offer in self.database['offers']:
+        # Dotykamy tylko rekordów, które mogą się zmienić: aktywnych (kandydaci do
+        # dezaktywacji) i pominiętych w tym scanie (last_seen / reaktywacja).
+        # Reszta historii (nieaktywne, nieobecne w scanie) zostaje nietknięta,
+        # więc nie ma sensu jej iterować (OfferStore, 2026-10-17).
+        # Kandydaci to REKORDY — historyczne duplikaty id są obsługiwane wszystkie.
+        store = self.offer_store
+        candidates = {id(o): o for o in store.active_offers()}
+        for oid in skipped_set:
+            candidates.update((id(o), o) for o in store.get_all(oid))
+        for offer in candidates.values():
             # Sprawdź czy oferta ma bogus address i NIE przeszła pełnego _process_offer w tym scanie
             # (była tylko skipped) - wtedy DEZAKTYWUJ ją zamiast chronić.
             if (is_bogus_offer(offer) 
                 and offer['id'] in skipped_set 
                 and offer['id'] not in processed_set):
                 if offer.get('active', True):
-                    offer['active'] = False
+                    store.set_active(offer, False)
                     deactivated_bogus_count += 1
                 continue
             
@@ -1147,19 +1478,20 @@ class SonarPokojowy:
                 if offer['id'] in skipped_set:
                     if not offer.get('active', True):
                         # Reaktywacja oferty która była nieaktywna
-                        offer['active'] = True
+                        store.set_active(offer, True)
                         offer['reactivated_at'] = now
                         offer['reactivation_count'] = offer.get('reactivation_count', 0) + 1
                         offer.setdefault('reactivation_dates', []).append(now)
                         reactivated_from_skipped += 1
                     # Aktualizuj last_seen dla skipped ofert
                     offer['last_seen'] = now
+                    store.mark_dirty(offer)
                     # Śledź odświeżenie (bump) — skipped nie wchodzi w _update_existing_offer,
                     # więc bez tego bump bez zmiany ceny nigdy nie trafia do licznika
                     self._track_refresh(offer, skipped_refresh_map.get(offer['id'], ''))
             elif offer['active']:
                 # Oferta nie jest w scanie - dezaktywuj
-                offer['active'] = False
+                store.set_active(offer, False)
                 deactivated_count += 1
         
         if deactivated_count > 0:
@@ -1196,10 +1528,7 @@ class SonarPokojowy:
         stats_lock = threading.Lock()
         
         # Pobierz nieaktywne oferty, posortowane od najnowszych (ostatnio dezaktywowane)
-        inactive_offers = [
-            offer for offer in self.database.get('offers', [])
-            if not offer.get('active', True)
-        ]
+        inactive_offers = self.offer_store.inactive_offers()
         
         if not inactive_offers:
             print("   ℹ️  Brak nieaktywnych ofert do weryfikacji")
@@ -1217,12 +1546,11 @@ class SonarPokojowy:
         print(f"   🔍 Weryfikuję {len(to_verify)} nieaktywnych ofert (z {len(inactive_offers)} łącznie) [10 wątków]...")
         
         # Sesja z impersonacją TLS Safari (WAF CloudFront tnie po JA3 —
-        # patrz scraper.py IMPERSONATE). Thread-safe dla GET.
+        # patrz scraper.py IMPERSONATE). Thread-safe dla GET. Tempo trzyma
+        # wspólny kontroler AIMD wpięty w sesję (rate_controller.OLX_RATE).
         session = OLXScraper.make_olx_session()
         
         now = datetime.now(self.tz).isoformat()
-        # Per-thread rate limiter dla weryfikacji (delay 0.2-0.5s per wątek)
-        thread_local = threading.local()
         
         def verify_single(offer: Dict) -> tuple:
             """
@@ -1235,15 +1563,8 @@ class SonarPokojowy:
             if not url:
                 return (offer, 'error', None)
             
-            # Per-thread delay (0.2-0.5s między requestami tego samego wątku)
-            last_req = getattr(thread_local, 'last_request', 0)
-            elapsed = time.time() - last_req
-            if elapsed < 0.2:
-                time.sleep(0.2 - elapsed + random.uniform(0, 0.3))
-            
             try:
                 response = session.get(url, timeout=15)
-                thread_local.last_request = time.time()
                 
                 with stats_lock:
                     stats['verified'] += 1
@@ -1337,7 +1658,7 @@ class SonarPokojowy:
                         # a podtrzymanie żywej oferty: ustaw active, odśwież cenę, ale bez count++.
                         was_inactive_before = offer.get('id') not in getattr(
                             self, '_active_before_deactivation', set())
-                        offer['active'] = True
+                        self.offer_store.set_active(offer, True)
                         offer['last_seen'] = reactivation_data['last_seen']
                         if was_inactive_before:
                             offer['reactivated_at'] = reactivation_data['reactivated_at']
@@ -1420,18 +1741,35 @@ class SonarPokojowy:
         
         # Rozpocznij logowanie
         self.scan_logger.start_scan()
+        # Retry scanu w tym samym jobie nie może dostać odpowiedzi z poprzedniej próby
+        SCAN_CACHE.begin_scan()
         
         try:
             # 1. Scraping OLX
             print("📡 Krok 1: Scraping OLX...")
             scraping_start = time.time()
             
-            raw_offers = self.scraper.scrape_all_pages(max_pages=50)
+            # JEDNO przejście listingu (2026-10-17): crawl idzie od razu w sorcie
+            # "od najnowszych", więc te same strony dają surowe oferty ORAZ mapę
+            # pozycji (krok 1a) — wcześniej listing był przechodzony dwa razy.
+            listing_sort = 'created_at:desc'
+            streaming = self.pipeline_mode == 'stream'
+            if streaming:
+                # Tylko listing + plan fazy 2 — szczegóły pobiera w tle DetailStream
+                # w kroku 2, równolegle z parsowaniem i geokodowaniem
+                raw_offers = self.scraper.scrape_listing(max_pages=50, sort=listing_sort)
+                details_to_fetch = self.scraper.plan_details(raw_offers)
+            else:
+                raw_offers = self.scraper.scrape_all_pages(max_pages=50, sort=listing_sort)
+                details_to_fetch = []
             
             scraping_duration = time.time() - scraping_start
             self.scan_logger.log_phase('scraping', scraping_duration, {
                 'offers_found': len(raw_offers),
-                'max_pages': 50
+                'max_pages': 50,
+                'sort': listing_sort,
+                'pipeline': self.pipeline_mode,
+                'details_streamed': len(details_to_fetch),
             })
             
             print(f"✅ Pobrano {len(raw_offers)} surowych ofert\n")
@@ -1439,11 +1777,14 @@ class SonarPokojowy:
             # 1a. Mapa pozycji: short_id → strona listingu OLX w sorcie
             # "od najnowszych" — pozycja ORGANICZNA (bez zaburzenia płatnymi
             # wyróżnieniami), możliwie najbliższa realnej kolejności oferty.
-            # Osobne RÓWNOLEGŁE przejście samego listingu (~5s, bez pobierania
-            # szczegółów). favorites_tracker dokleja stronę do snapshotów
-            # ulubionych ("na której stronie jest oferta w dniu odczytu").
-            listing_sort = 'created_at:desc'
-            listing_positions = self.scraper.fetch_listing_positions(sort=listing_sort)
+            # Zbierana przy crawlu z kroku 1; osobne równoległe przejście
+            # (fetch_listing_positions) tylko gdy crawl nie dał żadnej pozycji.
+            # favorites_tracker dokleja stronę do snapshotów ulubionych
+            # ("na której stronie jest oferta w dniu odczytu").
+            listing_positions = self.scraper.listing_positions
+            if not listing_positions:
+                listing_positions = self.scraper.fetch_listing_positions(sort=listing_sort)
+                self.scraper.stats['saved_positions_pass'] = 0
             write_json_atomic(DATA_DIR / 'listing_positions.json', {
                 'scanned_at': now.isoformat(),
                 'sort': listing_sort,
@@ -1455,8 +1796,11 @@ class SonarPokojowy:
             print("🏢 Krok 1b: Scraping profili firmowych...")
             profile_scraping_start = time.time()
             
+            # Oferty z głównego crawla: ich szczegóły są już pobrane (albo świadomie
+            # pominięte; w trybie strumieniowym pobierze je krok 2), profile
+            # dokładają do nich tylko tagi
             profile_raw_offers = self.scraper.scrape_all_profiles(
-                TRACKED_PROFILES, max_pages_per_profile=10
+                TRACKED_PROFILES, max_pages_per_profile=10, known_offers=raw_offers
             )
             
             profile_scraping_duration = time.time() - profile_scraping_start
@@ -1464,48 +1808,67 @@ class SonarPokojowy:
             # Merge: oferty z profili do raw_offers
             # URL-y już w regular scan → dodaj tylko tag profile_name
             # URL-y nowe (nie w regular scan) → dodaj do raw_offers
-            regular_urls = {o['url'].split('?')[0] for o in raw_offers}
+            # raw_offers to RawOfferCollection (indeks czysty URL + short ID),
+            # więc dopasowanie jest O(1) zamiast pętli po całym listingu.
             profile_new_count = 0
             profile_tag_count = 0
             
             for p_offer in profile_raw_offers:
-                clean_url = p_offer['url'].split('?')[0]
-                if clean_url in regular_urls:
+                r = raw_offers.find(p_offer['url'])
+                if r is not None:
                     # Dodaj tag do istniejącej oferty z regular scanu
-                    for r in raw_offers:
-                        if r['url'].split('?')[0] == clean_url:
-                            r['profile_key'] = p_offer['profile_key']
-                            r['profile_name'] = p_offer['profile_name']
-                            # Regular scan (HTML) nie zna api_last_refresh — przenieś z API v1,
-                            # inaczej skipped oferty firmowe nie mają skąd wziąć daty bumpu
-                            if p_offer.get('api_last_refresh'):
-                                r['api_last_refresh'] = p_offer['api_last_refresh']
-                            if p_offer.get('api_created') and not r.get('api_created'):
-                                r['api_created'] = p_offer['api_created']
-                            profile_tag_count += 1
-                            break
+                    r['profile_key'] = p_offer['profile_key']
+                    r['profile_name'] = p_offer['profile_name']
+                    # Regular scan (HTML) nie zna api_last_refresh — przenieś z API v1,
+                    # inaczej skipped oferty firmowe nie mają skąd wziąć daty bumpu
+                    if p_offer.get('api_last_refresh'):
+                        r['api_last_refresh'] = p_offer['api_last_refresh']
+                    if p_offer.get('api_created') and not r.get('api_created'):
+                        r['api_created'] = p_offer['api_created']
+                    profile_tag_count += 1
                 else:
                     # Nowa oferta tylko z profilu - dodaj do puli
                     raw_offers.append(p_offer)
-                    regular_urls.add(clean_url)
                     profile_new_count += 1
             
+            saved_positions = self.scraper.stats.get('saved_positions_pass', 0)
+            saved_details = self.scraper.stats.get('saved_profile_details', 0)
             self.scan_logger.log_phase('profile_scraping', profile_scraping_duration, {
                 'profiles': len(TRACKED_PROFILES),
                 'profile_offers': len(profile_raw_offers),
                 'new_from_profiles': profile_new_count,
-                'tagged_existing': profile_tag_count
+                'tagged_existing': profile_tag_count,
+                'requests_saved': saved_positions + saved_details,
+                'requests_saved_positions': saved_positions,
+                'requests_saved_profile_details': saved_details
             })
             
             print(f"✅ Profil: {len(profile_raw_offers)} ofert ({profile_new_count} nowych, ")
-            print(f"         {profile_tag_count} otagowanych w regular scan)\n")
+            print(f"         {profile_tag_count} otagowanych w regular scan)")
+            print(f"📉 Zaoszczędzone requesty: {saved_positions + saved_details} "
+                  f"(pozycje: {saved_positions}, szczegóły profili: {saved_details})\n")
             
             # 2. Przetwarzanie ofert
             print("🔧 Krok 2: Przetwarzanie ofert...")
             processing_start = time.time()
-            geocoding_time = 0  # Czas geokodowania
             
             processed_offers = []
+            # Indeks duplikatów (adres + pasmo cen) — zamiast liniowego find_duplicate po processed_offers
+            duplicate_index = DuplicateIndex(self.duplicate_detector)
+            # MinHash/LSH nad całą historią (też nieaktywne): ponowne wystawienia pod
+            # nowym ID i duplikaty z inaczej sparsowanym adresem. Sygnatury leżą
+            # w data/offers.minhash.pickle (poza gitem, klucz = hash opisu) — nie
+            # w rekordach; pierwszy skan po świeżym klonie liczy je dla historii.
+            # Archiwum wchodzi samymi wpisami z indeksu (id, url, adres, klucz opisu).
+            relist_index = RelistIndex.from_offers(
+                self.offer_store, cache=SignatureCache(signature_cache_path_for(json_path_for(self.data_file))),
+                on_legacy=self.offer_store.mark_dirty)
+            if self.cold_archive is not None:
+                for stub, signature in self.cold_archive.relist_entries(relist_index.cache):
+                    relist_index.add(stub, signature)
+            scan_accepted = set()  # id() ofert przyjętych w TYM skanie
+            relists_flagged = 0
+            skipped_duplicate_cross_address = 0
             skipped_no_address = 0
             skipped_no_price = 0
             skipped_no_coords = 0
@@ -1524,21 +1887,36 @@ class SonarPokojowy:
             }
             SAMPLE_LIMIT = 50
 
-            # FIX 2026-06-09: kolejka retry dla ofert które padły na TYMCZASOWY błąd
-            # Nominatim (timeout/429/5xx). Bez tego pojedynczy chwilowy błąd geokodera
-            # wyrzucał ofertę z poprawnym adresem do no_coords (Chodźki/Chmielewskiego/
-            # Wilczej). Te oferty ponawiamy po głównej pętli (z odstępem).
-            transient_retry_queue = []
-
-            def consume(raw_offer, processed):
-                """Obsługuje wynik _process_offer: liczy skip/sample LUB dodaje ofertę
-                (z dedupem). Wspólne dla głównej pętli i przebiegu retry."""
+            # Geokodowanie w tle: wątek główny parsuje oferty (_prepare_offer) i zleca
+            # łańcuchy adresów do schedulera, który sam pilnuje 1 req/s Nominatim,
+            # priorytetów i ponowień po błędach tymczasowych (FIX 2026-06-09: dawna
+            # transient_retry_queue — Chodźki/Chmielewskiego/Wilczej nie mogą spadać
+            # do no_coords przez chwilowy 429).
+            # Parsowanie całej paczki z góry na kilku rdzeniach (SONAR_PARSE_WORKERS,
+            # domyślnie min(4, CPU)) — pętla niżej trafia w memo parserów
+            # W trybie strumieniowym z góry znane są tylko oferty gotowe (z bazy /
+            # z profili) — pobierane dopiero co przyszły z sieci parsuje pętla.
+            detail_stream = (DetailStream(self.scraper, raw_offers, details_to_fetch)
+                             if streaming else None)
+            preparse_pool = ([o for o in raw_offers if id(o) not in detail_stream.positions]
+                             if detail_stream is not None else raw_offers)
+            parse_workers = default_workers()
+            if parse_workers > 1 and len(preparse_pool) >= self.PREPARSE_MIN_OFFERS:
+                preparse_stats = self._preparse_offers(preparse_pool, parse_workers)
+                self.scan_logger.log_phase('preparse', preparse_stats['wall_seconds'], preparse_stats)
+
+            geo_scheduler = GeocodeScheduler(self.geocoder)
+
+            def consume(raw_offer, processed, reason=None, detail=None):
+                """Obsługuje wynik oferty: liczy skip/sample (wg reason) LUB dodaje
+                ofertę (z dedupem)."""
                 nonlocal skipped_no_address, skipped_no_price, skipped_no_coords
                 nonlocal skipped_duplicate, skipped_excluded, skipped_price_outlier
+                nonlocal relists_flagged, skipped_duplicate_cross_address
 
                 if not processed:
                     # FIX 2026-06-09: klasyfikuj wg JAWNEGO powodu ustawionego przez
-                    # _process_offer (self._skip_reason), zamiast zgadywać przez
+                    # _prepare_offer (self._skip_reason) / brak coords, zamiast zgadywać przez
                     # re-derywację adresu/ceny. Poprzednio oferty odrzucone z innego
                     # powodu (np. filtr excluded_phrases) z parsowalnym adresem+ceną
                     # lądowały błędnie w no_coords.
@@ -1548,12 +1926,11 @@ class SonarPokojowy:
                         'title': raw_offer.get('title', '')[:200],
                         'description_preview': (raw_offer.get('description', '') or '')[:500]
                     }
-                    reason = getattr(self, '_skip_reason', None)
 
                     if reason == 'excluded':
                         skipped_excluded += 1
                         if len(skipped_samples['excluded']) < SAMPLE_LIMIT:
-                            sample['excluded_phrase'] = getattr(self, '_skip_detail', None)
+                            sample['excluded_phrase'] = detail
                             skipped_samples['excluded'].append(sample)
                     elif reason == 'price_outlier':
                         skipped_price_outlier += 1
@@ -1589,17 +1966,29 @@ class SonarPokojowy:
                             skipped_samples['no_address'].append(sample)
                     return
 
-                # Sprawdź duplikaty
-                original_dup = self.duplicate_detector.find_duplicate(processed, processed_offers)
+                # Sprawdź duplikaty: ten sam adres (DuplicateIndex), potem podobny
+                # tekst pod innym adresem wśród ofert przyjętych w tym skanie (LSH)
+                match_kind = 'address'
+                original_dup = duplicate_index.find(processed)
+                if original_dup is None:
+                    relist_matches = relist_index.query(processed)
+                    for candidate, _ in relist_matches:
+                        if (id(candidate) in scan_accepted
+                                and self.duplicate_detector.is_duplicate(processed, candidate, ignore_address=True)):
+                            original_dup, match_kind = candidate, 'minhash'
+                            break
                 if original_dup is not None:
                     skipped_duplicate += 1
-                    print(f"      ⚠️ Duplikat - ignoruję")
+                    if match_kind == 'minhash':
+                        skipped_duplicate_cross_address += 1
+                    print(f"      ⚠️ Duplikat{' (inny adres)' if match_kind == 'minhash' else ''} - ignoruję")
                     if len(skipped_samples['duplicate']) < SAMPLE_LIMIT:
                         # Oblicz podobieństwo opisów dla diagnostyki
                         similarity = self.duplicate_detector.calculate_similarity(
                             processed.get('description', ''),
                             original_dup.get('description', '')
                         )
+                        minhash_similarity = relist_index.similarity(processed, original_dup)
                         skipped_samples['duplicate'].append({
                             'url': raw_offer.get('url', ''),
                             'title': raw_offer.get('title', '')[:200],
@@ -1612,14 +2001,41 @@ class SonarPokojowy:
                                 'address': original_dup.get('address', {}).get('full', ''),
                                 'price': original_dup.get('price', {}).get('current')
                             },
-                            'similarity': round(similarity, 4)
+                            'similarity': round(similarity, 4),
+                            # 'address' = ten sam adres, 'minhash' = inny adres, ten sam tekst
+                            'match': match_kind,
+                            'minhash_similarity': (round(minhash_similarity, 4)
+                                                   if minhash_similarity is not None else None)
                         })
                     return
 
+                # Ponowne wystawienie: NOWY listing podobny do oferty z historii
+                # (inny ID OLX). Nie odrzucamy — stary listing zwykle już wygasł —
+                # tylko zapisujemy w rekordzie, z czego oferta powstała.
+                if not self.offer_store.exists(processed['id']):
+                    for candidate, minhash_similarity in relist_matches:
+                        if id(candidate) in scan_accepted:
+                            continue
+                        processed['relist_of'] = {
+                            'id': candidate.get('id', ''),
+                            'url': candidate.get('url', ''),
+                            'address': candidate.get('address', {}).get('full', ''),
+                            'active': candidate.get('active', False),
+                            'similarity': round(minhash_similarity, 4),
+                        }
+                        relists_flagged += 1
+                        print(f"      🔁 Ponowne wystawienie: {candidate.get('id', '')} "
+                              f"(podobieństwo {minhash_similarity:.0%})")
+                        break
+
                 processed_offers.append(processed)
+                duplicate_index.add(processed)
+                relist_index.add(processed)
+                scan_accepted.add(id(processed))
                 print(f"      ✅ {processed['address']['full']} - {processed['price']['current']} zł")
 
-            for i, raw_offer in enumerate(raw_offers, 1):
+            def prepare(i, raw_offer):
+                """Parsuje ofertę i zleca geokodowanie → slot dla finish()."""
                 print(f"   [{i}/{len(raw_offers)}] Przetwarzam: {raw_offer['title'][:50]}...")
                 
                 # Stwórz ID z URL
@@ -1640,50 +2056,57 @@ class SonarPokojowy:
                                 or (self._find_existing_offer_by_short_id(short_id) if short_id else None))
                     if existing and not existing.get('offer_type'):
                         existing['offer_type'] = raw_offer['offer_type']
+                        self.offer_store.mark_dirty(existing)
 
 
-                # Pomiar czasu geokodowania
-                geo_start = time.time()
-                processed = self._process_offer(raw_offer)
-                geocoding_time += time.time() - geo_start
+                pending = self._prepare_offer(raw_offer)
+                future = None
+                if pending is not None and pending['coords'] is None:
+                    future = geo_scheduler.submit(SonarPokojowy._geocode_candidates(
+                        self.address_parser, pending['address_data'], pending['address_precision'],
+                        pending['full_text'], raw_offer))
+                return (raw_offer, pending, future, self._skip_reason, self._skip_detail)
 
-                # FIX 2026-06-09: jeśli oferta padła na TYMCZASOWY błąd geokodera,
-                # nie licz jej jako no_coords — odłóż do kolejki retry (po pętli).
-                if not processed and getattr(self, '_geocode_transient', False):
-                    print(f"      ⏳ Transient fail geokodera — kolejka retry")
-                    transient_retry_queue.append(raw_offer)
-                    continue
+            def finish(raw_offer, pending, future, reason, detail):
+                """Odbiera wynik slotu (czeka na geokodowanie) i przekazuje do consume()."""
+                if pending is None:
+                    consume(raw_offer, None, reason, detail)
+                    return
+                if future is not None:
+                    coords, address_data, address_precision, _transient = future.result()
+                    if not coords:
+                        # Też po wyczerpaniu ponowień błędu tymczasowego
+                        print(f"⚠️ Nie można geokodować: {address_data['full']}")
+                        consume(raw_offer, None, 'no_coords')
+                        return
+                    pending.update(coords=coords, address_data=address_data,
+                                   address_precision=address_precision)
+                consume(raw_offer, self._build_offer(pending))
+
+            # Wyniki odbieramy w kolejności listingu — dedup "pierwsza wygrywa"
+            # działa jak przy przetwarzaniu synchronicznym
+            pipeline_stats = None
+            if detail_stream is None:
+                slots = [prepare(i, raw_offer) for i, raw_offer in enumerate(raw_offers, 1)]
+                if geo_scheduler.pending():
+                    print(f"\n   ⏳ Geokodowanie w tle: {geo_scheduler.pending()} zadań w kolejce...")
+                for slot in slots:
+                    finish(*slot)
+            else:
+                # Szczegóły → parsowanie → geokodowanie → dedup jednocześnie;
+                # ograniczona kolejka + limit zaległości geokodera = backpressure
+                detail_stream.start()
+                try:
+                    pipeline_stats = run_ordered(raw_offers, detail_stream, prepare, finish, geo_scheduler)
+                finally:
+                    detail_stream.close()
+                pipeline_stats.update(detail_stream.summary())
+                print(f"\n   ✅ Scraping zakończony: {len(raw_offers)} ofert z "
+                      f"{self.scraper.listing_last_page} stron "
+                      f"(zaoszczędzono {self.scraper.stats['skipped_same_price']} requestów)")
 
-                consume(raw_offer, processed)
-
-            # FIX 2026-06-09: przebieg RETRY dla ofert z transient-failem geokodera.
-            # Backoff 5/10/20s — pojedyncza próba po 5s nie wystarczała przy dłuższych
-            # oknach rate-limitu Nominatim i oferty cicho spadały do no_coords.
-            if transient_retry_queue:
-                retry_queue = transient_retry_queue
-                retry_delays = (5, 10, 20)
-                for attempt, delay in enumerate(retry_delays, start=1):
-                    print(f"\n   ⏳ Retry geokodowania (próba {attempt}/{len(retry_delays)}): "
-                          f"{len(retry_queue)} ofert (transient fail Nominatim), czekam {delay}s...")
-                    time.sleep(delay)
-                    still_transient = []
-                    for raw_offer in retry_queue:
-                        geo_start = time.time()
-                        processed = self._process_offer(raw_offer)
-                        geocoding_time += time.time() - geo_start
-                        if processed:
-                            print(f"      ✅ Retry OK: {raw_offer['title'][:50]}")
-                            consume(raw_offer, processed)
-                        elif (getattr(self, '_geocode_transient', False)
-                              and attempt < len(retry_delays)):
-                            still_transient.append(raw_offer)
-                        else:
-                            # Nie-transient None albo ostatnia próba — konsumujemy,
-                            # oferta trafi do właściwej kategorii skip (zwykle no_coords).
-                            consume(raw_offer, processed)
-                    retry_queue = still_transient
-                    if not retry_queue:
-                        break
+            geo_scheduler.close()
+            geocoding_stats = geo_scheduler.summary()
 
             # Zapisz próbki odrzuconych do analizy (nadpisuje przy każdym scanie)
             try:
@@ -1704,6 +2127,11 @@ class SonarPokojowy:
             except Exception as e:
                 print(f"   ⚠️ Nie udało się zapisać skipped_offers_sample.json: {e}")
             
+            # Cache geokodowania jest write-behind — snapshot po całej fazie
+            # zamiast przepisywania pliku przy każdym chybieniu
+            self.geocoder.flush()
+            relist_index.cache.save()
+
             processing_duration = time.time() - processing_start
             self.scan_logger.log_phase('processing', processing_duration, {
                 'processed': len(processed_offers),
@@ -1711,22 +2139,41 @@ class SonarPokojowy:
                 'skipped_no_price': skipped_no_price,
                 'skipped_no_coords': skipped_no_coords,
                 'skipped_duplicate': skipped_duplicate,
+                'skipped_duplicate_cross_address': skipped_duplicate_cross_address,
                 'skipped_excluded': skipped_excluded,
-                'skipped_price_outlier': skipped_price_outlier
+                'skipped_price_outlier': skipped_price_outlier,
+                'relists_flagged': relists_flagged,
+                'minhash_computed': relist_index.cache.stats['computed'],
+                'fast_path': dict(self.fast_path_stats, forced_reparse=self.force_reparse),
+                # Tryb strumieniowy: 'processing' obejmuje też pobieranie szczegółów
+                'pipeline': dict(pipeline_stats or {}, mode=self.pipeline_mode),
             })
 
             # Dodaj metryki geokodowania
-            self.scan_logger.log_phase('geocoding', geocoding_time, {
-                'geocoded_addresses': len(processed_offers)
+            # busy_seconds = czas pracy wątku geokodowania (w tle, nie sumuje się
+            # z czasem przetwarzania)
+            self.scan_logger.log_phase('geocoding', geocoding_stats['busy_seconds'], {
+                'geocoded_addresses': len(processed_offers),
+                **geocoding_stats
             })
             
             print(f"\n✅ Przetworzone oferty: {len(processed_offers)}")
             print(f"   Pominięte - brak adresu: {skipped_no_address}")
             print(f"   Pominięte - brak ceny: {skipped_no_price}")
             print(f"   Pominięte - brak współrzędnych: {skipped_no_coords}")
-            print(f"   Pominięte - duplikaty: {skipped_duplicate}")
+            print(f"   Pominięte - duplikaty: {skipped_duplicate} (w tym inny adres: {skipped_duplicate_cross_address})")
+            print(f"   Ponowne wystawienia (relist): {relists_flagged}")
+            print(f"   Fast path (tekst bez zmian): {self.fast_path_stats['hits']} ofert, "
+                  f"audyt {self.fast_path_stats['audited']} (niezgodne: {self.fast_path_stats['audit_mismatch']})"
+                  f"{' — WYMUSZONY RE-PARSING' if self.force_reparse else ''}")
             print(f"   Pominięte - wykluczone (filtr): {skipped_excluded}")
-            print(f"   Pominięte - cena-outlier (10x średnia): {skipped_price_outlier}\n")
+            print(f"   Pominięte - cena-outlier (10x średnia): {skipped_price_outlier}")
+            if pipeline_stats:
+                print(f"   Strumień: {pipeline_stats['streamed']} pobranych + {pipeline_stats['ready']} gotowych, "
+                      f"bezczynność {pipeline_stats['idle_seconds']}s, czekanie na geokoder "
+                      f"{pipeline_stats['head_wait_seconds']}s, producent wstrzymany "
+                      f"{pipeline_stats['producer_blocked_seconds']}s")
+            print()
             
             # 3. Aktualizacja bazy danych
             print("💾 Krok 3: Aktualizacja bazy danych...")
@@ -1742,26 +2189,24 @@ class SonarPokojowy:
                 # 1) Dopasowanie po pełnym ID (slug). 2) Fallback po końcówce ID OLX —
                 # gdy właściciel edytował tytuł/adres, OLX zmienia slug, ale ID OLX zostaje.
                 # Bez tego ta sama oferta rozdwajała się na duplikaty.
-                existing = self._find_existing_offer(processed['id'])
-                matched_by_short = False
-                if not existing and '-ID' in processed['id']:
-                    short_id = processed['id'].split('-ID')[-1]
-                    existing = self._find_existing_offer_by_short_id(short_id)
-                    matched_by_short = existing is not None
+                # Oba dopasowania idą przez indeksy OfferStore (O(1) zamiast
+                # liniowego skanu bazy na każdą przetworzoną ofertę).
+                existing, matched_by_short = self.offer_store.find(processed['id'])
 
                 if existing:
                     was_inactive = not existing.get('active', True)
                     self._update_existing_offer(existing, processed)
+                    # _update_existing_offer mógł reaktywować rekord — dociągnij indeks
+                    self.offer_store.sync_active(existing)
                     # Slug się zmienił → zaktualizuj id/url do aktualnego,
                     # żeby _mark_inactive_offers nie uznał rekordu za zniknięty.
                     if matched_by_short:
-                        existing['id'] = processed['id']
-                        existing['url'] = processed['url']
+                        self.offer_store.rename(existing, processed['id'], processed['url'])
                     updated_offers_count += 1
                     if was_inactive:
                         reactivated_count += 1
                 else:
-                    self.database['offers'].append(processed)
+                    self.offer_store.add(processed)
                     new_offers_count += 1
             
             # Oznacz nieaktywne (ale pominij oferty które były skipped - one są nadal aktywne)
@@ -1782,7 +2227,7 @@ class SonarPokojowy:
             # (Cloudflare, rate limit, pusta odpowiedź, itp.)
             # Jeśli scraper zwrócił 0 ofert lub podejrzanie mało w stosunku do bazy,
             # NIE dezaktywuj niczego - to prawie na pewno problem ze scrapem, nie z ofertami.
-            active_in_db = sum(1 for o in self.database['offers'] if o.get('active'))
+            active_in_db = self.offer_store.count_active()
             MIN_RATIO = 0.3   # Scrape musi zwrócić co najmniej 30% wcześniejszej liczby aktywnych
             SOFT_RATIO = 0.7  # ...i co najmniej 70% mediany ostatnich ZDROWYCH skanów
             TRUNCATED_RATIO = 0.9  # przy urwanej paginacji wystarczy 10% spadku
@@ -1795,9 +2240,7 @@ class SonarPokojowy:
             # scrape→inactive→verify→reactivate (firmówka spoza listingu z InStock była
             # aktywna, zdjęta i wskrzeszona w TYM SAMYM skanie). Bez tego licznik
             # reaktywacji puchł o +1/skan (zgłoszenie Mateusza: Nadbystrzycka/Głębokiej ×5).
-            self._active_before_deactivation = {
-                o['id'] for o in self.database['offers'] if o.get('active')
-            }
+            self._active_before_deactivation = self.offer_store.active_ids()
 
             scrape_blocked = False
             if scraped_count == 0 and active_in_db > 0:
@@ -1904,8 +2347,10 @@ class SonarPokojowy:
             # 8. Loguj statystyki
             total_duration = time.time() - scan_start_time
             
-            active = sum(1 for o in self.database['offers'] if o['active'])
-            inactive = len(self.database['offers']) - active
+            active = self.offer_store.count_active()
+            archived = len(self.cold_archive) if self.cold_archive is not None else 0
+            total_in_db = len(self.database['offers']) + archived
+            inactive = total_in_db - active
             
             self.scan_logger.log_stats({
                 'raw_offers': len(raw_offers),
@@ -1913,7 +2358,8 @@ class SonarPokojowy:
                 'new': new_offers_count,
                 'updated': updated_offers_count,
                 'reactivated': reactivated_count,
-                'total_in_db': len(self.database['offers']),
+                'total_in_db': total_in_db,
+                'archived': archived,
                 'active': active,
                 'inactive': inactive,
                 'skipped_no_address': skipped_no_address,
@@ -1925,6 +2371,17 @@ class SonarPokojowy:
                 'verification': verification_stats
             })
             
+            self.scan_logger.log_component('rate_controller', OLX_RATE.state())
+            if self.storage is not None:
+                self.scan_logger.log_component('offers_storage', self.storage.last_save)
+            if self.cold_archive is not None:
+                self.scan_logger.log_component('offer_shards', {
+                    'hot': len(self.database['offers']), **self.cold_archive.summary()})
+            http_cache_stats = SCAN_CACHE.summary()
+            self.scan_logger.log_component('http_cache', http_cache_stats)
+            print(f"🗄️ Cache HTTP: {http_cache_stats['hits']} trafień / "
+                  f"{http_cache_stats['misses']} chybień ({http_cache_stats['hit_rate']}%)")
+            
             final_status = 'warning' if scrape_blocked else 'completed'
             self.scan_logger.end_scan(final_status, total_duration)
             
@@ -1934,7 +2391,8 @@ class SonarPokojowy:
             print("="*60)
             print(f"✅ Oferty aktywne: {active}")
             print(f"📁 Oferty nieaktywne (historia): {inactive}")
-            print(f"📦 Łącznie w bazie: {len(self.database['offers'])}")
+            print(f"📦 Łącznie w bazie: {total_in_db}"
+                  + (f" (w archiwum: {archived})" if self.cold_archive is not None else ""))
             print(f"⏱️ Czas wykonania: {total_duration:.1f}s")
             print(f"⏰ Następny scan: {datetime.fromisoformat(self.database['next_scan']).strftime('%Y-%m-%d %H:%M')}")
             print("="*60 + "\n")
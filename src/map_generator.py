@@ -4,7 +4,6 @@ Generator map_data.json dla SONAR POKOJOWY
 Przekształca data.json → map_data.json z formatem wymaganym przez frontend
 """
 
-import json
 import re
 from datetime import datetime
 from collections import defaultdict
@@ -13,6 +12,7 @@ from pathlib import Path
 # Import taggera ofert (B1)
 from offer_tagger import tag_offer, TAGS as OFFER_TAGS
 from shared_utils import write_json_atomic, format_datetime
+from offers_journal import read_offers
 from profiles_config import TRACKED_PROFILES, FIRM_BORDER_COLOR, FIRM_BORDER_WIDTH
 
 # Definicja zakresów cenowych - 22 przedziały.
@@ -303,9 +303,8 @@ def generate_map_data(input_file, output_file):
     
     print("🔄 Generowanie map_data.json...")
     
-    # 1. Wczytaj data.json
-    with open(input_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    # 1. Wczytaj data.json (snapshot + journal zmian, jeśli jest)
+    data = read_offers(input_file)
     
     offers = data.get('offers', [])
     print(f"📥 Wczytano {len(offers)} ofert z data.json")
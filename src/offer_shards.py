@@ -0,0 +1,426 @@
+"""
+Offer Shards - podział bazy ofert na gorący zbiór i miesięczne archiwum.
+
+Historia ofert jest zbierana bezterminowo, a każdy scan przechodzi po całej
+database['offers'] (_update_days_active, indeks pomijania, próg outlierów,
+liczniki w kroku 3, indeks relistów). Większość rekordów to oferty nieaktywne
+od miesięcy, których scan już nie zmieni.
+
+Gorący zbiór (offers.json / backend SQLite / journal): oferty aktywne +
+nieaktywne z ostatnich HOT_WINDOW_DAYS dni — to samo okno reaktywacji, którego
+używa _build_existing_offers_index. Reszta trafia do archiwum:
+
+  data/offers_archive/offers-YYYY-MM.json  — rekordy wg miesiąca last_seen,
+                                             wczytywane dopiero gdy potrzebne
+  data/offers_archive/index.json           — lekkie wpisy każdej oferty z
+                                             archiwum (id, url, daty, adres,
+                                             klucz opisu): wyszukiwanie po id /
+                                             krótkim ID i indeks relistów bez
+                                             wczytywania miesięcy (sygnatury
+                                             z SignatureCache po kluczu opisu)
+
+Oferta z archiwum, która wróciła na OLX, jest wyciągana przy dopasowaniu
+(OfferStore.find → take) i wraca do gorącego zbioru jako zwykły rekord —
+krok 3 reaktywuje ją jak dotąd. Zapis: najpierw miesiące z nowymi rekordami
+(przeniesione nadal w pliku), potem gorący zbiór, na końcu usunięcie
+przeniesionych — crash w połowie zostawia najwyżej kopię w obu miejscach,
+a przy wczytaniu wygrywa gorący zbiór.
+
+Włączenie: env SONAR_OFFER_SHARDS=1. Istniejące archiwum jest używane zawsze
+(bez niego stare oferty wyglądałyby na nowe). Generatory czytają bazę przez
+offers_journal.read_offers(), który dokleja archiwum — pełna historia dla
+trendu, top5 i profili.
+
+CLI:
+    python offer_shards.py stats data/offers.json
+    python offer_shards.py merge data/offers.json   # archiwum → jeden offers.json
+"""
+
+import json
+import os
+import shutil
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from offer_store import offer_short_id
+from relist_detector import shingles, text_key
+from shared_utils import write_json_atomic
+
+# Okno reaktywacji: nieaktywne oferty widziane w tym oknie zostają w gorącym
+# zbiorze (i w indeksie inteligentnego pomijania scrapera)
+HOT_WINDOW_DAYS = 30
+
+ARCHIVE_DIR_NAME = 'offers_archive'
+
+
+def shards_enabled() -> bool:
+    return os.environ.get('SONAR_OFFER_SHARDS', '0') == '1'
+
+
+def archive_dir_for(json_path) -> Path:
+    """data/offers.json → data/offers_archive/."""
+    return Path(str(json_path)).parent / ARCHIVE_DIR_NAME
+
+
+def _month(offer: Dict) -> Optional[str]:
+    """Miesiąc shardu (YYYY-MM z last_seen) albo None gdy data nieczytelna."""
+    try:
+        return datetime.fromisoformat(offer['last_seen']).strftime('%Y-%m')
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def split_hot(offers: Iterable[Dict], now: datetime,
+              window_days: int = HOT_WINDOW_DAYS) -> Tuple[List[Dict], List[Dict]]:
+    """(gorące, zimne): aktywne i widziane w oknie zostają; rekordy z
+    nieczytelnym last_seen też (nie archiwizujemy czegoś, czego nie umiemy
+    przypisać do miesiąca)."""
+    cutoff = now - timedelta(days=window_days)
+    hot, cold = [], []
+    for offer in offers:
+        if offer.get('active', False) or _month(offer) is None:
+            hot.append(offer)
+            continue
+        last_seen = datetime.fromisoformat(offer['last_seen'])
+        if last_seen.tzinfo is None:
+            last_seen = last_seen.replace(tzinfo=cutoff.tzinfo)
+        (hot if last_seen >= cutoff else cold).append(offer)
+    return hot, cold
+
+
+def _description_key(offer: Dict) -> Optional[str]:
+    """Klucz opisu w SignatureCache albo None, gdy opis nie da sygnatury."""
+    description = offer.get('description', '')
+    return text_key(description) if shingles(description) else None
+
+
+def _stub(offer: Dict, month: str) -> Dict:
+    return {
+        'id': offer.get('id', ''),
+        'url': offer.get('url'),
+        'first_seen': offer.get('first_seen'),
+        'last_seen': offer.get('last_seen'),
+        'month': month,
+        'address': (offer.get('address') or {}).get('full') if isinstance(offer.get('address'), dict) else None,
+        'text_key': _description_key(offer),
+    }
+
+
+def _same_record(offer: Dict, stub: Dict) -> bool:
+    return (offer.get('id', '') == stub['id'] and offer.get('first_seen') == stub['first_seen']
+            and offer.get('last_seen') == stub['last_seen'])
+
+
+def _same_offer(offer: Dict, stub: Dict) -> bool:
+    """Ta sama oferta niezależnie od last_seen (rekord zaktualizowany po promocji)."""
+    return offer.get('id', '') == stub['id'] and offer.get('first_seen') == stub['first_seen']
+
+
+class ColdArchive:
+    """Archiwum nieaktywnych ofert w miesięcznych plikach + lekki indeks."""
+
+    def __init__(self, archive_dir):
+        self.archive_dir = Path(archive_dir)
+        self.index_file = self.archive_dir / 'index.json'
+        self._stubs: List[Dict] = []
+        if self.index_file.exists():
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                self._stubs = json.load(f).get('offers', [])
+        self._by_id: Dict[str, List[Dict]] = {}
+        self._by_short: Dict[str, List[Dict]] = {}
+        for stub in self._stubs:
+            self._index_stub(stub)
+        self._shards: Dict[str, List[Dict]] = {}
+        self._dirty: set = set()
+        # Wyciągnięte do gorącego zbioru, jeszcze nieusunięte z plików: miesiąc → rekordy
+        self._taken: Dict[str, List[Tuple[Dict, Dict]]] = {}
+        self.stats = {'promoted': 0, 'demoted': 0, 'months_loaded': 0}
+
+    def __len__(self) -> int:
+        return len(self._stubs)
+
+    def _index_stub(self, stub: Dict):
+        self._by_id.setdefault(stub['id'], []).append(stub)
+        short_id = offer_short_id(stub['id'])
+        if short_id:
+            self._by_short.setdefault(short_id, []).append(stub)
+
+    def _shard_path(self, month: str) -> Path:
+        return self.archive_dir / f'offers-{month}.json'
+
+    def months(self) -> List[str]:
+        return sorted({stub['month'] for stub in self._stubs})
+
+    def _shard(self, month: str) -> List[Dict]:
+        """Rekordy miesiąca — wczytywane leniwie, raz na proces."""
+        if month not in self._shards:
+            path = self._shard_path(month)
+            records = []
+            if path.exists():
+                with open(path, 'r', encoding='utf-8') as f:
+                    records = json.load(f).get('offers', [])
+                self.stats['months_loaded'] += 1
+                # Sygnatury trzymane kiedyś w rekordach — miesiąc zapisze się bez nich
+                for record in records:
+                    if record.pop('minhash', None) is not None:
+                        self._dirty.add(month)
+            self._shards[month] = records
+        return self._shards[month]
+
+    # ------------------------------------------------------------------
+    # ODCZYT
+    # ------------------------------------------------------------------
+
+    def _record(self, stub: Dict) -> Optional[Dict]:
+        return next((o for o in self._shard(stub['month']) if _same_record(o, stub)), None)
+
+    def relist_entries(self, cache) -> List[Tuple[Dict, Tuple[int, ...]]]:
+        """
+        (wpis w kształcie rekordu, sygnatura) dla RelistIndex.add — relisty
+        widzą całą historię bez wczytywania miesięcy, gdy cache sygnatur
+        (relist_detector.SignatureCache) zna klucz opisu. Brak w cache (świeży
+        klon) albo wpis sprzed klucza opisu (z sygnaturą 'minhash' w indeksie)
+        → opis z pliku miesiąca; stary wpis zapisze najbliższy flush().
+        """
+        entries = []
+        for stub in self._stubs:
+            key = stub.get('text_key')
+            signature = cache.lookup(key) if key else None
+            if signature is None and (key or 'text_key' not in stub):
+                record = self._record(stub) or {}
+                if 'text_key' not in stub:
+                    stub.pop('minhash', None)
+                    stub.pop('no_minhash', None)
+                    stub['text_key'] = key = _description_key(record)
+                    self._dirty.add(stub['month'])
+                if key:
+                    signature = cache.signature(record.get('description', ''), key)
+            if signature is not None:
+                entries.append(({'id': stub['id'], 'url': stub['url'], 'address': {'full': stub['address']},
+                                 'active': False, 'archived': stub['month']}, signature))
+        return entries
+
+    def contains(self, offer_id: str) -> bool:
+        """Czy archiwum ma rekord (pełne id albo krótki ID OLX) — bez wczytywania miesięcy."""
+        return bool(self._by_id.get(offer_id) or self._by_short.get(offer_short_id(offer_id) or ''))
+
+    def load_all(self) -> List[Dict]:
+        """Wszystkie rekordy archiwum (miesiącami od najstarszego)."""
+        return [offer for month in self.months() for offer in self._shard(month)]
+
+    def summary(self) -> Dict:
+        return {'archived': len(self), 'months': len(self.months()), **self.stats}
+
+    # ------------------------------------------------------------------
+    # ZMIANY
+    # ------------------------------------------------------------------
+
+    def take(self, offer_id: str) -> Optional[Dict]:
+        """Wyciąga rekord z archiwum (po pełnym id, potem krótkim ID OLX) —
+        wywołujący dopisuje go do gorącego zbioru."""
+        candidates = self._by_id.get(offer_id) or self._by_short.get(offer_short_id(offer_id) or '')
+        if not candidates:
+            return None
+        stub = max(candidates, key=lambda s: s.get('last_seen') or '')
+        shard = self._shard(stub['month'])
+        record = self._record(stub)
+        self._remove_stub(stub)
+        if record is None:
+            print(f"⚠️ Archiwum: brak rekordu {stub['id']} w offers-{stub['month']}.json — pomijam wpis")
+            return None
+        shard.remove(record)
+        self._taken.setdefault(stub['month'], []).append((record, stub))
+        self._dirty.add(stub['month'])
+        self.stats['promoted'] += 1
+        return record
+
+    def _remove_stub(self, stub: Dict):
+        self._stubs = [s for s in self._stubs if s is not stub]
+        for index, key in ((self._by_id, stub['id']), (self._by_short, offer_short_id(stub['id']))):
+            if key and key in index:
+                index[key] = [s for s in index[key] if s is not stub]
+                if not index[key]:
+                    del index[key]
+
+    def discard(self, hot_offers: Iterable[Dict]) -> int:
+        """Usuwa z archiwum kopie rekordów obecnych w gorącym zbiorze
+        (crash między zapisem archiwum a bazy) — gorący zbiór wygrywa.
+        Dopasowanie po id + first_seen: promowany rekord mógł już dostać
+        nowy last_seen, zanim proces padł przed drugim flush()."""
+        removed = 0
+        for offer in hot_offers:
+            for stub in list(self._by_id.get(offer.get('id', ''), ())):
+                if not _same_offer(offer, stub):
+                    continue
+                shard = self._shard(stub['month'])
+                shard[:] = [o for o in shard if not _same_offer(o, stub)]
+                self._remove_stub(stub)
+                self._dirty.add(stub['month'])
+                removed += 1
+        return removed
+
+    def archive(self, offers: Iterable[Dict]) -> int:
+        """Przenosi rekordy do archiwum (miesiąc wg last_seen)."""
+        moved = 0
+        for offer in offers:
+            month = _month(offer)
+            offer.pop('minhash', None)
+            self._shard(month).append(offer)
+            stub = _stub(offer, month)
+            self._stubs.append(stub)
+            self._index_stub(stub)
+            self._dirty.add(month)
+            moved += 1
+        self.stats['demoted'] += moved
+        return moved
+
+    def flush(self, keep_taken: bool = False):
+        """
+        Zapisuje zmienione miesiące i indeks. keep_taken=True (przed zapisem
+        gorącego zbioru): wyciągnięte rekordy zostają jeszcze w plikach;
+        flush() po zapisie bazy usuwa je na dobre.
+        """
+        if not self._dirty:
+            return
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        for month in sorted(self._dirty):
+            records = self._shard(month)
+            if keep_taken:
+                records = records + [record for record, _ in self._taken.get(month, ())]
+            path = self._shard_path(month)
+            if records:
+                write_json_atomic(path, {'month': month, 'offers': records})
+            elif path.exists():
+                path.unlink()
+        stubs = self._stubs
+        if keep_taken:
+            stubs = stubs + [stub for taken in self._taken.values() for _, stub in taken]
+        write_json_atomic(self.index_file, {'offers': stubs}, indent=None)
+        if not keep_taken:
+            self._dirty.clear()
+            self._taken.clear()
+
+
+def open_archive(json_path) -> Optional[ColdArchive]:
+    """Archiwum dla bazy ofert: gdy włączone (SONAR_OFFER_SHARDS=1) albo już istnieje."""
+    archive_dir = archive_dir_for(json_path)
+    if shards_enabled() or (archive_dir / 'index.json').exists():
+        return ColdArchive(archive_dir)
+    return None
+
+
+def main():
+    import argparse
+
+    from offers_journal import read_offers
+
+    parser = argparse.ArgumentParser(description='Archiwum ofert (gorący zbiór + miesiące)')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    for name, help_text in (('stats', 'Rozmiar gorącego zbioru i archiwum'),
+                            ('merge', 'Scal archiwum z powrotem do offers.json')):
+        sub.add_parser(name, help=help_text).add_argument('json_path')
+    args = parser.parse_args()
+
+    archive = ColdArchive(archive_dir_for(args.json_path))
+    if args.cmd == 'stats':
+        print(json.dumps({**archive.summary(), 'month_list': archive.months()}, indent=2))
+        return
+    database = read_offers(args.json_path)
+    write_json_atomic(args.json_path, database)
+    shutil.rmtree(archive.archive_dir)
+    print(f"📦 Scalono {len(archive)} ofert z archiwum do {args.json_path} "
+          f"(razem {len(database.get('offers', []))})")
+
+
+def _self_test():
+    import tempfile
+
+    import pytz
+
+    from relist_detector import SignatureCache
+
+    print("🧪 Test offer shards\n")
+    tz = pytz.timezone('Europe/Warsaw')
+    now = tz.localize(datetime(2026, 10, 17, 9, 0))
+
+    def offer(i, active, days_ago):
+        seen = (now - timedelta(days=days_ago)).isoformat()
+        return {'id': f'pokoj-{i}-CID3-ID1abc{i:02d}', 'url': f'https://www.olx.pl/d/oferta/pokoj-{i}-CID3-ID1abc{i:02d}.html',
+                'active': active, 'first_seen': (now - timedelta(days=days_ago + 20)).isoformat(),
+                'last_seen': seen, 'address': {'full': f'Lipowa {i}'},
+                'description': f'Pokój {i} przy Lipowej blisko UMCS, internet w cenie'}
+
+    offers = [offer(0, True, 0), offer(1, False, 3), offer(2, False, 45), offer(3, False, 80),
+              offer(4, False, 200), {'id': 'zepsuty-CID3-ID1bad00', 'active': False, 'last_seen': 'wczoraj'}]
+    hot, cold = split_hot(offers, now)
+    assert [o['id'][:7] for o in hot] == ['pokoj-0', 'pokoj-1', 'zepsuty'], hot
+    assert len(cold) == 3
+
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = ColdArchive(Path(tmp) / ARCHIVE_DIR_NAME)
+        archive.archive(cold)
+        archive.flush()
+        assert len(list(archive.archive_dir.glob('offers-*.json'))) == 3
+
+        # Nowy proces z ciepłym cache sygnatur: indeks relistów bez wczytywania miesięcy
+        cache = SignatureCache()
+        for o in cold:
+            cache.signature(o['description'])
+        archive = ColdArchive(Path(tmp) / ARCHIVE_DIR_NAME)
+        assert len(archive) == 3 and archive.stats['months_loaded'] == 0
+        assert {s['id'] for s, _ in archive.relist_entries(cache)} == {o['id'] for o in cold}
+        assert archive.stats['months_loaded'] == 0 and cache.stats['computed'] == 3
+
+        # Oferta wróciła pod nowym slugiem → po krótkim ID, wczytany jeden miesiąc
+        assert archive.contains('pokoj-3-nowy-tytul-CID3-ID1abc03') and archive.stats['months_loaded'] == 0
+        record = archive.take('pokoj-3-nowy-tytul-CID3-ID1abc03')
+        assert record['id'] == 'pokoj-3-CID3-ID1abc03' and archive.stats['months_loaded'] == 1
+        assert archive.take('pokoj-9-CID3-ID1abc09') is None
+
+        # Zapis przed bazą zostawia wyciągnięty rekord w pliku, po bazie — usuwa
+        archive.flush(keep_taken=True)
+        assert len(ColdArchive(archive.archive_dir)) == 3
+        archive.flush()
+        reopened = ColdArchive(archive.archive_dir)
+        assert len(reopened) == 2 and len(reopened.load_all()) == 2
+
+        # Kopia w obu miejscach (crash) → gorący zbiór wygrywa
+        assert reopened.discard([cold[0]]) == 1 and len(reopened) == 1
+
+        # Rekord ze starym polem 'minhash' → do archiwum bez niego, w indeksie klucz opisu
+        bare = dict(offer(5, False, 100), minhash='v1:AAAA')
+        reopened.archive([bare])
+        assert 'minhash' not in bare and reopened._stubs[-1]['text_key']
+        reopened.flush()
+
+        # Archiwum sprzed SignatureCache: sygnatury w indeksie i w rekordach, zimny
+        # cache → opisy z plików miesięcy, indeks i miesiące zapisane bez 'minhash'
+        with open(reopened.index_file, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        for stub in index['offers']:
+            del stub['text_key']
+            stub['minhash'] = 'v1:AAAA'
+        write_json_atomic(reopened.index_file, index, indent=None)
+        for path in reopened.archive_dir.glob('offers-*.json'):
+            with open(path, 'r', encoding='utf-8') as f:
+                shard = json.load(f)
+            for o in shard['offers']:
+                o['minhash'] = 'v1:AAAA'
+            write_json_atomic(path, shard)
+        legacy = ColdArchive(reopened.archive_dir)
+        entries = legacy.relist_entries(SignatureCache())
+        assert {s['id'] for s, _ in entries} == {s['id'] for s in index['offers']}
+        legacy.flush()
+        migrated = ColdArchive(legacy.archive_dir)
+        assert all(s['text_key'] and 'minhash' not in s for s in migrated._stubs)
+        assert not any('minhash' in o for o in migrated.load_all())
+        print(f"✅ {reopened.summary()}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main()
+    else:
+        _self_test()
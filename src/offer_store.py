@@ -0,0 +1,308 @@
+"""
+Offer Store - indeksowany widok na database['offers'] (offers.json).
+
+Krok 3 run_scan szukał istniejącej oferty liniowo po całej bazie dla KAŻDEJ
+przetworzonej oferty (_find_existing_offer), a przy chybieniu robił drugi
+pełny przebieg z endswith + sort (_find_existing_offer_by_short_id). Historia
+jest zbierana bezterminowo (15k+ rekordów), więc krok 3 był kwadratowy.
+
+OfferStore trzyma indeksy:
+  - id (pełny slug oferty)            → rekordy (historyczne duplikaty id!)
+  - krótki ID OLX (końcówka -IDxxxx)  → rekordy (historyczne duplikaty!)
+  - czysty URL (bez query)            → rekord
+  - aktywne REKORDY (nie id — duplikat id może mieć inną flagę active)
+
+Indeksy są utrzymywane przy add() (nowa oferta), rename() (OLX zmienił slug
+po edycji tytułu) i set_active() (dezaktywacja / reaktywacja). Rekordy to
+te same dicty co w database['offers'] — store niczego nie kopiuje, a zapis
+bazy dalej idzie przez _save_database.
+
+Gdy ktoś podmieni lub dopisze listę z pominięciem store'a (np. quick_scan
+nadpisuje database['offers']), indeks przebudowuje się przy następnym użyciu.
+
+Rekordy zmienione w scanie są znaczone jako brudne: add/rename/set_active/
+find() robią to same, inne ścieżki zmian wołają mark_dirty(). Backend SQLite
+zapisuje wtedy tylko brudne rekordy, bez serializowania całej historii dla
+digestu. Gdy lista ofert została podmieniona poza store'em (quick_scan),
+dirty_records() zwraca None — zapis wraca do porównania wszystkich rekordów.
+
+Z archiwum (offer_shards.ColdArchive) database['offers'] to tylko gorący
+zbiór — find() po chybieniu pyta archiwum i wyciągnięty rekord dopisuje
+z powrotem (promocja przy powrocie oferty na OLX). find() jest więc zapisem
+(promocja + rekord brudny) i woła go tylko krok 3; odczyty w trakcie scanu
+(fast path, detekcja relistów) idą przez lookup() / exists().
+"""
+
+from typing import Dict, Iterator, List, Optional
+
+
+def offer_short_id(offer_id: str) -> Optional[str]:
+    """Końcówka ID OLX z id oferty ("pokoj-...-CID3-ID1bT7ya" → "1bT7ya")."""
+    if not offer_id or '-ID' not in offer_id:
+        return None
+    short_id = offer_id.split('-ID')[-1]
+    return short_id if len(short_id) >= 3 else None
+
+
+def offer_keys(offers: List[Dict]) -> List[str]:
+    """Stabilny klucz rekordu = id oferty; historyczne duplikaty id dostają #2, #3…
+    (wiersze offers_sqlite, operacje journala offers_journal)."""
+    seen: Dict[str, int] = {}
+    keys = []
+    for offer in offers:
+        offer_id = offer.get('id', '')
+        n = seen.get(offer_id, 0) + 1
+        seen[offer_id] = n
+        keys.append(offer_id if n == 1 else f'{offer_id}#{n}')
+    return keys
+
+
+class OfferStore:
+    def __init__(self, database: Dict, archive=None):
+        self.database = database
+        self.archive = archive
+        self._indexed_list = None
+        self._indexed_len = 0
+        self._by_id: Dict[str, List[Dict]] = {}
+        self._by_short: Dict[str, List[Dict]] = {}
+        self._by_url: Dict[str, Dict] = {}
+        self._active: Dict[int, Dict] = {}  # id(rekord) → rekord
+        self._dirty: Dict[int, Dict] = {}   # id(rekord) → rekord zmieniony od zapisu
+        self._tracked_list = self.offers
+
+    # ------------------------------------------------------------------
+    # INDEKSY
+    # ------------------------------------------------------------------
+
+    @property
+    def offers(self) -> List[Dict]:
+        return self.database.setdefault('offers', [])
+
+    @staticmethod
+    def _clean_url(url: str) -> str:
+        return (url or '').split('?')[0]
+
+    def _index_one(self, offer: Dict):
+        offer_id = offer.get('id', '')
+        self._by_id.setdefault(offer_id, []).append(offer)
+        short_id = offer_short_id(offer_id)
+        if short_id:
+            self._by_short.setdefault(short_id, []).append(offer)
+        if offer.get('url'):
+            self._by_url.setdefault(self._clean_url(offer['url']), offer)
+        if offer.get('active', False):
+            self._active[id(offer)] = offer
+
+    def _ensure_index(self):
+        offers = self.offers
+        if offers is self._indexed_list and len(offers) == self._indexed_len:
+            return
+        self._by_id, self._by_short, self._by_url = {}, {}, {}
+        self._active = {}
+        for offer in offers:
+            self._index_one(offer)
+        self._indexed_list = offers
+        self._indexed_len = len(offers)
+
+    def reindex(self):
+        """Wymusza przebudowę indeksów (po masowych zmianach poza store'em)."""
+        self._indexed_list = None
+        self._ensure_index()
+
+    # ------------------------------------------------------------------
+    # ODCZYT
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.offers)
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(self.offers)
+
+    def get(self, offer_id: str) -> Optional[Dict]:
+        """Pierwszy rekord o tym id (kolejność bazy)."""
+        self._ensure_index()
+        records = self._by_id.get(offer_id)
+        return records[0] if records else None
+
+    def get_all(self, offer_id: str) -> List[Dict]:
+        """Wszystkie rekordy o tym id (historyczne duplikaty id)."""
+        self._ensure_index()
+        return list(self._by_id.get(offer_id, ()))
+
+    def get_by_url(self, url: str) -> Optional[Dict]:
+        self._ensure_index()
+        return self._by_url.get(self._clean_url(url))
+
+    def get_by_short_id(self, short_id: str) -> Optional[Dict]:
+        """Rekord po końcówce ID OLX. Gdy w bazie jest kilka rekordów z tą samą
+        końcówką (historyczne duplikaty), zwraca najlepszego kandydata:
+        aktywny > najświeższy last_seen."""
+        if not short_id or len(short_id) < 3:
+            return None
+        self._ensure_index()
+        candidates = self._by_short.get(short_id)
+        if not candidates:
+            return None
+        return max(candidates, key=lambda o: (o.get('active', False), o.get('last_seen', '')))
+
+    def lookup(self, offer_id: str):
+        """Jak find(), ale bez skutków ubocznych: tylko gorący zbiór, bez
+        promocji z archiwum i bez znaczenia rekordu jako brudnego.
+        Zwraca (rekord | None, matched_by_short)."""
+        existing = self.get(offer_id)
+        if existing is not None:
+            return existing, False
+        existing = self.get_by_short_id(offer_short_id(offer_id))
+        return existing, existing is not None
+
+    def exists(self, offer_id: str) -> bool:
+        """Czy oferta jest w bazie — w gorącym zbiorze albo w archiwum (bez promocji)."""
+        if self.lookup(offer_id)[0] is not None:
+            return True
+        return self.archive is not None and self.archive.contains(offer_id)
+
+    def find(self, offer_id: str):
+        """Dopasowanie przetworzonej oferty do bazy (krok 3): pełne id, potem
+        krótki ID, potem archiwum — rekord z archiwum wraca do gorącego zbioru.
+        Zwraca (rekord | None, matched_by_short)."""
+        existing = self.get(offer_id)
+        if existing is not None:
+            self.mark_dirty(existing)
+            return existing, False
+        existing = self.get_by_short_id(offer_short_id(offer_id))
+        if existing is None and self.archive is not None:
+            existing = self.archive.take(offer_id)
+            if existing is not None:
+                self.add(existing)
+                return existing, existing.get('id') != offer_id
+        if existing is not None:
+            self.mark_dirty(existing)
+        return existing, existing is not None
+
+    def is_active(self, offer_id: str) -> bool:
+        """Czy którykolwiek rekord o tym id jest aktywny."""
+        self._ensure_index()
+        return any(id(o) in self._active for o in self._by_id.get(offer_id, ()))
+
+    def count_active(self) -> int:
+        """Liczba aktywnych rekordów (duplikaty id liczone osobno)."""
+        self._ensure_index()
+        return len(self._active)
+
+    def active_ids(self) -> set:
+        self._ensure_index()
+        return {o.get('id', '') for o in self._active.values()}
+
+    def active_offers(self) -> List[Dict]:
+        self._ensure_index()
+        return list(self._active.values())
+
+    def inactive_offers(self) -> List[Dict]:
+        self._ensure_index()
+        return [o for o in self.offers if id(o) not in self._active]
+
+    # ------------------------------------------------------------------
+    # ZAPIS (utrzymuje indeksy)
+    # ------------------------------------------------------------------
+
+    def mark_dirty(self, offer: Dict):
+        """Rekord zmieniony poza metodami store'a (last_seen, days_active, minhash...)."""
+        self._dirty[id(offer)] = offer
+
+    def dirty_records(self) -> Optional[List[Dict]]:
+        """Rekordy zmienione od ostatniego clear_dirty(); None = lista ofert
+        podmieniona poza store'em, zmian nie da się wskazać."""
+        if self.offers is not self._tracked_list:
+            return None
+        return list(self._dirty.values())
+
+    def clear_dirty(self):
+        """Po zapisie bazy: bieżący stan to nowy punkt odniesienia."""
+        self._dirty = {}
+        self._tracked_list = self.offers
+
+    def add(self, offer: Dict):
+        self._ensure_index()
+        self.offers.append(offer)
+        self._index_one(offer)
+        self._indexed_len = len(self.offers)
+        self.mark_dirty(offer)
+
+    def rename(self, offer: Dict, new_id: str, new_url: str):
+        """OLX zmienił slug (edycja tytułu) — ten sam rekord, nowe id/url."""
+        self._ensure_index()
+        old_id = offer.get('id', '')
+        if offer in self._by_id.get(old_id, []):
+            self._by_id[old_id] = [o for o in self._by_id[old_id] if o is not offer]
+            if not self._by_id[old_id]:
+                del self._by_id[old_id]
+        if offer.get('url') and self._by_url.get(self._clean_url(offer['url'])) is offer:
+            del self._by_url[self._clean_url(offer['url'])]
+        old_short = offer_short_id(old_id)
+        if old_short and offer in self._by_short.get(old_short, []):
+            self._by_short[old_short] = [o for o in self._by_short[old_short] if o is not offer]
+        offer['id'] = new_id
+        offer['url'] = new_url
+        self.mark_dirty(offer)
+        self._by_id.setdefault(new_id, []).append(offer)
+        self._by_url.setdefault(self._clean_url(new_url), offer)
+        new_short = offer_short_id(new_id)
+        if new_short:
+            self._by_short.setdefault(new_short, []).append(offer)
+        if offer.get('active', False):
+            self._active[id(offer)] = offer
+
+    def set_active(self, offer: Dict, active: bool):
+        """Dezaktywacja / reaktywacja rekordu (flaga + zbiór aktywnych)."""
+        self._ensure_index()
+        offer['active'] = active
+        self.mark_dirty(offer)
+        if active:
+            self._active[id(offer)] = offer
+        else:
+            self._active.pop(id(offer), None)
+
+    def sync_active(self, offer: Dict):
+        """Dociąga zbiór aktywnych do flagi rekordu zmienionej bezpośrednio
+        (np. reaktywacja wewnątrz _update_existing_offer)."""
+        self.set_active(offer, bool(offer.get('active', False)))
+
+
+if __name__ == "__main__":
+    print("🧪 Test OfferStore\n")
+    db = {'offers': [
+        {'id': 'pokoj-a-CID3-IDabc1', 'url': 'https://www.olx.pl/d/oferta/pokoj-a-CID3-IDabc1.html',
+         'active': False, 'last_seen': '2026-01-01'},
+        {'id': 'pokoj-b-CID3-IDabc1', 'url': 'https://www.olx.pl/d/oferta/pokoj-b-CID3-IDabc1.html',
+         'active': True, 'last_seen': '2025-12-01'},
+    ]}
+    store = OfferStore(db)
+    assert store.lookup('pokoj-nowy-slug-CID3-IDabc1')[0] is db['offers'][1] and not store._dirty
+    existing, by_short = store.find('pokoj-nowy-slug-CID3-IDabc1')
+    assert by_short and existing['id'] == 'pokoj-b-CID3-IDabc1'
+    store.rename(existing, 'pokoj-nowy-slug-CID3-IDabc1',
+                 'https://www.olx.pl/d/oferta/pokoj-nowy-slug-CID3-IDabc1.html')
+    assert store.get('pokoj-nowy-slug-CID3-IDabc1') is existing
+    assert store.is_active('pokoj-nowy-slug-CID3-IDabc1')
+    store.set_active(existing, False)
+    assert store.count_active() == 0 and len(store.inactive_offers()) == 2
+    db['offers'].append({'id': 'x-CID3-IDzzz9', 'active': True})
+    assert store.count_active() == 1  # dopisane z pominięciem store'a → reindeks
+
+    # Duplikat id: oba rekordy widoczne, aktywne liczone per rekord
+    store.add({'id': 'x-CID3-IDzzz9', 'active': True})
+    assert len(store.get_all('x-CID3-IDzzz9')) == 2 and store.count_active() == 2
+    store.set_active(store.get_all('x-CID3-IDzzz9')[0], False)
+    assert store.is_active('x-CID3-IDzzz9') and store.count_active() == 1
+
+    # Brudne rekordy: zmienione przez store + mark_dirty; podmiana listy = nieznane
+    store.clear_dirty()
+    store.set_active(db['offers'][0], True)
+    store.mark_dirty(db['offers'][1])
+    assert store.dirty_records() == [db['offers'][0], db['offers'][1]]
+    db['offers'] = list(db['offers'])
+    assert store.dirty_records() is None
+    store.clear_dirty()
+    assert store.dirty_records() == []
+    print("✅ OfferStore OK")
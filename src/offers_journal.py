@@ -0,0 +1,511 @@
+"""
+Offers Journal - opcjonalny backend bazy ofert: snapshot offers.json + journal
+zmian dopisywany przy każdym scanie (alternatywa dla offers_sqlite bez silnika
+bazy).
+
+_save_database przepisywał cały offers.json (kilka MB, historia zbierana
+bezterminowo) 3x dziennie, choć scan zmienia last_seen aktywnych ofert i
+kilkadziesiąt rekordów. Backend journala dopisuje do offers.json.journal
+(NDJSON, klucz = id oferty jak w offers_sqlite, duplikaty id → id#2):
+
+  {"op": "base", "snapshot": <digest offers.json>}     pierwsza linia
+  {"op": "delete", "id": ...}                          _cleanup_old_offers
+  {"op": "insert", "id": ..., "pos": N, "record": {...}}
+  {"op": "update" | "deactivate" | "reactivate", "id": ...,
+   "set": {pole: wartość}, "unset": [pola]}            zmienione pola rekordu
+                                                       ("record" gdy zmieniła
+                                                       się kolejność pól)
+  {"op": "scan", "at": ..., "counts": {...}, "offers": N, "active": N,
+   "meta": {last_scan, next_scan, ...}}                zamyka paczkę scanu
+
+Paczka bez zamykającego "scan" (crash w trakcie dopisywania) jest przy
+odtwarzaniu pomijana w całości, a load() obcina journal do ostatniego
+znacznika — następny scan nie dopisze się za uciętą linią. Journal
+z "base" niepasującym do snapshotu (offers.json przepisany poza backendem,
+crash między kompakcją a rotacją journala) jest ignorowany — snapshot jest wtedy nowszy.
+
+Kompakcja (pełny zapis offers.json + rotacja journala do .journal.prev) co
+COMPACT_EVERY_SCANS scanów albo gdy journal przekroczy COMPACT_RATIO
+rozmiaru snapshotu, a także przy zmianie kolejności ofert (journal zna tylko
+wstawienia i usunięcia). Operacje deactivate/reactivate ze znacznikami scanów
+to ślad audytowy masowych dezaktywacji (patrz guard w run_scan):
+    python offers_journal.py audit data/offers.json
+
+Włączenie: env SONAR_OFFERS_BACKEND=journal. offers.json jest wtedy
+snapshotem sprzed kilku scanów — generatory i skrypty czytają bazę przez
+read_offers() (snapshot + journal; przy backendzie SQLite prosto z offers.sqlite,
+bo offers.json jest tam eksportem na żądanie).
+
+CLI:
+    python offers_journal.py audit data/offers.json
+    python offers_journal.py compact data/offers.json
+"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from offer_shards import ColdArchive, archive_dir_for
+from offer_store import offer_keys
+from offers_sqlite import SQLiteOfferStorage, sqlite_backend_enabled, sqlite_path_for
+from shared_utils import TZ, write_json_atomic
+
+# Kompakcja: co tyle scanów (3 dziennie → raz na tydzień) albo gdy journal
+# urośnie powyżej tej części snapshotu
+COMPACT_EVERY_SCANS = 21
+COMPACT_RATIO = 0.5
+
+_CHANGE_OPS = ('update', 'deactivate', 'reactivate')
+
+
+def journal_backend_enabled(data_file) -> bool:
+    """Czy baza ofert ma działać na snapshocie + journalu zmian."""
+    return os.environ.get('SONAR_OFFERS_BACKEND', 'json').lower() == 'journal'
+
+
+def journal_path_for(json_path) -> Path:
+    """offers.json → offers.json.journal (jak geocoding_cache.json.journal)."""
+    json_path = Path(str(json_path))
+    return json_path.with_name(json_path.name + '.journal')
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _empty_database() -> Dict:
+    return {"last_scan": None, "next_scan": None, "offers": []}
+
+
+def _read_snapshot(json_path: Path) -> Tuple[Dict, Optional[str], int]:
+    """(baza, digest pliku, rozmiar) — pusta baza i digest None bez snapshotu."""
+    try:
+        data = json_path.read_bytes()
+    except FileNotFoundError:
+        return _empty_database(), None, 0
+    try:
+        return json.loads(data), _digest(data), len(data)
+    except ValueError:
+        print(f"⚠️ Uszkodzony plik bazy danych {json_path.name}, tworzę nowy")
+        return _empty_database(), None, 0
+
+
+def _apply_batch(database: Dict, ops: List[Dict], marker: Dict):
+    """Nakłada paczkę jednego scanu: usunięcia → wstawienia → zmiany → meta."""
+    offers = database.setdefault('offers', [])
+    deleted = {op['id'] for op in ops if op['op'] == 'delete'}
+    if deleted:
+        offers[:] = [o for o, key in zip(offers, offer_keys(offers)) if key not in deleted]
+    for op in ops:
+        if op['op'] == 'insert':
+            offers.insert(op['pos'], op['record'])
+    changes = [op for op in ops if op['op'] in _CHANGE_OPS]
+    if changes:
+        by_key = dict(zip(offer_keys(offers), offers))
+        for op in changes:
+            record = by_key[op['id']]
+            if 'record' in op:
+                record.clear()
+                record.update(op['record'])
+                continue
+            for field in op.get('unset', ()):
+                record.pop(field, None)
+            record.update(op['set'])
+    for key in marker.get('unset', ()):
+        database.pop(key, None)
+    database.update(marker.get('meta', {}))
+
+
+def replay_journal(database: Dict, journal_path: Path, snapshot_digest: Optional[str]) -> Dict:
+    """
+    Odtwarza journal na snapshocie (w miejscu). Zwraca informację:
+    scans (odtworzone paczki), ops, torn (operacje bez znacznika scanu),
+    valid (False = journal nie pasuje do snapshotu i został pominięty),
+    committed_bytes (koniec ostatniej pełnej paczki).
+    """
+    info = {'scans': 0, 'ops': 0, 'torn': 0, 'valid': True, 'bytes': 0, 'committed_bytes': 0}
+    try:
+        f = open(journal_path, 'rb')
+    except FileNotFoundError:
+        return info
+    with f:
+        info['bytes'] = os.fstat(f.fileno()).st_size
+        batch: List[Dict] = []
+        offset = 0
+        for n, line in enumerate(f):
+            offset += len(line)
+            try:
+                entry = json.loads(line) if line.endswith(b'\n') else None
+            except ValueError:
+                entry = None
+            if entry is None:
+                # Ucięta linia (crash w trakcie dopisywania) — cała paczka do kosza
+                info['torn'] += len(batch) + 1
+                batch = []
+                continue
+            if n == 0:
+                if entry.get('op') != 'base' or entry.get('snapshot') != snapshot_digest:
+                    info['valid'] = False
+                    return info
+                info['committed_bytes'] = offset
+                continue
+            if entry['op'] == 'scan':
+                _apply_batch(database, batch, entry)
+                info['scans'] += 1
+                info['ops'] += len(batch)
+                info['committed_bytes'] = offset
+                batch = []
+            else:
+                batch.append(entry)
+        info['torn'] += len(batch)
+    return info
+
+
+def read_offers(json_path) -> Dict:
+    """offers.json + journal + archiwum offer_shards (tylko odczyt) — pełna
+    baza dla generatorów i skryptów. Backend SQLite: gorący zbiór z offers.sqlite
+    (offers.json nie jest odświeżany przy każdym zapisie)."""
+    json_path = Path(str(json_path))
+    sqlite_path = sqlite_path_for(json_path)
+    if sqlite_backend_enabled(json_path) and sqlite_path.exists():
+        storage = SQLiteOfferStorage(sqlite_path)
+        try:
+            database = storage.load()
+        finally:
+            storage.close()
+    else:
+        database, digest, _ = _read_snapshot(json_path)
+        info = replay_journal(database, journal_path_for(json_path), digest)
+        if not info['valid']:
+            print(f"⚠️ Journal {journal_path_for(json_path).name} nie pasuje do snapshotu — pomijam")
+    archive_dir = archive_dir_for(json_path)
+    if (archive_dir / 'index.json').exists():
+        database.setdefault('offers', []).extend(ColdArchive(archive_dir).load_all())
+    return database
+
+
+class JournalOfferStorage:
+    """Baza ofert jako snapshot + journal: load() odtwarza, save() dopisuje różnicę."""
+
+    def __init__(self, json_path, compact_every: int = COMPACT_EVERY_SCANS,
+                 compact_ratio: float = COMPACT_RATIO):
+        self.json_path = Path(str(json_path))
+        self.journal_path = journal_path_for(self.json_path)
+        self.db_path = self.journal_path
+        self.compact_every = compact_every
+        self.compact_ratio = compact_ratio
+        self._snapshot_digest: Optional[str] = None
+        self._snapshot_bytes = 0
+        self._journal_valid = True
+        self._scans = 0
+        # Stan po ostatnim load/save: kolejność kluczy i pola rekordów
+        # (zserializowane) — z nich liczona jest różnica przy save()
+        self._order: List[str] = []
+        self._fields: Dict[str, Dict[str, str]] = {}
+        self._meta: Dict[str, str] = {}
+        self.last_load: Dict = {}
+        self.last_save: Dict = {}
+
+    # ------------------------------------------------------------------
+    # ODCZYT
+    # ------------------------------------------------------------------
+
+    def load(self) -> Dict:
+        """Snapshot + odtworzony journal, w formacie offers.json."""
+        database, self._snapshot_digest, self._snapshot_bytes = _read_snapshot(self.json_path)
+        info = replay_journal(database, self.journal_path, self._snapshot_digest)
+        self._journal_valid = info['valid']
+        self._scans = info['scans']
+        if not info['valid']:
+            print(f"⚠️ Journal ofert: {self.journal_path.name} nie pasuje do {self.json_path.name} "
+                  f"(plik zmieniony poza journalem) — pomijam, zostanie zarchiwizowany")
+        elif info['scans']:
+            print(f"♻️  Journal ofert: odtworzono {info['scans']} scanów ({info['ops']} operacji)")
+        if info['valid'] and info['committed_bytes'] < info['bytes']:
+            # Ogon po crashu — obcięty, żeby następna paczka nie dokleiła się
+            # do uciętej linii ani nie zamknęła cudzych operacji swoim znacznikiem
+            with open(self.journal_path, 'r+b') as f:
+                f.truncate(info['committed_bytes'])
+            print(f"⚠️ Journal ofert: pominięto {info['torn']} operacji niedokończonego zapisu "
+                  f"(obcięto {info['bytes'] - info['committed_bytes']} B)")
+        self.last_load = info
+        self._remember(database)
+        return database
+
+    def _remember(self, database: Dict, fields: Optional[Dict[str, Dict[str, str]]] = None):
+        offers = database.get('offers', [])
+        self._order = offer_keys(offers)
+        self._fields = fields if fields is not None else {
+            key: {field: _dumps(value) for field, value in offer.items()}
+            for key, offer in zip(self._order, offers)}
+        self._meta = {key: _dumps(value) for key, value in database.items() if key != 'offers'}
+
+    # ------------------------------------------------------------------
+    # ZAPIS
+    # ------------------------------------------------------------------
+
+    def save(self, database: Dict) -> Dict:
+        """
+        Dopisuje do journala różnicę względem stanu z load()/poprzedniego
+        save() albo kompaktuje (pełny offers.json). Zwraca statystyki zapisu.
+        """
+        started = time.perf_counter()
+        offers = database.get('offers', [])
+        keys = offer_keys(offers)
+        new_keys = set(keys)
+        counts = {'insert': 0, 'update': 0, 'deactivate': 0, 'reactivate': 0, 'delete': 0}
+
+        deletes = [{'op': 'delete', 'id': key} for key in self._order if key not in new_keys]
+        inserts, changes = [], []
+        fields_now: Dict[str, Dict[str, str]] = {}
+        for pos, (key, offer) in enumerate(zip(keys, offers)):
+            fields = {field: _dumps(value) for field, value in offer.items()}
+            fields_now[key] = fields
+            previous = self._fields.get(key)
+            if previous is None:
+                inserts.append({'op': 'insert', 'id': key, 'pos': pos, 'record': offer})
+                continue
+            if previous == fields and list(previous) == list(fields):
+                continue
+            was_active = previous.get('active') == 'true'
+            is_active = bool(offer.get('active', False))
+            kind = 'update' if was_active == is_active else 'reactivate' if is_active else 'deactivate'
+            op = {'op': kind, 'id': key}
+            unset = [field for field in previous if field not in fields]
+            expected_order = [f for f in previous if f in fields] + [f for f in fields if f not in previous]
+            if expected_order != list(fields):
+                op['record'] = offer
+            else:
+                op['set'] = {field: offer[field] for field, dumped in fields.items()
+                             if previous.get(field) != dumped}
+                if unset:
+                    op['unset'] = unset
+            changes.append(op)
+        for op in deletes + inserts + changes:
+            counts[op['op']] += 1
+
+        meta = {key: _dumps(value) for key, value in database.items() if key != 'offers'}
+        marker = {
+            'op': 'scan',
+            'at': datetime.now(TZ).isoformat(timespec='seconds'),
+            'counts': counts,
+            'offers': len(offers),
+            'active': sum(1 for o in offers if o.get('active')),
+            'meta': {key: database[key] for key, dumped in meta.items() if self._meta.get(key) != dumped},
+        }
+        unset_meta = [key for key in self._meta if key not in meta]
+        if unset_meta:
+            marker['unset'] = unset_meta
+
+        # Journal zna tylko wstawienia i usunięcia — względna kolejność
+        # pozostałych ofert musi się zgadzać, inaczej pełny snapshot
+        kept_old = [key for key in self._order if key in new_keys]
+        kept_new = [key for key in keys if key in self._fields]
+        meta_order = [k for k in self._meta if k in meta] + [k for k in meta if k not in self._meta]
+        reason = None
+        if self._snapshot_digest is None:
+            reason = 'brak snapshotu'
+        elif kept_old != kept_new or meta_order != list(meta):
+            reason = 'zmiana kolejności'
+        elif self._scans + 1 >= self.compact_every:
+            reason = f'{self._scans + 1} scanów'
+
+        stats = {**counts, 'appended_bytes': 0, 'compacted': None}
+        if reason is None:
+            lines = [_dumps(op) for op in deletes + inserts + changes] + [_dumps(marker)]
+            payload = ('\n'.join(lines) + '\n').encode('utf-8')
+            journal_bytes = self.journal_path.stat().st_size if self._journal_valid and \
+                self.journal_path.exists() else 0
+            if journal_bytes + len(payload) > self.compact_ratio * self._snapshot_bytes:
+                reason = 'rozmiar journala'
+            else:
+                self._append(payload)
+                stats['appended_bytes'] = len(payload)
+                self._scans += 1
+        if reason is not None:
+            self.compact(database)
+            stats['compacted'] = reason
+
+        self._remember(database, fields_now)
+        stats['journal_scans'] = self._scans
+        stats['seconds'] = round(time.perf_counter() - started, 3)
+        self.last_save = stats
+        return stats
+
+    def _append(self, payload: bytes):
+        if not self._journal_valid:
+            self._rotate_journal()
+        new_journal = not self.journal_path.exists()
+        with open(self.journal_path, 'ab') as f:
+            start = f.tell()
+            try:
+                if new_journal:
+                    f.write((_dumps({'op': 'base', 'snapshot': self._snapshot_digest}) + '\n').encode('utf-8'))
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            except OSError:
+                # Np. brak miejsca — nie zostawiaj połowy paczki przed następnym zapisem
+                f.truncate(start)
+                raise
+
+    def _rotate_journal(self):
+        """Journal → .journal.prev (ślad audytowy poprzedniego okresu)."""
+        try:
+            os.replace(self.journal_path, self.journal_path.with_name(self.journal_path.name + '.prev'))
+        except FileNotFoundError:
+            pass
+        self._journal_valid = True
+
+    def compact(self, database: Dict):
+        """Pełny snapshot offers.json (atomowo) i rotacja journala."""
+        write_json_atomic(self.json_path, database)
+        data = self.json_path.read_bytes()
+        self._snapshot_digest, self._snapshot_bytes = _digest(data), len(data)
+        self._rotate_journal()
+        self._scans = 0
+
+    def close(self):
+        pass
+
+
+def open_journal(data_file) -> Optional[JournalOfferStorage]:
+    """Backend journala dla ścieżki bazy ofert albo None (zwykły offers.json)."""
+    if not journal_backend_enabled(data_file):
+        return None
+    return JournalOfferStorage(data_file)
+
+
+def audit(json_path) -> List[Dict]:
+    """Znaczniki scanów z journala (.prev + bieżący) z id zdezaktywowanych ofert."""
+    journal = journal_path_for(json_path)
+    scans = []
+    for path in (journal.with_name(journal.name + '.prev'), journal):
+        if not path.exists():
+            continue
+        deactivated: List[str] = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if entry['op'] == 'deactivate':
+                    deactivated.append(entry['id'])
+                elif entry['op'] == 'scan':
+                    scans.append({'at': entry['at'], 'counts': entry['counts'], 'offers': entry['offers'],
+                                  'active': entry['active'], 'deactivated': deactivated})
+                    deactivated = []
+    return scans
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Journal zmian bazy ofert')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p_audit = sub.add_parser('audit', help='Historia scanów z journala (dezaktywacje)')
+    p_audit.add_argument('json_path')
+    p_compact = sub.add_parser('compact', help='Snapshot + journal → pełny offers.json')
+    p_compact.add_argument('json_path')
+    args = parser.parse_args()
+
+    if args.cmd == 'audit':
+        for scan in audit(args.json_path):
+            c = scan['counts']
+            print(f"{scan['at']}  aktywne {scan['active']:>5}/{scan['offers']:<6} "
+                  f"+{c['insert']} ~{c['update']} ↓{c['deactivate']} ↑{c['reactivate']} ✗{c['delete']}")
+            if len(scan['deactivated']) >= 50:
+                print(f"    ⚠️ masowa dezaktywacja: {', '.join(scan['deactivated'][:5])}, …")
+    else:
+        store = JournalOfferStorage(args.json_path)
+        database = store.load()
+        store.compact(database)
+        print(f"🗜️  Skompaktowano {len(database.get('offers', []))} ofert do {args.json_path}")
+
+
+def _self_test():
+    import copy
+    import tempfile
+
+    print("🧪 Test offers journal\n")
+    database = {
+        'last_scan': '2026-10-17T09:00:00+02:00',
+        'next_scan': '2026-10-17T15:00:00+02:00',
+        'offers': [
+            {'id': f'pokoj-{i}-CID3-ID1abc{i:02d}', 'active': i % 4 != 0, 'last_seen': '2026-10-17T09:00:00+02:00',
+             'price': {'current': 800 + i, 'history': [800 + i]}, 'description': 'Pokój ' * 40}
+            for i in range(30)
+        ] + [{'id': 'stary-CID3-ID1old00', 'active': False}, {'id': 'stary-CID3-ID1old00', 'active': False}],
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'offers.json'
+        store = JournalOfferStorage(path, compact_every=3)
+        assert store.load() == _empty_database()
+        assert store.save(database)['compacted'] == 'brak snapshotu'
+
+        store = JournalOfferStorage(path, compact_every=3)
+        current = store.load()
+        assert current == database
+
+        # Scan: last_seen aktywnych, dezaktywacja, reaktywacja, nowa oferta, usunięty duplikat
+        current['last_scan'] = '2026-10-17T15:00:00+02:00'
+        for offer in current['offers']:
+            if offer['active']:
+                offer['last_seen'] = '2026-10-17T15:00:00+02:00'
+        current['offers'][1]['active'] = False
+        current['offers'][4]['active'] = True
+        current['offers'][5]['price'] = {'current': 900, 'history': [805, 900]}
+        del current['offers'][5]['description']
+        del current['offers'][30]
+        current['offers'].insert(10, {'id': 'nowy-CID3-ID1new00', 'active': True})
+        stats = store.save(current)
+        assert stats['compacted'] is None and (stats['deactivate'], stats['reactivate'], stats['insert'],
+                                               stats['delete']) == (1, 1, 1, 1), stats
+        assert json.loads(path.read_text(encoding='utf-8')) == database, "snapshot nie był przepisany"
+        assert read_offers(path) == current
+        assert _dumps(JournalOfferStorage(path).load()) == _dumps(current), "kolejność pól po odtworzeniu"
+        assert store.save(copy.deepcopy(current))['appended_bytes'] > 0  # sam znacznik scanu
+
+        # Ucięta paczka (crash w trakcie dopisywania) — pominięta w całości
+        with open(store.journal_path, 'a', encoding='utf-8') as f:
+            f.write(_dumps({'op': 'delete', 'id': current['offers'][0]['id']}) + '\n{"op": "upd')
+        reloaded = JournalOfferStorage(path)
+        assert reloaded.load() == current and reloaded.last_load['torn'] == 2
+
+        # ...a następny scan po crashu zapisuje się czysto: delete z uciętej
+        # paczki nie wchodzi, zmiana z nowej paczki nie ginie
+        after_crash = copy.deepcopy(current)
+        after_crash['offers'][2]['price'] = {'current': 1234, 'history': [1234]}
+        reloaded.save(after_crash)
+        assert JournalOfferStorage(path).load() == after_crash
+        current = after_crash
+
+        # Trzeci scan od kompakcji → pełny snapshot, journal do .prev
+        assert store.save(current)['compacted'] == '3 scanów'
+        assert json.loads(path.read_text(encoding='utf-8')) == current
+        assert not store.journal_path.exists() and len(audit(path)) == 3
+
+        # offers.json przepisany poza journalem → journal pominięty
+        current['offers'][0]['active'] = False
+        store.save(current)
+        write_json_atomic(path, database)
+        assert read_offers(path) == database
+        print(f"✅ {store.last_save} | audit: {audit(path)[0]['counts']}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main()
+    else:
+        _self_test()
@@ -0,0 +1,545 @@
+"""
+Offers SQLite - opcjonalny backend bazy ofert (zamiast jednego offers.json).
+
+offers.json to jeden dokument {last_scan, next_scan, offers: [...]} wczytywany
+w całości przez _load_database i przepisywany w całości przez _save_database
+przy każdym scanie (tak samo cleanup_bogus_addresses i skrypty naprawcze).
+Historia jest zbierana bezterminowo, więc każdy zapis jest wolniejszy od
+poprzedniego, choć scan zmienia zwykle kilkadziesiąt rekordów z tysięcy.
+
+Backend SQLite:
+  - offers              — rekord oferty (JSON) + kolumny do zapytań (id, short_id,
+                          url, active, first_seen/last_seen, adres, koordynaty,
+                          cena, profil) i digest treści rekordu
+  - price_history       — price.history_full
+  - versions            — versions[] (kind='address') i title_versions[] (kind='title')
+  - events              — refresh_dates[] (kind='refresh') i reactivation_dates[]
+                          (kind='reactivation')
+  - address_corrections — address_corrections[] (korekty parsera)
+  - meta                — klucze najwyższego poziomu (last_scan, next_scan, ...)
+
+Listy z tabel podrzędnych zostają w JSON rekordu jako znacznik
+{"$table": ..., "kind": ...} na swoim miejscu, więc eksport odtwarza rekord
+1:1 (z kolejnością kluczy) — offers.json z eksportu jest identyczny z tym,
+który zapisałby backend JSON.
+
+save() w jednej transakcji zapisuje TYLKO zmienione / nowe rekordy (wraz
+z ich wierszami podrzędnymi), usuwa zniknięte, a przy przesunięciu na liście
+poprawia samą kolumnę ord. Zmienione = digest różny od zapisanego; z listą
+dirty (OfferStore.dirty_records) digest liczony jest tylko dla brudnych
+i nowych rekordów — reszta historii nie jest serializowana wcale.
+
+Włączenie: env SONAR_OFFERS_BACKEND=sqlite (obok offers.json powstaje
+offers.sqlite, przy pierwszym otwarciu zasilony z JSON) albo ścieżka bazy
+z rozszerzeniem .sqlite / .db. Generatory czytają bazę przez
+offers_journal.read_offers (prosto z SQLite), offers.json powstaje eksportem
+na żądanie (CLI export — krok workflow przed commitem danych, skrypty
+naprawcze). Gdy ktoś zmieni offers.json poza backendem (skrypt naprawczy),
+przy następnym otwarciu zmiany są wciągane do SQLite.
+
+CLI:
+    python offers_sqlite.py import data/offers.json data/offers.sqlite
+    python offers_sqlite.py export data/offers.sqlite data/offers.json
+    python offers_sqlite.py stats data/offers.sqlite
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from offer_store import offer_keys, offer_short_id
+from shared_utils import write_json_atomic
+
+SQLITE_SUFFIXES = ('.sqlite', '.db')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS offers (
+    key           TEXT PRIMARY KEY,
+    ord           INTEGER NOT NULL,
+    id            TEXT NOT NULL,
+    short_id      TEXT,
+    url           TEXT,
+    active        INTEGER NOT NULL DEFAULT 0,
+    first_seen    TEXT,
+    last_seen     TEXT,
+    address_full  TEXT,
+    lat           REAL,
+    lon           REAL,
+    price_current REAL,
+    profile_name  TEXT,
+    digest        TEXT NOT NULL,
+    record        TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_offers_ord ON offers(ord);
+CREATE INDEX IF NOT EXISTS idx_offers_short ON offers(short_id);
+CREATE INDEX IF NOT EXISTS idx_offers_active ON offers(id) WHERE active = 1;
+
+CREATE TABLE IF NOT EXISTS price_history (
+    offer_key    TEXT NOT NULL,
+    seq          INTEGER NOT NULL,
+    price        REAL,
+    date         TEXT,
+    approximated INTEGER,
+    item         TEXT NOT NULL,
+    PRIMARY KEY (offer_key, seq)
+);
+CREATE TABLE IF NOT EXISTS versions (
+    offer_key  TEXT NOT NULL,
+    kind       TEXT NOT NULL,
+    seq        INTEGER NOT NULL,
+    label      TEXT,
+    first_seen TEXT,
+    last_seen  TEXT,
+    item       TEXT NOT NULL,
+    PRIMARY KEY (offer_key, kind, seq)
+);
+CREATE TABLE IF NOT EXISTS events (
+    offer_key TEXT NOT NULL,
+    kind      TEXT NOT NULL,
+    seq       INTEGER NOT NULL,
+    date      TEXT,
+    item      TEXT NOT NULL,
+    PRIMARY KEY (offer_key, kind, seq)
+);
+CREATE TABLE IF NOT EXISTS address_corrections (
+    offer_key TEXT NOT NULL,
+    seq       INTEGER NOT NULL,
+    from_full TEXT,
+    to_full   TEXT,
+    at        TEXT,
+    item      TEXT NOT NULL,
+    PRIMARY KEY (offer_key, seq)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Listy rekordu trzymane w tabelach podrzędnych: (ścieżka, tabela, kind)
+_CHILD_LISTS = (
+    (('price', 'history_full'), 'price_history', None),
+    (('versions',), 'versions', 'address'),
+    (('title_versions',), 'versions', 'title'),
+    (('refresh_dates',), 'events', 'refresh'),
+    (('reactivation_dates',), 'events', 'reactivation'),
+    (('address_corrections',), 'address_corrections', None),
+)
+_CHILD_TABLES = ('price_history', 'versions', 'events', 'address_corrections')
+_TABLE_MARK = '$table'
+
+# Meta: kolejność kluczy najwyższego poziomu i stan ostatniego eksportu JSON
+_META_ORDER = '$order'
+_META_EXPORT = '$json_export'
+
+
+def sqlite_backend_enabled(data_file) -> bool:
+    """Czy baza ofert pod tą ścieżką obsługuje backend SQLite."""
+    if Path(str(data_file)).suffix in SQLITE_SUFFIXES:
+        return True
+    return os.environ.get('SONAR_OFFERS_BACKEND', 'json').lower() == 'sqlite'
+
+
+def sqlite_path_for(data_file) -> Path:
+    """offers.json → offers.sqlite (ścieżka .sqlite/.db bez zmian)."""
+    path = Path(str(data_file))
+    return path if path.suffix in SQLITE_SUFFIXES else path.with_suffix('.sqlite')
+
+
+def json_path_for(data_file) -> Path:
+    """offers.sqlite → offers.json (eksport dla strony i generatorów)."""
+    path = Path(str(data_file))
+    return path.with_suffix('.json') if path.suffix in SQLITE_SUFFIXES else path
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+def split_offer(offer: Dict) -> Tuple[Dict, Dict[Tuple[str, Optional[str]], list]]:
+    """Rekord → (rdzeń ze znacznikami w miejscu list, {(tabela, kind): lista})."""
+    core = dict(offer)
+    if isinstance(core.get('price'), dict):
+        core['price'] = dict(core['price'])  # history_full podmieniamy w kopii
+    children = {}
+    for path, table, kind in _CHILD_LISTS:
+        parent = core
+        for key in path[:-1]:
+            parent = parent.get(key)
+            if not isinstance(parent, dict):
+                break
+        else:
+            value = parent.get(path[-1])
+            if isinstance(value, list):
+                children[(table, kind)] = value
+                parent[path[-1]] = {_TABLE_MARK: table, 'kind': kind}
+    return core, children
+
+
+def join_offer(core: Dict, children: Dict[Tuple[str, Optional[str]], list]) -> Dict:
+    """Odwrotność split_offer (core jest modyfikowany w miejscu)."""
+    for path, table, kind in _CHILD_LISTS:
+        parent = core
+        for key in path[:-1]:
+            parent = parent.get(key)
+            if not isinstance(parent, dict):
+                break
+        else:
+            mark = parent.get(path[-1])
+            if isinstance(mark, dict) and mark.get(_TABLE_MARK) == table:
+                parent[path[-1]] = children.get((table, kind), [])
+    return core
+
+
+def _child_row(table: str, kind: Optional[str], key: str, seq: int, item) -> tuple:
+    """Wiersz tabeli podrzędnej: kolumny do zapytań + pełny element (JSON)."""
+    d = item if isinstance(item, dict) else {}
+    if table == 'price_history':
+        approximated = d.get('approximated')
+        return (key, seq, d.get('price'), d.get('date'),
+                None if approximated is None else int(bool(approximated)), _dumps(item))
+    if table == 'versions':
+        label = (d.get('address') or {}).get('full') if kind == 'address' else d.get('title')
+        return (key, kind, seq, label, d.get('first_seen'), d.get('last_seen'), _dumps(item))
+    if table == 'events':
+        return (key, kind, seq, item if isinstance(item, str) else None, _dumps(item))
+    return (key, seq, d.get('from'), d.get('to'), d.get('at'), _dumps(item))
+
+
+_CHILD_INSERT = {
+    'price_history': 'INSERT INTO price_history VALUES (?, ?, ?, ?, ?, ?)',
+    'versions': 'INSERT INTO versions VALUES (?, ?, ?, ?, ?, ?, ?)',
+    'events': 'INSERT INTO events VALUES (?, ?, ?, ?, ?)',
+    'address_corrections': 'INSERT INTO address_corrections VALUES (?, ?, ?, ?, ?, ?)',
+}
+
+
+def _file_state(path: Path) -> Optional[List[int]]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+class SQLiteOfferStorage:
+    """Baza ofert w SQLite: load() → dict jak z offers.json, save() zapisuje różnicę."""
+
+    def __init__(self, db_path, import_json: Optional[Path] = None):
+        """
+        Args:
+            db_path: Plik bazy (tworzony przy pierwszym otwarciu)
+            import_json: offers.json — import do pustej bazy albo wciągnięcie
+                         zmian zrobionych w nim poza backendem
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path))
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        self.last_save: Dict = {}
+
+        if import_json is not None:
+            self.sync_from_json(Path(import_json))
+
+    # ------------------------------------------------------------------
+    # ODCZYT
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return self._conn.execute('SELECT COUNT(*) FROM offers').fetchone()[0]
+
+    def _meta(self, key: str, default=None):
+        row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def load(self) -> Dict:
+        """Pełna baza w formacie offers.json."""
+        children: Dict[str, Dict[Tuple[str, Optional[str]], list]] = {}
+        queries = (
+            ('price_history', 'SELECT offer_key, NULL, item FROM price_history ORDER BY offer_key, seq'),
+            ('versions', 'SELECT offer_key, kind, item FROM versions ORDER BY offer_key, kind, seq'),
+            ('events', 'SELECT offer_key, kind, item FROM events ORDER BY offer_key, kind, seq'),
+            ('address_corrections', 'SELECT offer_key, NULL, item FROM address_corrections '
+                                    'ORDER BY offer_key, seq'),
+        )
+        for table, sql in queries:
+            for key, kind, item in self._conn.execute(sql):
+                children.setdefault(key, {}).setdefault((table, kind), []).append(json.loads(item))
+
+        offers = [
+            join_offer(json.loads(record), children.get(key, {}))
+            for key, record in self._conn.execute('SELECT key, record FROM offers ORDER BY ord')
+        ]
+
+        order = self._meta(_META_ORDER, ['last_scan', 'next_scan', 'offers'])
+        meta = {key: json.loads(value) for key, value in self._conn.execute(
+            "SELECT key, value FROM meta WHERE key NOT LIKE '$%'")}
+        database = {}
+        for key in order:
+            database[key] = offers if key == 'offers' else meta.pop(key, None)
+        database.update(meta)
+        database.setdefault('offers', offers)
+        return database
+
+    # ------------------------------------------------------------------
+    # ZAPIS
+    # ------------------------------------------------------------------
+
+    def _write_offer(self, key: str, ord_: int, offer: Dict, digest: str):
+        core, children = split_offer(offer)
+        address = offer.get('address') if isinstance(offer.get('address'), dict) else {}
+        coords = address.get('coords') if isinstance(address.get('coords'), dict) else {}
+        price = offer.get('price') if isinstance(offer.get('price'), dict) else {}
+        self._conn.execute(
+            'INSERT OR REPLACE INTO offers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (key, ord_, offer.get('id', ''), offer_short_id(offer.get('id', '')), offer.get('url'),
+             int(bool(offer.get('active', False))), offer.get('first_seen'), offer.get('last_seen'),
+             address.get('full'), coords.get('lat'), coords.get('lon'), price.get('current'),
+             offer.get('profile_name'), digest, _dumps(core)))
+        for table in _CHILD_TABLES:
+            self._conn.execute(f'DELETE FROM {table} WHERE offer_key = ?', (key,))
+        for (table, kind), items in children.items():
+            self._conn.executemany(_CHILD_INSERT[table],
+                                   [_child_row(table, kind, key, seq, item)
+                                    for seq, item in enumerate(items)])
+
+    def save(self, database: Dict, dirty: Optional[List[Dict]] = None) -> Dict:
+        """
+        Zapisuje bazę jedną transakcją — tylko rekordy, których treść lub
+        pozycja się zmieniła. Zwraca statystyki zapisu.
+
+        Args:
+            database: Baza w formacie offers.json
+            dirty: Rekordy zmienione od wczytania (OfferStore.dirty_records) —
+                   pozostałe zapisane rekordy są traktowane jako niezmienione
+                   bez liczenia digestu. None = porównaj wszystkie.
+        """
+        started = time.perf_counter()
+        offers = database.get('offers', [])
+        keys = offer_keys(offers)
+        stored = {key: (ord_, digest) for key, ord_, digest in
+                  self._conn.execute('SELECT key, ord, digest FROM offers')}
+        dirty_ids = None if dirty is None else {id(offer) for offer in dirty}
+        stats = {'written': 0, 'reordered': 0, 'deleted': 0, 'unchanged': 0, 'compared': 0}
+
+        with self._conn:
+            for ord_, (key, offer) in enumerate(zip(keys, offers)):
+                previous = stored.pop(key, None)
+                if previous is not None and dirty_ids is not None and id(offer) not in dirty_ids:
+                    if previous[0] != ord_:
+                        self._conn.execute('UPDATE offers SET ord = ? WHERE key = ?', (ord_, key))
+                        stats['reordered'] += 1
+                    else:
+                        stats['unchanged'] += 1
+                    continue
+                digest = hashlib.blake2b(_dumps(offer).encode('utf-8'), digest_size=16).hexdigest()
+                stats['compared'] += 1
+                if previous is None or previous[1] != digest:
+                    self._write_offer(key, ord_, offer, digest)
+                    stats['written'] += 1
+                elif previous[0] != ord_:
+                    self._conn.execute('UPDATE offers SET ord = ? WHERE key = ?', (ord_, key))
+                    stats['reordered'] += 1
+                else:
+                    stats['unchanged'] += 1
+
+            for key in stored:
+                self._conn.execute('DELETE FROM offers WHERE key = ?', (key,))
+                for table in _CHILD_TABLES:
+                    self._conn.execute(f'DELETE FROM {table} WHERE offer_key = ?', (key,))
+            stats['deleted'] = len(stored)
+
+            self._conn.execute("DELETE FROM meta WHERE key NOT LIKE '$%'")
+            self._conn.executemany('INSERT INTO meta VALUES (?, ?)',
+                                   [(key, _dumps(value)) for key, value in database.items()
+                                    if key != 'offers'])
+            self._conn.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)',
+                               (_META_ORDER, _dumps(list(database))))
+
+        stats['seconds'] = round(time.perf_counter() - started, 3)
+        self.last_save = stats
+        return stats
+
+    # ------------------------------------------------------------------
+    # JSON (import / eksport)
+    # ------------------------------------------------------------------
+
+    def sync_from_json(self, json_path: Path) -> bool:
+        """
+        Wciąga offers.json, gdy baza jest pusta albo plik zmienił się od
+        ostatniego eksportu (edycja skryptem naprawczym). True = zaimportowano.
+        """
+        state = _file_state(json_path)
+        if state is None:
+            return False
+        if len(self) and self._meta(_META_EXPORT) == state:
+            return False
+        empty = not len(self)
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                database = json.load(f)
+        except json.JSONDecodeError:
+            print(f"⚠️ Offers SQLite: uszkodzony {json_path.name} — zostaję przy bazie SQLite")
+            return False
+        stats = self.save(database)
+        self._set_export_state(json_path)
+        if empty:
+            print(f"📥 Offers SQLite: zaimportowano {len(database.get('offers', []))} ofert z {json_path.name}")
+        else:
+            print(f"📥 Offers SQLite: {json_path.name} zmieniony poza backendem — wciągnięto "
+                  f"{stats['written']} zmienionych, {stats['deleted']} usuniętych ofert")
+        return True
+
+    def _set_export_state(self, json_path: Path):
+        with self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)',
+                               (_META_EXPORT, _dumps(_file_state(json_path))))
+
+    def export_json(self, json_path, database: Optional[Dict] = None):
+        """Eksport do formatu offers.json (strona, generatory, skrypty)."""
+        json_path = Path(json_path)
+        write_json_atomic(json_path, database if database is not None else self.load())
+        self._set_export_state(json_path)
+
+    def stats(self) -> Dict:
+        total, active = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(active), 0) FROM offers').fetchone()
+        return {
+            'offers': total,
+            'active': active,
+            'price_history': self._conn.execute('SELECT COUNT(*) FROM price_history').fetchone()[0],
+            'versions': self._conn.execute('SELECT COUNT(*) FROM versions').fetchone()[0],
+            'events': self._conn.execute('SELECT COUNT(*) FROM events').fetchone()[0],
+            'address_corrections': self._conn.execute(
+                'SELECT COUNT(*) FROM address_corrections').fetchone()[0],
+            'db_bytes': self.db_path.stat().st_size if self.db_path.exists() else 0,
+        }
+
+    def close(self):
+        self._conn.commit()
+        self._conn.close()
+
+
+def open_storage(data_file) -> Optional[SQLiteOfferStorage]:
+    """Backend SQLite dla ścieżki bazy ofert albo None (zwykły offers.json)."""
+    if not sqlite_backend_enabled(data_file):
+        return None
+    return SQLiteOfferStorage(sqlite_path_for(data_file), import_json=json_path_for(data_file))
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Backend SQLite bazy ofert')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p_imp = sub.add_parser('import', help='JSON → SQLite')
+    p_imp.add_argument('json_path')
+    p_imp.add_argument('db_path')
+    p_exp = sub.add_parser('export', help='SQLite → JSON')
+    p_exp.add_argument('db_path')
+    p_exp.add_argument('json_path')
+    p_st = sub.add_parser('stats', help='Statystyki bazy')
+    p_st.add_argument('db_path')
+    args = parser.parse_args()
+
+    store = SQLiteOfferStorage(args.db_path)
+    if args.cmd == 'import':
+        with open(args.json_path, 'r', encoding='utf-8') as f:
+            stats = store.save(json.load(f))
+        store._set_export_state(Path(args.json_path))
+        print(f"📥 Zaimportowano do {args.db_path}: {stats}")
+    elif args.cmd == 'export':
+        store.export_json(args.json_path)
+        print(f"📤 Wyeksportowano {len(store)} ofert do {args.json_path}")
+    else:
+        print(json.dumps(store.stats(), indent=2))
+    store.close()
+
+
+def _self_test():
+    import copy
+    import tempfile
+
+    print("🧪 Test offers SQLite\n")
+    database = {
+        'last_scan': '2026-10-17T09:00:00+02:00',
+        'next_scan': '2026-10-17T15:00:00+02:00',
+        'offers': [
+            {
+                'id': 'pokoj-lipowa-CID3-ID1abcde', 'url': 'https://www.olx.pl/d/oferta/pokoj-lipowa-CID3-ID1abcde.html',
+                'address': {'full': 'Lipowa 14', 'street': 'Lipowa', 'number': '14',
+                            'coords': {'lat': 51.2342, 'lon': 22.5601}, 'precision': 'exact'},
+                'price': {'current': 900, 'history': [850, 900], 'media_info': 'w cenie',
+                          'history_full': [{'price': 850, 'date': '2026-09-01T10:00:00+02:00', 'approximated': False},
+                                           {'price': 900, 'date': '2026-10-01T10:00:00+02:00', 'approximated': True}],
+                          'source': 'JSON-LD (OLX)'},
+                'description': 'Pokój przy Lipowej', 'active': True,
+                'title_versions': [{'title': 'Pokój Lipowa', 'first_seen': '2026-09-01', 'last_seen': None}],
+                'refresh_dates': ['2026-09-05', '2026-09-12'], 'reactivation_dates': [],
+                'versions': [{'address': {'full': 'Zana 58'}, 'price_history': [], 'first_seen': '2026-08-01',
+                              'last_seen': '2026-08-30', 'last_price': 800}],
+                'address_corrections': [{'from': 'Lipowej', 'from_precision': 'street_only', 'to': 'Lipowa 14',
+                                         'to_precision': 'exact', 'at': '2026-10-02'}],
+            },
+            {'id': 'stary-CID3-ID1old00', 'url': 'https://www.olx.pl/d/oferta/stary-CID3-ID1old00.html',
+             'address': {}, 'price': {'current': None, 'history': []}, 'active': False},
+            {'id': 'stary-CID3-ID1old00', 'url': 'https://www.olx.pl/d/oferta/stary-CID3-ID1old00.html',
+             'address': {}, 'price': {'current': 700}, 'active': False},  # historyczny duplikat id
+        ],
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src_json = Path(tmp) / 'offers.json'
+        write_json_atomic(src_json, database)
+        store = SQLiteOfferStorage(Path(tmp) / 'offers.sqlite', import_json=src_json)
+        loaded = store.load()
+        assert loaded == database
+        assert _dumps(loaded) == _dumps(database), "kolejność kluczy po eksporcie musi zostać"
+        assert store.stats()['price_history'] == 2 and store.stats()['events'] == 2
+
+        # Zapis przyrostowy: zmiana jednej oferty, usunięcie jednej, nowa na początku
+        changed = copy.deepcopy(loaded)
+        changed['offers'][0]['price']['history_full'].append(
+            {'price': 950, 'date': '2026-10-17T09:00:00+02:00', 'approximated': False})
+        changed['offers'][0]['refresh_dates'].append('2026-10-17')
+        del changed['offers'][2]
+        changed['offers'].insert(0, {'id': 'nowy-CID3-ID1new00', 'active': True, 'price': {'current': 1000}})
+        changed['last_scan'] = '2026-10-17T15:00:00+02:00'
+        stats = store.save(changed)
+        assert (stats['written'], stats['deleted'], stats['reordered'], stats['unchanged']) == (2, 1, 1, 0), stats
+        assert store.load() == changed
+        assert store.save(changed)['written'] == 0
+
+        # Z listą brudnych: porównywane tylko wskazane rekordy
+        changed['offers'][2]['description'] = 'Pokój po remoncie'
+        stats = store.save(changed, dirty=[changed['offers'][2]])
+        assert (stats['written'], stats['compared'], stats['unchanged']) == (1, 1, 2), stats
+        assert store.load() == changed
+
+        # Eksport → edycja pliku poza backendem → wciągnięta przy otwarciu
+        store.export_json(src_json)
+        assert not store.sync_from_json(src_json)
+        with open(src_json, 'r', encoding='utf-8') as f:
+            edited = json.load(f)
+        edited['offers'][1]['active'] = False
+        time.sleep(0.01)
+        write_json_atomic(src_json, edited)
+        store.close()
+        store = SQLiteOfferStorage(Path(tmp) / 'offers.sqlite', import_json=src_json)
+        assert store.load() == edited and store.last_save['written'] == 1
+        print(f"✅ {store.stats()}")
+        store.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main()
+    else:
+        _self_test()
@@ -0,0 +1,141 @@
+"""
+Parser Artifact - prekompilowany stan AddressParser zapisany na dysku.
+
+AddressParser.__init__ za każdym razem czytał i filtrował cały
+geocoding_cache.json przez _load_known_streets (json.load + regexy na każdym
+adresie), a potem leniwie budował automat ulic i indeks literówek. Parser
+tworzą SonarPokojowy, cleanup_bogus_addresses, testy golden i skrypty
+naprawcze — często wielokrotnie w jednym procesie.
+
+Artefakt (pickle obok cache, np. data/geocoding_cache.parser.pickle) trzyma:
+  - cache_streets: ulice z cache w kolejności wstawiania (zbiór odbudowany
+    z tej listy iteruje tak samo jak zbudowany od zera)
+  - automaton: StreetAutomaton nad całą whitelist
+  - typo_index: kubełki (długość, pierwsze 3, ostatnie 2 litery) dla
+    _fix_street_typo
+
+Artefakt jest ważny tylko dla identycznego odcisku: wersja formatu + treść
+cache (JSON) albo sygnatura pliku SQLite + źródła address_parser_data.py,
+address_parser.py i street_matcher.py. Zmiana czegokolwiek = przebudowa
+przy następnym starcie parsera.
+
+SONAR_PARSER_ARTIFACT=0 wyłącza artefakt (parser liczy wszystko od zera).
+"""
+
+import hashlib
+import os
+import pickle
+import sys
+from pathlib import Path
+from typing import Dict, Optional
+
+# Podbij przy zmianie zawartości artefaktu
+ARTIFACT_VERSION = 3
+
+_SRC_DIR = Path(__file__).resolve().parent
+_SOURCE_FILES = ('address_parser_data.py', 'address_parser.py', 'street_matcher.py')
+
+
+def artifact_enabled() -> bool:
+    return os.environ.get('SONAR_PARSER_ARTIFACT', '1') != '0'
+
+
+def artifact_path_for(cache_path) -> Path:
+    """data/geocoding_cache.json → data/geocoding_cache.parser.pickle"""
+    p = Path(cache_path)
+    return p.with_name(p.stem + '.parser.pickle')
+
+
+def source_fingerprint(cache_path) -> str:
+    """Odcisk wszystkiego, z czego budowany jest artefakt."""
+    from geocache_sqlite import sqlite_backend_enabled, sqlite_path_for
+
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f'v{ARTIFACT_VERSION}|py{sys.version_info[0]}.{sys.version_info[1]}|'.encode())
+
+    db_path = sqlite_path_for(cache_path)
+    if sqlite_backend_enabled(cache_path) and db_path.exists():
+        # Baza SQLite bywa duża i zmienia się w WAL — wystarcza sygnatura plików
+        for p in (db_path, db_path.with_name(db_path.name + '-wal')):
+            if p.exists():
+                st = p.stat()
+                h.update(f'sqlite:{p.name}:{st.st_size}:{st.st_mtime_ns}|'.encode())
+    else:
+        p = Path(cache_path)
+        h.update(p.read_bytes() if p.exists() else b'<brak cache>')
+    for name in _SOURCE_FILES:
+        h.update(b'|' + name.encode() + b'|')
+        h.update((_SRC_DIR / name).read_bytes())
+    return h.hexdigest()
+
+
+def load_artifact(cache_path, fingerprint: str) -> Optional[Dict]:
+    """Artefakt dla danego odcisku albo None (brak / nieaktualny / uszkodzony)."""
+    path = artifact_path_for(cache_path)
+    if not path.exists():
+        return None
+    try:
+        with open(path, 'rb') as f:
+            artifact = pickle.load(f)
+    except Exception as e:
+        print(f"⚠️ Artefakt parsera {path.name} nieczytelny ({e}) — przebudowa")
+        return None
+    if not isinstance(artifact, dict) or artifact.get('fingerprint') != fingerprint:
+        return None
+    return artifact
+
+
+def save_artifact(cache_path, artifact: Dict):
+    """Zapis atomowy (tmp + os.replace). Brak katalogu / uprawnień = cicho pomijamy."""
+    path = artifact_path_for(cache_path)
+    if not path.parent.is_dir():
+        return
+    tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    try:
+        with open(tmp, 'wb') as f:
+            pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"⚠️ Nie udało się zapisać artefaktu parsera {path.name}: {e}")
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+
+
+if __name__ == "__main__":
+    import json
+    import tempfile
+    import time
+
+    from address_parser import AddressParser
+
+    print("🧪 Test artefaktu parsera\n")
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = Path(tmp) / 'geocoding_cache.json'
+        cache.write_text(json.dumps({
+            'Lipowa 5': {'lat': 51.24, 'lon': 22.56},
+            'Narutowicza 38': {'lat': 51.24, 'lon': 22.55},
+            'Zła 1': None,
+        }), encoding='utf-8')
+
+        t0 = time.perf_counter()
+        fresh = AddressParser(str(cache))
+        t_fresh = time.perf_counter() - t0
+        assert artifact_path_for(cache).exists() and not fresh.artifact_loaded
+
+        t0 = time.perf_counter()
+        warm = AddressParser(str(cache))
+        t_warm = time.perf_counter() - t0
+        assert warm.artifact_loaded
+        assert list(warm._known_streets) == list(fresh._known_streets)
+        text = "Pokój przy Lipowej, blisko Narutowicza"
+        assert warm.extract_from_whitelist(text) == fresh.extract_from_whitelist(text)
+
+        # Zmiana cache → nowy odcisk → przebudowa
+        data = json.loads(cache.read_text(encoding='utf-8'))
+        data['Zana 10'] = {'lat': 51.23, 'lon': 22.53}
+        cache.write_text(json.dumps(data), encoding='utf-8')
+        rebuilt = AddressParser(str(cache))
+        assert not rebuilt.artifact_loaded and 'zana' in rebuilt._known_streets
+        print(f"✅ Artefakt OK (od zera {t_fresh * 1000:.1f} ms, z artefaktu {t_warm * 1000:.1f} ms)")
@@ -4,9 +4,18 @@ Priorytet: cena pokoju (bez opłat) > cena z nagłówka
 Filtruje: liczby z adresów, lata (2024-2030), liczby <100 zł
 """
 
+import hashlib
 import re
+import time
+from collections import OrderedDict
 from typing import Optional, Dict, List
 
+from shared_utils import default_workers, map_chunks_in_processes
+
+# Rozmiar memo wyników (per PriceParser) — extract_many powiększa je do rozmiaru paczki
+PRICE_MEMO_SIZE = 2048
+
+
 class PriceParser:
     # Pattern do wyciągania kwot (3-4 cyfry + opcjonalnie "zł", "PLN")
     PRICE_PATTERN = re.compile(r'(\d{3,4})\s*(?:zł|PLN|złotych)?', re.IGNORECASE)
@@ -54,7 +63,52 @@ class PriceParser:
     ]
     
     def __init__(self):
-        pass
+        # Memo hash tekstu → {'price': wynik extract_price, 'media_info': ...}
+        # (wypełniane przez extract_many, np. w puli procesów)
+        self._memo: 'OrderedDict[bytes, dict]' = OrderedDict()
+        self._memo_size = PRICE_MEMO_SIZE
+
+    @staticmethod
+    def _text_key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+    def _memo_get(self, text: str, field: str):
+        entry = self._memo.get(self._text_key(text)) if self._memo else None
+        if entry is None or field not in entry:
+            return False, None
+        value = entry[field]
+        return True, dict(value) if isinstance(value, dict) else value
+
+    def extract_many(self, texts, workers: Optional[int] = None, chunksize: int = 64) -> list:
+        """
+        Wsadowo: extract_price + detect_media_info_only dla każdego tekstu,
+        w puli procesów (parser jest bezstanowy). Wyniki trafiają do memo —
+        późniejsze extract_price / detect_media_info_only na tych tekstach nie
+        parsują ponownie.
+
+        Returns:
+            Lista w kolejności wejścia: {'price': dict | None, 'media_info': str,
+            'seconds': czas parsowania tekstu}
+        """
+        texts = list(texts)
+        unique = list(dict.fromkeys(texts))
+        if workers is None:
+            workers = default_workers()
+        if workers > 1 and len(unique) > chunksize:
+            results = map_chunks_in_processes(_price_chunk, unique, workers, chunksize)
+        else:
+            results = [_price_one(self, text) for text in unique]
+
+        self._memo_size = max(self._memo_size, len(unique) + PRICE_MEMO_SIZE)
+        for text, result in zip(unique, results):
+            key = self._text_key(text)
+            self._memo[key] = {'price': result['price'], 'media_info': result['media_info']}
+            self._memo.move_to_end(key)
+        while len(self._memo) > self._memo_size:
+            self._memo.popitem(last=False)
+
+        by_text = dict(zip(unique, results))
+        return [dict(by_text[text]) for text in texts]
     
     def _filter_invalid_prices(self, prices: List[int], text_lower: str) -> List[int]:
         """
@@ -180,6 +234,10 @@ class PriceParser:
         """
         if not text:
             return None
+
+        found, memoized = self._memo_get(text, 'price')
+        if found:
+            return memoized
         
         text_lower = text.lower()
         
@@ -214,6 +272,10 @@ class PriceParser:
         """
         if not text:
             return "brak informacji"
+
+        found, memoized = self._memo_get(text, 'media_info')
+        if found:
+            return memoized
         
         text_lower = text.lower()
         
@@ -294,6 +356,20 @@ class PriceParser:
         return context
 
 
+def _price_one(parser: PriceParser, text: str) -> dict:
+    started = time.perf_counter()
+    return {
+        'price': parser.extract_price(text),
+        'media_info': parser.detect_media_info_only(text),
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def _price_chunk(texts: list) -> list:
+    parser = PriceParser()
+    return [_price_one(parser, text) for text in texts]
+
+
 # Testy jednostkowe
 if __name__ == "__main__":
     parser = PriceParser()
@@ -5,13 +5,13 @@ Generuje dane dla strony profile_tracker.html:
 - per-profil lista ofert, historia cen, timeline pojawienia się
 """
 
-import json
 from datetime import datetime
 from pathlib import Path
 import pytz
 
 from profiles_config import TRACKED_PROFILES
 from shared_utils import write_json_atomic, format_datetime
+from offers_journal import read_offers
 from map_generator import PRICE_RANGES, extract_title
 
 
@@ -147,8 +147,7 @@ def generate_profile_data(input_file: str, output_file: str):
     """Główna funkcja generująca profile_data.json"""
     print("🔄 Generowanie profile_data.json...")
 
-    with open(input_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    data = read_offers(input_file)
 
     offers = data.get('offers', [])
     print(f"📥 Wczytano {len(offers)} ofert z offers.json")
@@ -2,6 +2,7 @@
 Quick scan - 5 stron dla szybkiej naprawy
 """
 from main import SonarPokojowy
+from duplicate_detector import DuplicateIndex
 
 # Nadpisz scraper na mniej stron
 class QuickSonar(SonarPokojowy):
@@ -43,6 +44,7 @@ class QuickSonar(SonarPokojowy):
             processing_start = time.time()
             
             processed_offers = []
+            duplicate_index = DuplicateIndex(self.duplicate_detector)
             skipped_no_address = 0
             skipped_no_price = 0
             skipped_no_coords = 0
@@ -64,11 +66,12 @@ class QuickSonar(SonarPokojowy):
                         skipped_no_coords += 1
                     continue
                 
-                if self.duplicate_detector.filter_duplicates(processed, processed_offers):
+                if duplicate_index.find(processed) is not None:
                     skipped_duplicate += 1
                     continue
                 
                 processed_offers.append(processed)
+                duplicate_index.add(processed)
             
             processing_duration = time.time() - processing_start
             
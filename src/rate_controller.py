@@ -0,0 +1,197 @@
+"""
+Rate Controller - wspólny limiter tempa requestów do OLX (token bucket + AIMD).
+
+Zastępuje dawne _random_delay (per-thread sleep + globalny soft cap) i
+podwajanie _global_min_interval po blokadzie. Stary mechanizm umiał tylko
+zwalniać: jedna czkawka CloudFront na początku runu zostawiała resztę scanu
+na 0,5 req/s. Teraz:
+
+  - token bucket: tempo `rate` req/s z małym burstem; wątki (acquire) i
+    zadania asyncio (acquire_async) rezerwują tokeny z JEDNEGO kubełka
+  - additive increase: po serii `increase_every` udanych odpowiedzi bez
+    wolnych latencji tempo rośnie o `increase_step` (do `max_rate`)
+  - multiplicative decrease: blokada WAF/rate-limit (403/429/503 rozpoznane
+    jako blok) tnie tempo ×`block_factor` i ustawia wspólny cooldown;
+    rosnąca latencja (EWMA > `latency_ceiling`) tnie łagodniej ×`latency_factor`
+  - stan (tempo, licznik blokad, zmiany tempa, latencja) eksportowany per
+    scan do scan_history przez ScanLogger.log_component
+
+Jedna instancja na proces (OLX_RATE) — wpięta w sesje z
+OLXScraper.make_olx_session, więc obejmuje scraper, weryfikację
+nieaktywnych i favorites_tracker.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Dict
+
+
+class AIMDRateController:
+    def __init__(self, initial_rate: float = 3.0, min_rate: float = 0.5, max_rate: float = 8.0,
+                 burst: float = 3.0, increase_step: float = 1.0, increase_every: int = 25,
+                 block_factor: float = 0.5, latency_factor: float = 0.8,
+                 latency_ceiling: float = 3.0, block_cooldown: float = 30.0):
+        """
+        Args:
+            initial_rate: Tempo startowe (req/s). Ostrożne ~3 req/s — tyle
+                          robiło 10 wątków z dawnym _random_delay; resztę
+                          tempo musi wypracować seriami sukcesów
+            min_rate / max_rate: Granice tempa. max 8 req/s — wyraźnie poniżej
+                                 dawnego soft capu 20 req/s: blokada CloudFront
+                                 kosztuje cooldown i pół tempa, a przy pracy
+                                 z jednego IP runnera nie ma po co ryzykować
+            burst: Pojemność kubełka (ile requestów może wyjść od razu)
+            increase_step: Przyrost tempa (req/s) po serii sukcesów
+            increase_every: Długość serii sukcesów wymagana do przyrostu
+            block_factor: Mnożnik tempa po blokadzie
+            latency_factor: Mnożnik tempa gdy latencja rośnie ponad próg
+            latency_ceiling: Próg EWMA latencji (s), powyżej którego zwalniamy
+            block_cooldown: Wspólna pauza po blokadzie (s)
+        """
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase_step = increase_step
+        self.increase_every = increase_every
+        self.block_factor = block_factor
+        self.latency_factor = latency_factor
+        self.latency_ceiling = latency_ceiling
+        self.block_cooldown = block_cooldown
+
+        self._lock = threading.Lock()
+        self.rate = max(min_rate, min(initial_rate, max_rate))
+        self._tokens = burst
+        self._last_refill = time.monotonic()
+        self._cooldown_until = 0.0
+        self._streak = 0
+        self._slow_streak = 0
+        self._latency_ewma = None
+
+        self.stats = {
+            'requests': 0,
+            'successes': 0,
+            'blocks': 0,
+            'errors': 0,
+            'increases': 0,
+            'decreases': 0,
+            'wait_seconds': 0.0,
+            'min_rate_seen': self.rate,
+            'max_rate_seen': self.rate,
+        }
+
+    # ------------------------------------------------------------------
+    # TOKENY
+    # ------------------------------------------------------------------
+
+    def _reserve(self) -> float:
+        """Rezerwuje token i zwraca ile trzeba odczekać. Tokeny mogą zejść
+        pod zero — ujemny stan to kolejka rezerwacji, każda czeka na swój slot."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            wait = max(wait, self._cooldown_until - now)
+            self.stats['requests'] += 1
+            self.stats['wait_seconds'] += wait
+            return wait
+
+    def acquire(self):
+        """Blokujące pobranie tokenu (wątki)."""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Pobranie tokenu bez blokowania pętli zdarzeń (asyncio)."""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    # ------------------------------------------------------------------
+    # SYGNAŁY
+    # ------------------------------------------------------------------
+
+    def _set_rate(self, new_rate: float):
+        self.rate = max(self.min_rate, min(new_rate, self.max_rate))
+        self.stats['min_rate_seen'] = min(self.stats['min_rate_seen'], self.rate)
+        self.stats['max_rate_seen'] = max(self.stats['max_rate_seen'], self.rate)
+
+    def on_success(self, latency: float):
+        """Odpowiedź bez blokady (również 404 — serwer odpowiada normalnie)."""
+        with self._lock:
+            self.stats['successes'] += 1
+            self._latency_ewma = latency if self._latency_ewma is None \
+                else 0.8 * self._latency_ewma + 0.2 * latency
+            if self._latency_ewma > self.latency_ceiling:
+                # Serwer mięknie zanim zacznie blokować — zwolnij łagodnie,
+                # raz na serię wolnych odpowiedzi, nie przy każdej z osobna
+                self._streak = 0
+                self._slow_streak += 1
+                if self._slow_streak >= 5:
+                    self._set_rate(self.rate * self.latency_factor)
+                    self.stats['decreases'] += 1
+                    self._slow_streak = 0
+                return
+            self._slow_streak = 0
+            self._streak += 1
+            if self._streak >= self.increase_every and self.rate < self.max_rate:
+                self._set_rate(self.rate + self.increase_step)
+                self.stats['increases'] += 1
+                self._streak = 0
+
+    def on_block(self, edge: str, status_code: int):
+        """Blokada WAF / rate-limit: multiplicative decrease + wspólny cooldown."""
+        with self._lock:
+            old_rate = self.rate
+            self._set_rate(self.rate * self.block_factor)
+            self._cooldown_until = max(self._cooldown_until, time.monotonic() + self.block_cooldown)
+            self._streak = 0
+            self._tokens = min(self._tokens, 0.0)
+            self.stats['blocks'] += 1
+            self.stats['decreases'] += 1
+            print(f"\n🛑 Wykryto blokadę {edge} ({status_code}) - spowalniam: "
+                  f"{old_rate:.2f} → {self.rate:.2f} req/s, pauza {self.block_cooldown:.0f}s")
+
+    def on_error(self):
+        """Błąd sieci (timeout/reset) — przerywa serię sukcesów, tempa nie rusza."""
+        with self._lock:
+            self.stats['errors'] += 1
+            self._streak = 0
+
+    def state(self) -> Dict:
+        """Stan kontrolera do scan_history (ScanLogger.log_component)."""
+        with self._lock:
+            return {
+                **self.stats,
+                'wait_seconds': round(self.stats['wait_seconds'], 1),
+                'rate': round(self.rate, 2),
+                'min_rate_seen': round(self.stats['min_rate_seen'], 2),
+                'max_rate_seen': round(self.stats['max_rate_seen'], 2),
+                'latency_ewma': round(self._latency_ewma, 3) if self._latency_ewma is not None else None,
+            }
+
+
+# Jeden kontroler na proces — wspólny dla wszystkich requestów do OLX
+OLX_RATE = AIMDRateController()
+
+
+if __name__ == "__main__":
+    print("🧪 Test AIMD rate controller\n")
+    rc = AIMDRateController(increase_every=5, block_cooldown=0.1)
+    assert rc.rate == 3, rc.rate
+    for _ in range(10):
+        rc.acquire()
+        rc.on_success(0.2)
+    assert rc.rate == 5, rc.rate
+    rc.on_block('CloudFront/WAF', 403)
+    assert rc.rate == 2.5, rc.rate
+    for _ in range(30):
+        rc.on_success(0.2)
+    assert rc.rate == 8, rc.rate  # sufit max_rate
+    for _ in range(20):
+        rc.on_success(10.0)
+    assert rc.rate < 8, rc.rate
+    print(f"✅ {rc.state()}")
@@ -0,0 +1,369 @@
+"""
+Relist Detector - wykrywanie ponownych wystawień i duplikatów z innym adresem.
+
+DuplicateDetector porównuje tylko oferty z bieżącego skanu i tylko przy
+identycznym address.full. Agencje wystawiają ten sam pokój ponownie pod nowym
+ID OLX (stare ogłoszenie wygasa, nowe ma świeży slug), a parser potrafi
+odczytać z lekko przepisanego tekstu inny adres ("Lipowa 5" vs "Lipowa").
+
+MinHash + LSH nad CAŁĄ historią (również nieaktywne oferty):
+  - opis (tytuł + opis, jak w rekordzie) → zbiór shingli (3 kolejne słowa)
+  - sygnatura MinHash w wariancie "one permutation hashing": hash shingla
+    wybiera jeden z NUM_PERM koszyków, koszyk trzyma minimum (puste koszyki
+    dziedziczą wartość następnego niepustego — densyfikacja). Jeden hash na
+    shingiel zamiast NUM_PERM permutacji: ~0.3 ms zamiast ~7 ms na opis, co
+    ma znaczenie przy backfillu historii. Odsetek zgodnych pozycji dwóch
+    sygnatur szacuje podobieństwo Jaccarda zbiorów shingli
+  - sygnatury w SignatureCache: pickle obok bazy (data/offers.minhash.pickle,
+    poza gitem), klucz = hash tekstu opisu — historia jest liczona raz, a
+    commitowana baza nie rośnie o ~350 znaków base64 na rekord. Brak pliku
+    (świeży klon) = sygnatury policzone od nowa z opisów przy budowie indeksu
+  - LSH: sygnatura pocięta na BANDS pasm po ROWS wartości; kandydaci to
+    oferty ze wspólnym kubełkiem choć jednego pasma — zapytanie nie
+    przegląda całej historii
+
+Próg LSH (prawdopodobieństwo 50% wspólnego kubełka) ≈ (1/BANDS)^(1/ROWS) ≈ 0.5,
+dla Jaccarda 0.7 (RELIST_THRESHOLD) kandydat wypada w ~99% przypadków.
+"""
+
+import hashlib
+import os
+import pickle
+import re
+import struct
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from offer_store import offer_short_id
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 3
+
+# Podbij przy zmianie shingli / hashy — stare sygnatury zostaną przeliczone
+SIGNATURE_VERSION = 1
+
+# Szacowany Jaccard, od którego oferta z historii to ponowne wystawienie
+RELIST_THRESHOLD = 0.7
+
+_MAX_HASH = (1 << 32) - 1
+_BIN_BITS = NUM_PERM.bit_length() - 1  # NUM_PERM musi być potęgą 2
+# Przesunięcie wartości pożyczonej z odległego koszyka (densyfikacja rotacyjna)
+_DENSIFY_STEP = 0x9E3779B1
+_WORD = re.compile(r'\w+')
+
+
+def shingles(text: str) -> set:
+    """Zbiór 64-bitowych hashy shingli (SHINGLE_WORDS kolejnych słów, lowercase)."""
+    words = _WORD.findall((text or '').lower())
+    if not words:
+        return set()
+    if len(words) < SHINGLE_WORDS:
+        grams = [' '.join(words)]
+    else:
+        grams = [' '.join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)]
+    return {
+        int.from_bytes(hashlib.blake2b(g.encode('utf-8'), digest_size=8).digest(), 'little')
+        for g in set(grams)
+    }
+
+
+def minhash_signature(text: str) -> Optional[Tuple[int, ...]]:
+    """Sygnatura MinHash tekstu (NUM_PERM wartości 32-bit) albo None dla pustego."""
+    hashes = shingles(text)
+    if not hashes:
+        return None
+    bins = [None] * NUM_PERM
+    mask = NUM_PERM - 1
+    for h in hashes:
+        b = h & mask
+        v = (h >> _BIN_BITS) & _MAX_HASH
+        if bins[b] is None or v < bins[b]:
+            bins[b] = v
+    # Densyfikacja: pusty koszyk bierze wartość najbliższego niepustego w prawo
+    # (cyklicznie) przesuniętą o odległość — te same zbiory dają te same sygnatury
+    signature = []
+    for i in range(NUM_PERM):
+        offset = 0
+        while bins[(i + offset) & mask] is None:
+            offset += 1
+        signature.append((bins[(i + offset) & mask] + offset * _DENSIFY_STEP) & _MAX_HASH)
+    return tuple(signature)
+
+
+def text_key(text: str) -> str:
+    """Klucz sygnatury w SignatureCache: hash tekstu opisu (16 znaków hex)."""
+    return hashlib.blake2b((text or '').encode('utf-8'), digest_size=8).hexdigest()
+
+
+def signature_cache_path_for(json_path) -> Path:
+    """data/offers.json → data/offers.minhash.pickle"""
+    p = Path(str(json_path))
+    return p.with_name(p.stem + '.minhash.pickle')
+
+
+def estimate_similarity(sig1: Tuple[int, ...], sig2: Tuple[int, ...]) -> float:
+    """Szacowany Jaccard: odsetek zgodnych pozycji sygnatur."""
+    return sum(1 for x, y in zip(sig1, sig2) if x == y) / NUM_PERM
+
+
+class SignatureCache:
+    """
+    Sygnatury MinHash po kluczu tekstu (text_key), trzymane poza rekordami.
+
+    path=None — tylko w pamięci (testy, generatory). save() zapisuje wyłącznie
+    sygnatury użyte w tym procesie, więc wpisy usuniętych / zmienionych opisów
+    wypadają same.
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path is not None else None
+        self._packed: Dict[str, bytes] = {}
+        self._used: set = set()
+        self._changed = False
+        self.stats = {'loaded': 0, 'computed': 0}
+        if self.path is not None and self.path.exists():
+            try:
+                with open(self.path, 'rb') as f:
+                    data = pickle.load(f)
+            except Exception as e:
+                print(f"⚠️ Cache sygnatur {self.path.name} nieczytelny ({e}) — liczę od nowa")
+                data = None
+            if isinstance(data, dict) and data.get('version') == (SIGNATURE_VERSION, NUM_PERM):
+                self._packed = data.get('signatures', {})
+                self.stats['loaded'] = len(self._packed)
+
+    def lookup(self, key: str) -> Optional[Tuple[int, ...]]:
+        """Sygnatura po kluczu albo None (nieznany tekst — trzeba go policzyć)."""
+        packed = self._packed.get(key)
+        if packed is None:
+            return None
+        self._used.add(key)
+        return struct.unpack(f'<{NUM_PERM}I', packed)
+
+    def signature(self, text: str, key: Optional[str] = None) -> Optional[Tuple[int, ...]]:
+        """Sygnatura tekstu: z cache, a przy braku policzona i zapamiętana."""
+        key = key or text_key(text)
+        signature = self.lookup(key)
+        if signature is None:
+            signature = minhash_signature(text)
+            if signature is None:
+                return None
+            self._packed[key] = struct.pack(f'<{NUM_PERM}I', *signature)
+            self._used.add(key)
+            self._changed = True
+            self.stats['computed'] += 1
+        return signature
+
+    def save(self):
+        """Zapis atomowy (tmp + os.replace). Brak katalogu / uprawnień = cicho pomijamy."""
+        if self.path is None or not self.path.parent.is_dir():
+            return
+        if not self._changed and len(self._used) == len(self._packed):
+            return
+        signatures = {key: self._packed[key] for key in self._used}
+        tmp = self.path.with_name(f'{self.path.name}.{os.getpid()}.tmp')
+        try:
+            with open(tmp, 'wb') as f:
+                pickle.dump({'version': (SIGNATURE_VERSION, NUM_PERM), 'signatures': signatures},
+                            f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"⚠️ Nie udało się zapisać cache sygnatur {self.path.name}: {e}")
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+            return
+        self._packed = signatures
+        self._changed = False
+
+
+class RelistIndex:
+    """
+    Indeks LSH nad rekordami ofert (te same dicty co w database['offers']).
+
+    Użycie (run_scan):
+        index = RelistIndex.from_offers(self.offer_store, cache=self.signature_cache)
+        for match, similarity in index.query(processed): ...
+        index.add(processed)
+    """
+
+    def __init__(self, threshold: float = RELIST_THRESHOLD, cache: Optional[SignatureCache] = None,
+                 on_legacy: Optional[Callable[[Dict], None]] = None):
+        self.threshold = threshold
+        self.cache = cache if cache is not None else SignatureCache()
+        # Wołane z rekordem, z którego usunięto stare pole offer['minhash']
+        # (OfferStore.mark_dirty — zapis bazy bez niego)
+        self.on_legacy = on_legacy
+        # (nr pasma, wartości pasma) → rekordy
+        self._buckets: Dict[Tuple, List[Dict]] = {}
+        self._signatures: Dict[int, Tuple[int, ...]] = {}  # id(rekord) → sygnatura
+        self._order: Dict[int, int] = {}                    # id(rekord) → kolejność dodania
+        self._records: List[Dict] = []
+        self.stats = {'indexed': 0, 'legacy_stripped': 0, 'queries': 0, 'candidates': 0}
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    @classmethod
+    def from_offers(cls, offers: Iterable[Dict], threshold: float = RELIST_THRESHOLD,
+                    cache: Optional[SignatureCache] = None,
+                    on_legacy: Optional[Callable[[Dict], None]] = None) -> 'RelistIndex':
+        index = cls(threshold, cache, on_legacy)
+        for offer in offers:
+            index.add(offer)
+        return index
+
+    def signature_for(self, offer: Dict) -> Optional[Tuple[int, ...]]:
+        """Sygnatura opisu oferty (z SignatureCache albo policzona)."""
+        if id(offer) in self._signatures:
+            return self._signatures[id(offer)]
+        # Sygnatury trzymane kiedyś w rekordzie — usuwamy, baza zapisze się bez nich
+        if offer.pop('minhash', None) is not None:
+            self.stats['legacy_stripped'] += 1
+            if self.on_legacy is not None:
+                self.on_legacy(offer)
+        return self.cache.signature(offer.get('description', ''))
+
+    @staticmethod
+    def _bands(signature: Tuple[int, ...]):
+        for band in range(BANDS):
+            yield band, signature[band * ROWS:(band + 1) * ROWS]
+
+    def add(self, offer: Dict, signature: Optional[Tuple[int, ...]] = None):
+        """Dodaje rekord do indeksu; signature podana z góry dla wpisów archiwum
+        (bez opisu — ColdArchive.relist_entries)."""
+        if id(offer) in self._signatures:
+            return
+        if signature is None:
+            signature = self.signature_for(offer)
+        if signature is None:
+            return
+        self._signatures[id(offer)] = signature
+        self._order[id(offer)] = len(self._records)
+        self._records.append(offer)
+        for key in self._bands(signature):
+            self._buckets.setdefault(key, []).append(offer)
+        self.stats['indexed'] += 1
+
+    @staticmethod
+    def _same_listing(a: Dict, b: Dict) -> bool:
+        """Ten sam listing OLX (ta sama końcówka ID lub URL) — to nie relist."""
+        if a is b:
+            return True
+        short_a = offer_short_id(a.get('id', ''))
+        if short_a and short_a == offer_short_id(b.get('id', '')):
+            return True
+        url_a = (a.get('url') or '').split('?')[0]
+        return bool(url_a) and url_a == (b.get('url') or '').split('?')[0]
+
+    def query(self, offer: Dict, threshold: float = None) -> List[Tuple[Dict, float]]:
+        """
+        Rekordy (inne listingi) podobne do oferty: [(rekord, szacowany Jaccard)],
+        od najbardziej podobnego; remis — kolejność dodania do indeksu.
+        """
+        threshold = self.threshold if threshold is None else threshold
+        signature = self.signature_for(offer)
+        if signature is None:
+            return []
+        self.stats['queries'] += 1
+
+        seen = set()
+        candidates = []
+        for key in self._bands(signature):
+            for record in self._buckets.get(key, ()):
+                if id(record) in seen:
+                    continue
+                seen.add(id(record))
+                candidates.append(record)
+        self.stats['candidates'] += len(candidates)
+
+        found = []
+        for record in candidates:
+            if self._same_listing(offer, record):
+                continue
+            similarity = estimate_similarity(signature, self._signatures[id(record)])
+            if similarity >= threshold:
+                found.append((record, similarity))
+        found.sort(key=lambda x: (-x[1], self._order[id(x[0])]))
+        return found
+
+    def similarity(self, offer1: Dict, offer2: Dict) -> Optional[float]:
+        """Szacowany Jaccard dwóch ofert (None, gdy któraś nie ma opisu)."""
+        sig1, sig2 = self.signature_for(offer1), self.signature_for(offer2)
+        if sig1 is None or sig2 is None:
+            return None
+        return estimate_similarity(sig1, sig2)
+
+    def best_match(self, offer: Dict, threshold: float = None) -> Optional[Tuple[Dict, float]]:
+        found = self.query(offer, threshold)
+        return found[0] if found else None
+
+
+if __name__ == "__main__":
+    import random
+    import time
+
+    print("🧪 Test RelistIndex\n")
+    base = ("Pokój jednoosobowy do wynajęcia w mieszkaniu 3-pokojowym przy ulicy Lipowej, "
+            "blisko UMCS i KUL. Pokój umeblowany: łóżko, biurko, szafa. Mieszkanie po remoncie, "
+            "internet światłowodowy, pralka, zmywarka. Media według zużycia, kaucja jednomiesięczna. "
+            "Zapraszam studentów i osoby pracujące, niepalące.")
+    relist = base.replace('przy ulicy Lipowej', 'przy Lipowej 5').replace('niepalące', 'niepalące!')
+    other = ("Kawalerka na Czubach, 28 m2, balkon, miejsce parkingowe w garażu podziemnym, "
+             "dostępna od zaraz, umowa na rok, zwierzęta mile widziane.")
+
+    sig_a, sig_b = minhash_signature(base), minhash_signature(relist)
+    exact = len(shingles(base) & shingles(relist)) / len(shingles(base) | shingles(relist))
+    est = estimate_similarity(sig_a, sig_b)
+    print(f"Jaccard dokładny {exact:.2f}, szacowany {est:.2f}")
+    assert abs(exact - est) < 0.2
+
+    history = [
+        {'id': 'pokoj-lipowa-CID3-IDaaa1', 'url': 'https://olx.pl/d/oferta/pokoj-lipowa-CID3-IDaaa1.html',
+         'description': base, 'active': False},
+        {'id': 'kawalerka-CID3-IDbbb2', 'url': 'https://olx.pl/d/oferta/kawalerka-CID3-IDbbb2.html',
+         'description': other, 'active': True},
+    ]
+    index = RelistIndex.from_offers(history)
+    assert not any('minhash' in o for o in history) and index.cache.stats['computed'] == 2
+
+    new = {'id': 'pokoj-lipowa-5-CID3-IDccc3', 'url': 'https://olx.pl/d/oferta/pokoj-lipowa-5-CID3-IDccc3.html',
+           'description': relist}
+    match = index.best_match(new)
+    assert match and match[0] is history[0], match
+    print(f"✅ Relist wykryty: {match[0]['id']} (podobieństwo {match[1]:.2f})")
+
+    # Ten sam listing (nowy slug, ta sama końcówka ID) to nie relist
+    same = dict(new, id='pokoj-lipowa-edytowany-CID3-IDaaa1', url='https://olx.pl/d/oferta/x-CID3-IDaaa1.html')
+    assert index.best_match(same) is None
+
+    # Zapytanie nie przegląda całej historii
+    rng = random.Random(5)
+    vocab = [f'słowo{i}' for i in range(3000)]
+    bulk = [{'id': f'o-CID3-ID{i:05d}', 'description': ' '.join(rng.choice(vocab) for _ in range(80))}
+            for i in range(2000)]
+    t0 = time.perf_counter()
+    big = RelistIndex.from_offers(bulk)
+    t_build = time.perf_counter() - t0
+    before = big.stats['candidates']
+    big.query(new)
+    print(f"✅ {len(big)} ofert w {t_build:.2f}s, kandydatów na zapytanie: "
+          f"{big.stats['candidates'] - before} (zamiast {len(big)})")
+
+    # Sygnatury w pliku obok bazy: drugi proces niczego nie liczy, stare pole
+    # 'minhash' w rekordzie jest usuwane (rekord do zapisu)
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = signature_cache_path_for(Path(tmp) / 'offers.json')
+        legacy = dict(history[1], minhash='v1:AAAA')
+        stripped = []
+        RelistIndex.from_offers([history[0], legacy], cache=SignatureCache(cache_path),
+                                on_legacy=stripped.append).cache.save()
+        assert stripped == [legacy] and 'minhash' not in legacy
+        warm = RelistIndex.from_offers(history, cache=SignatureCache(cache_path))
+        assert warm.cache.stats == {'loaded': 2, 'computed': 0}
+        assert warm.best_match(new)[0] is history[0]
+        print(f"✅ Cache sygnatur: {cache_path.name}, {cache_path.stat().st_size} B na 2 opisy")
@@ -7,8 +7,6 @@ Uruchom: cd src && python3 retry_none_cache.py
 """
 import sys
 import os
-import json
-import time
 from pathlib import Path
 
 # Dodaj src do path
@@ -123,12 +121,13 @@ def is_noise_address(address: str) -> bool:
 def main():
     cache_path = GEOCODING_CACHE_FILE
     
+    # Geocoder wczytuje cache raz (JSON albo backend SQLite) — listę None
+    # bierzemy z niego zamiast parsować plik drugi raz
     print(f"Wczytuję cache z {cache_path}")
-    with open(cache_path) as f:
-        cache = json.load(f)
+    geocoder = Geocoder(cache_file=str(cache_path))
     
-    total = len(cache)
-    none_keys = [k for k, v in cache.items() if v is None]
+    total = len(geocoder.cache)
+    none_keys = geocoder.negative_keys()
     print(f"Total: {total}, None: {len(none_keys)} ({len(none_keys)/total*100:.0f}%)")
     
     # Odfiltruj noise (nie próbuj geokodować "telefonu 60")
@@ -146,11 +145,10 @@ def main():
         nom = to_nominative(k)
         print(f"  {k}" + (f"  →  {nom}" if nom != k else ""))
     
-    # Geocoder w sąsiednim katalogu
-    geocoder = Geocoder(cache_file=str(cache_path))
-    
-    print(f"\n🚀 Rozpoczynam retry {len(real_keys)} adresów (delay 1.1s/req)...")
-    print(f"   Szacowany czas: {len(real_keys) * 1.1 / 60:.1f} min")
+    # Tempo 1 req/s pilnuje sam Geocoder (_pace_nominatim) — trafienia
+    # gazetteera offline nie czekają wcale
+    print(f"\n🚀 Rozpoczynam retry {len(real_keys)} adresów (Nominatim max 1 req/s)...")
+    print(f"   Szacowany czas (bez gazetteera): {len(real_keys) * 1.0 / 60:.1f} min")
     
     fixed = 0
     still_none = 0
@@ -171,9 +169,7 @@ def main():
         
         if i % 20 == 0 or i == len(real_keys):
             print(f"  [{i}/{len(real_keys)}] {key[:40]:40s} → {status}  | fixed={fixed}, none={still_none}")
-        
-        # Nominatim: max 1 req/s
-        time.sleep(1.1)
+
     
     # Final save
     geocoder._save_cache()
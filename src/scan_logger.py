@@ -60,6 +60,19 @@ class ScanLogger:
         
         self.current_scan['stats'] = stats
     
+    def log_component(self, name: str, state: Dict):
+        """
+        Zapisuje stan/statystyki komponentu scanu (np. cache HTTP).
+        
+        Args:
+            name: Nazwa komponentu (np. 'http_cache')
+            state: Dict ze stanem komponentu na koniec scanu
+        """
+        if not self.current_scan:
+            return
+        
+        self.current_scan.setdefault('components', {})[name] = state
+    
     def log_error(self, error: str):
         """Dodaje błąd do logu."""
         if not self.current_scan:
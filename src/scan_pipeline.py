@@ -0,0 +1,303 @@
+"""
+Scan Pipeline - strumieniowy krok 1→2 run_scan (pobieranie → parsowanie →
+geokodowanie → dedup) zamiast etapów odpalanych po kolei.
+
+run_scan był ściśle etapowy: scrape_all_pages kończył CAŁĄ fazę 2 (szczegóły
+setek ofert, sieć), zanim krok 2 sparsował pierwszą ofertę, a geokodowanie
+(Nominatim, 1 req/s) ruszało dopiero po parsowaniu. Czas scanu ≈ suma etapów,
+choć każdy czeka na co innego (sieć OLX / CPU / Nominatim).
+
+Tryb strumieniowy:
+  - DetailStream: wątek producenta pobiera szczegóły
+    (OLXScraper.fetch_planned_details) i wrzuca każdą ukończoną ofertę do
+    OGRANICZONEJ kolejki — pełna kolejka blokuje producenta (backpressure,
+    w trybie async staje cała pętla pobierania)
+  - run_ordered: wątek główny parsuje oferty w kolejności nadejścia
+    (prepare → _prepare_offer + zlecenie do GeocodeScheduler), a wyniki
+    ODBIERA (finish → dedup/relist) ściśle w kolejności listingu, gdy czoło
+    jest gotowe — dedup "pierwsza wygrywa" i klasyfikacja odrzuconych
+    działają jak przy przetwarzaniu etapowym
+  - przy zapchanym geokoderze (max_geocode_backlog zleceń) wątek główny
+    przestaje brać nowe oferty i czeka na czoło — kolejka szczegółów się
+    zapełnia i hamuje producenta
+  - bufor slotów poza kolejnością jest ograniczony (max_buffered): pełny
+    bufor = czekanie na czoło; gdy czoło jeszcze się pobiera, kolejne oferty
+    są tylko odkładane (bez parsowania i zleceń geokodowania), aż czoło dojdzie
+
+Oferty gotowe od razu (pominięte "ta sama cena" z danymi z bazy, oferty
+tylko z profili) są przetwarzane w przerwach, gdy ze strumienia nic nie
+przyszło. Czas scanu dąży do max(etap) zamiast sumy.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import wait as wait_futures
+from typing import Callable, Dict, List, Optional
+
+DEFAULT_QUEUE_SIZE = 32
+DEFAULT_GEOCODE_BACKLOG = 64
+DEFAULT_MAX_BUFFERED = 64
+PROGRESS_EVERY = 25
+
+_END = object()
+
+
+class DetailStream:
+    def __init__(self, scraper, all_offers, offers_to_fetch: List[Dict],
+                 maxsize: int = DEFAULT_QUEUE_SIZE):
+        """
+        Args:
+            scraper: OLXScraper (fetch_planned_details)
+            all_offers: RawOfferCollection — pozycja oferty w niej = slot w run_ordered
+            offers_to_fetch: Zadania z OLXScraper.plan_details
+            maxsize: Pojemność kolejki pobranych ofert (backpressure)
+        """
+        self.scraper = scraper
+        self.all_offers = all_offers
+        self.offers_to_fetch = offers_to_fetch
+        fetch_ids = {id(item['offer']) for item in offers_to_fetch}
+        # id(oferta) → pozycja w listingu. Szczegóły trafiają do TEGO SAMEGO
+        # dicta (_apply_offer_details), więc id z planu identyfikuje wynik.
+        self.positions: Dict[int, int] = {id(o): i for i, o in enumerate(all_offers)
+                                          if id(o) in fetch_ids}
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._emitted = set()
+        self._closed = threading.Event()
+        self._finished = False
+        self._error: Optional[BaseException] = None
+        self.stats = {'expected': len(offers_to_fetch), 'received': 0,
+                      'producer_blocked_seconds': 0.0, 'max_queue_depth': 0}
+        self._producer = threading.Thread(target=self._run, name='detail-stream', daemon=True)
+
+    def start(self) -> 'DetailStream':
+        self._producer.start()
+        return self
+
+    @property
+    def exhausted(self) -> bool:
+        """Producent skończył i wszystko zostało odebrane."""
+        return self._finished
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """
+        Następna pobrana oferta. None = nic nie przyszło (timeout=None: bez
+        czekania) albo koniec strumienia (exhausted). Wyjątek producenta jest
+        rzucany tutaj, w wątku głównym.
+        """
+        if self._finished:
+            return None
+        try:
+            item = self._queue.get(timeout=timeout) if timeout else self._queue.get_nowait()
+        except queue.Empty:
+            return None
+        if item is _END:
+            self._finished = True
+            if self._error is not None:
+                raise self._error
+            return None
+        self.stats['received'] += 1
+        return item
+
+    def close(self):
+        """Zatrzymuje producenta (np. po wyjątku w wątku głównym)."""
+        self._closed.set()
+        if self._producer.is_alive():
+            self._producer.join(timeout=1)
+
+    def summary(self) -> Dict:
+        return {**self.stats,
+                'producer_blocked_seconds': round(self.stats['producer_blocked_seconds'], 1)}
+
+    # ------------------------------------------------------------------
+
+    def _put(self, offer: Dict):
+        # Fallback async → wątki pobiera wszystko jeszcze raz — oddajemy raz
+        if id(offer) in self._emitted:
+            return
+        self._emitted.add(id(offer))
+        started = time.monotonic()
+        while not self._closed.is_set():
+            try:
+                self._queue.put(offer, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        self.stats['producer_blocked_seconds'] += time.monotonic() - started
+        self.stats['max_queue_depth'] = max(self.stats['max_queue_depth'], self._queue.qsize())
+
+    def _run(self):
+        try:
+            self.scraper.fetch_planned_details(self.all_offers, self.offers_to_fetch,
+                                               on_offer=self._put, progress_every=PROGRESS_EVERY)
+            # Zadania bez wyniku (nie powinno się zdarzyć) — z danymi listingu,
+            # żeby konsument nie czekał w nieskończoność
+            for item in self.offers_to_fetch:
+                self._put(item['offer'])
+        except BaseException as e:  # przekazany do wątku głównego w get()
+            self._error = e
+        finally:
+            while not self._closed.is_set():
+                try:
+                    self._queue.put(_END, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+
+
+def run_ordered(all_offers, stream: DetailStream, prepare: Callable, finish: Callable,
+                scheduler, max_geocode_backlog: int = DEFAULT_GEOCODE_BACKLOG,
+                max_buffered: int = DEFAULT_MAX_BUFFERED) -> Dict:
+    """
+    Przetwarza all_offers strumieniowo: prepare(numer, oferta) → slot
+    (raw_offer, pending, future, reason, detail) w kolejności nadejścia,
+    finish(*slot) ściśle w kolejności pozycji w all_offers.
+
+    Najwyżej max_buffered slotów (plus czoło) czeka na odbiór. Przy pełnym buforze wątek
+    główny czeka na czoło; jeśli czoła jeszcze nie ma (szczegóły się pobierają),
+    dalej odbiera strumień — inaczej producent utknąłby na pełnej kolejce przed
+    ofertą z czoła — ale nowe oferty tylko odkłada (parked), bez prepare.
+
+    Zwraca statystyki (czas bezczynności wątku głównego, czekanie na czoło,
+    maksymalny bufor slotów poza kolejnością i odłożonych ofert).
+    """
+    total = len(all_offers)
+    ready = deque(i for i, o in enumerate(all_offers) if id(o) not in stream.positions)
+    slots: Dict[int, tuple] = {}
+    parked: Dict[int, Dict] = {}  # pobrane, czekają na miejsce w buforze slotów
+    cursor = 0
+    stats = {'idle_seconds': 0.0, 'head_wait_seconds': 0.0, 'max_buffered_slots': 0,
+             'max_parked': 0, 'streamed': 0, 'ready': len(ready)}
+
+    while True:
+        # Odbiór w kolejności listingu: czoło gotowe = bez geokodowania albo Future rozstrzygnięty
+        while cursor < total and cursor in slots:
+            future = slots[cursor][2]
+            if future is not None and not future.done():
+                break
+            finish(*slots.pop(cursor))
+            cursor += 1
+        if cursor >= total:
+            break
+
+        head = slots.get(cursor)
+        head_future = head[2] if head is not None else None
+        full = len(slots) >= max_buffered
+        if head_future is not None and (full or scheduler.pending() >= max_geocode_backlog):
+            # Geokoder zapchany albo pełny bufor — nie bierz nowych ofert, czekaj na czoło
+            started = time.monotonic()
+            wait_futures([head_future], timeout=0.5)
+            stats['head_wait_seconds'] += time.monotonic() - started
+            continue
+
+        if cursor in parked or (parked and not full):
+            # Odłożone przy pełnym buforze — czoło od razu, reszta gdy zwolni się miejsce
+            i = cursor if cursor in parked else min(parked)
+            slots[i] = prepare(i + 1, parked.pop(i))
+            stats['max_buffered_slots'] = max(stats['max_buffered_slots'], len(slots))
+            continue
+
+        # Czoło to oferta gotowa od razu (z bazy / z profilu) — bierz ją pierwszą,
+        # inaczej blokowałaby odbiór wszystkiego za sobą
+        offer = stream.get() if not (ready and ready[0] == cursor) else None
+        if offer is not None:
+            i = stream.positions[id(offer)]
+            stats['streamed'] += 1
+        elif ready and (not full or ready[0] == cursor):
+            i = ready.popleft()
+            offer = all_offers[i]
+        elif stream.exhausted:
+            if head_future is None:
+                raise RuntimeError(f"Strumień szczegółów zakończony bez oferty z pozycji {cursor}")
+            started = time.monotonic()
+            wait_futures([head_future])
+            stats['head_wait_seconds'] += time.monotonic() - started
+            continue
+        else:
+            # Nic do parsowania: czekaj na sieć (szczegóły) — albo na czoło
+            started = time.monotonic()
+            offer = stream.get(timeout=0.05)
+            stats['idle_seconds'] += time.monotonic() - started
+            if offer is None:
+                continue
+            i = stream.positions[id(offer)]
+            stats['streamed'] += 1
+
+        if full and i != cursor:
+            parked[i] = offer
+            stats['max_parked'] = max(stats['max_parked'], len(parked))
+            continue
+        slots[i] = prepare(i + 1, offer)
+        stats['max_buffered_slots'] = max(stats['max_buffered_slots'], len(slots))
+
+    stats['idle_seconds'] = round(stats['idle_seconds'], 1)
+    stats['head_wait_seconds'] = round(stats['head_wait_seconds'], 1)
+    return stats
+
+
+if __name__ == "__main__":
+    import random
+    from concurrent.futures import Future
+
+    print("🧪 Test scan_pipeline\n")
+    rng = random.Random(3)
+
+    class _Scraper:
+        def fetch_planned_details(self, all_offers, offers_to_fetch, on_offer=None, progress_every=1):
+            order = list(range(len(offers_to_fetch)))
+            rng.shuffle(order)  # ukończenie w dowolnej kolejności
+            for i in order:
+                time.sleep(0.001)
+                offer = offers_to_fetch[i]['offer']
+                offer['description'] = 'opis ' + offer['url']
+                on_offer(offer)
+
+    class _Scheduler:
+        def __init__(self):
+            self.jobs = []
+
+        def pending(self):
+            return sum(not f.done() for f in self.jobs)
+
+        def submit(self):
+            future = Future()
+            self.jobs.append(future)
+            threading.Timer(rng.random() * 0.01, future.set_result, args=(True,)).start()
+            return future
+
+    offers = [{'url': f'https://olx.pl/d/oferta/o{i}', 'skipped': i % 3 == 0} for i in range(120)]
+    to_fetch = [{'offer': o, 'reason': 'new'} for o in offers if not o['skipped']]
+    scheduler = _Scheduler()
+    finished = []
+
+    def _prepare(n, offer):
+        assert offer['skipped'] or offer.get('description'), offer
+        future = scheduler.submit() if n % 2 else None
+        return (offer, {'n': n}, future, None, None)
+
+    def _finish(raw_offer, pending, future, reason, detail):
+        assert future is None or future.done()
+        finished.append(pending['n'])
+
+    stream = DetailStream(_Scraper(), offers, to_fetch, maxsize=4).start()
+    stats = run_ordered(offers, stream, _prepare, _finish, scheduler, max_geocode_backlog=5,
+                        max_buffered=8)
+    stream.close()
+    assert finished == list(range(1, len(offers) + 1)), finished[:10]
+    assert stats['max_buffered_slots'] <= 8 + 1, stats  # + czoło
+    assert stats['streamed'] == len(to_fetch) and stats['ready'] == len(offers) - len(to_fetch)
+    assert stream.summary()['received'] == len(to_fetch)
+    print(f"✅ Kolejność listingu zachowana | {stats} | {stream.summary()}")
+
+    # Błąd producenta trafia do wątku głównego
+    class _Broken:
+        def fetch_planned_details(self, *args, **kwargs):
+            raise ConnectionError("OLX leży")
+
+    broken = DetailStream(_Broken(), offers[:3], [{'offer': offers[1]}]).start()
+    try:
+        run_ordered(offers[:3], broken, _prepare, lambda *slot: None, scheduler)
+        raise AssertionError("brak wyjątku")
+    except ConnectionError:
+        print("✅ Wyjątek producenta przekazany do run_ordered")
@@ -2,22 +2,25 @@
 OLX Scraper - pobiera wszystkie oferty pokoi w Lublinie
 Obsługuje paginację (wszystkie strony), opóźnienia anti-block
 WERSJA 2.0: Równoległe pobieranie szczegółów (ThreadPoolExecutor)
+WERSJA 2.1: Asynchroniczny silnik szczegółów (curl_cffi AsyncSession),
+            ThreadPoolExecutor zostaje jako tryb zapasowy
 """
 
 import os
+import asyncio
 import requests
 from curl_cffi import requests as cffi_requests
 from bs4 import BeautifulSoup
 import time
-import random
 import re
 import json
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 from urllib.parse import urljoin
 from concurrent.futures import ThreadPoolExecutor, as_completed
-import threading
 
 from address_parser_data import LUBLIN_DISTRICTS
+from http_cache import SCAN_CACHE
+from rate_controller import OLX_RATE
 
 # OLX potrafi zlokalizować ogłoszenie w dzielnicy Lublina jako osobnej
 # "miejscowości" (np. city="Szerokie"). Filtr profili musi je przepuszczać,
@@ -38,6 +41,175 @@ IMPERSONATE = 'safari17_0'
 # nadal może rzucić requests.RequestException.
 NETWORK_EXCEPTIONS = (requests.RequestException, cffi_requests.exceptions.RequestException)
 
+# Tryb pobierania szczegółów ofert (faza 2): 'async' = jedna pętla asyncio
+# z setkami requestów w locie pod wspólnym limitem tempa, 'threads' = stary
+# ThreadPoolExecutor (fallback — np. gdy AsyncSession nie wstanie).
+FETCH_MODES = ('async', 'threads')
+DEFAULT_FETCH_MODE = os.environ.get('SONAR_FETCH_MODE', 'async')
+
+def detect_block(response) -> Optional[str]:
+    """
+    Rozpoznaje blokadę po stronie OLX. Zwraca nazwę warstwy która nas
+    hamuje ('CloudFront/WAF' / 'Cloudflare' / 'rate-limit') albo None.
+
+    403/429/503 = serwer nas hamuje. OLX stoi za DWOMA warstwami:
+      - Cloudflare ("just a moment", cf-ray) — challenge/rate-limit
+      - AWS CloudFront ("Request blocked", Server: CloudFront) — WAF/blok IP
+    Bez rozpoznania CloudFront _fetch_page traktował jego 403 jak zwykły
+    błąd sieci (raise_for_status), więc scraper nie robił cooldownu ani
+    auto-spowolnienia i nie logował poprawnie że został zablokowany.
+    """
+    if response.status_code not in (403, 429, 503):
+        return None
+    content_lower = response.text[:2000].lower() if response.text else ''
+    headers_lower = str(response.headers).lower()
+    server_lower = response.headers.get('Server', '').lower()
+
+    is_cloudflare = ('cloudflare' in content_lower or 'cf-ray' in headers_lower
+                     or 'just a moment' in content_lower or 'attention required' in content_lower)
+    is_cloudfront = ('cloudfront' in server_lower or 'cloudfront' in headers_lower
+                     or 'request blocked' in content_lower
+                     or 'the request could not be satisfied' in content_lower)
+
+    if is_cloudfront:
+        return 'CloudFront/WAF'
+    if is_cloudflare:
+        return 'Cloudflare'
+    if response.status_code == 429:
+        return 'rate-limit'
+    return None
+
+
+def _report_to_rate_controller(response, started: float) -> Optional[str]:
+    """Sygnał dla OLX_RATE: blokada → multiplicative decrease, inaczej sukces z latencją.
+    Zwraca warstwę blokady z detect_block (albo None)."""
+    edge = detect_block(response)
+    if edge:
+        OLX_RATE.on_block(edge, response.status_code)
+    elif response.status_code < 500:
+        OLX_RATE.on_success(time.monotonic() - started)
+    else:
+        OLX_RATE.on_error()
+    return edge
+
+
+def _is_cacheable(method: str, args: tuple, kwargs: dict) -> bool:
+    return method.upper() == 'GET' and not args and not kwargs.get('params') \
+        and not kwargs.get('data')
+
+
+class CachedOLXSession(cffi_requests.Session):
+    """Sesja curl_cffi z per-scanowym cache odpowiedzi (http_cache.SCAN_CACHE)
+    i wspólnym limiterem tempa (rate_controller.OLX_RATE).
+    GET bez params/data najpierw zagląda do cache (trafienie = bez tokenu
+    i bez requestu), odpowiedź 200 strony oferty bez znamion blokady trafia
+    do cache (listing nigdy — patrz http_cache.is_cacheable_page). Każdy
+    request do sieci czeka na token i raportuje wynik do kontrolera AIMD."""
+
+    def request(self, method, url, *args, **kwargs):
+        cacheable = _is_cacheable(method, args, kwargs)
+        if cacheable:
+            cached = SCAN_CACHE.get(url)
+            if cached is not None:
+                return cached
+        OLX_RATE.acquire()
+        started = time.monotonic()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except NETWORK_EXCEPTIONS:
+            OLX_RATE.on_error()
+            raise
+        edge = _report_to_rate_controller(response, started)
+        if cacheable and not edge:
+            SCAN_CACHE.put(url, response)
+        return response
+
+
+class CachedOLXAsyncSession(cffi_requests.AsyncSession):
+    """Async odpowiednik CachedOLXSession (ten sam SCAN_CACHE i OLX_RATE)."""
+
+    async def request(self, method, url, *args, **kwargs):
+        cacheable = _is_cacheable(method, args, kwargs)
+        if cacheable:
+            cached = SCAN_CACHE.get(url)
+            if cached is not None:
+                return cached
+        await OLX_RATE.acquire_async()
+        started = time.monotonic()
+        try:
+            response = await super().request(method, url, *args, **kwargs)
+        except NETWORK_EXCEPTIONS:
+            OLX_RATE.on_error()
+            raise
+        edge = _report_to_rate_controller(response, started)
+        if cacheable and not edge:
+            SCAN_CACHE.put(url, response)
+        return response
+
+
+def olx_short_id(url: str) -> Optional[str]:
+    """Krótki ID OLX z URL-a ("...-ID1bT7ya.html" → "1bT7ya"). Stały mimo
+    zmiany sluga (OLX podmienia slug przy edycji tytułu)."""
+    m = re.search(r'-ID(\w+)\.html', url or '')
+    return m.group(1) if m else None
+
+
+class RawOfferCollection(list):
+    """
+    Lista surowych ofert z indeksem: czysty URL (bez query) i krótki ID OLX.
+
+    Scalanie pobranych szczegółów i ofert z profili szukało wcześniej
+    dopasowania pętlą po całej liście (O(n) na ofertę → O(n²) na scan).
+    Tu find()/replace() są O(1). Przy powtórzonym URL-u (wyróżnienie na kilku
+    stronach listingu) indeks trzyma PIERWSZE wystąpienie — tak jak dawna
+    pętla z break. Dozwolone mutacje: append/extend/replace (pozostałe
+    metody listy rozjechałyby indeks).
+    """
+
+    def __init__(self, offers=()):
+        super().__init__()
+        self._by_url: Dict[str, int] = {}
+        self._by_short: Dict[str, int] = {}
+        self.extend(offers)
+
+    @staticmethod
+    def clean_url(url: str) -> str:
+        return (url or '').split('?')[0]
+
+    def append(self, offer: Dict):
+        idx = len(self)
+        super().append(offer)
+        self._by_url.setdefault(self.clean_url(offer.get('url')), idx)
+        sid = olx_short_id(offer.get('url'))
+        if sid:
+            self._by_short.setdefault(sid, idx)
+
+    def extend(self, offers):
+        for offer in offers:
+            self.append(offer)
+
+    def index_of(self, url: str) -> Optional[int]:
+        """Pozycja oferty: najpierw czysty URL, potem krótki ID (OLX
+        podmienia slug przy edycji tytułu — ta sama oferta, inny URL)."""
+        idx = self._by_url.get(self.clean_url(url))
+        if idx is None:
+            sid = olx_short_id(url)
+            idx = self._by_short.get(sid) if sid else None
+        return idx
+
+    def find(self, url: str) -> Optional[Dict]:
+        idx = self.index_of(url)
+        return self[idx] if idx is not None else None
+
+    def replace(self, offer: Dict) -> bool:
+        """Podmienia ofertę o tym samym URL/short ID. False = brak w kolekcji."""
+        idx = self.index_of(offer.get('url'))
+        if idx is None:
+            return False
+        self[idx] = offer
+        return True
+
+
 class OLXScraper:
     BASE_URL = "https://www.olx.pl/nieruchomosci/stancje-pokoje/lublin/"
     
@@ -61,35 +233,53 @@ class OLXScraper:
         verify: w GitHub Actions ruch idzie bezpośrednio (default True);
         CURL_CA_BUNDLE/REQUESTS_CA_BUNDLE pozwala podać własne CA
         (np. środowiska za MITM-proxy).
+
+        Sesja ma wpięty per-scanowy cache odpowiedzi (http_cache.SCAN_CACHE):
+        strona oferty pobrana już w tym scanie (przez dowolny komponent)
+        wraca z cache.
         """
-        ca = os.environ.get('CURL_CA_BUNDLE') or os.environ.get('REQUESTS_CA_BUNDLE')
-        session = cffi_requests.Session(impersonate=IMPERSONATE, verify=ca if ca else True)
+        session = CachedOLXSession(impersonate=IMPERSONATE, verify=OLXScraper._olx_verify())
         session.headers.update(OLXScraper.HEADERS)
         return session
 
-    def __init__(self, delay_range: tuple = (2, 4), max_workers: int = 5, existing_offers: dict = None):
+    @staticmethod
+    def make_olx_async_session(max_clients: int = 10) -> 'cffi_requests.AsyncSession':
+        """Asynchroniczny odpowiednik make_olx_session (ta sama impersonacja
+        TLS, nagłówki i CA). max_clients = limit równoległych połączeń curl."""
+        return CachedOLXAsyncSession(impersonate=IMPERSONATE, verify=OLXScraper._olx_verify(),
+                                          headers=OLXScraper.HEADERS, max_clients=max_clients)
+
+    @staticmethod
+    def _olx_verify():
+        ca = os.environ.get('CURL_CA_BUNDLE') or os.environ.get('REQUESTS_CA_BUNDLE')
+        return ca if ca else True
+
+    def __init__(self, delay_range: tuple = (2, 4), max_workers: int = 5, existing_offers: dict = None,
+                 fetch_mode: str = None, async_concurrency: int = 64):
         """
         Args:
-            delay_range: Zakres opóźnień między requestami (min, max) w sekundach
-                         UWAGA: to delay PER-THREAD, nie globalny. Każdy wątek niezależnie
-                         odczekuje swój delay między swoimi requestami.
+            delay_range: (legacy) dawny per-thread zakres opóźnień (min, max) w sekundach.
+                         Tempo ustala teraz wspólny kontroler AIMD (rate_controller.OLX_RATE).
             max_workers: Liczba równoległych wątków dla pobierania szczegółów
             existing_offers: Słownik istniejących ofert {id: {'price': X, ...}} do inteligentnego pomijania
+            fetch_mode: 'async' (domyślnie, env SONAR_FETCH_MODE) lub 'threads'
+            async_concurrency: Maks. liczba requestów szczegółów w locie w trybie async
         """
         self.delay_min, self.delay_max = delay_range
         self.max_workers = max_workers
         self.session = self.make_olx_session()
+        self.fetch_mode = fetch_mode or DEFAULT_FETCH_MODE
+        if self.fetch_mode not in FETCH_MODES:
+            print(f"⚠️ Nieznany tryb pobierania '{self.fetch_mode}' — używam 'threads'")
+            self.fetch_mode = 'threads'
+        self.async_concurrency = async_concurrency
         
-        # Per-thread rate limiter (KAŻDY WĄTEK MA SWÓJ LICZNIK)
-        # Wcześniej globalny self._lock + self._last_request_time powodował, że
-        # 5 wątków czekało sekwencyjnie w kolejce na delay - efektywnie 1 wątek.
-        # Teraz każdy wątek czeka tylko na SWÓJ ostatni request, więc 10 wątków
-        # robi 10× więcej requestów/s niż 1 wątek (ograniczone tylko siecią/serwerem).
-        self._thread_local = threading.local()
-        # Globalny "soft cap" jako zabezpieczenie przed CF - max QPS dla CAŁEGO scrapera
-        self._global_lock = threading.Lock()
-        self._global_last_request = 0
-        self._global_min_interval = 0.05  # 20 req/s górny limit (CF zwykle limituje przy 30+)
+        # Tempo requestów: wspólny kontroler AIMD (rate_controller.OLX_RATE),
+        # wpięty w sesję z make_olx_session. Zastąpił per-thread _random_delay
+        # i podwajanie globalnego intervalu po blokadzie (które nigdy nie
+        # przyspieszało z powrotem). delay_range zostaje w sygnaturze dla
+        # zgodności wywołań, tempa już nie ustala.
+        self.rate = OLX_RATE
         
         # Inteligentne pomijanie - istniejące oferty
         self.existing_offers = existing_offers or {}
@@ -100,13 +290,21 @@ class OLXScraper:
         # więc bez tej flagi częściowy scrape wygląda jak "rynek się skurczył".
         self.pagination_truncated = False
         self.pages_scraped = 0
+        self.listing_last_page = 0
         
         # Statystyki pomijania
         self.stats = {
             'skipped_same_price': 0,
             'fetched_new': 0,
-            'fetched_price_changed': 0
+            'fetched_price_changed': 0,
+            # Requesty NIE wykonane dzięki jednemu przejściu listingu
+            # (pozycje z głównego crawla + szczegóły profili już pobrane)
+            'saved_positions_pass': 0,
+            'saved_profile_details': 0,
         }
+
+        # Mapa short_id → strona listingu, wypełniana przy scrape_all_pages(sort=...)
+        self.listing_positions: Dict[str, int] = {}
     
     @staticmethod
     def _listing_title_changed(existing: dict, offer: dict) -> bool:
@@ -149,42 +347,6 @@ class OLXScraper:
             return int(cleaned)
         return None
     
-    def _random_delay(self):
-        """
-        Per-thread rate limiter z globalnym soft cap.
-        
-        Logika:
-        1. Każdy wątek czeka SWÓJ delay (delay_min..delay_max) między swoimi requestami.
-           Wątek A i wątek B mogą wystrzelić requesty równocześnie - to celowe.
-        2. Globalny soft cap (20 QPS) chroni przed wystrzeleniem zbyt wielu requestów
-           naraz gdyby wszystkie wątki zsynchronizowały się przypadkiem.
-        """
-        # === KROK 1: Per-thread delay ===
-        last_req = getattr(self._thread_local, 'last_request_time', 0)
-        now = time.time()
-        time_since_last = now - last_req
-        
-        if time_since_last < self.delay_min:
-            sleep_time = self.delay_min - time_since_last
-            # Dodaj losowy jitter w zakresie [delay_min, delay_max]
-            jitter = random.uniform(0, self.delay_max - self.delay_min)
-            time.sleep(sleep_time + jitter)
-        else:
-            # Już minął delay_min - dodaj tylko jitter (jeśli jest)
-            jitter = random.uniform(0, self.delay_max - self.delay_min)
-            if jitter > 0:
-                time.sleep(jitter)
-        
-        # === KROK 2: Globalny soft cap (max 20 QPS dla całego scrapera) ===
-        with self._global_lock:
-            now = time.time()
-            global_since_last = now - self._global_last_request
-            if global_since_last < self._global_min_interval:
-                time.sleep(self._global_min_interval - global_since_last)
-            self._global_last_request = time.time()
-        
-        self._thread_local.last_request_time = time.time()
-    
     def _fetch_page(self, url: str) -> Optional[BeautifulSoup]:
         """
         Pobiera stronę i zwraca BeautifulSoup object.
@@ -194,35 +356,9 @@ class OLXScraper:
             response = self.session.get(url, timeout=15)
             
             # === WYKRYWANIE BLOKADY CLOUDFLARE / CLOUDFRONT / RATE LIMIT ===
-            # 403/429/503 = serwer nas hamuje. OLX stoi za DWOMA warstwami:
-            #   - Cloudflare ("just a moment", cf-ray) — challenge/rate-limit
-            #   - AWS CloudFront ("Request blocked", Server: CloudFront) — WAF/blok IP
-            # Bez rozpoznania CloudFront _fetch_page traktował jego 403 jak zwykły
-            # błąd sieci (raise_for_status), więc scraper nie robił cooldownu ani
-            # auto-spowolnienia i nie logował poprawnie że został zablokowany.
-            if response.status_code in (403, 429, 503):
-                content_lower = response.text[:2000].lower() if response.text else ''
-                headers_lower = str(response.headers).lower()
-                server_lower = response.headers.get('Server', '').lower()
-
-                is_cloudflare = ('cloudflare' in content_lower or 'cf-ray' in headers_lower
-                                 or 'just a moment' in content_lower or 'attention required' in content_lower)
-                is_cloudfront = ('cloudfront' in server_lower or 'cloudfront' in headers_lower
-                                 or 'request blocked' in content_lower
-                                 or 'the request could not be satisfied' in content_lower)
-                is_blocked = is_cloudflare or is_cloudfront
-
-                if is_blocked or response.status_code == 429:
-                    edge = 'CloudFront/WAF' if is_cloudfront else ('Cloudflare' if is_cloudflare else 'rate-limit')
-                    with self._global_lock:
-                        # Podwój globalny min_interval (auto-spowolnienie)
-                        old_interval = self._global_min_interval
-                        self._global_min_interval = min(old_interval * 2, 2.0)
-                        print(f"\n🛑 Wykryto blokadę {edge} ({response.status_code}) - spowalniam: "
-                              f"{old_interval:.2f}s → {self._global_min_interval:.2f}s globalny interval")
-                    # Cooldown 30s
-                    time.sleep(30)
-                    return None
+            # Spowolnienie i wspólny cooldown robi już sesja (OLX_RATE.on_block)
+            if detect_block(response):
+                return None
             
             response.raise_for_status()
             return BeautifulSoup(response.text, 'lxml')
@@ -342,47 +478,141 @@ class OLXScraper:
         # Brak następnej strony
         return None
     
-    def scrape_all_pages(self, max_pages: int = 20) -> List[Dict]:
+    @staticmethod
+    def _last_page_number(soup: BeautifulSoup) -> int:
+        """Najwyższy numer strony z linków paginatora (?page=N) — 1 gdy brak."""
+        last_page = 1
+        for a in soup.find_all('a', href=lambda x: x and 'page=' in str(x)):
+            m = re.search(r'page=(\d+)', a.get('href', ''))
+            if m:
+                last_page = max(last_page, int(m.group(1)))
+        return last_page
+
+    def _sorted_listing_url(self, sort: Optional[str]) -> str:
+        if not sort:
+            return self.BASE_URL
+        return f"{self.BASE_URL}?search%5Border%5D={sort.replace(':', '%3A')}"
+
+    def _absorb_positions(self, offers: List[Dict], page: int,
+                          positions: Optional[Dict[str, int]] = None):
+        """short_id → strona; domyślnie do self.listing_positions (scan),
+        fetch_listing_positions podaje własną mapę (inny sort)."""
+        if positions is None:
+            positions = self.listing_positions
+        for o in offers:
+            sid = olx_short_id(o.get('url', ''))
+            # najniższa (najwyższa pozycja) strona wygrywa — strony
+            # z równoległych wątków przychodzą w dowolnej kolejności
+            if sid and page < positions.get(sid, 10 ** 9):
+                positions[sid] = page
+
+    @staticmethod
+    def _page_url(base_url: str, page: int) -> str:
+        return f"{base_url}{'&' if '?' in base_url else '?'}page={page}"
+
+    def _fetch_listing_page_with_retry(self, url: str, page_num: int) -> Optional[BeautifulSoup]:
         """
-        Scrapuje wszystkie strony z ofertami (z limitem max_pages).
-        NOWE: Równoległe pobieranie szczegółów ofert.
-        
-        Args:
-            max_pages: Maksymalna liczba stron do przejrzenia (zabezpieczenie)
-            
-        Returns:
-            Lista wszystkich ofert ze wszystkich stron
+        Pobiera stronę listingu z retry.
+
+        RETRY paginacji (2026-08-11): pojedynczy przejściowy reset/blok
+        połączenia (curl_cffi bywa resetowany, _fetch_page robi cooldown
+        i zwraca None) NIE może uciąć całego listingu. Bez retry jeden
+        feler na stronie 3 dawał scrape 97/295 ofert zamiast ~900 →
+        masowa fałszywa deaktywacja. Ponawiamy TĘ SAMĄ stronę do 4× z
+        rosnącym backoffem; dopiero trwała porażka = urwana paginacja.
         """
-        all_offers = []
-        current_url = self.BASE_URL
-        page_num = 1
-        self.pagination_truncated = False
-        self.pages_scraped = 0
+        for attempt in range(4):
+            soup = self._fetch_page(url)
+            if soup:
+                return soup
+            if attempt < 3:
+                backoff = 5 * (attempt + 1)  # 5s, 10s, 15s
+                print(f"   ↻ Strona {page_num} nieudana (próba {attempt + 1}/4) — ponawiam za {backoff}s")
+                time.sleep(backoff)
+        print(f"⚠️ Nie udało się pobrać strony {page_num} po 4 próbach")
+        return None
 
-        print(f"🔍 Rozpoczynam scraping OLX Lublin - Pokoje...")
-        print(f"⚡ Tryb równoległy: {self.max_workers} wątków\n")
-        
-        # FAZA 1: Pobierz wszystkie podstawowe oferty ze stron listingowych
+    def _fetch_listing_page_task(self, url: str, page_num: int) -> Optional[List[Dict]]:
+        """Zadanie dla puli wątków: strona listingu z retry → oferty (None = porażka)."""
+        soup = self._fetch_listing_page_with_retry(url, page_num)
+        if not soup:
+            return None
+        return self._extract_offers_from_page(soup)
+
+    def _scrape_listing_pages(self, base_url: str, max_pages: int):
+        """
+        Faza 1 scrape_all_pages: wszystkie strony listingu → (oferty, liczba stron).
+
+        Strona 1 sekwencyjnie — z jej paginatora liczba stron (jak w
+        fetch_listing_positions), strony 2..N RÓWNOLEGLE przez ThreadPoolExecutor
+        (~45s sekwencyjnie → kilka sekund). Oferty sklejane w kolejności stron.
+        Semantyka pagination_truncated bez zmian: strona, która po 4 próbach
+        nie przyszła albo przyszła PUSTA (soft-block OLX = HTTP 200 z pustą
+        listą) oznacza urwaną paginację. Gdy paginator nie podaje numerów stron
+        a jest link "dalej" — fallback na stare przejście sekwencyjne.
+        """
+        print(f"📄 Strona 1: {base_url}")
+        soup = self._fetch_listing_page_with_retry(base_url, 1)
+        if not soup:
+            self.pagination_truncated = True
+            return RawOfferCollection(), 1
+        offers = self._extract_offers_from_page(soup)
+        print(f"   Znaleziono {len(offers)} ofert")
+        if not offers:
+            print("   ⚠️ Brak ofert na stronie - paginacja urwana (możliwy soft-block OLX)")
+            self.pagination_truncated = True
+            return RawOfferCollection(), 1
+        self.pages_scraped = 1
+        self._absorb_positions(offers, 1)
+
+        last_page = min(self._last_page_number(soup), max_pages)
+        if last_page == 1:
+            next_url = self._get_next_page_url(soup, 1, base_url)
+            if next_url and max_pages > 1:
+                return self._scrape_listing_sequential(next_url, 2, max_pages,
+                                                       RawOfferCollection(offers), base_url)
+            print(f"✅ Osiągnięto ostatnią stronę")
+            return RawOfferCollection(offers), 1
+
+        pages: Dict[int, Optional[List[Dict]]] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            future_to_page = {
+                executor.submit(self._fetch_listing_page_task, self._page_url(base_url, n), n): n
+                for n in range(2, last_page + 1)
+            }
+            for future in as_completed(future_to_page):
+                n = future_to_page[future]
+                try:
+                    pages[n] = future.result()
+                except (*NETWORK_EXCEPTIONS, AttributeError, TypeError) as e:
+                    print(f"   ⚠️ Strona {n}: {e}")
+                    pages[n] = None
+                if pages[n] is not None:
+                    print(f"📄 Strona {n}: {len(pages[n])} ofert")
+
+        all_offers = RawOfferCollection(offers)
+        for n in range(2, last_page + 1):
+            page_offers = pages.get(n)
+            if page_offers is None:
+                self.pagination_truncated = True
+                continue
+            if not page_offers:
+                print(f"   ⚠️ Brak ofert na stronie {n} - paginacja urwana (możliwy soft-block OLX)")
+                self.pagination_truncated = True
+                continue
+            self.pages_scraped += 1
+            self._absorb_positions(page_offers, n)
+            all_offers.extend(page_offers)
+        return all_offers, last_page
+
+    def _scrape_listing_sequential(self, current_url: str, page_num: int, max_pages: int,
+                                   all_offers: 'RawOfferCollection', base_url: str):
+        """Stare przejście strona po stronie przez _get_next_page_url
+        (fallback gdy paginator nie podaje numerów stron)."""
         while current_url and page_num <= max_pages:
             print(f"📄 Strona {page_num}: {current_url}")
-
-            # RETRY paginacji (2026-08-11): pojedynczy przejściowy reset/blok
-            # połączenia (curl_cffi bywa resetowany, _fetch_page robi cooldown
-            # i zwraca None) NIE może uciąć całego listingu. Bez retry jeden
-            # feler na stronie 3 dawał scrape 97/295 ofert zamiast ~900 →
-            # masowa fałszywa deaktywacja. Ponawiamy TĘ SAMĄ stronę do 4× z
-            # rosnącym backoffem; dopiero trwała porażka = urwana paginacja.
-            soup = None
-            for attempt in range(4):
-                soup = self._fetch_page(current_url)
-                if soup:
-                    break
-                if attempt < 3:
-                    backoff = 5 * (attempt + 1)  # 5s, 10s, 15s
-                    print(f"   ↻ Strona {page_num} nieudana (próba {attempt + 1}/4) — ponawiam za {backoff}s")
-                    time.sleep(backoff)
+            soup = self._fetch_listing_page_with_retry(current_url, page_num)
             if not soup:
-                print(f"⚠️ Nie udało się pobrać strony {page_num} po 4 próbach")
                 self.pagination_truncated = True
                 break
 
@@ -396,137 +626,181 @@ class OLXScraper:
                 break
 
             self.pages_scraped = page_num
+            self._absorb_positions(offers, page_num)
             all_offers.extend(offers)
-            
+
             # Sprawdzamy czy jest następna strona
-            next_url = self._get_next_page_url(soup, page_num)
-            
+            next_url = self._get_next_page_url(soup, page_num, base_url)
             if not next_url:
                 print(f"✅ Osiągnięto ostatnią stronę")
                 break
-            
             current_url = next_url
             page_num += 1
+        return all_offers, page_num
+
+    def scrape_all_pages(self, max_pages: int = 20, sort: Optional[str] = None) -> 'RawOfferCollection':
+        """
+        Scrapuje wszystkie strony z ofertami (z limitem max_pages).
+        NOWE: Równoległe pobieranie szczegółów ofert.
+
+        Etapy: scrape_listing (faza 1) → plan_details → fetch_planned_details
+        (faza 2). run_scan w trybie strumieniowym woła je osobno, żeby szczegóły
+        szły do przetwarzania w miarę pobierania (scan_pipeline.DetailStream).
+        
+        Args:
+            max_pages: Maksymalna liczba stron do przejrzenia (zabezpieczenie)
+            sort: Opcjonalny sort listingu OLX (np. 'created_at:desc'). Przy
+                  podanym sorcie ten sam crawl wypełnia self.listing_positions
+                  — osobne przejście fetch_listing_positions nie jest potrzebne.
             
-            # Opóźnienie przed następną stroną
-            if page_num <= max_pages:
-                self._random_delay()
+        Returns:
+            Lista wszystkich ofert ze wszystkich stron
+        """
+        all_offers = self.scrape_listing(max_pages, sort)
+        offers_to_fetch = self.plan_details(all_offers)
+        self.fetch_planned_details(all_offers, offers_to_fetch)
+
+        print(f"\n✅ Scraping zakończony: {len(all_offers)} ofert z {self.listing_last_page} stron")
+        print(f"   📈 Zaoszczędzono {self.stats['skipped_same_price']} requestów!")
+        return all_offers
+
+    def scrape_listing(self, max_pages: int = 20, sort: Optional[str] = None) -> 'RawOfferCollection':
+        """Faza 1 scrape_all_pages: same strony listingu (bez szczegółów ofert)."""
+        self.pagination_truncated = False
+        self.pages_scraped = 0
+        self.listing_positions = {}
+
+        print(f"🔍 Rozpoczynam scraping OLX Lublin - Pokoje...")
+        print(f"⚡ Tryb równoległy: {self.max_workers} wątków\n")
+        
+        # FAZA 1: Pobierz wszystkie podstawowe oferty ze stron listingowych
+        all_offers, page_num = self._scrape_listing_pages(self._sorted_listing_url(sort), max_pages)
+        self.listing_last_page = page_num
+        if sort:
+            # Pozycje przyszły z tego samego crawla — tyle stron oszczędza
+            # pominięte osobne przejście fetch_listing_positions
+            self.stats['saved_positions_pass'] = self.pages_scraped
         
         print(f"\n✅ Faza 1: Pobrano {len(all_offers)} podstawowych ofert z {page_num} stron")
+        return all_offers
+
+    def plan_details(self, all_offers: 'RawOfferCollection') -> List[Dict]:
+        """
+        Faza 2 (plan): inteligentne pobieranie szczegółów — oferty ze stałą ceną
+        i tytułem dostają opis/adres/współrzędne z bazy (skipped=True), reszta
+        wraca jako lista zadań {'offer', 'reason', ['old_price', 'new_price']}
+        dla fetch_planned_details.
+        """
+        if not all_offers:
+            return []
+
+        # Rozdziel oferty na: do pobrania vs do pominięcia
+        offers_to_fetch = []
+        offers_to_skip = []
         
-        # FAZA 2: Inteligentne pobieranie szczegółów (pomijamy oferty ze stałą ceną)
-        if all_offers:
-            # Rozdziel oferty na: do pobrania vs do pominięcia
-            offers_to_fetch = []
-            offers_to_skip = []
+        for offer in all_offers:
+            offer_id = offer['url'].split('/')[-1].split('.')[0]
+            listing_price = self._extract_price_number(offer['price_raw'])
             
-            for offer in all_offers:
-                offer_id = offer['url'].split('/')[-1].split('.')[0]
-                listing_price = self._extract_price_number(offer['price_raw'])
+            # Sprawdź czy oferta istnieje w bazie
+            if offer_id in self.existing_offers:
+                existing = self.existing_offers[offer_id]
+                existing_price = existing.get('price')
                 
-                # Sprawdź czy oferta istnieje w bazie
-                if offer_id in self.existing_offers:
-                    existing = self.existing_offers[offer_id]
-                    existing_price = existing.get('price')
-                    
-                    # Porównaj ceny (tylko cyfry). Zmiana TYTUŁU też wymusza pobranie —
-                    # patrz _listing_title_changed (FIX 2026-08-18).
-                    if listing_price and existing_price and listing_price == existing_price \
-                            and not self._listing_title_changed(existing, offer):
-                        # Ta sama cena i ten sam tytuł → pomiń pobieranie szczegółów
-                        offers_to_skip.append({
-                            'offer': offer,
-                            'existing': existing,
-                            'reason': 'same_price'
-                        })
-                        self.stats['skipped_same_price'] += 1
-                    else:
-                        # Cena się zmieniła → pobierz szczegóły
-                        offers_to_fetch.append({
-                            'offer': offer,
-                            'old_price': existing_price,
-                            'new_price': listing_price,
-                            'reason': 'price_changed'
-                        })
-                        self.stats['fetched_price_changed'] += 1
+                # Porównaj ceny (tylko cyfry). Zmiana TYTUŁU też wymusza pobranie —
+                # patrz _listing_title_changed (FIX 2026-08-18).
+                if listing_price and existing_price and listing_price == existing_price \
+                        and not self._listing_title_changed(existing, offer):
+                    # Ta sama cena i ten sam tytuł → pomiń pobieranie szczegółów
+                    offers_to_skip.append({
+                        'offer': offer,
+                        'existing': existing,
+                        'reason': 'same_price'
+                    })
+                    self.stats['skipped_same_price'] += 1
                 else:
-                    # Nowa oferta → pobierz szczegóły
+                    # Cena się zmieniła → pobierz szczegóły
                     offers_to_fetch.append({
                         'offer': offer,
-                        'reason': 'new'
+                        'old_price': existing_price,
+                        'new_price': listing_price,
+                        'reason': 'price_changed'
                     })
-                    self.stats['fetched_new'] += 1
-            
-            print(f"\n📊 Inteligentne pobieranie:")
-            print(f"   ⏭️  Pominięto (ta sama cena): {len(offers_to_skip)}")
-            print(f"   🆕 Nowe oferty do pobrania: {self.stats['fetched_new']}")
-            print(f"   💰 Zmieniona cena: {self.stats['fetched_price_changed']}")
-            
-            # Uzupełnij oferty pominięte danymi z istniejącej bazy
-            for item in offers_to_skip:
-                offer = item['offer']
-                existing = item['existing']
-                offer['description'] = existing.get('description', offer['title'])
-                offer['official_price'] = existing.get('price')
-                offer['official_price_raw'] = f"{existing.get('price')} zł (cache)"
-                offer['price_source'] = 'cache'
-                offer['skipped'] = True  # Flaga że pominięto pobieranie
-                
-                # Dodaj adres i współrzędne z cache (dla reaktywacji nieaktywnych ofert)
-                if existing.get('address'):
-                    offer['cached_address'] = existing.get('address')
-                # Współrzędne: PRIORYTET 1 = address.coords (canonical),
-                # FALLBACK = top-level 'coordinates' (legacy, do usunięcia z bazy).
-                _coords = (existing.get('address', {}) or {}).get('coords') or existing.get('coordinates')
-                if _coords:
-                    offer['cached_coordinates'] = _coords
-                # Oznacz czy oferta była nieaktywna (do potencjalnej reaktywacji)
-                offer['was_inactive'] = not existing.get('was_active', True)
-            
-            # Pobierz szczegóły tylko dla ofert które tego wymagają
-            if offers_to_fetch:
-                print(f"\n⚡ Faza 2: Pobieranie szczegółów dla {len(offers_to_fetch)} ofert ({self.max_workers} wątków)...")
-                start_time = time.time()
-                
-                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                    # Submit tylko oferty do pobrania
-                    future_to_item = {
-                        executor.submit(self._fetch_single_offer_details, item['offer']): item 
-                        for item in offers_to_fetch
-                    }
-                    
-                    # Zbierz wyniki
-                    completed = 0
-                    total = len(offers_to_fetch)
-                    
-                    for future in as_completed(future_to_item):
-                        completed += 1
-                        item = future_to_item[future]
-                        try:
-                            updated_offer = future.result()
-                            # Dodaj info o poprzedniej cenie jeśli się zmieniła
-                            if item.get('reason') == 'price_changed':
-                                updated_offer['previous_price'] = item.get('old_price')
-                            
-                            # Zaktualizuj w all_offers
-                            for i, o in enumerate(all_offers):
-                                if o['url'] == updated_offer['url']:
-                                    all_offers[i] = updated_offer
-                                    break
-                            
-                            progress = (completed / total) * 100
-                            print(f"\r   Postęp: [{completed}/{total}] {progress:.1f}%", end='', flush=True)
-                        except (*NETWORK_EXCEPTIONS, AttributeError, TypeError) as e:
-                            print(f"\n   ⚠️ Błąd pobierania: {e}")
-                
-                elapsed = time.time() - start_time
-                print(f"\n✅ Szczegóły pobrane w {elapsed:.1f}s (średnio {elapsed/len(offers_to_fetch):.2f}s/oferta)")
+                    self.stats['fetched_price_changed'] += 1
             else:
+                # Nowa oferta → pobierz szczegóły
+                offers_to_fetch.append({
+                    'offer': offer,
+                    'reason': 'new'
+                })
+                self.stats['fetched_new'] += 1
+        
+        print(f"\n📊 Inteligentne pobieranie:")
+        print(f"   ⏭️  Pominięto (ta sama cena): {len(offers_to_skip)}")
+        print(f"   🆕 Nowe oferty do pobrania: {self.stats['fetched_new']}")
+        print(f"   💰 Zmieniona cena: {self.stats['fetched_price_changed']}")
+        
+        # Uzupełnij oferty pominięte danymi z istniejącej bazy
+        for item in offers_to_skip:
+            offer = item['offer']
+            existing = item['existing']
+            offer['description'] = existing.get('description', offer['title'])
+            offer['official_price'] = existing.get('price')
+            offer['official_price_raw'] = f"{existing.get('price')} zł (cache)"
+            offer['price_source'] = 'cache'
+            offer['skipped'] = True  # Flaga że pominięto pobieranie
+            
+            # Dodaj adres i współrzędne z cache (dla reaktywacji nieaktywnych ofert)
+            if existing.get('address'):
+                offer['cached_address'] = existing.get('address')
+            # Współrzędne: PRIORYTET 1 = address.coords (canonical),
+            # FALLBACK = top-level 'coordinates' (legacy, do usunięcia z bazy).
+            _coords = (existing.get('address', {}) or {}).get('coords') or existing.get('coordinates')
+            if _coords:
+                offer['cached_coordinates'] = _coords
+            # Oznacz czy oferta była nieaktywna (do potencjalnej reaktywacji)
+            offer['was_inactive'] = not existing.get('was_active', True)
+        return offers_to_fetch
+
+    def fetch_planned_details(self, all_offers: 'RawOfferCollection', offers_to_fetch: List[Dict],
+                              on_offer: Optional[Callable[[Dict], None]] = None,
+                              progress_every: int = 1):
+        """
+        Faza 2 (pobieranie): szczegóły dla zadań z plan_details, wyniki
+        podmieniane w all_offers.
+
+        on_offer(oferta) jest wołane dla KAŻDEGO zadania zaraz po jego
+        ukończeniu (w kolejności ukończenia, z wątku pobierającego) — także gdy
+        pobranie się nie udało (oferta zostaje wtedy z danymi listingu, jak
+        w all_offers).
+        """
+        if not offers_to_fetch:
+            if all_offers:
                 print(f"\n✅ Wszystkie oferty pominięte (brak zmian cen)")
+            return
+
+        engine = (f"async, {self.async_concurrency} w locie" if self.fetch_mode == 'async'
+                  else f"{self.max_workers} wątków")
+        print(f"\n⚡ Faza 2: Pobieranie szczegółów dla {len(offers_to_fetch)} ofert ({engine})...")
+        start_time = time.time()
+
+        def _done(i: int, updated_offer: Optional[Dict]):
+            item = offers_to_fetch[i]
+            if updated_offer is not None:
+                # Dodaj info o poprzedniej cenie jeśli się zmieniła
+                if item.get('reason') == 'price_changed':
+                    updated_offer['previous_price'] = item.get('old_price')
+
+                # Zaktualizuj w all_offers (indeks URL → O(1))
+                all_offers.replace(updated_offer)
+            if on_offer is not None:
+                on_offer(updated_offer if updated_offer is not None else item['offer'])
+
+        self._fetch_details_many([item['offer'] for item in offers_to_fetch],
+                                 progress_every=progress_every, on_result=_done)
         
-        print(f"\n✅ Scraping zakończony: {len(all_offers)} ofert z {page_num} stron")
-        print(f"   📈 Zaoszczędzono {self.stats['skipped_same_price']} requestów!")
-        return all_offers
+        elapsed = time.time() - start_time
+        print(f"\n✅ Szczegóły pobrane w {elapsed:.1f}s (średnio {elapsed/len(offers_to_fetch):.2f}s/oferta)")
 
     # ------------------------------------------------------------------
     # POZYCJE LISTINGU — na której stronie wyników jest oferta (dla ulubionych)
@@ -536,7 +810,6 @@ class OLXScraper:
         """Pobiera JEDNĄ stronę listingu i zwraca surowe oferty (bez
         pobierania szczegółów). Używane przez fetch_listing_positions
         w trybie równoległym."""
-        self._random_delay()
         soup = self._fetch_page(url)
         if not soup:
             return []
@@ -554,42 +827,23 @@ class OLXScraper:
         liczba stron z paginatora), strony 2..N równolegle przez
         ThreadPoolExecutor. Wynik zasila favorites_tracker ("na której
         stronie jest ulubiona oferta w dniu odczytu")."""
-        order = 'search%5Border%5D=' + sort.replace(':', '%3A')
-        base = f"{self.BASE_URL}?{order}"
+        base = self._sorted_listing_url(sort)
         positions: Dict[str, int] = {}
 
-        def _short_id(u: str) -> Optional[str]:
-            m = re.search(r'-ID(\w+)\.html', u or '')
-            return m.group(1) if m else None
-
-        def _absorb(offers: List[Dict], page: int):
-            for o in offers:
-                sid = _short_id(o.get('url', ''))
-                # najniższa (najwyższa pozycja) strona wygrywa — strony
-                # z równoległych wątków przychodzą w dowolnej kolejności
-                if sid and page < positions.get(sid, 10 ** 9):
-                    positions[sid] = page
-
         print(f"\n📄 Pozycje listingu (sort={sort}) — równoległe przejście...")
 
         # Strona 1 sekwencyjnie: z paginatora czytamy liczbę stron
-        self._random_delay()
         soup1 = self._fetch_page(base)
         if not soup1:
             print("   ⚠️ Strona 1 niedostępna — mapa pozycji pusta")
             return positions
-        _absorb(self._extract_offers_from_page(soup1), 1)
+        self._absorb_positions(self._extract_offers_from_page(soup1), 1, positions)
 
-        last_page = 1
-        for a in soup1.find_all('a', href=lambda x: x and 'page=' in str(x)):
-            m = re.search(r'page=(\d+)', a.get('href', ''))
-            if m:
-                last_page = max(last_page, int(m.group(1)))
-        last_page = min(last_page, max_pages)
+        last_page = min(self._last_page_number(soup1), max_pages)
 
         # Strony 2..N równolegle (znamy wzorzec URL ?page=N, order zachowany)
         if last_page >= 2:
-            page_urls = {n: f"{base}&page={n}" for n in range(2, last_page + 1)}
+            page_urls = {n: self._page_url(base, n) for n in range(2, last_page + 1)}
             with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
                 future_to_page = {
                     executor.submit(self._fetch_listing_page_offers, url): n
@@ -598,7 +852,7 @@ class OLXScraper:
                 for future in as_completed(future_to_page):
                     n = future_to_page[future]
                     try:
-                        _absorb(future.result(), n)
+                        self._absorb_positions(future.result(), n, positions)
                     except (*NETWORK_EXCEPTIONS, AttributeError, TypeError) as e:
                         print(f"   ⚠️ Strona {n}: {e}")
 
@@ -701,7 +955,6 @@ class OLXScraper:
                     print(f"   ✅ Pobrano wszystkie {total} ofert")
                     break
 
-                self._random_delay()
 
             except (*NETWORK_EXCEPTIONS, ValueError, KeyError) as e:
                 print(f"   ⚠️ Błąd API strona {page_num}: {e}")
@@ -711,14 +964,20 @@ class OLXScraper:
         return all_offers
 
     def scrape_all_profiles(self, profiles_config: dict,
-                            max_pages_per_profile: int = 10) -> List[Dict]:
+                            max_pages_per_profile: int = 10,
+                            known_offers: 'RawOfferCollection' = None) -> 'RawOfferCollection':
         """
         Scrapuje wszystkie profile firmowe przez OLX API v1.
         Zwraca listę ofert z tagiem profile_key/profile_name.
+
+        known_offers: oferty już obsłużone przez główny crawl listingu
+        (RawOfferCollection z scrape_all_pages). Ich szczegółów NIE pobieramy
+        drugi raz — oferta z profilu służy wtedy tylko do otagowania
+        (profile_key/api_last_refresh) przy merge'u w run_scan.
         """
-        all_raw: List[Dict] = []
-        seen_urls: set = set()
-        profile_keys = list(profiles_config.keys())
+        known_offers = known_offers if known_offers is not None else RawOfferCollection()
+        self.stats['saved_profile_details'] = 0
+        all_raw = RawOfferCollection()
 
         print(f"\n🏢 Scraping {len(profiles_config)} profili firmowych przez API v1...")
 
@@ -737,23 +996,19 @@ class OLXScraper:
             )
 
             for offer in profile_offers:
-                clean = offer['url'].split('?')[0]
-                if clean not in seen_urls:
-                    seen_urls.add(clean)
+                if all_raw.index_of(offer['url']) is None:
                     all_raw.append(offer)
 
-            if key != profile_keys[-1]:
-                self._random_delay()
-
         print(f"\n📊 Profile Faza 1: {len(all_raw)} unikalnych ofert ze wszystkich profili")
 
         if not all_raw:
-            return []
+            return all_raw
 
         # Faza 2: fetch szczegółów dla ofert bez pełnych danych
         # Oferty z API mają tylko podstawowe dane — potrzebujemy adresu
         offers_to_fetch = []
         offers_to_skip = []
+        known_count = 0
 
         for offer in all_raw:
             offer_id = offer['url'].split('/')[-1].split('.')[0]
@@ -795,17 +1050,22 @@ class OLXScraper:
             short_key = f'_short_{offer_id.split("-ID")[-1]}' if '-ID' in offer_id else None
             existing = (self.existing_offers.get(offer_id)
                         or (self.existing_offers.get(short_key) if short_key else None))
-            if existing:
-                existing_price = existing.get('price')
-                if listing_price and existing_price and listing_price == existing_price \
-                        and not self._listing_title_changed(existing, offer):
-                    offers_to_skip.append({'offer': offer, 'existing': existing})
-                else:
-                    offers_to_fetch.append({'offer': offer})
-            else:
+            needs_fetch = not (existing and listing_price and existing.get('price')
+                               and listing_price == existing.get('price')
+                               and not self._listing_title_changed(existing, offer))
+            if known_offers.index_of(offer['url']) is not None:
+                # Już w głównym crawlu (szczegóły pobrane / pominięte tam) —
+                # z profilu bierzemy tylko tagi, bez drugiego requestu
+                if needs_fetch:
+                    self.stats['saved_profile_details'] += 1
+                known_count += 1
+            elif needs_fetch:
                 offers_to_fetch.append({'offer': offer})
+            else:
+                offers_to_skip.append({'offer': offer, 'existing': existing})
 
         print(f"   ⏭️  Pominięto (ta sama cena): {len(offers_to_skip)}")
+        print(f"   🔗 Już w listingu (tylko tagi): {known_count}")
         print(f"   🆕 Do pobrania szczegółów: {len(offers_to_fetch)}")
 
         # Uzupełnij skip-owane z cache
@@ -831,34 +1091,114 @@ class OLXScraper:
         # Pobierz szczegóły dla nowych
         if offers_to_fetch:
             print(f"   ⚡ Pobieranie szczegółów dla {len(offers_to_fetch)} ofert "
-                  f"({self.max_workers} wątków)...")
+                  f"({self.fetch_mode})...")
 
-            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                future_to_item = {
-                    executor.submit(self._fetch_single_offer_details, item['offer']): item
-                    for item in offers_to_fetch
-                }
-                completed = 0
-                total_fetch = len(offers_to_fetch)
-                for future in as_completed(future_to_item):
-                    completed += 1
-                    try:
-                        updated_offer = future.result()
-                        for i, o in enumerate(all_raw):
-                            if o['url'] == updated_offer['url']:
-                                all_raw[i] = updated_offer
-                                break
-                        if completed % 10 == 0 or completed == total_fetch:
-                            print(f"\r   Postęp: [{completed}/{total_fetch}] "
-                                  f"{completed/total_fetch*100:.0f}%", end='', flush=True)
-                    except (*NETWORK_EXCEPTIONS, AttributeError, TypeError) as e:
-                        print(f"\n   ⚠️ Błąd: {e}")
+            fetched = self._fetch_details_many([item['offer'] for item in offers_to_fetch],
+                                               progress_every=10)
+            for updated_offer in fetched:
+                if updated_offer is not None:
+                    all_raw.replace(updated_offer)
 
             print(f"\n   ✅ Szczegóły profili pobrane")
 
         print(f"\n✅ Profile Faza 2: {len(all_raw)} ofert gotowych do przetworzenia")
         return all_raw
     
+    # ------------------------------------------------------------------
+    # SILNIK POBIERANIA SZCZEGÓŁÓW — async (domyślny) / wątki (fallback)
+    # ------------------------------------------------------------------
+
+    def _fetch_details_many(self, offers: List[Dict], progress_every: int = 1,
+                            on_result: Optional[Callable[[int, Optional[Dict]], None]] = None
+                            ) -> List[Optional[Dict]]:
+        """
+        Pobiera szczegóły dla listy ofert. Zwraca listę wyników w KOLEJNOŚCI
+        wejścia (oferta uzupełniona o szczegóły albo None przy wyjątku).
+        on_result(indeks, wynik) — opcjonalnie, zaraz po ukończeniu każdej oferty.
+
+        Tryb 'async': jedna pętla asyncio na curl_cffi AsyncSession — do
+        async_concurrency requestów w locie, tempo trzyma wyłącznie wspólny
+        kontroler OLX_RATE. W trybie wątków 10 workerów spędzało większość
+        fazy 2 na time.sleep w dawnym _random_delay, nie na sieci. Gdy silnik async
+        nie wstanie (brak AsyncSession, już działająca pętla zdarzeń) —
+        spadamy na ThreadPoolExecutor.
+        """
+        if not offers:
+            return []
+        if self.fetch_mode == 'async':
+            try:
+                return asyncio.run(self._fetch_details_async(offers, progress_every, on_result))
+            except (RuntimeError, AttributeError, ImportError) as e:
+                print(f"\n   ⚠️ Silnik async niedostępny ({e}) — fallback na wątki")
+        return self._fetch_details_threaded(offers, progress_every, on_result)
+
+    @staticmethod
+    def _print_progress(completed: int, total: int, progress_every: int):
+        if completed % progress_every == 0 or completed == total:
+            print(f"\r   Postęp: [{completed}/{total}] {completed / total * 100:.1f}%", end='', flush=True)
+
+    def _fetch_details_threaded(self, offers: List[Dict], progress_every: int = 1,
+                                on_result: Optional[Callable[[int, Optional[Dict]], None]] = None
+                                ) -> List[Optional[Dict]]:
+        results: List[Optional[Dict]] = [None] * len(offers)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            future_to_idx = {
+                executor.submit(self._fetch_single_offer_details, offer): i
+                for i, offer in enumerate(offers)
+            }
+            completed = 0
+            for future in as_completed(future_to_idx):
+                completed += 1
+                try:
+                    results[future_to_idx[future]] = future.result()
+                except (*NETWORK_EXCEPTIONS, AttributeError, TypeError) as e:
+                    print(f"\n   ⚠️ Błąd pobierania: {e}")
+                if on_result is not None:
+                    on_result(future_to_idx[future], results[future_to_idx[future]])
+                self._print_progress(completed, len(offers), progress_every)
+        return results
+
+    async def _fetch_details_async(self, offers: List[Dict], progress_every: int = 1,
+                                   on_result: Optional[Callable[[int, Optional[Dict]], None]] = None
+                                   ) -> List[Optional[Dict]]:
+        results: List[Optional[Dict]] = [None] * len(offers)
+        semaphore = asyncio.Semaphore(self.async_concurrency)
+        completed = 0
+
+        async def _one(i: int, offer: Dict):
+            nonlocal completed
+            async with semaphore:
+                try:
+                    details = await self._fetch_offer_details_async(session, offer['url'])
+                    results[i] = self._apply_offer_details(offer, details)
+                except (*NETWORK_EXCEPTIONS, AttributeError, TypeError) as e:
+                    print(f"\n   ⚠️ Błąd pobierania: {e}")
+            completed += 1
+            if on_result is not None:
+                # Blokujący on_result (pełna kolejka konsumenta) wstrzymuje całą
+                # pętlę — to jest backpressure trybu strumieniowego
+                on_result(i, results[i])
+            self._print_progress(completed, len(offers), progress_every)
+
+        async with self.make_olx_async_session(max_clients=self.async_concurrency) as session:
+            await asyncio.gather(*(_one(i, o) for i, o in enumerate(offers)))
+        return results
+
+    async def _fetch_offer_details_async(self, session, url: str) -> Optional[Dict]:
+        """Async odpowiednik fetch_offer_details (ta sama detekcja blokad i parsowanie)."""
+        try:
+            # Token z OLX_RATE i raport blokady/latencji robi sama sesja
+            response = await session.get(url, timeout=15)
+            if detect_block(response):
+                return None
+            response.raise_for_status()
+        except NETWORK_EXCEPTIONS as e:
+            print(f"❌ Błąd pobierania {url}: {e}")
+            return None
+        # Parsowanie lxml poza pętlą zdarzeń — curl w tym czasie obsługuje sockety
+        soup = await asyncio.to_thread(BeautifulSoup, response.text, 'lxml')
+        return self._parse_offer_details(soup, url)
+
     def fetch_offer_details(self, url: str) -> Optional[Dict]:
         """
         Pobiera pełne szczegóły ogłoszenia (pełny opis + oficjalna cena).
@@ -873,11 +1213,14 @@ class OLXScraper:
         Returns:
             Dict z pełnym opisem, oficjalną ceną i innymi danymi
         """
-        self._random_delay()
         soup = self._fetch_page(url)
         if not soup:
             return None
-        
+        return self._parse_offer_details(soup, url)
+
+    def _parse_offer_details(self, soup: BeautifulSoup, url: str) -> Optional[Dict]:
+        """Parsuje stronę ogłoszenia (opis, og:title, cena JSON-LD / h3).
+        Wspólne dla trybu wątków (fetch_offer_details) i async."""
         try:
             # NOWE: Pobierz tytuł z og:title (bardziej niezawodne niż h1)
             title_from_page = ""
@@ -971,7 +1314,11 @@ class OLXScraper:
         Wrapper do równoległego pobierania szczegółów pojedynczej oferty.
         Zwraca ofertę z dodanymi szczegółami.
         """
-        details = self.fetch_offer_details(offer['url'])
+        return self._apply_offer_details(offer, self.fetch_offer_details(offer['url']))
+
+    @staticmethod
+    def _apply_offer_details(offer: Dict, details: Optional[Dict]) -> Dict:
+        """Przenosi pobrane szczegóły do oferty (wspólne dla wątków i async)."""
         if details:
             offer['description'] = details['description']
             # Czysty og:title (osobno od offer['title'] z listingu, którego NIE ruszamy —
@@ -7,12 +7,15 @@ Trzy rzeczy, które wcześniej były skopiowane w wielu plikach:
 - strefa czasowa Europe/Warsaw,
 - formatowanie dat ISO → format polski frontendu,
 - atomowy zapis JSON (temp + rename) — chroni offers.json i pliki
-  docs/*.json przed ucięciem przy crashu w połowie zapisu.
+  docs/*.json przed ucięciem przy crashu w połowie zapisu,
+- rozdzielanie pracy CPU (parsowanie tekstów) na pulę procesów.
 """
 
 import json
+import multiprocessing
 import os
 import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
@@ -66,3 +69,38 @@ def write_json_atomic(filepath, data, indent=2):
         except OSError:
             pass
         raise
+
+
+def default_workers() -> int:
+    """Liczba procesów do parsowania: SONAR_PARSE_WORKERS albo min(4, liczba CPU).
+    0/1 = bez puli (wszystko w bieżącym procesie)."""
+    env = os.environ.get('SONAR_PARSE_WORKERS')
+    if env is not None:
+        try:
+            return max(0, int(env))
+        except ValueError:
+            pass
+    return min(4, os.cpu_count() or 1)
+
+
+def map_chunks_in_processes(worker_fn, items, workers, chunksize=64,
+                            initializer=None, initargs=()):
+    """
+    worker_fn(lista_elementów) → lista wyników, w puli `workers` procesów.
+    Elementy idą paczkami po chunksize (mniej pickle/IPC), wyniki wracają
+    spłaszczone w kolejności wejścia.
+
+    worker_fn i initializer muszą być funkcjami z poziomu modułu (pickle).
+    """
+    items = list(items)
+    chunks = [items[i:i + chunksize] for i in range(0, len(items), chunksize)]
+    # fork (Linux/CI): procesy dziedziczą sól hashy, więc zbiory iterują jak w
+    # procesie głównym — wyniki parsera są identyczne z liczonymi na miejscu
+    mp_context = (multiprocessing.get_context('fork')
+                  if 'fork' in multiprocessing.get_all_start_methods() else None)
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context,
+                             initializer=initializer, initargs=initargs) as pool:
+        for chunk_results in pool.map(worker_fn, chunks):
+            results.extend(chunk_results)
+    return results
@@ -99,6 +99,12 @@ def _build_offer_card(category: str, sample: dict) -> str:
         dup_of = sample['duplicate_of']
         similarity = sample.get('similarity')
         sim_label = f'{similarity * 100:.1f}% podobne' if isinstance(similarity, (int, float)) else 'podobne'
+        # Duplikat znaleziony przez MinHash/LSH (inny adres, ten sam tekst)
+        minhash_similarity = sample.get('minhash_similarity')
+        if sample.get('match') == 'minhash':
+            sim_label += ' · inny adres'
+        if isinstance(minhash_similarity, (int, float)):
+            sim_label += f' · Jaccard {minhash_similarity * 100:.0f}%'
         orig_url = dup_of.get('url', '')
         orig_url_esc = _esc(orig_url)
         orig_id_esc = _esc(dup_of.get('id', '(brak ID)'))
@@ -0,0 +1,265 @@
+"""
+Street Matcher - wyszukiwanie wielu nazw ulic w tekście jednym przebiegiem.
+
+AddressParser._find_in_text iterował po CAŁEJ whitelist ulic (cache geokodera
++ HARDCODED_LUBLIN_STREETS) dla każdego tekstu: dla ulic wielowyrazowych
+budował i puszczał świeży re.search(r'\\b...\\b'), dla jednowyrazowych trafień
+kolejny re.finditer. Koszt O(ulice × tekst), a whitelist rośnie z każdą nową
+zgeokodowaną ulicą.
+
+StreetAutomaton to automat Aho-Corasick zbudowany raz nad whitelist:
+  - jeden przebieg po tekście znajduje wszystkie wystąpienia wszystkich nazw
+  - granice słów jak w regexie \\b (znak słowa z jednej strony, nie-słowa
+    z drugiej), więc "lipowa" nie trafia w "lipowastreet"
+  - wzorce mają rangę (kolejność podania) — wołający może odtworzyć
+    dotychczasową kolejność kandydatów
+
+SymSpellIndex to indeks literówek (sąsiedztwo usunięć, jak SymSpell) dla
+AddressParser.street_typo_candidates: "najbliższe znane ulice w odległości
+≤ k" bez liczenia Levenshteina z każdą ulicą whitelisty. Sama korekta
+(_fix_street_typo) zostaje przy kubełkach (długość, prefiks, sufiks) —
+jej kryteria zawężają kandydatów szybciej niż generowanie usunięć.
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+try:
+    from Levenshtein import distance as _lev_distance
+except ImportError:  # pragma: no cover — wolniejszy fallback w czystym Pythonie
+    _lev_distance = None
+
+
+def _is_word_char(c: str) -> bool:
+    return c.isalnum() or c == '_'
+
+
+def _is_boundary(text: str, pos: int) -> bool:
+    """Semantyka regexowego \\b na pozycji pos."""
+    before = pos > 0 and _is_word_char(text[pos - 1])
+    after = pos < len(text) and _is_word_char(text[pos])
+    return before != after
+
+
+class StreetAutomaton:
+    def __init__(self, patterns: Iterable[str]):
+        """
+        Args:
+            patterns: Nazwy (lowercase) w kolejności wyznaczającej rangę
+        """
+        self.patterns: List[str] = []
+        self.rank: Dict[str, int] = {}
+        # Trie: lista stanów, każdy stan = dict znak → stan potomny
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+
+        for pattern in patterns:
+            if not pattern or pattern in self.rank:
+                continue
+            self.rank[pattern] = len(self.patterns)
+            self.patterns.append(pattern)
+            self._insert(pattern, self.rank[pattern])
+        self._build_fail_links()
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def rerank(self, order: Iterable[str]):
+        """Nadaje wzorcom rangę wg nowej kolejności (np. automat z artefaktu,
+        a zbiór ulic iteruje w tym procesie inaczej niż w budującym)."""
+        rank = {pattern: i for i, pattern in enumerate(order)}
+        missing = len(rank)
+        for pattern in self.patterns:
+            if pattern not in rank:
+                rank[pattern] = missing
+                missing += 1
+        self.rank = rank
+
+    def _insert(self, pattern: str, idx: int):
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(idx)
+
+    def _build_fail_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                cand = self._goto[f].get(ch, 0)
+                self._fail[nxt] = cand if cand != nxt else 0
+                # Wyjścia stanu fail są sufiksami — dziedziczymy je
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def finditer(self, text: str, word_boundary: bool = True) -> Iterable[Tuple[int, int, str]]:
+        """
+        Wszystkie wystąpienia wzorców w tekście: (start, end, wzorzec),
+        w kolejności końca dopasowania.
+        """
+        goto, fail, out, patterns = self._goto, self._fail, self._out, self.patterns
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not out[state]:
+                continue
+            end = i + 1
+            for idx in out[state]:
+                pattern = patterns[idx]
+                start = end - len(pattern)
+                if word_boundary and not (_is_boundary(text, start) and _is_boundary(text, end)):
+                    continue
+                yield start, end, pattern
+
+    def find_all(self, text: str, word_boundary: bool = True) -> Dict[str, List[Tuple[int, int]]]:
+        """
+        Wzorzec → lista spanów (start, end) jego wystąpień. Jak re.finditer:
+        wystąpienia tego samego wzorca nie nakładają się (pierwsze od lewej wygrywa).
+        """
+        found: Dict[str, List[Tuple[int, int]]] = {}
+        for start, end, pattern in self.finditer(text, word_boundary):
+            spans = found.setdefault(pattern, [])
+            if spans and start < spans[-1][1]:
+                continue
+            spans.append((start, end))
+        return found
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Odległość Levenshteina (python-Levenshtein, gdy zainstalowany)."""
+    if _lev_distance is not None:
+        return _lev_distance(a, b)
+    if len(a) < len(b):
+        a, b = b, a
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+
+class SymSpellIndex:
+    """
+    Indeks sąsiedztwa usunięć: każde słowo słownika zapisane pod wszystkimi
+    wariantami swojego prefiksu (prefix_length znaków) z usuniętymi ≤ max_distance
+    znakami. Zapytanie generuje te same warianty dla szukanego słowa — słowa
+    w odległości ≤ k mają wspólny wariant — i liczy Levenshteina tylko dla
+    tej garstki kandydatów. Ograniczenie do prefiksu (jak w SymSpell) trzyma
+    rozmiar indeksu ~30 wpisów na słowo niezależnie od jego długości.
+    """
+
+    def __init__(self, words: Iterable[str], max_distance: int = 2, prefix_length: int = 7):
+        self.max_distance = max_distance
+        self.prefix_length = max(prefix_length, max_distance + 1)
+        self.words = set()
+        self._deletes: Dict[str, List[str]] = {}
+        for word in words:
+            if not word or word in self.words:
+                continue
+            self.words.add(word)
+            for variant in self._variants(word[:self.prefix_length], max_distance):
+                self._deletes.setdefault(variant, []).append(word)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    @staticmethod
+    def _variants(word: str, max_distance: int) -> set:
+        variants = {word}
+        frontier = {word}
+        for _ in range(max_distance):
+            frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+            variants |= frontier
+        return variants
+
+    def candidates(self, word: str, max_distance: int = None) -> List[Tuple[str, int]]:
+        """
+        Słowa słownika w odległości ≤ max_distance od word: [(słowo, odległość)],
+        od najbliższego (remis: alfabetycznie).
+        """
+        k = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        seen = set()
+        found = []
+        for variant in self._variants(word[:self.prefix_length], k):
+            for known in self._deletes.get(variant, ()):
+                if known in seen:
+                    continue
+                seen.add(known)
+                if abs(len(known) - len(word)) > k:
+                    continue
+                dist = edit_distance(known, word)
+                if dist <= k:
+                    found.append((known, dist))
+        found.sort(key=lambda x: (x[1], x[0]))
+        return found
+
+    def closest(self, word: str, max_distance: int = None) -> List[str]:
+        """Wszystkie słowa o minimalnej odległości (≤ max_distance) — remisy razem."""
+        found = self.candidates(word, max_distance)
+        if not found:
+            return []
+        best = found[0][1]
+        return [known for known, dist in found if dist == best]
+
+
+if __name__ == "__main__":
+    import random
+    import re
+
+    print("🧪 Test StreetAutomaton\n")
+    streets = ['lipowa', 'lipowa boczna', 'krakowskie przedmieście', 'owa', 'zana', 'al. racławickie']
+    auto = StreetAutomaton(streets)
+    text = 'pokój lipowa 5, blisko krakowskie przedmieście; zanaa i zana. lipowastreet al. racławickie'
+    found = auto.find_all(text)
+    for street in streets:
+        expected = [m.span() for m in re.finditer(r'\b' + re.escape(street) + r'\b', text)]
+        assert found.get(street, []) == expected, (street, found.get(street), expected)
+    assert 'owa' not in found
+
+    # Losowe porównanie z regexem (granice słów, nakładające się wzorce)
+    rng = random.Random(7)
+    alphabet = 'abł ż.'
+    for _ in range(300):
+        pats = list({''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))).strip()
+                     for _ in range(6)} - {''})
+        txt = ''.join(rng.choice(alphabet) for _ in range(40))
+        found = StreetAutomaton(pats).find_all(txt)
+        for p in pats:
+            expected = [m.span() for m in re.finditer(r'\b' + re.escape(p) + r'\b', txt)]
+            assert found.get(p, []) == expected, (p, txt, found.get(p), expected)
+    print(f"✅ StreetAutomaton OK ({len(auto)} wzorców)")
+
+    # SymSpellIndex vs pełne porównanie z każdym słowem
+    words = ['leszetyckiego', 'narutowicza', 'nadbystrzycka', 'ogrodowa', 'ogródkowa',
+             'kryształowa', 'krochmalna', 'lipowa', 'zana', 'abramowicka']
+    index = SymSpellIndex(words)
+    for query in ['leszyteckiego', 'narutowicz', 'ogrodkowa', 'zaba', 'xyz', 'krysztalowa',
+                  'nadbystrzyckaa', 'l']:
+        brute = sorted(((w, edit_distance(w, query)) for w in words if edit_distance(w, query) <= 2),
+                       key=lambda x: (x[1], x[0]))
+        assert index.candidates(query) == brute, (query, index.candidates(query), brute)
+    assert index.closest('leszyteckiego') == ['leszetyckiego']
+    for _ in range(200):  # krótkie prefiksy — gwarancja "wspólnego wariantu" musi trzymać
+        pool = [''.join(rng.choice('abł') for _ in range(rng.randint(1, 9))) for _ in range(20)]
+        small = SymSpellIndex(pool, prefix_length=3)
+        q = ''.join(rng.choice('abł') for _ in range(rng.randint(1, 9)))
+        brute = sorted({(w, edit_distance(w, q)) for w in pool if edit_distance(w, q) <= 2},
+                       key=lambda x: (x[1], x[0]))
+        assert small.candidates(q) == brute, (q, small.candidates(q), brute)
+    assert edit_distance('kitten', 'sitting') == 3
+    print(f"✅ SymSpellIndex OK ({len(index)} słów, {len(index._deletes)} wariantów)")
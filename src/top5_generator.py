@@ -29,6 +29,7 @@ from datetime import datetime
 import pytz
 
 from shared_utils import write_json_atomic
+from offers_journal import read_offers
 
 
 class Top5Generator:
@@ -58,8 +59,7 @@ class Top5Generator:
     def generate(self):
         print("🔄 Generowanie danych dla strony top5...")
         
-        with open(self.offers_file, encoding='utf-8') as f:
-            data = json.load(f)
+        data = read_offers(self.offers_file)
         
         offers = data.get('offers', [])
         total_offers = len(offers)
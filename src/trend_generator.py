@@ -17,11 +17,11 @@ zaniżony (survivorship: w bazie zostały tylko długo żyjące oferty z tamtych
 więc odcinamy go i rysujemy tylko wiarygodny zakres.
 """
 
-import json
 from datetime import datetime, date, timedelta
 from pathlib import Path
 
 from shared_utils import write_json_atomic
+from offers_journal import read_offers
 
 TITLE = "Lublin – pokoje: wynajem"
 UNIT = "ofert"
@@ -323,8 +323,7 @@ def generate_trend_data(base_dir: Path = None) -> bool:
     output_file = base_dir / 'docs' / 'trend_data.json'
 
     print("🔄 Generowanie trend_data.json...")
-    with open(input_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    data = read_offers(input_file)
     offers = data.get('offers', [])
 
     series = build_series(offers)
@@ -8,16 +8,22 @@ Pilnuje kontraktu wprowadzonego przy odmrożeniu re-parsingu istniejących ofert
   3. powrót do adresu, z którego już korygowaliśmy → pominięte (anty-migotanie)
   4. opis pominiętej oferty (wraca z doklejonym tytułem) NIE liczy się jako
      zmiana tekstu — inaczej każda korekta lądowałaby w historii adresu
+  5. ten sam adres, inne koordynaty (poprawiony wpis cache geokodera) →
+     korekta koordynatów in-place, bez historii adresu
+  6. fast path (source_hash bez zmian) bierze koordynaty z bazy tylko, gdy
+     cache geokodera ma pod tym adresem te same
 
 Uruchamianie: python3 test_address_correction.py  (z katalogu głównego repo)
 """
 import os
 import sys
+from types import SimpleNamespace
 
 sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
 os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
 
 from main import SonarPokojowy  # noqa: E402
+from offer_store import OfferStore  # noqa: E402
 
 OPIS = ('Pokój 1 osobowy, ul. Kaprysowa, Czechów Pokój 1 osobowy, ul. Kaprysowa, Czechów '
         'Lublin Ciche osiedle, tuż obok pasaż handlowy przy ul. Braci Wieniawskich.')
@@ -99,6 +105,32 @@ def main():
               'Kaprysowa', 'Kaprysowa',
               description='Pokój 1 osobowy Lublin wynajmę od zaraz, przeprowadzka na ul. Nową 5.')))
 
+    print("\n5️⃣  Ten sam adres, poprawione koordynaty w cache → korekta koordynatów")
+    o = _offer()
+    m._update_existing_offer(o, _processed('Braci Wieniawskich', 'Braci Wieniawskich'))
+    check('koordynaty podmienione', o['address']['coords'] == {'lat': 51.263, 'lon': 22.546},
+          str(o['address']['coords']))
+    check('BRAK wpisu w versions[] i address_corrections',
+          not o.get('versions') and not o.get('address_corrections'))
+
+    print("\n6️⃣  Fast path: koordynaty z bazy tylko zgodne z cache geokodera")
+    o = _offer()
+    raw = {'url': o['url'], 'title': o['title'], 'description': OPIS}
+    o['source_hash'] = m._source_hash(raw)
+    geocoder, offer_store, force_reparse = m.geocoder, m.offer_store, m.force_reparse
+    try:
+        m.offer_store = OfferStore({'offers': [o]})
+        m.force_reparse = False
+        m.geocoder = SimpleNamespace(cache={'Braci Wieniawskich': {'lat': 51.26, 'lon': 22.54}})
+        stored = m._stored_parse(raw, o['source_hash'])
+        check('cache zgodny → adres z bazy', stored is not None and stored[2] == o['address']['coords'])
+        m.geocoder.cache['Braci Wieniawskich'] = {'lat': 51.263, 'lon': 22.546}
+        check('cache poprawiony → pełny pipeline', m._stored_parse(raw, o['source_hash']) is None)
+        del m.geocoder.cache['Braci Wieniawskich']
+        check('brak wpisu w cache → pełny pipeline', m._stored_parse(raw, o['source_hash']) is None)
+    finally:
+        m.geocoder, m.offer_store, m.force_reparse = geocoder, offer_store, force_reparse
+
     print("\n" + "=" * 60)
     if failed:
         print(f"❌ Niezaliczone: {len(failed)} → {', '.join(failed)}")
@@ -0,0 +1,34 @@
+"""Rekordy ofert w kształcie offers.json dla testów backendów bazy
+(test_offers_sqlite.py, test_offers_journal.py, test_offer_shards.py)."""
+
+SEEN = '2026-10-17T09:00:00+02:00'
+FIRST_SEEN = '2026-10-01T09:00:00+02:00'
+
+
+def make_offer(i, active=True, last_seen=SEEN, first_seen=FIRST_SEEN, **over):
+    """Oferta nr i: pełny rekord z listami podrzędnymi i opisem (MinHash)."""
+    offer_id = f'pokoj-{i}-CID3-IDTST{i:03d}'
+    offer = {
+        'id': offer_id,
+        'url': f'https://www.olx.pl/d/oferta/{offer_id}.html',
+        'title': f'Pokój {i}',
+        'address': {'full': f'Lipowa {i}', 'street': 'Lipowa', 'number': str(i),
+                    'coords': {'lat': 51.24, 'lon': 22.56}, 'precision': 'exact'},
+        'price': {'current': 900 + i, 'history': [900 + i],
+                  'history_full': [{'price': 900 + i, 'date': first_seen, 'approximated': False}],
+                  'media_info': 'w cenie', 'source': 'JSON-LD (OLX)'},
+        'description': f'Pokój {i} przy Lipowej blisko UMCS, cisza, internet w cenie, dla studentki',
+        'first_seen': first_seen,
+        'last_seen': last_seen,
+        'active': active,
+        'refresh_dates': ['2026-10-05'],
+        'title_versions': [{'title': f'Pokój {i}', 'first_seen': first_seen[:10], 'last_seen': None}],
+    }
+    offer.update(over)
+    return offer
+
+
+def make_database(n=5, inactive_every=2):
+    """Baza z n ofertami; co inactive_every-ta (od pierwszej) nieaktywna."""
+    return {'last_scan': SEEN, 'next_scan': '2026-10-17T15:00:00+02:00',
+            'offers': [make_offer(i, active=i % inactive_every != 0) for i in range(n)]}
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""Test: archiwum nieaktywnych ofert w miesięcznych plikach (offer_shards.py).
+
+Pilnuje kontraktu archiwum razem z OfferStore:
+
+  1. split_hot + archive: stare nieaktywne oferty trafiają do plików
+     miesięcy, nowy proces widzi je z samego indeksu (bez wczytywania miesięcy);
+     indeks relistów bierze sygnatury z SignatureCache po kluczu opisu, a przy
+     zimnym cache (świeży klon) liczy je z opisów z plików miesięcy
+  2. lookup()/exists() nie promują — oferta zostaje w archiwum
+  3. find() po krótkim ID promuje rekord z archiwum do gorącego zbioru;
+     cykl zapisu (flush keep_taken → baza → flush) usuwa go z archiwum
+  4. promowany rekord, który znów wygasł, wraca do archiwum — jedna kopia
+  5. crash między zapisem bazy a drugim flush: discard() usuwa kopię z
+     archiwum, także gdy rekord w bazie ma już nowy last_seen
+  6. read_offers (generatory) widzi gorący zbiór + archiwum
+
+Uruchamianie: python3 test_offer_shards.py  (z katalogu głównego repo)
+"""
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytz
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from offer_shards import ColdArchive, archive_dir_for, split_hot  # noqa: E402
+from offer_store import OfferStore  # noqa: E402
+from offers_journal import read_offers  # noqa: E402
+from relist_detector import SignatureCache, minhash_signature, signature_cache_path_for  # noqa: E402
+from shared_utils import write_json_atomic  # noqa: E402
+from test_fixtures.offer_factory import make_offer  # noqa: E402
+
+TZ = pytz.timezone('Europe/Warsaw')
+NOW = TZ.localize(datetime(2026, 10, 17, 9, 0))
+
+
+def _offer(i, active, days_ago):
+    seen = NOW - timedelta(days=days_ago)
+    return make_offer(i, active=active, last_seen=seen.isoformat(),
+                      first_seen=(seen - timedelta(days=20)).isoformat())
+
+
+def _offers():
+    # 0-1 gorące (aktywna, świeżo wygasła), 2-4 zimne z trzech różnych miesięcy
+    return [_offer(0, True, 0), _offer(1, False, 3), _offer(2, False, 45),
+            _offer(3, False, 80), _offer(4, False, 200)]
+
+
+def _archived(tmp):
+    """Baza po pierwszym scanie z archiwum: (offers.json, gorący zbiór, zimne)."""
+    json_path = Path(tmp) / 'offers.json'
+    hot, cold = split_hot(_offers(), NOW)
+    archive = ColdArchive(archive_dir_for(json_path))
+    archive.archive(cold)
+    archive.flush(keep_taken=True)
+    write_json_atomic(json_path, {'last_scan': NOW.isoformat(), 'offers': hot})
+    archive.flush()
+    return json_path, hot, cold
+
+
+def _save(json_path, database, archive):
+    """Kolejność zapisu jak OLXMonitor._save_database."""
+    archive.flush(keep_taken=True)
+    write_json_atomic(json_path, database)
+    archive.flush()
+
+
+def _load(json_path):
+    with open(json_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_split_and_reopen():
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path, hot, cold = _archived(tmp)
+        assert [o['id'][:7] for o in hot] == ['pokoj-0', 'pokoj-1']
+        assert len(list(archive_dir_for(json_path).glob('offers-*.json'))) == 3
+        archive = ColdArchive(archive_dir_for(json_path))
+        assert len(archive) == 3 and archive.stats['months_loaded'] == 0
+        # Zimny cache sygnatur: opisy z plików miesięcy, sygnatury jak z samego opisu
+        cache = SignatureCache(signature_cache_path_for(json_path))
+        entries = archive.relist_entries(cache)
+        assert {s['id'] for s, _ in entries} == {o['id'] for o in cold}
+        by_id = {o['id']: o for o in cold}
+        assert all(sig == minhash_signature(by_id[s['id']]['description']) for s, sig in entries)
+        assert archive.stats['months_loaded'] == 3
+        cache.save()
+        # Ciepły cache: relisty widzą archiwum z samego indeksu
+        archive = ColdArchive(archive_dir_for(json_path))
+        warm = SignatureCache(signature_cache_path_for(json_path))
+        assert len(archive.relist_entries(warm)) == 3
+        assert archive.stats['months_loaded'] == 0 and warm.stats['computed'] == 0
+        assert sorted(o['id'] for o in archive.load_all()) == sorted(o['id'] for o in cold)
+        # Commitowane dane bez sygnatur
+        assert 'minhash' not in (archive_dir_for(json_path) / 'index.json').read_text(encoding='utf-8')
+
+
+def test_lookup_does_not_promote():
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path, _, _ = _archived(tmp)
+        archive = ColdArchive(archive_dir_for(json_path))
+        store = OfferStore(_load(json_path), archive=archive)
+        relisted = 'pokoj-3-nowy-tytul-CID3-IDTST003'
+        assert store.lookup(relisted) == (None, False)
+        assert store.exists(relisted) and not store.exists('pokoj-9-CID3-IDTST009')
+        assert len(archive) == 3 and len(store) == 2
+        assert archive.stats['months_loaded'] == 0 and archive.stats['promoted'] == 0
+        assert store.dirty_records() == []
+
+
+def test_promotion_and_rearchive():
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path, _, _ = _archived(tmp)
+        archive = ColdArchive(archive_dir_for(json_path))
+        database = _load(json_path)
+        store = OfferStore(database, archive=archive)
+
+        # Oferta wróciła na OLX pod nowym slugiem → promocja po krótkim ID
+        record, by_short = store.find('pokoj-3-nowy-tytul-CID3-IDTST003')
+        assert record['id'] == 'pokoj-3-CID3-IDTST003' and by_short
+        assert store.get('pokoj-3-CID3-IDTST003') is record and len(store) == 3
+        assert record in store.dirty_records()
+        store.set_active(record, True)
+        record['last_seen'] = NOW.isoformat()
+        _save(json_path, database, archive)
+
+        reopened = ColdArchive(archive_dir_for(json_path))
+        assert len(reopened) == 2 and not reopened.contains('pokoj-3-CID3-IDTST003')
+        assert 'pokoj-3-CID3-IDTST003' not in {o['id'] for o in reopened.load_all()}
+        assert 'pokoj-3-CID3-IDTST003' in {o['id'] for o in _load(json_path)['offers']}
+
+        # Dwa miesiące później oferta znów wygasła → wraca do archiwum, jedna kopia
+        database = _load(json_path)
+        promoted = next(o for o in database['offers'] if o['id'] == 'pokoj-3-CID3-IDTST003')
+        promoted['active'] = False
+        assert reopened.discard(database['offers']) == 0
+        hot, cold = split_hot(database['offers'], NOW + timedelta(days=60))
+        assert 'pokoj-3-CID3-IDTST003' in {o['id'] for o in cold}
+        database['offers'] = hot
+        reopened.archive(cold)
+        _save(json_path, database, reopened)
+
+        final = ColdArchive(archive_dir_for(json_path))
+        ids = [o['id'] for o in final.load_all()]
+        assert ids.count('pokoj-3-CID3-IDTST003') == 1, ids
+        assert final.contains('pokoj-3-CID3-IDTST003')
+        assert 'pokoj-3-CID3-IDTST003' not in {o['id'] for o in _load(json_path)['offers']}
+
+
+def test_crash_between_flushes():
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path, _, _ = _archived(tmp)
+        archive = ColdArchive(archive_dir_for(json_path))
+        database = _load(json_path)
+        store = OfferStore(database, archive=archive)
+        record, _ = store.find('pokoj-2-CID3-IDTST002')
+        store.set_active(record, True)
+        record['last_seen'] = NOW.isoformat()
+        archive.flush(keep_taken=True)
+        write_json_atomic(json_path, database)
+        # Crash przed drugim flush(): rekord w bazie (z nowym last_seen) i jeszcze w archiwum
+        reopened = ColdArchive(archive_dir_for(json_path))
+        assert reopened.contains('pokoj-2-CID3-IDTST002')
+        assert reopened.discard(_load(json_path)['offers']) == 1
+        reopened.flush()
+        final = ColdArchive(archive_dir_for(json_path))
+        assert not final.contains('pokoj-2-CID3-IDTST002') and len(final) == 2
+        assert 'pokoj-2-CID3-IDTST002' not in {o['id'] for o in final.load_all()}
+
+
+def test_read_offers_hot_plus_archive():
+    previous = os.environ.pop('SONAR_OFFERS_BACKEND', None)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path, hot, cold = _archived(tmp)
+            database = read_offers(json_path)
+            assert [o['id'] for o in database['offers'][:len(hot)]] == [o['id'] for o in hot]
+            assert sorted(o['id'] for o in database['offers'][len(hot):]) == sorted(o['id'] for o in cold)
+            # offers.json na dysku dalej zawiera tylko gorący zbiór
+            assert len(_load(json_path)['offers']) == len(hot)
+    finally:
+        if previous is not None:
+            os.environ['SONAR_OFFERS_BACKEND'] = previous
+
+
+def _run():
+    tests = [
+        test_split_and_reopen,
+        test_lookup_does_not_promote,
+        test_promotion_and_rearchive,
+        test_crash_between_flushes,
+        test_read_offers_hot_plus_archive,
+    ]
+    passed = 0
+    failed = 0
+    print("🧪 TEST: archiwum ofert (offer_shards)\n")
+    for t in tests:
+        try:
+            t()
+            print(f"✅ {t.__name__}")
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {t.__name__}\n   {e}")
+            failed += 1
+    print(f"\n📊 {passed} OK / {failed} FAIL")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    ok = _run()
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""Test: baza ofert jako snapshot + journal zmian (offers_journal.py).
+
+Pilnuje kontraktu backendu:
+
+  1. zapis → odczyt przez kilka scanów odtwarza dokładnie to, co zapisałby
+     backend JSON (kolejność ofert i kluczy), offers.json nieprzepisywany
+  2. crash w trakcie dopisywania paczki: ucięta paczka pominięta w całości,
+     ogon obcięty przy otwarciu, następny scan zapisuje się czysto
+  3. kompakcja co N scanów albo po przekroczeniu progu rozmiaru journala:
+     pełny snapshot, journal rotowany do .prev, audyt widzi scany z .prev
+  4. offers.json zmieniony poza journalem → journal pominięty
+  5. read_offers (generatory) widzi stan snapshot + journal
+
+Uruchamianie: python3 test_offers_journal.py  (z katalogu głównego repo)
+"""
+import copy
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from offers_journal import JournalOfferStorage, audit, read_offers  # noqa: E402
+from shared_utils import write_json_atomic  # noqa: E402
+from test_fixtures.offer_factory import make_database, make_offer  # noqa: E402
+
+
+def _database():
+    return make_database(10, inactive_every=3)
+
+
+def _scan(database, at, step):
+    """Zmiany jednego scanu: last_seen aktywnych, cena, dezaktywacja, nowa oferta."""
+    database['last_scan'] = at
+    for offer in database['offers']:
+        if offer['active']:
+            offer['last_seen'] = at
+    database['offers'][1]['price'] = {'current': 950 + step, 'history': [901, 950 + step]}
+    next(o for o in database['offers'][2:] if o['active'])['active'] = False
+    database['offers'].insert(0, make_offer(100 + step))
+
+
+def _storage(path, **kwargs):
+    # Mała baza testowa — próg rozmiaru journala podniesiony, żeby kompakcję
+    # wyzwalała liczba scanów (test_compaction_by_size sprawdza próg osobno)
+    kwargs.setdefault('compact_ratio', 10.0)
+    return JournalOfferStorage(path, **kwargs)
+
+
+def _dumps(database):
+    return json.dumps(database, ensure_ascii=False)
+
+
+def test_roundtrip_several_scans():
+    database = _database()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'offers.json'
+        store = _storage(path, compact_every=10)
+        store.load()
+        store.save(database)
+        snapshot = path.read_bytes()
+        current = _storage(path, compact_every=10).load()
+        assert current == database
+        store = _storage(path, compact_every=10)
+        current = store.load()
+        for step in range(3):
+            _scan(current, f'2026-10-17T{10 + step}:00:00+02:00', step)
+            stats = store.save(current)
+            assert stats['compacted'] is None, stats
+            assert (stats['insert'], stats['deactivate']) == (1, 1), stats
+        # Snapshot nietknięty, stan odtworzony z journala — łącznie z kolejnością kluczy
+        assert path.read_bytes() == snapshot
+        reloaded = _storage(path)
+        assert _dumps(reloaded.load()) == _dumps(current)
+        assert reloaded.last_load['scans'] == 3 and reloaded.last_load['torn'] == 0
+        assert [scan['counts']['deactivate'] for scan in audit(path)] == [1, 1, 1]
+
+
+def test_crash_then_save():
+    database = _database()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'offers.json'
+        store = _storage(path)
+        store.load()
+        store.save(database)
+        current = store.load()
+        _scan(current, '2026-10-17T15:00:00+02:00', 0)
+        store.save(current)
+        committed = store.journal_path.stat().st_size
+
+        # Crash w połowie paczki: pełna linia operacji + ucięta, bez znacznika scanu
+        with open(store.journal_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'op': 'delete', 'id': current['offers'][0]['id']}) + '\n{"op": "upd')
+        after_crash = _storage(path)
+        assert after_crash.load() == current, "operacja z uciętej paczki zastosowana"
+        assert after_crash.last_load['torn'] == 2
+        assert after_crash.journal_path.stat().st_size == committed, "ogon journala nie obcięty"
+
+        # Następny scan po restarcie: jego zmiany nie giną, delete z uciętej paczki nie wchodzi
+        expected = copy.deepcopy(current)
+        _scan(expected, '2026-10-17T21:00:00+02:00', 1)
+        after_crash.save(copy.deepcopy(expected))
+        reloaded = _storage(path)
+        assert reloaded.load() == expected
+        assert reloaded.last_load['torn'] == 0 and reloaded.last_load['scans'] == 2
+        assert expected['offers'][1]['id'] in {o['id'] for o in reloaded.load()['offers']}
+
+
+def test_compaction_rotates_journal():
+    database = _database()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'offers.json'
+        store = _storage(path, compact_every=2)
+        store.load()
+        assert store.save(database)['compacted'] == 'brak snapshotu'
+        current = store.load()
+        _scan(current, '2026-10-17T15:00:00+02:00', 0)
+        assert store.save(current)['compacted'] is None
+        _scan(current, '2026-10-17T21:00:00+02:00', 1)
+        assert store.save(current)['compacted'] == '2 scanów'
+        with open(path, 'r', encoding='utf-8') as f:
+            assert json.load(f) == current
+        assert not store.journal_path.exists()
+        assert store.journal_path.with_name(store.journal_path.name + '.prev').exists()
+        # Scan kompaktujący nie trafia do journala — w .prev zostaje pierwszy
+        assert [scan['counts']['insert'] for scan in audit(path)] == [1]
+        # Po kompakcji journal startuje od nowego snapshotu
+        _scan(current, '2026-10-18T09:00:00+02:00', 2)
+        store.save(current)
+        assert _storage(path).load() == current
+
+
+def test_compaction_by_size():
+    database = _database()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'offers.json'
+        store = _storage(path, compact_ratio=0.25)
+        store.load()
+        store.save(database)
+        current = store.load()
+        _scan(current, '2026-10-17T15:00:00+02:00', 0)
+        assert store.save(current)['compacted'] is None
+        _scan(current, '2026-10-17T21:00:00+02:00', 1)
+        # Journal przerósłby 25% snapshotu → pełny zapis zamiast dopisywania
+        stats = store.save(current)
+        assert stats['compacted'] == 'rozmiar journala' and stats['appended_bytes'] == 0, stats
+        assert _storage(path).load() == current
+
+
+def test_snapshot_edited_outside_journal():
+    database = _database()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'offers.json'
+        store = _storage(path)
+        store.load()
+        store.save(database)
+        current = store.load()
+        _scan(current, '2026-10-17T15:00:00+02:00', 0)
+        store.save(current)
+        # Skrypt naprawczy przepisuje offers.json — journal nie pasuje do snapshotu
+        edited = copy.deepcopy(database)
+        edited['offers'][0]['title'] = 'Pokój po naprawie'
+        write_json_atomic(path, edited)
+        reloaded = _storage(path)
+        assert reloaded.load() == edited and reloaded.last_load['valid'] is False
+        assert read_offers(path) == edited
+
+
+def test_read_offers_matches_load():
+    database = _database()
+    previous = os.environ.pop('SONAR_OFFERS_BACKEND', None)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'offers.json'
+            store = _storage(path)
+            store.load()
+            store.save(database)
+            current = store.load()
+            _scan(current, '2026-10-17T15:00:00+02:00', 0)
+            store.save(current)
+            assert read_offers(path) == current
+            with open(path, 'r', encoding='utf-8') as f:
+                assert json.load(f) == database
+    finally:
+        if previous is not None:
+            os.environ['SONAR_OFFERS_BACKEND'] = previous
+
+
+def _run():
+    tests = [
+        test_roundtrip_several_scans,
+        test_crash_then_save,
+        test_compaction_rotates_journal,
+        test_compaction_by_size,
+        test_snapshot_edited_outside_journal,
+        test_read_offers_matches_load,
+    ]
+    passed = 0
+    failed = 0
+    print("🧪 TEST: journal bazy ofert\n")
+    for t in tests:
+        try:
+            t()
+            print(f"✅ {t.__name__}")
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {t.__name__}\n   {e}")
+            failed += 1
+    print(f"\n📊 {passed} OK / {failed} FAIL")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    ok = _run()
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""Test: backend SQLite bazy ofert (offers_sqlite.py).
+
+Pilnuje kontraktu backendu:
+
+  1. zapis → odczyt → eksport daje offers.json bajt w bajt taki sam jak
+     zapisałby backend JSON (kolejność ofert i kluczy, listy podrzędne)
+  2. zapis przyrostowy: zmiana / nowa / usunięta / przesunięta oferta
+  3. z listą brudnych rekordów (OfferStore.dirty_records) porównywane są
+     tylko one — czysta reszta historii nie jest serializowana
+  4. offers.json zmieniony poza backendem jest wciągany przy otwarciu
+  5. read_offers (generatory) czyta prosto z offers.sqlite — offers.json
+     nie jest eksportowany przy każdym zapisie
+
+Uruchamianie: python3 test_offers_sqlite.py  (z katalogu głównego repo)
+"""
+import copy
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from offer_store import OfferStore  # noqa: E402
+from offers_journal import read_offers  # noqa: E402
+from offers_sqlite import SQLiteOfferStorage, open_storage  # noqa: E402
+from shared_utils import write_json_atomic  # noqa: E402
+from test_fixtures.offer_factory import make_database, make_offer  # noqa: E402
+
+
+def test_roundtrip_export_identical():
+    database = make_database()
+    # Historyczny duplikat id (klucz #2) i rekord bez list podrzędnych
+    database['offers'].append(copy.deepcopy(database['offers'][1]))
+    database['offers'].append({'id': 'goly-CID3-IDTST999', 'active': False})
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteOfferStorage(Path(tmp) / 'offers.sqlite')
+        store.save(database)
+        assert store.load() == database
+        store.export_json(Path(tmp) / 'export.json')
+        write_json_atomic(Path(tmp) / 'direct.json', database)
+        assert (Path(tmp) / 'export.json').read_bytes() == (Path(tmp) / 'direct.json').read_bytes()
+        store.close()
+
+
+def test_incremental_save():
+    database = make_database()
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteOfferStorage(Path(tmp) / 'offers.sqlite')
+        store.save(database)
+        changed = copy.deepcopy(database)
+        changed['offers'][0]['price']['history_full'].append(
+            {'price': 950, 'date': '2026-10-17T09:00:00+02:00', 'approximated': False})
+        del changed['offers'][3]
+        changed['offers'].insert(0, make_offer(7))
+        stats = store.save(changed)
+        # nowa + zmieniona zapisane, usunięta skasowana, przesunięte tylko ord
+        assert (stats['written'], stats['deleted']) == (2, 1), stats
+        assert (stats['reordered'], stats['unchanged']) == (2, 1), stats
+        assert store.load() == changed
+        assert store.save(changed)['written'] == 0
+        store.close()
+
+
+def test_dirty_records_only():
+    database = make_database(20)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteOfferStorage(Path(tmp) / 'offers.sqlite')
+        store.save(database)
+        loaded = store.load()
+        offers = OfferStore(loaded)
+        offers.set_active(loaded['offers'][1], False)
+        loaded['offers'][2]['last_seen'] = '2026-10-17T15:00:00+02:00'
+        offers.mark_dirty(loaded['offers'][2])
+        offers.add(make_offer(30))
+        stats = store.save(loaded, dirty=offers.dirty_records())
+        assert stats['compared'] == 3 and stats['written'] == 3, stats
+        assert stats['unchanged'] == 18, stats
+        assert store.load() == loaded
+        store.close()
+
+
+def test_sync_from_json_edit():
+    database = make_database()
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = Path(tmp) / 'offers.json'
+        write_json_atomic(json_path, database)
+        store = SQLiteOfferStorage(Path(tmp) / 'offers.sqlite', import_json=json_path)
+        assert store.load() == database
+        store.close()
+        # Skrypt naprawczy edytuje offers.json poza backendem
+        database['offers'][0]['address']['full'] = 'Lipowa 14'
+        time.sleep(0.01)
+        write_json_atomic(json_path, database)
+        store = SQLiteOfferStorage(Path(tmp) / 'offers.sqlite', import_json=json_path)
+        assert store.load() == database and store.last_save['written'] == 1
+        store.close()
+
+
+def test_read_offers_from_sqlite():
+    database = make_database()
+    previous = os.environ.get('SONAR_OFFERS_BACKEND')
+    os.environ['SONAR_OFFERS_BACKEND'] = 'sqlite'
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = Path(tmp) / 'offers.json'
+            write_json_atomic(json_path, database)
+            store = open_storage(json_path)
+            loaded = store.load()
+            loaded['offers'][0]['active'] = False
+            store.save(loaded)
+            store.close()
+            # offers.json nietknięty (brak eksportu), generatory widzą stan z SQLite
+            with open(json_path, 'r', encoding='utf-8') as f:
+                assert json.load(f) == database
+            assert read_offers(json_path) == loaded
+    finally:
+        if previous is None:
+            os.environ.pop('SONAR_OFFERS_BACKEND', None)
+        else:
+            os.environ['SONAR_OFFERS_BACKEND'] = previous
+
+
+def _run():
+    tests = [
+        test_roundtrip_export_identical,
+        test_incremental_save,
+        test_dirty_records_only,
+        test_sync_from_json_edit,
+        test_read_offers_from_sqlite,
+    ]
+    passed = 0
+    failed = 0
+    print("🧪 TEST: backend SQLite bazy ofert\n")
+    for t in tests:
+        try:
+            t()
+            print(f"✅ {t.__name__}")
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ {t.__name__}\n   {e}")
+            failed += 1
+    print(f"\n📊 {passed} OK / {failed} FAIL")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    ok = _run()
+    sys.exit(0 if ok else 1)